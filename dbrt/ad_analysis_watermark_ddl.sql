@@ -0,0 +1,18 @@
+-- 群组分析提取水位线表
+-- 说明：按 (群组, 提取器) 记录已提取到的最大消息ID与词典版本，
+--       process_messages_for_chat 常规运行只处理水位线之后的新消息，
+--       词典（交易方式、地理位置、黑词配置或价格规则）版本变化时删除旧结果并全量重新提取
+
+USE jd;
+
+CREATE TABLE IF NOT EXISTS `ad_analysis_watermark` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY COMMENT '主键ID',
+  `chat_id` VARCHAR(128) NOT NULL COMMENT '群组ID',
+  `extractor` VARCHAR(32) NOT NULL COMMENT '提取器（price/transaction/geo/dark_keyword）',
+  `last_message_id` BIGINT NOT NULL DEFAULT 0 COMMENT '已处理的最大消息ID（tg_group_chat_history.id）',
+  `dictionary_version` VARCHAR(64) NOT NULL DEFAULT '' COMMENT '提取时使用的词典版本',
+  `created_at` DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+  `updated_at` DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+
+  UNIQUE KEY `uk_chat_extractor` (`chat_id`, `extractor`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='群组分析提取水位线';
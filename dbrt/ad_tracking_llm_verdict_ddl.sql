@@ -0,0 +1,22 @@
+-- LLM 高价值信息判别结果缓存表
+-- 说明：cache_key = SHA1(提示词/模型版本 + 标准化文本哈希 + 排序后的图片内容哈希)，
+--       AdTrackingLLMJob 先按内容键查本表，命中的消息直接复用判别结果，
+--       只有新内容才请求 LLM；提示词、模型或解析规则变化时版本随之变化，旧条目不再命中
+
+USE jd;
+
+CREATE TABLE IF NOT EXISTS `ad_tracking_llm_verdict` (
+  `id` BIGINT AUTO_INCREMENT PRIMARY KEY COMMENT '主键ID',
+  `cache_key` CHAR(40) NOT NULL COMMENT '内容键（SHA1）',
+  `prompt_version` VARCHAR(16) NOT NULL COMMENT '提示词/模型版本',
+  `ai_judgment` TEXT NOT NULL COMMENT '大模型判断结果',
+  `importance_score` FLOAT NOT NULL DEFAULT 0 COMMENT '重要程度评分（0-100）',
+  `is_high_priority` TINYINT(1) NOT NULL DEFAULT 0 COMMENT '是否为高优先级',
+  `image_count` INT NOT NULL DEFAULT 0 COMMENT '图片数量',
+  `hit_count` INT NOT NULL DEFAULT 0 COMMENT '缓存命中次数',
+  `last_hit_at` DATETIME NULL COMMENT '最近一次命中时间',
+  `created_at` DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+  `updated_at` DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+
+  UNIQUE KEY `uk_cache_key` (`cache_key`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='LLM 高价值信息判别结果缓存';
@@ -0,0 +1,55 @@
+-- ================================================
+-- ad_tracking 批量 upsert 唯一键
+-- 执行时间: 2026-10-19
+-- 包含内容:
+--   1. 新增 content_hash 生成列（SHA1(LOWER(normalized_content))）
+--      转小写后再哈希：与原先按 normalized_content 查找（utf8mb4_unicode_ci，不区分大小写）
+--      的合并范围一致，只是大小写不同的内容合并为同一条记录
+--   2. 合并已有重复记录（相同 normalized_content + source_type + source_id）
+--   3. 添加唯一键 uk_content_source，供 INSERT ... ON DUPLICATE KEY UPDATE 使用
+-- ================================================
+
+-- 1. 标准化内容哈希（TEXT 列无法直接建唯一索引）
+ALTER TABLE `ad_tracking`
+ADD COLUMN `content_hash` char(40) GENERATED ALWAYS AS (SHA1(LOWER(`normalized_content`))) STORED
+    COMMENT '标准化内容转小写后的SHA1（生成列，用于唯一键）' AFTER `normalized_content`;
+
+-- 2. 合并重复记录：保留最小ID，累加出现次数，合并首次/最后发现时间
+UPDATE `ad_tracking` t
+JOIN (
+    SELECT MIN(`id`) AS keep_id,
+           SUM(`occurrence_count`) AS total_count,
+           MIN(`first_seen`) AS first_seen,
+           MAX(`last_seen`) AS last_seen
+    FROM `ad_tracking`
+    GROUP BY `content_hash`, `source_type`, `source_id`
+    HAVING COUNT(*) > 1
+) d ON t.`id` = d.keep_id
+SET t.`occurrence_count` = d.total_count,
+    t.`first_seen` = d.first_seen,
+    t.`last_seen` = d.last_seen;
+
+-- 重复记录的标签关联迁移到保留的记录
+UPDATE IGNORE `ad_tracking_tags` tg
+JOIN `ad_tracking` dup ON tg.`ad_tracking_id` = dup.`id`
+JOIN (
+    SELECT MIN(`id`) AS keep_id, `content_hash`, `source_type`, `source_id`
+    FROM `ad_tracking`
+    GROUP BY `content_hash`, `source_type`, `source_id`
+    HAVING COUNT(*) > 1
+) d ON d.`content_hash` = dup.`content_hash`
+    AND d.`source_type` = dup.`source_type`
+    AND d.`source_id` = dup.`source_id`
+    AND dup.`id` > d.keep_id
+SET tg.`ad_tracking_id` = d.keep_id;
+
+-- 删除重复记录（ad_tracking_tags 中未能迁移的关联随外键级联删除）
+DELETE dup FROM `ad_tracking` dup
+JOIN `ad_tracking` keep ON keep.`content_hash` = dup.`content_hash`
+    AND keep.`source_type` = dup.`source_type`
+    AND keep.`source_id` = dup.`source_id`
+    AND keep.`id` < dup.`id`;
+
+-- 3. 唯一键
+ALTER TABLE `ad_tracking`
+ADD UNIQUE KEY `uk_content_source` (`content_hash`, `source_type`, `source_id`);
@@ -0,0 +1,16 @@
+-- ================================================
+-- 聊天图片缩略图路径字段
+-- 执行时间: 2026-10-19
+-- 包含内容:
+--   1. tg_group_chat_history 新增 photo_thumb_path
+--   2. tg_person_chat_history 新增 photo_thumb_path
+-- 说明:
+--   下载图片生成缩略图后写入该字段，列表接口直接读取，为空时回退为原图。
+--   历史记录执行 python scripts/generate_photo_thumbnails.py 补生成缩略图并回填。
+-- ================================================
+
+ALTER TABLE `tg_group_chat_history`
+ADD COLUMN `photo_thumb_path` varchar(256) NOT NULL DEFAULT '' COMMENT '图片缩略图路径' AFTER `photo_path`;
+
+ALTER TABLE `tg_person_chat_history`
+ADD COLUMN `photo_thumb_path` varchar(256) NOT NULL DEFAULT '' COMMENT '图片缩略图路径' AFTER `photo_path`;
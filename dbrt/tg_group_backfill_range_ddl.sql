@@ -0,0 +1,24 @@
+-- 群组历史回溯分段检查点表
+-- 说明：新加入群组的历史按message_id区间切分，记录每个区间的认领状态与拉取进度，
+--       worker重启或FloodWait中断后从cursor_id继续，多个session可并行认领不同区间
+
+USE jd;
+
+CREATE TABLE IF NOT EXISTS `tg_group_backfill_range` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY COMMENT '主键ID',
+  `chat_id` VARCHAR(128) NOT NULL COMMENT '群聊id',
+  `range_start_id` BIGINT NOT NULL DEFAULT 0 COMMENT '区间下界message_id（不含）',
+  `range_end_id` BIGINT NOT NULL DEFAULT 0 COMMENT '区间上界message_id（含）',
+  `cursor_id` BIGINT NOT NULL DEFAULT 0 COMMENT '下次拉取的上界message_id（不含），从新到旧推进',
+  `status` ENUM('pending', 'running', 'done', 'failed') NOT NULL DEFAULT 'pending' COMMENT '区间状态',
+  `session_name` VARCHAR(128) NOT NULL DEFAULT '' COMMENT '认领该区间的session',
+  `attempts` INT NOT NULL DEFAULT 0 COMMENT '失败次数',
+  `fetched_count` INT NOT NULL DEFAULT 0 COMMENT '已拉取消息数',
+  `saved_count` INT NOT NULL DEFAULT 0 COMMENT '已写入消息数',
+  `error_message` VARCHAR(512) NOT NULL DEFAULT '' COMMENT '最近一次错误',
+  `created_at` DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+  `updated_at` DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+
+  UNIQUE KEY `uk_chat_range` (`chat_id`, `range_start_id`),
+  KEY `idx_chat_status` (`chat_id`, `status`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='群组历史回溯分段检查点';
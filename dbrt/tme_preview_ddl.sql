@@ -0,0 +1,26 @@
+-- t.me 账户预览存储表
+-- 说明：按用户名保存 t.me 预览，广告追踪提及账户时只读本表不发起请求；
+--       next_refresh_at 作为刷新队列，后台任务只抓取到期的条目，
+--       到期时间根据提及频率（recent_sightings）与变化频率（change_count / fetch_count）计算
+
+USE jd;
+
+CREATE TABLE IF NOT EXISTS `tme_preview` (
+  `id` INT AUTO_INCREMENT PRIMARY KEY COMMENT '主键ID',
+  `username` VARCHAR(64) NOT NULL COMMENT '用户名（小写，不带@）',
+  `preview` JSON NULL COMMENT '最近一次成功抓取的预览信息',
+  `error` VARCHAR(512) NOT NULL DEFAULT '' COMMENT '最近一次抓取错误',
+  `fetched_at` DATETIME NULL COMMENT '最近一次抓取时间',
+  `next_refresh_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '计划刷新时间',
+  `sighting_count` INT NOT NULL DEFAULT 0 COMMENT '累计提及次数',
+  `recent_sightings` INT NOT NULL DEFAULT 0 COMMENT '上次抓取以来的提及次数',
+  `last_seen_at` DATETIME NULL COMMENT '最近一次提及时间',
+  `fetch_count` INT NOT NULL DEFAULT 0 COMMENT '成功抓取次数',
+  `change_count` INT NOT NULL DEFAULT 0 COMMENT '抓取结果发生变化的次数',
+  `error_streak` INT NOT NULL DEFAULT 0 COMMENT '连续抓取失败次数',
+  `created_at` DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+  `updated_at` DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+
+  UNIQUE KEY `uk_username` (`username`),
+  KEY `idx_next_refresh_at` (`next_refresh_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='t.me 账户预览存储';
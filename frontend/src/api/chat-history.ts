@@ -23,6 +23,7 @@ export interface ChatMessage {
   user_avatar: string
   is_key_focus?: boolean
   photo_paths: string[]
+  photo_thumb_paths?: string[]
   document_paths: string[]  // 保持向后兼容
   documents: DocumentInfo[]  // 新增：包含类型信息的文档列表
   reply_to_msg_id: number
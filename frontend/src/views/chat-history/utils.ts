@@ -64,6 +64,19 @@ export const buildImageUrl = (imagePath: string): string => {
   return `/static/images/${imagePath}`
 }
 
+/**
+ * 构建消息图片列表对应的缩略图URL（与images一一对应）
+ * photo_paths优先使用后端返回的WebP缩略图，图片类文档沿用原图
+ */
+export const buildThumbnailUrls = (msg: ChatMessage): string[] => {
+  const photoPaths = (msg.photo_paths || []).filter(path => path)
+  const thumbPaths = msg.photo_thumb_paths || []
+  return [
+    ...photoPaths.map((path, index) => buildImageUrl(thumbPaths[index] || path)),
+    ...getImageDocuments(msg).map(doc => buildImageUrl(doc.path))
+  ]
+}
+
 /**
  * 检查消息是否有文本内容
  */
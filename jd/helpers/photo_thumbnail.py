@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+聊天图片缩略图辅助函数
+- 为下载的原图生成 medium 规格 WebP 缩略图，与原图存放在同一目录
+- 缩略图文件名由原图路径确定（images/123.jpg -> images/123.medium.webp）
+- 生成成功后缩略图路径随消息记录写入 photo_thumb_path 字段，
+  列表接口直接读取该字段，不在每次请求时检查文件是否存在
+
+说明：
+- 列表接口返回缩略图路径，原图仍用于预览和下载
+- photo_thumb_path 为空时（历史图片或生成失败）回退为原图路径，
+  历史图片可用 scripts/generate_photo_thumbnails.py 补生成并回填该字段
+"""
+
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# 缩略图规格：名称 -> 最长边像素（列表接口使用 medium）
+THUMBNAIL_SIZES = {
+    'medium': 480,
+}
+
+THUMBNAIL_QUALITY = 75
+
+
+def get_thumbnail_path(photo_path, size='medium'):
+    """
+    根据原图相对路径得到缩略图相对路径
+
+    Args:
+        photo_path: 原图路径，如 images/123.jpg
+        size: 缩略图规格
+
+    Returns:
+        str: 缩略图路径，如 images/123.medium.webp；photo_path为空时返回空字符串
+    """
+    if not photo_path:
+        return ''
+    stem = os.path.splitext(photo_path)[0]
+    return f'{stem}.{size}.webp'
+
+
+def generate_thumbnails(original_file_path):
+    """
+    为原图生成所有规格的WebP缩略图，已存在的规格跳过
+
+    Args:
+        original_file_path: 原图绝对路径
+
+    Returns:
+        dict: 规格 -> 缩略图绝对路径（只包含成功生成或已存在的规格）
+    """
+    result = {}
+    if not original_file_path or not os.path.exists(original_file_path):
+        return result
+
+    pending = {}
+    for size, max_edge in THUMBNAIL_SIZES.items():
+        thumb_file_path = get_thumbnail_path(original_file_path, size)
+        if os.path.exists(thumb_file_path):
+            result[size] = thumb_file_path
+        else:
+            pending[size] = (max_edge, thumb_file_path)
+
+    if not pending:
+        return result
+
+    try:
+        from PIL import Image
+
+        with Image.open(original_file_path) as image:
+            image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+            # 从大到小依次缩放，较小规格复用较大规格的结果
+            for size, (max_edge, thumb_file_path) in sorted(pending.items(), key=lambda item: -item[1][0]):
+                image.thumbnail((max_edge, max_edge))
+                temp_file_path = f'{thumb_file_path}.tmp'
+                image.save(temp_file_path, 'WEBP', quality=THUMBNAIL_QUALITY, method=4)
+                os.replace(temp_file_path, thumb_file_path)
+                result[size] = thumb_file_path
+    except Exception as e:
+        logger.warning(f'生成缩略图失败: {original_file_path}, error={e}')
+
+    return result
+
+
+def resolve_thumbnail_paths(photo_paths, photo_thumb_path):
+    """
+    返回与 photo_paths 一一对应的缩略图相对路径，没有记录缩略图的图片回退为原图路径
+
+    Args:
+        photo_paths: 原图相对路径列表
+        photo_thumb_path: 消息记录的 photo_thumb_path 字段（多张图片以逗号分隔）
+
+    Returns:
+        list: 缩略图或原图的相对路径列表
+    """
+    thumb_paths = photo_thumb_path.split(',') if photo_thumb_path else []
+    return [
+        thumb_paths[index].strip() if index < len(thumb_paths) and thumb_paths[index].strip() else path
+        for index, path in enumerate(photo_paths)
+    ]
@@ -13,9 +13,8 @@
 """
 
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from urllib.parse import urlparse
-import time
 
 from jd import app, db
 from jd.models.tg_group_chat_history import TgGroupChatHistory
@@ -23,7 +22,14 @@ from jd.models.tg_group_user_info import TgGroupUserInfo
 from jd.models.tg_group import TgGroup
 from jd.models.ad_tracking import AdTracking
 from jd.models.ad_tracking_tags import AdTrackingTags
+from jd.jobs.ad_tracking_planner import AdTrackingRunPlanner
+from jd.jobs.ad_tracking_writer import AdTrackingBatchWriter
+from jd.jobs.tme_preview_store import TmePreviewStore, account_extra_info
+from jd.services.cache_service import CacheService
+from jd.services.spider.certificate_probe import CertificateCache
+from jd.services.spider.ip_geo_resolver import DnsCache, IpGeoResolver
 from jd.services.spider.tme_spider import TmeSpider
+from jd.services.spider.url_analysis_cache import UrlAnalysisCache
 from jd.jobs.auto_tagging import AutoTaggingService
 from jd.utils.logging_config import get_logger, PerformanceLogger
 
@@ -32,18 +38,59 @@ logger = get_logger(__name__, {
     'module': 'job'
 })
 
+# 历史数据来源：{来源: (模型, 来源构建方法名, 结果计数字段)}
+HISTORICAL_SOURCES = {
+    'chat': (TgGroupChatHistory, '_chat_record_sources', 'chat_records_processed'),
+    'user_info': (TgGroupUserInfo, '_user_info_sources', 'user_infos_processed'),
+    'group': (TgGroup, '_group_info_sources', 'group_infos_processed'),
+}
+
+HISTORICAL_CHECKPOINT_PREFIX = 'ad_tracking:historical_checkpoint:'
+
 
 class AdTrackingJob:
     """广告追踪数据处理作业"""
 
     def __init__(self):
         """初始化作业实例"""
-        self.spider = TmeSpider()
+        self.spider = TmeSpider(
+            max_concurrency=app.config.get('AD_TRACKING_HTTP_MAX_CONCURRENCY', 64),
+            per_host_limit=app.config.get('AD_TRACKING_HTTP_PER_HOST_LIMIT', 4),
+            per_host_interval=app.config.get('AD_TRACKING_HTTP_PER_HOST_INTERVAL', 0.2),
+            url_cache=UrlAnalysisCache(
+                max_entries=app.config.get('AD_TRACKING_URL_CACHE_MAX_ENTRIES', 5000),
+                success_ttl=app.config.get('AD_TRACKING_URL_CACHE_SUCCESS_TTL', 6 * 3600),
+                redirect_ttl=app.config.get('AD_TRACKING_URL_CACHE_REDIRECT_TTL', 3600),
+                failure_ttl=app.config.get('AD_TRACKING_URL_CACHE_FAILURE_TTL', 600)
+            ),
+            ip_resolver=IpGeoResolver(
+                geo_db_path=app.config.get('GEOIP_RANGE_DB_PATH'),
+                dns_cache=DnsCache(
+                    ttl=app.config.get('AD_TRACKING_DNS_CACHE_TTL', 600),
+                    negative_ttl=app.config.get('AD_TRACKING_DNS_NEGATIVE_TTL', 60)
+                )
+            ),
+            cert_cache=CertificateCache(
+                max_ttl=app.config.get('AD_TRACKING_CERT_CACHE_MAX_TTL', 86400),
+                failure_ttl=app.config.get('AD_TRACKING_CERT_CACHE_FAILURE_TTL', 3600)
+            )
+        )
+        # t.me 账户预览由后台刷新任务抓取，提及时只读存储
+        self.preview_store = TmePreviewStore(
+            base_interval=app.config.get('AD_TRACKING_TME_REFRESH_BASE_INTERVAL', 86400),
+            min_interval=app.config.get('AD_TRACKING_TME_REFRESH_MIN_INTERVAL', 3600),
+            max_interval=app.config.get('AD_TRACKING_TME_REFRESH_MAX_INTERVAL', 7 * 86400),
+            error_interval=app.config.get('AD_TRACKING_TME_REFRESH_ERROR_INTERVAL', 6 * 3600),
+            hot_sightings=app.config.get('AD_TRACKING_TME_REFRESH_HOT_SIGHTINGS', 50)
+        )
         self.auto_tagging_service = AutoTaggingService()
+        # 每批规划（抽取、去重、批量分析）的来源记录数
+        self.plan_chunk_size = app.config.get('AD_TRACKING_PLAN_CHUNK_SIZE', 1000)
 
     def _process_content_item(self, content: str, content_type: str,
                               source_type: str, source_id: str,
-                              user_id: str = None, chat_id: str = None) -> Optional[Dict[str, Any]]:
+                              user_id: str = None, chat_id: str = None,
+                              analysis: Dict = None) -> Optional[Dict[str, Any]]:
         """
         处理单个内容项（URL、账户等）
 
@@ -54,6 +101,8 @@ class AdTrackingJob:
             source_id: 来源记录ID
             user_id: 用户ID
             chat_id: 群组ID
+            analysis: 运行计划中已完成的分析结果（URL 为 classify_and_process_url() 结构，
+                账户为 analyze_telegram_account() 结构），为空时现场分析
 
         Returns:
             处理结果字典，如果失败返回None
@@ -72,7 +121,7 @@ class AdTrackingJob:
 
             if content_type == 'url':
                 # 使用智能URL处理（统一通过 TmeSpider）
-                result = self.spider.classify_and_process_url(content)
+                result = analysis or self.spider.classify_and_process_url(content)
                 if result and not result.get('error'):
                     url_type = result.get('url_type')
                     data = result.get('data', {})
@@ -86,9 +135,9 @@ class AdTrackingJob:
                         content_type = 'telegraph'
                         extra_info = data
                     else:
-                        # 普通URL - 直接使用 TmeSpider.analyze_url() 获取完整信息
-                        # （包括主流域名检查 + 网站信息获取）
-                        website_info = self.spider.analyze_url(content)
+                        # 普通URL - 使用 TmeSpider 综合分析结果
+                        # （包括主流域名检查 + 网站信息获取），缺失时再单独分析
+                        website_info = data.get('analysis') or self.spider.analyze_url(content)
 
                         if not website_info.get('error'):
                             extra_info = {
@@ -150,10 +199,9 @@ class AdTrackingJob:
                         })
 
             elif content_type == 'telegram_account':
-                # Telegram账户深度分析
-                # 1. 将 @username 转换为 t.me/username
-                # 2. 爬取账户预览信息
-                account_analysis = self.spider.analyze_telegram_account(content)
+                # Telegram账户：优先使用预览存储中的结果（pending 表示等待后台刷新任务抓取），
+                # 缺失时现场抓取 t.me 预览
+                account_analysis = analysis or self.spider.analyze_telegram_account(content)
 
                 if account_analysis.get('error'):
                     logger.warning("Telegram 账户分析失败", extra={
@@ -162,23 +210,7 @@ class AdTrackingJob:
                             'error': account_analysis.get('error')
                         }
                     })
-                    extra_info = {
-                        'account_type': 'user',
-                        'tme_url': account_analysis.get('tme_url'),
-                        'error': account_analysis.get('error')
-                    }
-                else:
-                    # 从预览信息中提取账户详情
-                    preview = account_analysis.get('preview', {})
-                    extra_info = {
-                        'account_type': preview.get('type', 'user'),  # channel/group/user
-                        'tme_url': account_analysis.get('tme_url'),
-                        'name': preview.get('name'),
-                        'username': account_analysis.get('username'),
-                        'avatar': preview.get('avatar'),
-                        'desc': preview.get('desc'),
-                        'members': preview.get('members')
-                    }
+                extra_info = account_extra_info(account_analysis)
 
             return {
                 'content': content,
@@ -236,38 +268,148 @@ class AdTrackingJob:
         if not content_text:
             return stats
 
-        # 确定用于标签的源文本
-        tag_source = tag_source_text or content_text
+        source = {
+            'content_text': content_text,
+            'source_type': source_type,
+            'source_id': source_id,
+            'user_id': user_id,
+            'chat_id': chat_id,
+            'apply_tags': apply_tags,
+            'tag_source_text': tag_source_text
+        }
 
-        # 提取并处理 URLs
-        urls = self.spider.extract_urls(content_text)
-        for url in urls:
-            tracking_data = self._process_content_item(
-                url, 'url', source_type, source_id, user_id, chat_id
-            )
-            if tracking_data:
-                tracking_record = self._save_or_update_tracking(tracking_data)
-                if tracking_record:
-                    if apply_tags and user_id:
-                        self._apply_auto_tags(tag_source, user_id, tracking_record.id)
-                    stats['urls'] += 1
-                    stats['total_items'] += 1
-
-        # 提取并处理 Telegram 账户
-        accounts = self.spider.extract_telegram_accounts(content_text)
-        for account in accounts:
+        urls, accounts = self.spider.extract_urls_and_accounts(content_text)
+        items = [(url, 'url', source, None) for url in urls]
+        items += [(account, 'telegram_account', source, None) for account in accounts]
+
+        for (_, content_type, _, _), tracking_id in zip(items, self._track_items(items)):
+            if tracking_id:
+                stats['urls' if content_type == 'url' else 'telegram_accounts'] += 1
+                stats['total_items'] += 1
+
+        return stats
+
+    def _track_items(self, items: List[Tuple[str, str, Dict[str, Any], Optional[Dict]]]) -> List[Optional[int]]:
+        """
+        分析一批内容项，合并写入追踪记录（一次 upsert），再应用自动标签
+
+        Args:
+            items: [(原始内容, 'url' 或 'telegram_account', 来源字段, 已完成的分析结果或None), ...]
+                来源字段同 _process_and_track_content 的参数
+
+        Returns:
+            与 items 对应的追踪记录ID列表，失败项为 None
+        """
+        items = self._with_stored_account_previews(items)
+        writer = AdTrackingBatchWriter()
+        keys = []
+        for content, content_type, source, analysis in items:
             tracking_data = self._process_content_item(
-                account, 'telegram_account', source_type, source_id, user_id, chat_id
+                content, content_type, source['source_type'], source['source_id'],
+                source.get('user_id'), source.get('chat_id'), analysis=analysis
             )
-            if tracking_data:
-                tracking_record = self._save_or_update_tracking(tracking_data)
-                if tracking_record:
-                    if apply_tags and user_id:
-                        self._apply_auto_tags(tag_source, user_id, tracking_record.id)
-                    stats['telegram_accounts'] += 1
-                    stats['total_items'] += 1
+            keys.append(writer.add(tracking_data) if tracking_data else None)
 
-        return stats
+        try:
+            ids = writer.flush()
+        except Exception:
+            return [None] * len(items)
+        tracking_ids = [ids.get(key) if key else None for key in keys]
+
+        # 同一文本、用户和追踪记录只匹配一次标签
+        tagged = set()
+        for (_, _, source, _), tracking_id in zip(items, tracking_ids):
+            if not tracking_id or not source.get('apply_tags', True) or not source.get('user_id'):
+                continue
+            tag_source = source.get('tag_source_text') or source['content_text']
+            tag_key = (tag_source, source['user_id'], tracking_id)
+            if tag_key not in tagged:
+                tagged.add(tag_key)
+                self._apply_auto_tags(tag_source, source['user_id'], tracking_id)
+        if tagged:
+            db.session.commit()
+
+        return tracking_ids
+
+    def _with_stored_account_previews(self, items: List[Tuple[str, str, Dict[str, Any], Optional[Dict]]]):
+        """为缺少分析结果的账户项记录提及并读取存储的预览，读取失败时保持原样（现场抓取）"""
+        accounts = [content for content, content_type, _, analysis in items
+                    if content_type == 'telegram_account' and analysis is None]
+        if not accounts:
+            return items
+        try:
+            analyses = self.preview_store.sight(accounts)
+        except Exception as e:
+            logger.warning("t.me 预览存储读取失败，改为现场抓取", extra={
+                'extra_fields': {
+                    'account_count': len(accounts),
+                    'error_type': type(e).__name__,
+                    'error_message': str(e)
+                }
+            })
+            return items
+        return [
+            (content, content_type, source,
+             analyses.get(content) if content_type == 'telegram_account' and analysis is None else analysis)
+            for content, content_type, source, analysis in items
+        ]
+
+    def refresh_tme_previews(self, limit: int = None) -> Dict[str, int]:
+        """
+        刷新到期的 t.me 账户预览（后台刷新队列）
+
+        Args:
+            limit: 本次最多抓取的条目数，默认取 AD_TRACKING_TME_REFRESH_BATCH_SIZE
+
+        Returns:
+            {'due': int, 'fetched': int, 'changed': int, 'failed': int}
+        """
+        limit = limit or app.config.get('AD_TRACKING_TME_REFRESH_BATCH_SIZE', 500)
+        return self.preview_store.refresh_due(self.spider, limit=limit)
+
+    def _process_planned_sources(self, planner: AdTrackingRunPlanner,
+                                 sources: List[Dict[str, Any]], result: Dict[str, Any]):
+        """
+        按运行计划处理一批来源：先整体抽取、去重并批量分析，再整批合并写入
+
+        Args:
+            planner: 本次运行的工作计划
+            sources: 来源列表（见 _chat_record_sources 等）
+            result: 运行结果统计，原地累加 total_urls/total_accounts/total_items/errors
+        """
+        try:
+            occurrences = planner.plan(sources)
+        except Exception as e:
+            logger.error("广告追踪批次计划失败", extra={
+                'extra_fields': {
+                    'source_count': len(sources),
+                    'error_type': type(e).__name__,
+                    'error_message': str(e)
+                }
+            }, exc_info=True)
+            result['errors'] += 1
+            return
+
+        items = [(occurrence['content'], occurrence['content_type'], occurrence, occurrence['analysis'])
+                 for occurrence in occurrences]
+        for occurrence, tracking_id in zip(occurrences, self._track_items(items)):
+            if not tracking_id:
+                result['errors'] += 1
+            elif occurrence['content_type'] == 'url':
+                result['total_urls'] += 1
+                result['total_items'] += 1
+            else:
+                result['total_accounts'] += 1
+                result['total_items'] += 1
+
+    def _process_in_chunks(self, planner: AdTrackingRunPlanner, records: List, build_sources,
+                           counter: str, result: Dict[str, Any]):
+        """按 plan_chunk_size 分批规划并处理记录，result[counter] 累加处理的记录数"""
+        for index in range(0, len(records), self.plan_chunk_size):
+            chunk = records[index:index + self.plan_chunk_size]
+            sources = [source for record in chunk for source in build_sources(record)]
+            self._process_planned_sources(planner, sources, result)
+            result[counter] += len(chunk)
 
     def _get_tme_content_type(self, classification: Dict) -> str:
         """根据t.me链接分类结果获取content_type"""
@@ -285,7 +427,7 @@ class AdTrackingJob:
 
     def _save_or_update_tracking(self, tracking_data: Dict[str, Any]) -> Optional[AdTracking]:
         """
-        保存或更新广告追踪记录
+        保存或更新单条广告追踪记录（批量场景请使用 _track_items）
 
         Args:
             tracking_data: 追踪数据
@@ -293,69 +435,13 @@ class AdTrackingJob:
         Returns:
             AdTracking对象，如果失败返回None
         """
+        writer = AdTrackingBatchWriter()
+        key = writer.add(tracking_data)
         try:
-            # 查找是否存在相同的记录
-            existing = AdTracking.query.filter_by(
-                normalized_content=tracking_data['normalized_content'],
-                source_type=tracking_data['source_type'],
-                source_id=tracking_data['source_id']
-            ).first()
-
-            if existing:
-                # 更新已有记录
-                existing.last_seen = datetime.now()
-                existing.occurrence_count += 1
-                # 更新extra_info（合并新信息）
-                if tracking_data.get('extra_info'):
-                    if existing.extra_info:
-                        existing.extra_info.update(tracking_data['extra_info'])
-                    else:
-                        existing.extra_info = tracking_data['extra_info']
-                db.session.commit()
-                logger.debug("更新已有追踪记录", extra={
-                    'extra_fields': {
-                        'tracking_id': existing.id,
-                        'content_type': tracking_data['content_type'],
-                        'source_type': tracking_data['source_type']
-                    }
-                })
-                return existing
-            else:
-                # 创建新记录
-                new_tracking = AdTracking(
-                    content=tracking_data['content'],
-                    content_type=tracking_data['content_type'],
-                    normalized_content=tracking_data['normalized_content'],
-                    extra_info=tracking_data.get('extra_info'),
-                    source_type=tracking_data['source_type'],
-                    source_id=tracking_data['source_id'],
-                    user_id=tracking_data.get('user_id'),
-                    chat_id=tracking_data.get('chat_id'),
-                    first_seen=datetime.now(),
-                    last_seen=datetime.now(),
-                    occurrence_count=1
-                )
-                db.session.add(new_tracking)
-                db.session.commit()
-                logger.debug("创建新追踪记录", extra={
-                    'extra_fields': {
-                        'content': tracking_data['content'],
-                        'content_type': tracking_data['content_type'],
-                        'source_type': tracking_data['source_type'],
-                        'tracking_id': new_tracking.id
-                    }
-                })
-                return new_tracking
-
-        except Exception as e:
-            db.session.rollback()
-            logger.error("保存追踪记录失败", extra={
-                'extra_fields': {
-                    'error_type': type(e).__name__,
-                    'error_message': str(e)
-                }
-            }, exc_info=True)
+            tracking_id = writer.flush().get(key)
+        except Exception:
             return None
+        return db.session.get(AdTracking, tracking_id) if tracking_id else None
 
     def _apply_auto_tags(self, text: str, user_id: str, tracking_id: int):
         """
@@ -411,6 +497,73 @@ class AdTrackingJob:
                 }
             }, exc_info=True)
 
+    @staticmethod
+    def _chat_record_sources(chat_record: TgGroupChatHistory) -> List[Dict[str, Any]]:
+        """聊天记录 -> 来源列表"""
+        if not chat_record.message:
+            return []
+        return [{
+            'content_text': chat_record.message,
+            'source_type': 'chat',
+            'source_id': str(chat_record.id),
+            'user_id': str(chat_record.user_id) if chat_record.user_id else None,
+            'chat_id': str(chat_record.chat_id) if chat_record.chat_id else None,
+            'apply_tags': True
+        }]
+
+    @staticmethod
+    def _user_info_sources(user_info: TgGroupUserInfo) -> List[Dict[str, Any]]:
+        """用户信息（昵称、描述） -> 来源列表"""
+        user_id = str(user_info.user_id)
+        sources = []
+        if user_info.nickname:
+            sources.append({
+                'content_text': user_info.nickname,
+                'source_type': 'nickname',
+                'source_id': user_id,
+                'user_id': user_id,
+                'chat_id': None,
+                'apply_tags': True
+            })
+        if user_info.desc:
+            sources.append({
+                'content_text': user_info.desc,
+                'source_type': 'user_desc',
+                'source_id': user_id,
+                'user_id': user_id,
+                'chat_id': None,
+                'apply_tags': True
+            })
+        return sources
+
+    @staticmethod
+    def _group_info_sources(group: TgGroup) -> List[Dict[str, Any]]:
+        """群组信息（群介绍） -> 来源列表"""
+        if not group.group_intro:
+            return []
+        chat_id = str(group.chat_id)
+        return [{
+            'content_text': group.group_intro,
+            'source_type': 'group_intro',
+            'source_id': chat_id,
+            'user_id': None,
+            'chat_id': chat_id,
+            'apply_tags': True  # 修复 bug：群组信息也应该应用自动标签
+        }]
+
+    def _process_sources(self, sources: List[Dict[str, Any]]) -> Dict[str, int]:
+        """逐个来源处理并汇总统计"""
+        stats = {
+            'urls': 0,
+            'telegram_accounts': 0,
+            'total_items': 0
+        }
+        for source in sources:
+            source_stats = self._process_and_track_content(**source)
+            for key in stats:
+                stats[key] += source_stats[key]
+        return stats
+
     def process_chat_record(self, chat_record: TgGroupChatHistory) -> Dict[str, int]:
         """
         处理单条聊天记录
@@ -421,17 +574,7 @@ class AdTrackingJob:
         Returns:
             处理统计 {'urls': count, 'accounts': count, 'total_items': count}
         """
-        if not chat_record.message:
-            return {'urls': 0, 'telegram_accounts': 0, 'total_items': 0}
-
-        return self._process_and_track_content(
-            content_text=chat_record.message,
-            source_type='chat',
-            source_id=str(chat_record.id),
-            user_id=str(chat_record.user_id) if chat_record.user_id else None,
-            chat_id=str(chat_record.chat_id) if chat_record.chat_id else None,
-            apply_tags=True
-        )
+        return self._process_sources(self._chat_record_sources(chat_record))
 
     def process_user_info(self, user_info: TgGroupUserInfo) -> Dict[str, int]:
         """
@@ -443,43 +586,7 @@ class AdTrackingJob:
         Returns:
             处理统计 {'urls': count, 'accounts': count, 'total_items': count}
         """
-        stats = {
-            'urls': 0,
-            'telegram_accounts': 0,
-            'total_items': 0
-        }
-
-        user_id = str(user_info.user_id)
-
-        # 处理昵称
-        if user_info.nickname:
-            nickname_stats = self._process_and_track_content(
-                content_text=user_info.nickname,
-                source_type='nickname',
-                source_id=user_id,
-                user_id=user_id,
-                chat_id=None,
-                apply_tags=True
-            )
-            stats['urls'] += nickname_stats['urls']
-            stats['telegram_accounts'] += nickname_stats['telegram_accounts']
-            stats['total_items'] += nickname_stats['total_items']
-
-        # 处理描述
-        if user_info.desc:
-            desc_stats = self._process_and_track_content(
-                content_text=user_info.desc,
-                source_type='user_desc',
-                source_id=user_id,
-                user_id=user_id,
-                chat_id=None,
-                apply_tags=True
-            )
-            stats['urls'] += desc_stats['urls']
-            stats['telegram_accounts'] += desc_stats['telegram_accounts']
-            stats['total_items'] += desc_stats['total_items']
-
-        return stats
+        return self._process_sources(self._user_info_sources(user_info))
 
     def process_group_info(self, group: TgGroup) -> Dict[str, int]:
         """
@@ -491,19 +598,7 @@ class AdTrackingJob:
         Returns:
             处理统计 {'urls': count, 'accounts': count, 'total_items': count}
         """
-        if not group.group_intro:
-            return {'urls': 0, 'telegram_accounts': 0, 'total_items': 0}
-
-        chat_id = str(group.chat_id)
-
-        return self._process_and_track_content(
-            content_text=group.group_intro,
-            source_type='group_intro',
-            source_id=chat_id,
-            user_id=None,
-            chat_id=chat_id,
-            apply_tags=True  # 修复 bug：群组信息也应该应用自动标签
-        )
+        return self._process_sources(self._group_info_sources(group))
 
     def tag_nonmainstream_website_titles(self, limit: int = None) -> Dict[str, int]:
         """
@@ -701,6 +796,9 @@ class AdTrackingJob:
             'errors': 0
         }
 
+        # 运行级工作计划：同一实体在整个运行中只分析一次
+        planner = AdTrackingRunPlanner(self.spider, preview_store=self.preview_store)
+
         try:
             # 处理聊天记录
             chat_records = TgGroupChatHistory.query.filter(
@@ -715,22 +813,8 @@ class AdTrackingJob:
                 }
             })
 
-            for record in chat_records:
-                try:
-                    stats = self.process_chat_record(record)
-                    result['chat_records_processed'] += 1
-                    result['total_urls'] += stats['urls']
-                    result['total_accounts'] += stats['telegram_accounts']
-                    result['total_items'] += stats['total_items']
-                except Exception as e:
-                    logger.error("处理聊天记录失败", extra={
-                        'extra_fields': {
-                            'record_id': record.id,
-                            'error_type': type(e).__name__,
-                            'error_message': str(e)
-                        }
-                    }, exc_info=True)
-                    result['errors'] += 1
+            self._process_in_chunks(planner, chat_records, self._chat_record_sources,
+                                    'chat_records_processed', result)
 
             # 处理当天更新的用户信息
             user_infos = TgGroupUserInfo.query.filter(
@@ -745,22 +829,8 @@ class AdTrackingJob:
                 }
             })
 
-            for user_info in user_infos:
-                try:
-                    stats = self.process_user_info(user_info)
-                    result['user_infos_processed'] += 1
-                    result['total_urls'] += stats['urls']
-                    result['total_accounts'] += stats['telegram_accounts']
-                    result['total_items'] += stats['total_items']
-                except Exception as e:
-                    logger.error("处理用户信息失败", extra={
-                        'extra_fields': {
-                            'user_id': user_info.user_id,
-                            'error_type': type(e).__name__,
-                            'error_message': str(e)
-                        }
-                    }, exc_info=True)
-                    result['errors'] += 1
+            self._process_in_chunks(planner, user_infos, self._user_info_sources,
+                                    'user_infos_processed', result)
 
             # 处理当天更新的群组信息
             groups = TgGroup.query.filter(
@@ -775,31 +845,19 @@ class AdTrackingJob:
                 }
             })
 
-            for group in groups:
-                try:
-                    stats = self.process_group_info(group)
-                    result['group_infos_processed'] += 1
-                    result['total_urls'] += stats['urls']
-                    result['total_accounts'] += stats['telegram_accounts']
-                    result['total_items'] += stats['total_items']
-                except Exception as e:
-                    logger.error("处理群组信息失败", extra={
-                        'extra_fields': {
-                            'chat_id': group.chat_id,
-                            'error_type': type(e).__name__,
-                            'error_message': str(e)
-                        }
-                    }, exc_info=True)
-                    result['errors'] += 1
+            self._process_in_chunks(planner, groups, self._group_info_sources,
+                                    'group_infos_processed', result)
 
-            # 注：追踪记录已在各个处理方法中逐条提交
-            # 这里只提交自动标签相关的改动
+            # 注：追踪记录已按批合并写入并提交
+            # 这里提交剩余的自动标签相关改动
             db.session.commit()
             result['status'] = 'success'
+            result['planner'] = dict(planner.stats)
 
             logger.info("每日广告追踪任务完成", extra={
                 'extra_fields': {
                     'target_date': target_date.strftime('%Y-%m-%d'),
+                    'planner': result['planner'],
                     'chat_records': result['chat_records_processed'],
                     'user_infos': result['user_infos_processed'],
                     'group_infos': result['group_infos_processed'],
@@ -830,13 +888,170 @@ class AdTrackingJob:
 
         return result
 
-    def run_historical_batch(self, batch_size: int = 1000, max_batches: int = None) -> Dict[str, Any]:
+    def get_historical_id_bounds(self, source: str) -> Tuple[Optional[int], Optional[int]]:
         """
-        历史数据批量处理任务
+        查询历史来源表的ID范围
+
+        Args:
+            source: 'chat' | 'user_info' | 'group'
+
+        Returns:
+            (min_id, max_id)，表为空时为 (None, None)
+        """
+        model = HISTORICAL_SOURCES[source][0]
+        return db.session.query(db.func.min(model.id), db.func.max(model.id)).one()
+
+    def plan_historical_shards(self, shard_size: int = None,
+                               sources: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        按ID范围把历史数据切分为分片
+
+        Args:
+            shard_size: 每个分片覆盖的ID跨度，默认取 AD_TRACKING_HISTORICAL_SHARD_SIZE
+            sources: 来源列表，默认全部（chat、user_info、group）
+
+        Returns:
+            [{'source': str, 'start_id': int, 'end_id': int}, ...]，ID区间为闭区间
+
+        分片边界按 shard_size 对齐（1 ~ shard_size、shard_size+1 ~ 2*shard_size ...），
+        不随当前 max_id 变化，新数据写入后已有分片的检查点键保持不变
+        """
+        shard_size = shard_size or app.config.get('AD_TRACKING_HISTORICAL_SHARD_SIZE', 100000)
+        shards = []
+        for source in sources or list(HISTORICAL_SOURCES):
+            min_id, max_id = self.get_historical_id_bounds(source)
+            if min_id is None:
+                continue
+            first_start = (min_id - 1) // shard_size * shard_size + 1
+            for start_id in range(first_start, max_id + 1, shard_size):
+                shards.append({
+                    'source': source,
+                    'start_id': start_id,
+                    'end_id': start_id + shard_size - 1
+                })
+        return shards
+
+    @staticmethod
+    def _checkpoint_key(source: str, start_id: int = None, end_id: int = None) -> str:
+        if start_id is None:
+            return f'{HISTORICAL_CHECKPOINT_PREFIX}{source}'
+        return f'{HISTORICAL_CHECKPOINT_PREFIX}{source}:{start_id}-{end_id}'
+
+    def get_historical_checkpoint(self, source: str, start_id: int = None,
+                                  end_id: int = None) -> Optional[Dict]:
+        """
+        读取检查点 {'last_id': int, 'done': bool, 'updated_at': str}
+
+        不传ID区间时读取单进程批量任务按来源记录的检查点
+        """
+        return CacheService.get(self._checkpoint_key(source, start_id, end_id))
+
+    def _save_historical_checkpoint(self, source: str, start_id: Optional[int], end_id: Optional[int],
+                                    last_id: int, done: bool = False):
+        CacheService.set(self._checkpoint_key(source, start_id, end_id), {
+            'last_id': last_id,
+            'done': done,
+            'updated_at': datetime.now().isoformat()
+        }, ttl=app.config.get('AD_TRACKING_HISTORICAL_CHECKPOINT_TTL', 30 * 86400))
+
+    def run_historical_shard(self, source: str, start_id: int, end_id: int,
+                             batch_size: int = 1000, max_batches: int = None,
+                             resume: bool = True, shard_checkpoint: bool = True) -> Dict[str, Any]:
+        """
+        处理一个历史数据分片（ID闭区间），按ID游标分页并逐批记录检查点
+
+        每批按 id > 游标 顺序读取，不使用 offset，也不人为休眠；
+        处理速度只受下游 HTTP 并发限制（见 TmeSpider / AsyncHttpEngine 配置）。
+
+        Args:
+            source: 'chat' | 'user_info' | 'group'
+            start_id: 起始ID（含）
+            end_id: 结束ID（含）
+            batch_size: 每批读取的记录数
+            max_batches: 最大批次数（None表示处理到分片结束）
+            resume: 是否从检查点继续
+            shard_checkpoint: 检查点是否按ID区间区分；为 False 时按来源记录
+                （单进程批量任务的 end_id 取当前 max_id，每次运行都会变化）
+
+        Returns:
+            执行结果统计
+
+        检查点标记完成时 last_id 为最后处理到的ID；之后 end_id 变大（有新数据）时
+        从 last_id 继续，而不是跳过或从头处理
+        """
+        model, build_sources_name, counter = HISTORICAL_SOURCES[source]
+        key_start, key_end = (start_id, end_id) if shard_checkpoint else (None, None)
+        build_sources = getattr(self, build_sources_name)
+
+        result = {
+            'source': source,
+            'start_id': start_id,
+            'end_id': end_id,
+            counter: 0,
+            'total_urls': 0,
+            'total_accounts': 0,
+            'total_items': 0,
+            'batches_processed': 0,
+            'errors': 0
+        }
+
+        cursor = start_id - 1
+        checkpoint = self.get_historical_checkpoint(source, key_start, key_end) if resume else None
+        if checkpoint:
+            cursor = max(cursor, checkpoint.get('last_id', cursor))
+            if checkpoint.get('done') and cursor >= end_id:
+                result['status'] = 'skipped'
+                return result
+
+        planner = AdTrackingRunPlanner(self.spider, preview_store=self.preview_store)
+        exhausted = False
+        while not max_batches or result['batches_processed'] < max_batches:
+            records = model.query.filter(
+                model.id > cursor,
+                model.id <= end_id
+            ).order_by(model.id).limit(batch_size).all()
+            if not records:
+                exhausted = True
+                break
+
+            self._process_in_chunks(planner, records, build_sources, counter, result)
+            # 注：追踪记录已按批合并写入并提交，这里提交剩余的自动标签相关改动
+            db.session.commit()
+
+            cursor = records[-1].id
+            result['batches_processed'] += 1
+            self._save_historical_checkpoint(source, key_start, key_end, cursor)
+
+            logger.info("历史分片处理进度", extra={
+                'extra_fields': {
+                    'source': source,
+                    'start_id': start_id,
+                    'end_id': end_id,
+                    'cursor': cursor,
+                    'records_processed': result[counter],
+                    'total_items': result['total_items']
+                }
+            })
+
+        finished = exhausted or cursor >= end_id
+        if finished:
+            self._save_historical_checkpoint(source, key_start, key_end, cursor, done=True)
+        result['last_id'] = cursor
+        result['status'] = 'success' if finished else 'partial'
+        result['planner'] = dict(planner.stats)
+        return result
+
+    def run_historical_batch(self, batch_size: int = 1000, max_batches: int = None,
+                             resume: bool = True) -> Dict[str, Any]:
+        """
+        历史数据批量处理任务（单进程，依次处理聊天记录、用户信息、群组信息）
+
+        多 worker 并行处理请使用 HistoricalAdTrackingBatchTask 按分片分发。
 
         Args:
             batch_size: 每批处理数量
             max_batches: 最大批次数（None表示处理全部）
+            resume: 是否从检查点继续
 
         Returns:
             执行结果统计
@@ -863,131 +1078,32 @@ class AdTrackingJob:
         }
 
         try:
-            # 批量处理聊天记录
-            chat_offset = 0
-            batch_count = 0
-
-            while True:
-                if max_batches and batch_count >= max_batches:
-                    break
-
-                chat_records = TgGroupChatHistory.query.offset(chat_offset).limit(batch_size).all()
-                if not chat_records:
-                    break
-
-                for record in chat_records:
-                    try:
-                        stats = self.process_chat_record(record)
-                        result['chat_records_processed'] += 1
-                        result['total_urls'] += stats['urls']
-                        result['total_accounts'] += stats['telegram_accounts']
-                        result['total_items'] += stats['total_items']
-                    except Exception as e:
-                        logger.error("处理聊天记录失败", extra={
-                            'extra_fields': {
-                                'record_id': record.id,
-                                'batch': batch_count,
-                                'error_type': type(e).__name__,
-                                'error_message': str(e)
-                            }
-                        }, exc_info=True)
-                        result['errors'] += 1
-
-                # 注：追踪记录已在各处理方法中逐条提交，这里只提交自动标签相关改动
-                db.session.commit()
-                chat_offset += batch_size
-                batch_count += 1
-                result['batches_processed'] = batch_count
-
-                logger.info("批量处理进度", extra={
-                    'extra_fields': {
-                        'batch_number': batch_count,
-                        'chat_records_processed': result['chat_records_processed'],
-                        'total_urls': result['total_urls'],
-                        'total_accounts': result['total_accounts']
-                    }
-                })
-                time.sleep(0.5)  # 避免长时间占用资源
-
-            # 批量处理用户信息
-            user_offset = 0
-            while True:
-                if max_batches and batch_count >= max_batches:
-                    break
-
-                user_infos = TgGroupUserInfo.query.offset(user_offset).limit(batch_size).all()
-                if not user_infos:
+            for source in HISTORICAL_SOURCES:
+                remaining = max_batches - result['batches_processed'] if max_batches else None
+                if remaining is not None and remaining <= 0:
                     break
 
-                for user_info in user_infos:
-                    try:
-                        stats = self.process_user_info(user_info)
-                        result['user_infos_processed'] += 1
-                        result['total_urls'] += stats['urls']
-                        result['total_accounts'] += stats['telegram_accounts']
-                        result['total_items'] += stats['total_items']
-                    except Exception as e:
-                        logger.error("处理用户信息失败", extra={
-                            'extra_fields': {
-                                'user_id': user_info.user_id,
-                                'batch': batch_count,
-                                'error_type': type(e).__name__,
-                                'error_message': str(e)
-                            }
-                        }, exc_info=True)
-                        result['errors'] += 1
+                min_id, max_id = self.get_historical_id_bounds(source)
+                if min_id is None:
+                    continue
 
-                # 注：追踪记录已在各处理方法中逐条提交，这里只提交自动标签相关改动
-                db.session.commit()
-                user_offset += batch_size
-                logger.info("用户信息批量处理进度", extra={
-                    'extra_fields': {
-                        'user_infos_processed': result['user_infos_processed'],
-                        'total_urls': result['total_urls'],
-                        'total_accounts': result['total_accounts']
-                    }
-                })
-                time.sleep(0.5)
-
-            # 批量处理群组信息
-            group_offset = 0
-            while True:
-                if max_batches and batch_count >= max_batches:
-                    break
-
-                groups = TgGroup.query.offset(group_offset).limit(batch_size).all()
-                if not groups:
-                    break
-
-                for group in groups:
-                    try:
-                        stats = self.process_group_info(group)
-                        result['group_infos_processed'] += 1
-                        result['total_urls'] += stats['urls']
-                        result['total_accounts'] += stats['telegram_accounts']
-                        result['total_items'] += stats['total_items']
-                    except Exception as e:
-                        logger.error("处理群组信息失败", extra={
-                            'extra_fields': {
-                                'chat_id': group.chat_id,
-                                'batch': batch_count,
-                                'error_type': type(e).__name__,
-                                'error_message': str(e)
-                            }
-                        }, exc_info=True)
-                        result['errors'] += 1
+                # 检查点按来源记录，end_id 每次取当前 max_id，新数据写入后从上次位置继续
+                shard_result = self.run_historical_shard(
+                    source, min_id, max_id, batch_size=batch_size,
+                    max_batches=remaining, resume=resume, shard_checkpoint=False
+                )
+                for key in result:
+                    result[key] += shard_result.get(key, 0)
 
-                # 注：追踪记录已在各处理方法中逐条提交，这里只提交自动标签相关改动
-                db.session.commit()
-                group_offset += batch_size
-                logger.info("群组信息批量处理进度", extra={
+                logger.info("历史来源处理完成", extra={
                     'extra_fields': {
-                        'group_infos_processed': result['group_infos_processed'],
+                        'source': source,
+                        'status': shard_result['status'],
+                        'last_id': shard_result.get('last_id'),
                         'total_urls': result['total_urls'],
                         'total_accounts': result['total_accounts']
                     }
                 })
-                time.sleep(0.5)
 
             result['status'] = 'success'
             logger.info("历史广告追踪批量处理任务完成", extra={
@@ -19,13 +19,15 @@
 
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import hashlib
 import logging
 import json
-from difflib import SequenceMatcher
-import requests
-import time
 
 from jd import app, db
+from jd.jobs.llm_client import AsyncLLMClient, RedisTokenBucket
+from jd.jobs.llm_verdict_cache import LLMVerdictCache
+from jd.jobs.near_duplicate import MinHashLSH
 from jd.models.tg_group_chat_history import TgGroupChatHistory
 from jd.models.tg_group import TgGroup
 from jd.models.tg_group_user_info import TgGroupUserInfo
@@ -53,13 +55,23 @@ class LLMConfig:
     LLM_MODEL_VISION = LLM_CONFIG.get('model_vision')
     LLM_TIMEOUT = LLM_CONFIG.get('timeout', 30)
 
-    # 限流配置（从 config.py 读取）
+    # 限流配置（从 config.py 读取），所有 worker 共享 Redis 中的同一个令牌桶
     RATE_LIMIT_INTERVAL_SECONDS = LLM_CONFIG.get('rate_limit_interval_seconds', 5)
     RATE_LIMIT_PER_HOUR = LLM_CONFIG.get('rate_limit_per_hour', 10)
+    RATE_LIMIT_BURST = LLM_CONFIG.get('rate_limit_burst', 1)
+    RATE_LIMIT_KEY = LLM_CONFIG.get('rate_limit_key', 'llm:rate_limit:ad_tracking')
+
+    # 并发配置：同时在途的请求数（服务商并发上限）与失败重试次数
+    MAX_CONCURRENCY = LLM_CONFIG.get('max_concurrency', 4)
+    MAX_RETRIES = LLM_CONFIG.get('max_retries', 3)
 
     # 提示词相关配置
     SYSTEM_PROMPT = "你是一个打击走私、诈骗、毒品等交易的警员，请识别此聊天记录是否包含可疑的黑灰产交易信息？如果包含，请分析其重要程度（0-100分）和优先级（高/中/低）。"
     USER_PROMPT_TEMPLATE = "群组: {group_name}\n用户: {username}\n内容: {content}"
+    VISION_PROMPT_TEMPLATE = "这些是来自 {group_name} 的用户 {username} 的消息和图片。\n\n消息内容: {content}\n\n请分析这些内容是否涉及黑灰产、诈骗、毒品等非法交易。"
+
+    # 判别结果解析规则版本（修改 _parse_llm_response 及分数/优先级提取规则时递增，使缓存失效）
+    VERDICT_PARSER_VERSION = 1
 
     @classmethod
     def is_configured(cls) -> bool:
@@ -70,98 +82,18 @@ class LLMConfig:
             cls.LLM_MODEL_TEXT or cls.LLM_MODEL_VISION,
         ])
 
-
-class LLMRateLimiter:
-    """LLM 请求限流器
-
-    限制条件：
-    1. 请求间隔：每个请求之间必须间隔 5 秒
-    2. 小时限制：每小时最多 10 次请求
-    """
-
-    def __init__(self, interval_seconds: int = 5, per_hour: int = 10):
-        """
-        初始化限流器
-
-        Args:
-            interval_seconds: 请求间隔（秒）
-            per_hour: 每小时最大请求次数
-        """
-        self.interval_seconds = interval_seconds
-        self.per_hour = per_hour
-        self.last_request_time = None
-        self.hourly_requests = []  # 存储一小时内的请求时间
-
-    def _cleanup_old_requests(self):
-        """清理超过一小时的请求记录"""
-        now = time.time()
-        self.hourly_requests = [
-            req_time for req_time in self.hourly_requests
-            if now - req_time < 3600
+    @classmethod
+    def prompt_version(cls) -> str:
+        """提示词、模型与解析规则的版本，作为判别结果缓存键的一部分"""
+        parts = [
+            str(cls.VERDICT_PARSER_VERSION),
+            cls.LLM_MODEL_TEXT or '',
+            cls.LLM_MODEL_VISION or '',
+            cls.SYSTEM_PROMPT,
+            cls.USER_PROMPT_TEMPLATE,
+            cls.VISION_PROMPT_TEMPLATE,
         ]
-
-    def can_request(self) -> Tuple[bool, str]:
-        """
-        检查是否可以发起请求
-
-        Returns:
-            (是否可以请求, 等待理由或提示信息)
-        """
-        now = time.time()
-        self._cleanup_old_requests()
-
-        # 检查小时限制
-        if len(self.hourly_requests) >= self.per_hour:
-            wait_time = self.hourly_requests[0] + 3600 - now
-            return False, f"小时请求限制已达到 ({self.per_hour}次)，还需等待 {wait_time:.1f} 秒"
-
-        # 检查间隔限制
-        if self.last_request_time is not None:
-            time_since_last = now - self.last_request_time
-            if time_since_last < self.interval_seconds:
-                wait_time = self.interval_seconds - time_since_last
-                return False, f"请求间隔不足，还需等待 {wait_time:.2f} 秒"
-
-        return True, "可以请求"
-
-    def wait_if_needed(self):
-        """如果需要，等待直到可以请求"""
-        while True:
-            can_req, reason = self.can_request()
-            if can_req:
-                break
-
-            # 提取等待时间
-            wait_time = 0.1  # 默认等待时间
-            if "还需等待" in reason:
-                try:
-                    import re
-                    match = re.search(r'(\d+\.?\d*)\s*秒', reason)
-                    if match:
-                        wait_time = float(match.group(1))
-                except:
-                    pass
-
-            logger.debug(f"限流等待中: {reason}")
-            time.sleep(min(wait_time, 1))  # 最多等待1秒，然后重新检查
-
-    def record_request(self):
-        """记录一次成功的请求"""
-        now = time.time()
-        self.last_request_time = now
-        self.hourly_requests.append(now)
-        self._cleanup_old_requests()
-        logger.debug(f"LLM 请求已记录，当前小时内请求次数: {len(self.hourly_requests)}/{self.per_hour}")
-
-    def get_status(self) -> Dict[str, Any]:
-        """获取限流器当前状态"""
-        self._cleanup_old_requests()
-        return {
-            'requests_this_hour': len(self.hourly_requests),
-            'max_per_hour': self.per_hour,
-            'last_request_time': self.last_request_time,
-            'interval_seconds': self.interval_seconds
-        }
+        return hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()[:16]
 
 
 class AdTrackingLLMJob:
@@ -170,12 +102,16 @@ class AdTrackingLLMJob:
     def __init__(self):
         """初始化作业实例"""
         self.batch_size = 100  # 批处理大小
-        self.similarity_threshold = 0.9  # 相似度阈值（90%）
+        self.near_duplicate_threshold = 0.7  # 近似重复阈值（字符3-gram的Jaccard相似度）
         self.performance_logger = PerformanceLogger()
-        self.rate_limiter = LLMRateLimiter(
+        self.rate_limiter = RedisTokenBucket(
+            key=LLMConfig.RATE_LIMIT_KEY,
+            per_hour=LLMConfig.RATE_LIMIT_PER_HOUR,
             interval_seconds=LLMConfig.RATE_LIMIT_INTERVAL_SECONDS,
-            per_hour=LLMConfig.RATE_LIMIT_PER_HOUR
+            burst=LLMConfig.RATE_LIMIT_BURST
         )
+        self.client_stats = {}
+        self.verdict_cache = LLMVerdictCache(LLMConfig.prompt_version(), static_folder=app.static_folder)
 
     def _get_today_messages_with_images(self) -> List[TgGroupChatHistory]:
         """
@@ -209,28 +145,10 @@ class AdTrackingLLMJob:
             logger.error(f"获取聊天记录失败: {e}", exc_info=True)
             return []
 
-    def _calculate_similarity(self, text1: str, text2: str) -> float:
-        """
-        计算两段文本的相似度
-
-        Args:
-            text1: 第一段文本
-            text2: 第二段文本
-
-        Returns:
-            相似度（0-1），1表示完全相同，0表示完全不同
-        """
-        if not text1 or not text2:
-            return 0.0
-
-        # 使用 SequenceMatcher 计算相似度
-        ratio = SequenceMatcher(None, text1, text2).ratio()
-        return ratio
-
-    def _deduplicate_messages_by_user(self, messages: List[TgGroupChatHistory]
-                                      ) -> Tuple[List[TgGroupChatHistory], int]:
+    def _deduplicate_messages(self, messages: List[TgGroupChatHistory]
+                              ) -> Tuple[List[TgGroupChatHistory], int]:
         """
-        按用户分组，去除同一用户中相似度超过阈值的重复消息
+        在当天全部候选消息中去除近似重复的消息（不区分用户）
 
         Args:
             messages: 原始聊天记录列表
@@ -239,69 +157,41 @@ class AdTrackingLLMJob:
             (去重后的消息列表, 去重数量)
 
         说明：
-            按 user_id 分组，对同一用户的消息进行相似度比较。
-            如果消息相似度超过 90%，则只保留第一条（时间最早的）。
+            按发布时间顺序为每条消息计算 MinHash 签名并放入 LSH 索引，
+            与已保留消息的估计 Jaccard 相似度达到阈值即视为重复，只保留最早的一条。
+            同一广告被多个账号复制粘贴时也会被去除，避免消耗 LLM 配额。
+            没有文字或文字过短（n-gram 少于 min_shingles，如「新货到了」）的消息不参与去重，
+            避免文案相同但图片不同的广告被合并。
         """
-        # 按用户ID分组
-        user_messages = {}
-        for msg in messages:
-            if msg.user_id not in user_messages:
-                user_messages[msg.user_id] = []
-            user_messages[msg.user_id].append(msg)
-
+        index = MinHashLSH(threshold=self.near_duplicate_threshold)
+        kept_by_id = {}
         deduped_messages = []
         dedup_count = 0
+        cross_user_count = 0
 
-        # 对每个用户的消息进行去重
-        for user_id, user_msgs in user_messages.items():
-            if not user_msgs:
+        for msg in sorted(messages, key=lambda m: (m.postal_time or datetime.min, m.id)):
+            duplicate = index.add(msg.id, msg.message)
+            if duplicate is None:
+                deduped_messages.append(msg)
+                kept_by_id[msg.id] = msg
                 continue
 
-            # 按发布时间排序（保证保留最早的消息）
-            user_msgs_sorted = sorted(user_msgs, key=lambda m: m.postal_time)
-
-            # 第一条消息总是保留
-            kept_messages = [user_msgs_sorted[0]]
-            kept_indices = [0]
-
-            # 与已保留的消息比较
-            for i in range(1, len(user_msgs_sorted)):
-                current_msg = user_msgs_sorted[i]
-                is_duplicate = False
-
-                # 与已保留的所有消息进行相似度比较
-                for kept_idx in kept_indices:
-                    kept_msg = user_msgs_sorted[kept_idx]
-                    similarity = self._calculate_similarity(
-                        current_msg.message,
-                        kept_msg.message
-                    )
-
-                    # 如果相似度超过阈值，则认为是重复消息
-                    if similarity >= self.similarity_threshold:
-                        logger.debug(
-                            f"去重: 用户 {user_id} 的消息相似度 {similarity:.2%}, "
-                            f"保留消息ID: {kept_msg.message_id}, "
-                            f"去除消息ID: {current_msg.message_id}"
-                        )
-                        is_duplicate = True
-                        dedup_count += 1
-                        break
-
-                # 如果不是重复消息，则保留
-                if not is_duplicate:
-                    kept_messages.append(current_msg)
-                    kept_indices.append(i)
-
-            deduped_messages.extend(kept_messages)
+            kept_msg = kept_by_id[duplicate[0]]
+            dedup_count += 1
+            if kept_msg.user_id != msg.user_id:
+                cross_user_count += 1
+            logger.debug(
+                f"去重: 消息相似度 {duplicate[1]:.2%}, "
+                f"保留消息ID: {kept_msg.message_id} (用户 {kept_msg.user_id}), "
+                f"去除消息ID: {msg.message_id} (用户 {msg.user_id})"
+            )
 
         logger.info(f"去重完成: 原始消息 {len(messages)} 条, "
                    f"去重后 {len(deduped_messages)} 条, "
-                   f"去除 {dedup_count} 条重复消息")
+                   f"去除 {dedup_count} 条重复消息（其中跨用户 {cross_user_count} 条）")
 
         return deduped_messages, dedup_count
 
-
     def _prepare_message_for_llm(self, message: TgGroupChatHistory) -> Dict[str, Any]:
         """
         为 LLM 分析准备消息数据
@@ -348,187 +238,166 @@ class AdTrackingLLMJob:
             logger.error(f"准备消息数据失败: {e}", exc_info=True)
             return {}
 
+    def _judge_messages(self, messages_batch: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        获取一批消息的判别结果：先查判别结果缓存，只有未命中的新内容才请求 LLM
+
+        同一批内内容键相同的消息只请求一次；LLM 未配置时只返回缓存命中的结果
+
+        Args:
+            messages_batch: 消息数据列表（批处理）
+
+        Returns:
+            (判别结果列表（与输入顺序一致，无结果时为空字典）, 请求 LLM 的消息数)
+        """
+        keys = [self.verdict_cache.cache_key(message.get('content'), message.get('images') or [])
+                for message in messages_batch]
+        verdicts = self.verdict_cache.lookup(keys)
+        hit_count = sum(1 for key in keys if key in verdicts)
+
+        pending = {}  # {内容键: 首次出现的消息}
+        for key, message in zip(keys, messages_batch):
+            if key not in verdicts and key not in pending:
+                pending[key] = message
+
+        if not LLMConfig.is_configured():
+            pending = {}
+        elif pending:
+            results = self._call_llm_for_judgment(list(pending.values()))
+            fresh = {key: result for key, result in zip(pending, results) if result}
+            self.verdict_cache.save(fresh, {key: len(message.get('images') or [])
+                                            for key, message in pending.items()})
+            verdicts.update(fresh)
+
+        logger.info(f"判别结果缓存: 命中 {hit_count} 条, 请求 LLM {len(pending)} 条")
+        return [verdicts.get(key, {}) for key in keys], len(pending)
+
     def _call_llm_for_judgment(self, messages_batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         调用 LLM API 进行高价值信息判别
 
+        整批请求由 AsyncLLMClient 并发发送：在途请求数不超过 MAX_CONCURRENCY，
+        每次发送前从共享令牌桶获取令牌
+
         Args:
             messages_batch: 消息数据列表（批处理）
 
         Returns:
-            LLM 判别结果列表
+            LLM 判别结果列表（与输入顺序一致，失败或无判别结果时为空字典）
         """
         if not LLMConfig.is_configured():
             logger.warning("LLM 配置不完整，无法调用 LLM API")
             return [{}] * len(messages_batch)
 
-        results = []
-        for message in messages_batch:
-            try:
-                # 判断是否有图片，选择相应的模型和提示词
-                has_images = message.get('images') and len(message['images']) > 0
-
-                if has_images:
-                    # 使用视觉模型处理图片
-                    judgment = self._call_llm_with_vision(message)
-                else:
-                    # 使用文本模型处理文本
-                    judgment = self._call_llm_with_text(message)
-
-                # 确保返回有效的判别结果（至少要有 ai_judgment 字段）
-                if judgment and judgment.get('ai_judgment'):
-                    results.append(judgment)
-                else:
-                    results.append({})
-
-            except Exception as e:
-                logger.error(f"调用 LLM 处理消息失败 (message_id={message.get('message_id')}): {e}", exc_info=True)
-                results.append({})
+        try:
+            responses = asyncio.run(self._post_payloads([self._build_payload(message) for message in messages_batch]))
+        except Exception as e:
+            logger.error(f"批量调用 LLM 失败: {e}", exc_info=True)
+            return [{}] * len(messages_batch)
 
+        results = []
+        for response in responses:
+            judgment = self._parse_llm_response(response) if response else {}
+            # 确保返回有效的判别结果（至少要有 ai_judgment 字段）
+            results.append(judgment if judgment.get('ai_judgment') else {})
         return results
 
-    def _call_llm_with_text(self, message: Dict[str, Any]) -> Dict[str, Any]:
+    async def _post_payloads(self, payloads: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        async with AsyncLLMClient(
+            LLMConfig.LLM_API_ENDPOINT,
+            LLMConfig.LLM_API_KEY,
+            self.rate_limiter,
+            max_concurrency=LLMConfig.MAX_CONCURRENCY,
+            timeout=LLMConfig.LLM_TIMEOUT,
+            max_retries=LLMConfig.MAX_RETRIES
+        ) as client:
+            responses = await client.post_many(payloads)
+        for key, value in client.stats.items():
+            self.client_stats[key] = self.client_stats.get(key, 0) + value
+        return responses
+
+    def _build_payload(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """有图片时使用视觉模型，否则使用文本模型"""
+        if message.get('images'):
+            return self._build_vision_payload(message)
+        return self._build_text_payload(message)
+
+    def _build_text_payload(self, message: Dict[str, Any]) -> Dict[str, Any]:
         """
-        使用文本模型调用 LLM
+        构建文本模型请求载荷
 
         Args:
             message: 消息数据字典
 
         Returns:
-            解析后的 LLM 判别结果
+            请求载荷
         """
-        try:
-            # 应用限流
-            self.rate_limiter.wait_if_needed()
-
-            # 构建提示词
-            prompt = LLMConfig.USER_PROMPT_TEMPLATE.format(
-                group_name=message.get('group_name', '未知'),
-                username=message.get('username', '未知'),
-                content=message.get('content', '')
-            )
-
-            # 构建请求载荷
-            payload = {
-                "model": LLMConfig.LLM_MODEL_TEXT,
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": LLMConfig.SYSTEM_PROMPT
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "temperature": 1,
-                "max_tokens": 65536,
-                "stream": False
-            }
-
-            headers = {
-                "Authorization": f"Bearer {LLMConfig.LLM_API_KEY}",
-                "Content-Type": "application/json"
-            }
-
-            logger.debug(f"调用 LLM 文本模型，message_id={message.get('message_id')}")
-
-            response = requests.post(
-                LLMConfig.LLM_API_ENDPOINT,
-                json=payload,
-                headers=headers,
-                timeout=LLMConfig.LLM_TIMEOUT
-            )
-
-            response.raise_for_status()
-            result = response.json()
-
-            # 请求成功，记录请求
-            self.rate_limiter.record_request()
-
-            return self._parse_llm_response(result)
+        prompt = LLMConfig.USER_PROMPT_TEMPLATE.format(
+            group_name=message.get('group_name', '未知'),
+            username=message.get('username', '未知'),
+            content=message.get('content', '')
+        )
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"LLM API 请求失败: {e}")
-            return {}
-        except Exception as e:
-            logger.error(f"处理 LLM 文本响应失败: {e}", exc_info=True)
-            return {}
+        return {
+            "model": LLMConfig.LLM_MODEL_TEXT,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": LLMConfig.SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 1,
+            "max_tokens": 65536,
+            "stream": False
+        }
 
-    def _call_llm_with_vision(self, message: Dict[str, Any]) -> Dict[str, Any]:
+    def _build_vision_payload(self, message: Dict[str, Any]) -> Dict[str, Any]:
         """
-        使用视觉模型调用 LLM（处理包含图片的消息）
+        构建视觉模型请求载荷（处理包含图片的消息）
 
         Args:
             message: 消息数据字典（包含图片）
 
         Returns:
-            解析后的 LLM 判别结果
+            请求载荷
         """
-        try:
-            # 应用限流
-            self.rate_limiter.wait_if_needed()
-
-            # 构建内容数组（包含图片和文本）
-            content = []
-
-            # 添加图片
-            images = message.get('images', [])
-            for image_url in images:
-                content.append({
-                    "type": "image_url",
-                    "image_url": {"url": image_url}
-                })
-
-            # 添加文本提示
-            text_prompt = f"这些是来自 {message.get('group_name', '群组')} 的用户 {message.get('username', '用户')} 的消息和图片。\n\n消息内容: {message.get('content', '')}\n\n请分析这些内容是否涉及黑灰产、诈骗、毒品等非法交易。"
+        # 构建内容数组（包含图片和文本）
+        content = []
+
+        # 添加图片
+        for image_url in message.get('images', []):
             content.append({
-                "type": "text",
-                "text": f"{LLMConfig.SYSTEM_PROMPT}\n\n{text_prompt}"
+                "type": "image_url",
+                "image_url": {"url": image_url}
             })
 
-            # 构建请求载荷
-            payload = {
-                "model": LLMConfig.LLM_MODEL_VISION,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": content
-                    }
-                ],
-                "temperature": 1,
-                "max_tokens": 65536,
-                "stream": False
-            }
-
-            headers = {
-                "Authorization": f"Bearer {LLMConfig.LLM_API_KEY}",
-                "Content-Type": "application/json"
-            }
-
-            logger.debug(f"调用 LLM 视觉模型，message_id={message.get('message_id')}, 图片数={len(images)}")
-
-            response = requests.post(
-                LLMConfig.LLM_API_ENDPOINT,
-                json=payload,
-                headers=headers,
-                timeout=LLMConfig.LLM_TIMEOUT
-            )
-
-            response.raise_for_status()
-            result = response.json()
-
-            # 请求成功，记录请求
-            self.rate_limiter.record_request()
-
-            return self._parse_llm_response(result)
+        # 添加文本提示
+        text_prompt = LLMConfig.VISION_PROMPT_TEMPLATE.format(
+            group_name=message.get('group_name', '群组'),
+            username=message.get('username', '用户'),
+            content=message.get('content', '')
+        )
+        content.append({
+            "type": "text",
+            "text": f"{LLMConfig.SYSTEM_PROMPT}\n\n{text_prompt}"
+        })
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"LLM API 请求失败: {e}")
-            return {}
-        except Exception as e:
-            logger.error(f"处理 LLM 视觉响应失败: {e}", exc_info=True)
-            return {}
+        return {
+            "model": LLMConfig.LLM_MODEL_VISION,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": content
+                }
+            ],
+            "temperature": 1,
+            "max_tokens": 65536,
+            "stream": False
+        }
 
     def _parse_llm_response(self, response: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -728,7 +597,7 @@ class AdTrackingLLMJob:
         处理流程：
         1. 获取当日 0 点到当前的所有包含图片的聊天记录
         2. 去除重复消息
-        3. 批量提交给 LLM 进行分析
+        3. 按内容键复用已缓存的判别结果，新内容批量提交给 LLM 进行分析
         4. 解析 LLM 结果并保存高价值信息到数据库
         5. 记录统计信息和错误情况
         """
@@ -738,6 +607,7 @@ class AdTrackingLLMJob:
             'messages_after_dedup': 0,
             'duplicates_removed': 0,
             'llm_calls': 0,
+            'llm_judged_messages': 0,
             'high_value_saved': 0,
             'errors': 0,
             'start_time': start_time.isoformat(),
@@ -754,8 +624,8 @@ class AdTrackingLLMJob:
             messages = self._get_today_messages_with_images()
             stats['total_messages'] = len(messages)
 
-            # 2. 去除重复消息（相似度超过90%的同用户消息）
-            messages, dedup_count = self._deduplicate_messages_by_user(messages)
+            # 2. 去除近似重复消息（跨用户）
+            messages, dedup_count = self._deduplicate_messages(messages)
             stats['messages_after_dedup'] = len(messages)
             stats['duplicates_removed'] = dedup_count
 
@@ -786,13 +656,11 @@ class AdTrackingLLMJob:
 
                 # 处理所有消息（无论是否有LLM配置）
                 if messages_for_llm:
-                    # 调用 LLM 进行判别（如果配置了的话）
-                    if LLMConfig.is_configured():
-                        llm_results = self._call_llm_for_judgment(messages_for_llm)
+                    # 先复用缓存的判别结果，只有新内容才调用 LLM（如果配置了的话）
+                    llm_results, requested = self._judge_messages(messages_for_llm)
+                    if requested:
                         stats['llm_calls'] += 1
-                    else:
-                        # 未配置LLM时，返回空结果
-                        llm_results = [{}] * len(messages_for_llm)
+                        stats['llm_judged_messages'] += requested
 
                     # 处理结果并保存高价值信息
                     for idx, msg_data in enumerate(messages_for_llm):
@@ -823,9 +691,10 @@ class AdTrackingLLMJob:
             stats['end_time'] = end_time.isoformat()
             stats['duration_seconds'] = (end_time - start_time).total_seconds()
 
-            # 添加限流器状态统计
-            rate_limiter_status = self.rate_limiter.get_status()
-            stats['rate_limiter'] = rate_limiter_status
+            # 添加限流器与请求客户端统计
+            stats['rate_limiter'] = self.rate_limiter.get_status()
+            stats['llm_requests'] = dict(self.client_stats)
+            stats['verdict_cache'] = self.verdict_cache.get_stats()
 
             logger.info("=" * 80)
             logger.info("处理任务完成")
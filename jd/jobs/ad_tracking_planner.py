@@ -0,0 +1,175 @@
+"""
+广告追踪运行级工作计划
+
+一次作业运行内，先从一批来源文本中抽取全部URL与Telegram账户，
+按标准化结果去重，每个唯一实体只分析一次（URL、账户分别批量并发），
+再把分析结果分发回各个出现位置。分析成本随唯一实体数增长，而不是随提及次数增长。
+
+分析结果在整个运行期间保留，后续批次再次出现的实体直接复用；
+超过 max_entries 时清空重来（已分析的URL仍可命中 TmeSpider 的URL缓存）。
+
+传入 preview_store 时账户不再抓取 t.me：每次提及都记入 TmePreviewStore，
+分析结果直接读取存储的预览（未抓取过的账户为 pending，由后台刷新任务补全）。
+"""
+
+from collections import Counter
+from typing import Any, Dict, Iterable, List
+
+from jd.utils.logging_config import get_logger
+
+logger = get_logger(__name__, {
+    'component': 'ad_tracking',
+    'module': 'planner'
+})
+
+
+class AdTrackingRunPlanner:
+    """单次运行内的实体抽取、去重与批量分析"""
+
+    def __init__(self, spider, max_entries: int = 200000, preview_store=None):
+        """
+        Args:
+            spider: TmeSpider 实例
+            max_entries: 运行期内保留的URL/账户分析结果上限（各自计算）
+            preview_store: TmePreviewStore 实例，为空时账户通过 spider 批量抓取
+        """
+        self.spider = spider
+        self.preview_store = preview_store
+        self.max_entries = max_entries
+        self.url_results = {}  # {标准化URL: classify_and_process_url() 结构的结果}
+        self.account_results = {}  # {小写用户名: analyze_telegram_account() 结构的结果}
+        self.stats = {
+            'sources': 0,
+            'url_mentions': 0,
+            'account_mentions': 0,
+            'unique_urls': 0,
+            'unique_accounts': 0,
+            'pending_accounts': 0
+        }
+
+    def plan(self, sources: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        抽取并去重一批来源中的实体，批量分析本次运行中首次出现的实体
+
+        Args:
+            sources: 来源列表，每项包含 content_text、source_type、source_id、
+                user_id、chat_id、apply_tags、tag_source_text
+
+        Returns:
+            出现位置列表，每项为来源字段加上 content、content_type 和 analysis
+            （analysis 为 None 表示批量分析失败，由调用方回退为逐条分析）
+        """
+        if len(self.url_results) > self.max_entries:
+            self.url_results.clear()
+        if len(self.account_results) > self.max_entries:
+            self.account_results.clear()
+
+        occurrences = []
+        new_urls = {}  # {标准化URL: 原始URL}
+        new_accounts = {}  # {小写用户名: 原始账户}
+        account_counts = Counter()  # {小写用户名: 本批提及次数}
+
+        for source in sources:
+            content_text = source.get('content_text')
+            if not content_text:
+                continue
+            self.stats['sources'] += 1
+
+            urls, accounts = self.spider.extract_urls_and_accounts(content_text)
+            for url in urls:
+                key = self.spider.normalize_url(url)
+                occurrences.append(dict(source, content=url, content_type='url', key=key))
+                if key not in self.url_results:
+                    new_urls.setdefault(key, url)
+
+            for account in accounts:
+                key = account.lstrip('@').lower()
+                occurrences.append(dict(source, content=account, content_type='telegram_account', key=key))
+                account_counts[key] += 1
+                if key not in self.account_results:
+                    new_accounts.setdefault(key, account)
+
+        self._analyze_urls(new_urls)
+        if self.preview_store is not None:
+            self._read_account_previews(new_accounts, account_counts)
+        else:
+            self._analyze_accounts(new_accounts)
+
+        for occurrence in occurrences:
+            if occurrence['content_type'] == 'url':
+                self.stats['url_mentions'] += 1
+                occurrence['analysis'] = self.url_results.get(occurrence['key'])
+            else:
+                self.stats['account_mentions'] += 1
+                occurrence['analysis'] = self.account_results.get(occurrence['key'])
+
+        logger.debug("广告追踪批次计划完成", extra={
+            'extra_fields': {
+                'occurrences': len(occurrences),
+                'new_urls': len(new_urls),
+                'new_accounts': len(new_accounts)
+            }
+        })
+        return occurrences
+
+    def _analyze_urls(self, new_urls: Dict[str, str]):
+        if not new_urls:
+            return
+        try:
+            results = self.spider.analyze_urls_batch(list(new_urls.values()))
+        except Exception as e:
+            logger.warning("URL 批量分析失败，回退为逐条处理", extra={
+                'extra_fields': {
+                    'url_count': len(new_urls),
+                    'error_type': type(e).__name__,
+                    'error_message': str(e)
+                }
+            })
+            return
+        for key, url in new_urls.items():
+            if results.get(url) is not None:
+                self.url_results[key] = results[url]
+        self.stats['unique_urls'] += len(new_urls)
+
+    def _analyze_accounts(self, new_accounts: Dict[str, str]):
+        if not new_accounts:
+            return
+        try:
+            results = self.spider.analyze_telegram_accounts_batch(list(new_accounts.values()))
+        except Exception as e:
+            logger.warning("Telegram 账户批量分析失败，回退为逐条处理", extra={
+                'extra_fields': {
+                    'account_count': len(new_accounts),
+                    'error_type': type(e).__name__,
+                    'error_message': str(e)
+                }
+            })
+            return
+        for key, account in new_accounts.items():
+            if results.get(account) is not None:
+                self.account_results[key] = results[account]
+        self.stats['unique_accounts'] += len(new_accounts)
+
+    def _read_account_previews(self, new_accounts: Dict[str, str], account_counts: Counter):
+        """记录本批全部账户提及，并从预览存储读取首次出现账户的分析结果"""
+        if not account_counts:
+            return
+        try:
+            self.preview_store.record_sightings(account_counts)
+            results = self.preview_store.lookup(new_accounts) if new_accounts else {}
+        except Exception as e:
+            logger.warning("t.me 预览存储读取失败，回退为逐条处理", extra={
+                'extra_fields': {
+                    'account_count': len(account_counts),
+                    'error_type': type(e).__name__,
+                    'error_message': str(e)
+                }
+            })
+            return
+        for key, account in new_accounts.items():
+            analysis = results.get(key)
+            if analysis is not None:
+                self.account_results[key] = dict(analysis, account=account)
+                if analysis.get('pending'):
+                    self.stats['pending_accounts'] += 1
+        self.stats['unique_accounts'] += len(new_accounts)
@@ -0,0 +1,176 @@
+"""
+广告追踪记录批量写入
+
+AdTrackingBatchWriter 在内存中累积一批追踪数据，按
+(normalized_content 转小写, source_type, source_id) 合并同一内容的多次出现
+（出现次数求和、first_seen 取最早、last_seen 取最晚、extra_info 依次合并），
+flush 时用一条 INSERT ... ON DUPLICATE KEY UPDATE 写入整批：
+
+    occurrence_count = occurrence_count + VALUES(occurrence_count)
+    first_seen = LEAST(first_seen, VALUES(first_seen))
+    last_seen = GREATEST(last_seen, VALUES(last_seen))
+    extra_info = JSON_MERGE_PATCH(extra_info, VALUES(extra_info))
+
+唯一键为 (content_hash, source_type, source_id)，content_hash 是
+SHA1(LOWER(normalized_content)) 的生成列，见 dbrt/ad_tracking_upsert_key_20261019.sql。
+转小写后再哈希，与原先按 normalized_content 不区分大小写（utf8mb4_unicode_ci）查找的行为一致，
+大小写不同的同一内容（如 @User 与 @user）合并为一条记录，保留首次写入时的原文。
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import func, null, tuple_
+from sqlalchemy.dialects.mysql import insert
+
+from jd import db
+from jd.models.ad_tracking import AdTracking
+from jd.utils.logging_config import get_logger
+
+logger = get_logger(__name__, {
+    'component': 'ad_tracking',
+    'module': 'writer'
+})
+
+TrackingKey = Tuple[str, str, str]
+
+
+def content_hash(normalized_content: str) -> str:
+    """与数据库生成列 SHA1(LOWER(normalized_content)) 一致的哈希"""
+    return hashlib.sha1(normalized_content.lower().encode('utf-8')).hexdigest()
+
+
+class AdTrackingBatchWriter:
+    """追踪记录批量合并写入器"""
+
+    def __init__(self, max_rows_per_statement: int = 500):
+        """
+        Args:
+            max_rows_per_statement: 单条 INSERT 语句的最大行数
+        """
+        self.max_rows_per_statement = max_rows_per_statement
+        self._rows = {}  # {TrackingKey: 合并后的行}
+
+    def __len__(self):
+        return len(self._rows)
+
+    @staticmethod
+    def tracking_key(tracking_data: Dict[str, Any]) -> TrackingKey:
+        """记录键：与唯一键一致，内容不区分大小写"""
+        return (tracking_data['normalized_content'].lower(), tracking_data['source_type'],
+                str(tracking_data['source_id']))
+
+    def add(self, tracking_data: Dict[str, Any], seen_at: datetime = None) -> TrackingKey:
+        """
+        累积一次出现
+
+        Args:
+            tracking_data: _process_content_item() 返回的追踪数据
+            seen_at: 出现时间，默认当前时间
+
+        Returns:
+            记录键，flush() 后可用于查找记录ID
+        """
+        seen_at = seen_at or datetime.now()
+        key = self.tracking_key(tracking_data)
+        row = self._rows.get(key)
+        if row is None:
+            self._rows[key] = {
+                'content': tracking_data['content'],
+                'content_type': tracking_data['content_type'],
+                'normalized_content': tracking_data['normalized_content'],
+                'extra_info': dict(tracking_data['extra_info']) if tracking_data.get('extra_info') else None,
+                'source_type': tracking_data['source_type'],
+                'source_id': key[2],
+                'user_id': tracking_data.get('user_id'),
+                'chat_id': tracking_data.get('chat_id'),
+                'first_seen': seen_at,
+                'last_seen': seen_at,
+                'occurrence_count': 1
+            }
+            return key
+
+        row['occurrence_count'] += 1
+        row['first_seen'] = min(row['first_seen'], seen_at)
+        row['last_seen'] = max(row['last_seen'], seen_at)
+        if tracking_data.get('extra_info'):
+            if row['extra_info']:
+                row['extra_info'].update(tracking_data['extra_info'])
+            else:
+                row['extra_info'] = dict(tracking_data['extra_info'])
+        return key
+
+    def flush(self) -> Dict[TrackingKey, int]:
+        """
+        写入并提交累积的记录，清空缓冲区
+
+        Returns:
+            {记录键: 追踪记录ID}
+
+        Raises:
+            写入失败时回滚并抛出异常（缓冲区同样被清空）
+        """
+        if not self._rows:
+            return {}
+
+        rows = list(self._rows.values())
+        self._rows = {}
+        try:
+            for start in range(0, len(rows), self.max_rows_per_statement):
+                self._upsert(rows[start:start + self.max_rows_per_statement])
+            ids = self._query_ids(rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.error("追踪记录批量写入失败", extra={
+                'extra_fields': {'row_count': len(rows)}
+            }, exc_info=True)
+            raise
+
+        logger.debug("追踪记录批量写入完成", extra={
+            'extra_fields': {
+                'row_count': len(rows),
+                'occurrences': sum(row['occurrence_count'] for row in rows)
+            }
+        })
+        return ids
+
+    @staticmethod
+    def _upsert(rows: List[Dict[str, Any]]):
+        table = AdTracking.__table__
+        # 无额外信息时写入 SQL NULL（而不是 JSON null），保留已有的 extra_info
+        stmt = insert(table).values([
+            dict(row, extra_info=row['extra_info'] or null()) for row in rows
+        ])
+        new = stmt.inserted
+        stmt = stmt.on_duplicate_key_update(
+            occurrence_count=table.c.occurrence_count + new.occurrence_count,
+            first_seen=func.least(table.c.first_seen, new.first_seen),
+            last_seen=func.greatest(table.c.last_seen, new.last_seen),
+            extra_info=func.IF(
+                new.extra_info.is_(None),
+                table.c.extra_info,
+                func.JSON_MERGE_PATCH(func.COALESCE(table.c.extra_info, func.JSON_OBJECT()), new.extra_info)
+            )
+        )
+        db.session.execute(stmt)
+
+    def _query_ids(self, rows: List[Dict[str, Any]]) -> Dict[TrackingKey, int]:
+        """按唯一键回查记录ID（一次查询）"""
+        keys = {
+            (content_hash(row['normalized_content']), row['source_type'], row['source_id']): self.tracking_key(row)
+            for row in rows
+        }
+        found = db.session.query(
+            AdTracking.id, AdTracking.content_hash, AdTracking.source_type, AdTracking.source_id
+        ).filter(
+            tuple_(AdTracking.content_hash, AdTracking.source_type, AdTracking.source_id).in_(list(keys))
+        ).all()
+
+        ids = {}
+        for tracking_id, hash_value, source_type, source_id in found:
+            key = keys.get((hash_value, source_type, source_id))
+            if key is not None:
+                ids[key] = tracking_id
+        return ids
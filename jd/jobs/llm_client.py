@@ -0,0 +1,295 @@
+"""
+LLM 请求客户端与分布式限流
+
+1. RedisTokenBucket：所有 worker 共享的令牌桶。采用 GCRA（通用信元速率算法，
+   与令牌桶等价），Redis 中每个桶只存一个"下一个令牌的理论发放时间"，由 Lua 脚本
+   以 Redis 服务器时间原子地预订时隙：令牌按 max(请求间隔, 3600 / 每小时次数)
+   匀速发放，任意时刻都不会超过配额，也不会因轮询空等浪费配额
+2. AsyncLLMClient：基于 httpx 的异步客户端，在服务商并发上限内保持多个请求在途；
+   429 按 Retry-After 暂停整个令牌桶（所有 worker 一起退避）后重试，
+   5xx 与网络错误按指数退避重试
+
+Redis 不可用时令牌桶退化为进程内限流。
+"""
+
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from jd.services.cache_service import CacheService
+from jd.utils.logging_config import get_logger
+
+logger = get_logger(__name__, {
+    'component': 'ad_tracking',
+    'module': 'llm_client'
+})
+
+
+def gcra_reserve(tat: float, now: float, interval: float, tolerance: float) -> Tuple[float, float]:
+    """
+    预订一个令牌（与 Redis Lua 脚本的计算一致）
+
+    Args:
+        tat: 下一个令牌的理论发放时间
+        now: 当前时间
+        interval: 令牌发放间隔（秒）
+        tolerance: 允许的突发量 (burst - 1) * interval
+
+    Returns:
+        (新的理论发放时间, 需要等待的秒数)
+    """
+    tat = max(tat, now)
+    return tat + interval, max(0.0, tat - tolerance - now)
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头（秒数或 HTTP 日期），无法解析时返回 None"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RedisTokenBucket:
+    """所有 worker 共享的 GCRA 令牌桶"""
+
+    # KEYS[1]: 桶键；ARGV: 发放间隔, 突发容差
+    # 返回 [新的理论发放时间, 等待秒数]（字符串，避免 Lua 数字被截断为整数）
+    _RESERVE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < now then tat = now end
+local delay = tat - tolerance - now
+if delay < 0 then delay = 0 end
+local new_tat = tat + interval
+redis.call('SET', KEYS[1], string.format('%.6f', new_tat), 'PX', math.ceil((new_tat - now) * 1000) + 1000)
+return {string.format('%.6f', new_tat), string.format('%.6f', delay)}
+"""
+
+    # KEYS[1]: 桶键；ARGV: 暂停秒数。把理论发放时间推迟到 now + 暂停秒数（只推迟不提前）
+    _PAUSE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local resume_at = now + tonumber(ARGV[1])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < resume_at then
+    redis.call('SET', KEYS[1], string.format('%.6f', resume_at), 'PX', math.ceil(tonumber(ARGV[1]) * 1000) + 1000)
+end
+return string.format('%.6f', resume_at)
+"""
+
+    def __init__(self, key: str, per_hour: int, interval_seconds: float = 0, burst: int = 1,
+                 use_redis: bool = True):
+        """
+        Args:
+            key: Redis 键（同一配额的所有 worker 使用同一个键）
+            per_hour: 每小时最大请求次数
+            interval_seconds: 相邻请求的最小间隔（秒）
+            burst: 允许的突发请求数（1 表示严格匀速）
+            use_redis: 是否使用 Redis 共享桶
+        """
+        self.key = key
+        self.per_hour = per_hour
+        self.interval_seconds = interval_seconds
+        self.burst = max(1, burst)
+        self.interval = max(float(interval_seconds), 3600.0 / per_hour if per_hour else 0.0)
+        self.tolerance = (self.burst - 1) * self.interval
+        self.use_redis = use_redis
+
+        self._lock = threading.Lock()
+        self._local_tat = 0.0
+        self.acquired_count = 0
+        self.waited_seconds = 0.0
+        self.paused_count = 0
+
+    def _redis(self):
+        return CacheService.get_redis() if self.use_redis else None
+
+    def reserve(self) -> float:
+        """预订下一个令牌，返回需要等待的秒数（预订后必须等待后再发请求）"""
+        redis = self._redis()
+        if redis is not None:
+            try:
+                _, delay = redis.eval(self._RESERVE_SCRIPT, 1, self.key, self.interval, self.tolerance)
+                return float(delay)
+            except Exception as e:
+                logger.warning("Redis 令牌桶不可用，退化为进程内限流", extra={
+                    'extra_fields': {'key': self.key, 'error': str(e)}
+                })
+
+        with self._lock:
+            self._local_tat, delay = gcra_reserve(self._local_tat, time.time(), self.interval, self.tolerance)
+        return delay
+
+    async def acquire(self) -> float:
+        """等待直到获得令牌，返回等待秒数"""
+        delay = self.reserve()
+        self.acquired_count += 1
+        if delay > 0:
+            self.waited_seconds += delay
+            await asyncio.sleep(delay)
+        return delay
+
+    def pause(self, seconds: float) -> None:
+        """暂停发放令牌（服务商返回 429 时所有 worker 一起退避）"""
+        self.paused_count += 1
+        redis = self._redis()
+        if redis is not None:
+            try:
+                redis.eval(self._PAUSE_SCRIPT, 1, self.key, seconds)
+                return
+            except Exception as e:
+                logger.warning("Redis 令牌桶暂停失败", extra={
+                    'extra_fields': {'key': self.key, 'error': str(e)}
+                })
+        with self._lock:
+            self._local_tat = max(self._local_tat, time.time() + seconds)
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取限流器当前状态"""
+        return {
+            'key': self.key,
+            'max_per_hour': self.per_hour,
+            'interval_seconds': self.interval_seconds,
+            'token_interval_seconds': round(self.interval, 3),
+            'burst': self.burst,
+            'acquired_count': self.acquired_count,
+            'waited_seconds': round(self.waited_seconds, 2),
+            'paused_count': self.paused_count,
+        }
+
+
+class AsyncLLMClient:
+    """并发受限、共享限流的异步 LLM 请求客户端"""
+
+    RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+    def __init__(self, endpoint: str, api_key: str, bucket: RedisTokenBucket,
+                 max_concurrency: int = 4, timeout: float = 30, max_retries: int = 3,
+                 transport: httpx.AsyncBaseTransport = None):
+        """
+        Args:
+            endpoint: Chat Completions 接口地址
+            api_key: API KEY
+            bucket: 共享令牌桶，每次发送（含重试）前获取一个令牌
+            max_concurrency: 同时在途的最大请求数（服务商并发上限）
+            timeout: 单个请求超时（秒）
+            max_retries: 429/5xx/网络错误的最大重试次数
+            transport: 自定义 httpx 传输层（代理或测试）
+        """
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.bucket = bucket
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.transport = transport
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.stats = {
+            'request_count': 0,
+            'success_count': 0,
+            'retry_count': 0,
+            'rate_limited_count': 0,
+            'error_count': 0,
+        }
+
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            headers={
+                'Authorization': f'Bearer {self.api_key}',
+                'Content-Type': 'application/json'
+            },
+            limits=httpx.Limits(max_connections=self.max_concurrency,
+                                max_keepalive_connections=self.max_concurrency),
+            transport=self.transport
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def post(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        发送一个请求
+
+        Returns:
+            响应 JSON；重试耗尽或不可重试的错误返回 None（不抛出网络异常）
+        """
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self.bucket.acquire()
+                self.stats['request_count'] += 1
+                if attempt:
+                    self.stats['retry_count'] += 1
+
+                try:
+                    response = await self._client.post(self.endpoint, json=payload)
+                except httpx.HTTPError as e:
+                    logger.warning("LLM 请求网络错误", extra={
+                        'extra_fields': {'attempt': attempt, 'error': str(e)}
+                    })
+                    if attempt < self.max_retries:
+                        await asyncio.sleep(2 ** attempt)
+                    continue
+
+                if response.status_code in self.RETRY_STATUS_CODES:
+                    wait = retry_after_seconds(response.headers.get('Retry-After'))
+                    wait = 2 ** attempt if wait is None else wait
+                    if response.status_code == 429:
+                        self.stats['rate_limited_count'] += 1
+                        self.bucket.pause(wait)
+                    elif attempt < self.max_retries:
+                        await asyncio.sleep(wait)
+                    logger.warning("LLM 请求被限流或服务端错误，稍后重试", extra={
+                        'extra_fields': {'status_code': response.status_code, 'attempt': attempt, 'wait': wait}
+                    })
+                    continue
+
+                if response.status_code >= 400:
+                    self.stats['error_count'] += 1
+                    logger.error("LLM API 请求失败", extra={
+                        'extra_fields': {'status_code': response.status_code, 'body': response.text[:500]}
+                    })
+                    return None
+
+                try:
+                    result = response.json()
+                except ValueError as e:
+                    self.stats['error_count'] += 1
+                    logger.error("LLM 响应不是有效的 JSON", extra={'extra_fields': {'error': str(e)}})
+                    return None
+                self.stats['success_count'] += 1
+                return result
+
+        self.stats['error_count'] += 1
+        logger.error("LLM 请求重试次数耗尽", extra={'extra_fields': {'max_retries': self.max_retries}})
+        return None
+
+    async def post_many(self, payloads: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """并发发送一批请求，结果顺序与 payloads 一致"""
+        return list(await asyncio.gather(*(self.post(payload) for payload in payloads)))
@@ -0,0 +1,205 @@
+"""
+LLM 判别结果持久缓存
+
+同一条广告（相同文字与图片）会在很多群组、很多天里重复出现，每次都请求 LLM
+会耗尽每小时配额。判别结果按内容键保存在 ad_tracking_llm_verdict 表：
+
+    cache_key = SHA1(提示词/模型版本 | 标准化文本哈希 | 排序后的图片内容哈希)
+
+- 文本标准化：NFKC（全角转半角）、转小写、合并空白
+- 图片按文件内容哈希（同一图片被不同群组下载为不同文件也能命中），
+  文件不存在时退化为按路径哈希
+- 提示词、模型或解析规则变化时版本随之变化，旧条目自然失效
+
+群组名、用户名不参与内容键：同一内容在不同群组的判别结果视为相同。
+"""
+
+import hashlib
+import os
+import re
+import unicodedata
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import update
+from sqlalchemy.dialects.mysql import insert
+
+from jd import db
+from jd.models.ad_tracking_llm_verdict import AdTrackingLLMVerdict
+from jd.utils.logging_config import get_logger
+
+logger = get_logger(__name__, {
+    'component': 'ad_tracking',
+    'module': 'llm_verdict_cache'
+})
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """NFKC、小写、合并空白后的文本"""
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def text_hash(text: Optional[str]) -> str:
+    """标准化文本的 SHA1"""
+    return hashlib.sha1(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+def verdict_cache_key(prompt_version: str, normalized_text_hash: str, image_hashes: Iterable[str]) -> str:
+    """由版本、文本哈希与图片哈希（与顺序无关）生成内容键"""
+    raw = '|'.join([prompt_version, normalized_text_hash, ','.join(sorted(image_hashes))])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class LLMVerdictCache:
+    """按内容键读写 LLM 判别结果"""
+
+    def __init__(self, prompt_version: str, static_folder: str = None, query_chunk_size: int = 500):
+        """
+        Args:
+            prompt_version: 提示词/模型版本（LLMConfig.prompt_version()）
+            static_folder: 图片相对路径的根目录，为空时按路径哈希图片
+            query_chunk_size: IN 查询与批量写入的分块大小
+        """
+        self.prompt_version = prompt_version
+        self.static_folder = static_folder
+        self.query_chunk_size = query_chunk_size
+        self._image_hashes = {}  # {图片路径: 内容哈希}，同一次运行内每个文件只读一次
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'writes': 0,
+        }
+
+    def image_hash(self, path: str) -> str:
+        """图片文件内容的 SHA1，文件不可读时返回 'path:' + 路径的 SHA1"""
+        digest = self._image_hashes.get(path)
+        if digest is not None:
+            return digest
+
+        full_path = os.path.join(self.static_folder, path) if self.static_folder else None
+        try:
+            sha1 = hashlib.sha1()
+            with open(full_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(65536), b''):
+                    sha1.update(chunk)
+            digest = sha1.hexdigest()
+        except (OSError, TypeError):
+            digest = 'path:' + hashlib.sha1(path.encode('utf-8')).hexdigest()
+        self._image_hashes[path] = digest
+        return digest
+
+    def cache_key(self, content: Optional[str], images: Iterable[str]) -> str:
+        """消息（文本 + 图片路径列表）的内容键"""
+        return verdict_cache_key(self.prompt_version, text_hash(content),
+                                 (self.image_hash(path) for path in images))
+
+    def lookup(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        读取判别结果并累加命中次数
+
+        Args:
+            keys: 内容键（可重复，每次出现计一次命中）
+
+        Returns:
+            {内容键: _parse_llm_response 结构的判别结果}，只包含命中的键
+        """
+        occurrences = Counter(keys)
+        unique_keys = list(occurrences)
+        verdicts = {}
+        for start in range(0, len(unique_keys), self.query_chunk_size):
+            chunk = unique_keys[start:start + self.query_chunk_size]
+            for cache_key, ai_judgment, importance_score, is_high_priority in db.session.query(
+                AdTrackingLLMVerdict.cache_key,
+                AdTrackingLLMVerdict.ai_judgment,
+                AdTrackingLLMVerdict.importance_score,
+                AdTrackingLLMVerdict.is_high_priority
+            ).filter(AdTrackingLLMVerdict.cache_key.in_(chunk)):
+                verdicts[cache_key] = {
+                    'ai_judgment': ai_judgment,
+                    'importance_score': importance_score,
+                    'is_high_priority': bool(is_high_priority)
+                }
+
+        hits = sum(occurrences[key] for key in verdicts)
+        self.stats['hits'] += hits
+        self.stats['misses'] += sum(occurrences.values()) - hits
+        if verdicts:
+            self._record_hits({key: occurrences[key] for key in verdicts})
+        return verdicts
+
+    def _record_hits(self, counts: Dict[str, int]) -> None:
+        """累加命中次数（相同次数的键合并为一条 UPDATE），失败只记录日志"""
+        by_count = {}
+        for key, count in counts.items():
+            by_count.setdefault(count, []).append(key)
+
+        table = AdTrackingLLMVerdict.__table__
+        now = datetime.now()
+        try:
+            for count, keys in by_count.items():
+                for start in range(0, len(keys), self.query_chunk_size):
+                    db.session.execute(
+                        update(table)
+                        .where(table.c.cache_key.in_(keys[start:start + self.query_chunk_size]))
+                        .values(hit_count=table.c.hit_count + count, last_hit_at=now)
+                    )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.warning("LLM 判别缓存命中次数更新失败", extra={
+                'extra_fields': {'key_count': len(counts)}
+            }, exc_info=True)
+
+    def save(self, verdicts: Dict[str, Dict[str, Any]], image_counts: Dict[str, int] = None) -> None:
+        """
+        保存判别结果（INSERT ... ON DUPLICATE KEY UPDATE），没有 ai_judgment 的结果不保存
+
+        写入失败只记录日志：本次运行仍使用已得到的判别结果，下次运行重新请求
+
+        Args:
+            verdicts: {内容键: _parse_llm_response 结构的判别结果}
+            image_counts: {内容键: 图片数量}
+        """
+        image_counts = image_counts or {}
+        rows = [
+            {
+                'cache_key': key,
+                'prompt_version': self.prompt_version,
+                'ai_judgment': verdict['ai_judgment'],
+                'importance_score': verdict.get('importance_score') or 0,
+                'is_high_priority': bool(verdict.get('is_high_priority')),
+                'image_count': image_counts.get(key, 0),
+            }
+            for key, verdict in verdicts.items() if verdict and verdict.get('ai_judgment')
+        ]
+        if not rows:
+            return
+
+        table = AdTrackingLLMVerdict.__table__
+        try:
+            for start in range(0, len(rows), self.query_chunk_size):
+                stmt = insert(table).values(rows[start:start + self.query_chunk_size])
+                new = stmt.inserted
+                stmt = stmt.on_duplicate_key_update(
+                    ai_judgment=new.ai_judgment,
+                    importance_score=new.importance_score,
+                    is_high_priority=new.is_high_priority,
+                )
+                db.session.execute(stmt)
+            db.session.commit()
+            self.stats['writes'] += len(rows)
+        except Exception:
+            db.session.rollback()
+            logger.error("LLM 判别结果缓存写入失败", extra={
+                'extra_fields': {'verdict_count': len(rows)}
+            }, exc_info=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """返回缓存统计信息"""
+        stats = dict(self.stats)
+        stats['hashed_images'] = len(self._image_hashes)
+        return stats
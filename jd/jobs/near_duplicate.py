@@ -0,0 +1,148 @@
+"""
+近似重复消息检测（MinHash + LSH）
+
+每条消息按字符 n-gram 切片后计算 MinHash 签名，签名分成若干段（band），
+任一段完全相同的消息落入同一个桶成为候选，只与候选比较签名估计的 Jaccard 相似度。
+每条消息的处理代价与已保留消息的数量无关，整体近似线性，
+可以在一天的全部候选消息上跨用户去重（同一广告被多个账号复制粘贴）。
+
+阈值与相似度：
+- 命中概率 1 - (1 - s^rows)^bands，默认 16 段 × 4 行，相似度 0.7 时候选召回约 99%
+- 判重使用签名中相同位置的比例（Jaccard 估计值）>= threshold
+- n-gram 少于 min_shingles 的短文本（如「新货到了」）不参与去重：
+  短文案在不同广告中反复出现，按文字判重会把图片不同的广告合并
+"""
+
+import hashlib
+import re
+from typing import Dict, Hashable, List, Optional, Tuple
+
+# 借用值的偏移，大于任何桶内取值（64 位哈希除以桶数），保证借用值与原值不会相等
+_DENSIFY_OFFSET = 1 << 64
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class MinHashLSH:
+    """MinHash 签名 + LSH 分段索引"""
+
+    def __init__(self, threshold: float = 0.7, num_perm: int = 64, bands: int = 16,
+                 shingle_size: int = 3, min_shingles: int = 8, seed: int = 1):
+        """
+        Args:
+            threshold: 判定为近似重复的 Jaccard 相似度下限
+            num_perm: 签名长度（桶数）
+            bands: LSH 分段数，num_perm 必须能被整除
+            shingle_size: 字符 n-gram 长度
+            min_shingles: 参与去重的最少 n-gram 数量，更短的文本不判重也不加入索引
+            seed: 哈希种子（固定种子保证结果可复现）
+        """
+        if num_perm % bands:
+            raise ValueError('num_perm 必须能被 bands 整除')
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.min_shingles = min_shingles
+
+        self._key = seed.to_bytes(8, 'big')
+        self._buckets: List[Dict[Tuple[int, ...], List[Hashable]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[Hashable, Tuple[int, ...]] = {}
+        self._order: Dict[Hashable, int] = {}  # {键: 加入索引的序号}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def shingles(self, text: str) -> set:
+        """去掉空白并转小写后的字符 n-gram 集合"""
+        text = _WHITESPACE.sub('', text or '').lower()
+        if len(text) <= self.shingle_size:
+            return {text} if text else set()
+        size = self.shingle_size
+        return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+    def signature(self, text: str) -> Optional[Tuple[int, ...]]:
+        """
+        计算 MinHash 签名，空文本返回 None
+
+        采用单次置换 MinHash（one permutation hashing）：每个 n-gram 只哈希一次，
+        按哈希值分到 num_perm 个桶并取桶内最小值，空桶向右借用最近非空桶的值
+        （加上距离偏移以区分来源），计算量与文本长度成正比而与签名长度无关
+        """
+        return self._minhash(self.shingles(text))
+
+    def _minhash(self, shingles: set) -> Optional[Tuple[int, ...]]:
+        num_perm = self.num_perm
+        bins = [None] * num_perm
+        for shingle in shingles:
+            h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8, key=self._key).digest(), 'big')
+            slot, value = h % num_perm, h // num_perm
+            if bins[slot] is None or value < bins[slot]:
+                bins[slot] = value
+        if all(value is None for value in bins):
+            return None
+
+        # 从右向左扫描两圈，记录每个位置右侧（循环）最近的非空桶
+        signature = list(bins)
+        next_filled = None
+        for position in range(2 * num_perm - 1, -1, -1):
+            slot = position % num_perm
+            if bins[slot] is not None:
+                next_filled = position
+            elif position < num_perm:
+                signature[slot] = bins[next_filled % num_perm] + (next_filled - position) * _DENSIFY_OFFSET
+        return tuple(signature)
+
+    @staticmethod
+    def similarity(left: Tuple[int, ...], right: Tuple[int, ...]) -> float:
+        """签名估计的 Jaccard 相似度"""
+        return sum(1 for x, y in zip(left, right) if x == y) / len(left)
+
+    def _band_keys(self, signature: Tuple[int, ...]):
+        rows = self.rows
+        for band in range(self.bands):
+            yield band, signature[band * rows:(band + 1) * rows]
+
+    def query(self, signature: Tuple[int, ...]) -> Optional[Tuple[Hashable, float]]:
+        """
+        查找已索引的近似重复项
+
+        Returns:
+            (最早加入索引且达到阈值的键, 相似度)，没有达到阈值的候选时返回 None
+        """
+        earliest = None
+        seen = set()
+        for band, key in self._band_keys(signature):
+            for candidate in self._buckets[band].get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                score = self.similarity(signature, self._signatures[candidate])
+                if score >= self.threshold and (
+                        earliest is None or self._order[candidate] < self._order[earliest[0]]):
+                    earliest = (candidate, score)
+        return earliest
+
+    def insert(self, key: Hashable, signature: Tuple[int, ...]) -> None:
+        """把签名加入索引"""
+        self._signatures[key] = signature
+        self._order.setdefault(key, len(self._order))
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band].setdefault(band_key, []).append(key)
+
+    def add(self, key: Hashable, text: str) -> Optional[Tuple[Hashable, float]]:
+        """
+        检查文本是否与已保留的文本近似重复；不重复时加入索引
+
+        Returns:
+            (重复的已保留键, 相似度)；不重复或文本过短返回 None（过短的文本不加入索引）
+        """
+        shingles = self.shingles(text)
+        if not shingles or len(shingles) < self.min_shingles:
+            return None
+        signature = self._minhash(shingles)
+        duplicate = self.query(signature)
+        if duplicate is None:
+            self.insert(key, signature)
+        return duplicate
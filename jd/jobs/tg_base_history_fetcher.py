@@ -1,10 +1,12 @@
 import datetime
 import signal
 import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from zoneinfo import ZoneInfo
 from sqlalchemy import func
 
-from jd import db
+from jd import app, db
 from jd.utils.logging_config import get_logger, PerformanceLogger, async_log_performance
 from jd.models.tg_group_chat_history import TgGroupChatHistory
 from jd.models.tg_group import TgGroup
@@ -50,6 +52,9 @@ class BaseTgHistoryFetcher:
     def __init__(self):
         self.tg = None
         self.user_processor = None
+        # 流水线写库使用的单线程执行器，保证同一fetcher的批次按顺序提交
+        self._db_executor = None
+        self.pipeline_queue_size = app.config.get('TG_HISTORY_PIPELINE_QUEUE_SIZE', 3)
         # 将此实例添加到活跃连接列表中
         _active_connections.append(self)
     
@@ -87,6 +92,11 @@ class BaseTgHistoryFetcher:
                 self.tg = None
                 self.user_processor = None
         
+        if self._db_executor:
+            # 在线程中等待流水线写库完成，避免阻塞事件循环
+            executor, self._db_executor = self._db_executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown, True)
+
         # 从活跃连接列表中移除
         try:
             _active_connections.remove(self)
@@ -235,6 +245,52 @@ class BaseTgHistoryFetcher:
         else:
             return datetime.datetime.now(ZoneInfo('UTC')).replace(tzinfo=None) + datetime.timedelta(hours=8)
 
+    def _filter_new_messages(self, batch_messages, chat_id: int) -> list:
+        """批量检查重复消息并过滤无效消息，返回需要写入的消息"""
+        message_ids = [str(msg.get("message_id", 0)) for msg in batch_messages if msg.get("message_id")]
+        existing_ids = set()
+
+        if message_ids:
+            existing_records = TgGroupChatHistory.query.filter(
+                TgGroupChatHistory.message_id.in_(message_ids),
+                TgGroupChatHistory.chat_id == str(chat_id)
+            ).with_entities(TgGroupChatHistory.message_id).all()
+            existing_ids = {record.message_id for record in existing_records}
+
+        valid_messages = []
+        for data in batch_messages:
+            message_id = str(data.get("message_id", 0))
+            user_id = data.get("user_id", 0)
+
+            if (message_id and message_id != "0" and
+                message_id not in existing_ids and
+                user_id != 777000):
+                valid_messages.append(data)
+
+        return valid_messages
+
+    def _build_chat_objects(self, valid_messages, chat_id: int) -> list:
+        """将消息数据转换为TgGroupChatHistory对象"""
+        chat_objects = []
+        for data in valid_messages:
+            obj = TgGroupChatHistory(
+                chat_id=str(chat_id),
+                message_id=str(data.get("message_id", 0)),
+                nickname=self._safe_str(data.get("nick_name", "")),
+                username=self._safe_str(data.get("user_name", "")),
+                user_id=str(data.get("user_id", 0)),
+                postal_time=self._process_postal_time(data.get("postal_time")),
+                message=self._safe_str(data.get("message", "")),
+                reply_to_msg_id=str(data.get("reply_to_msg_id", 0)),
+                photo_path=data.get("photo", {}).get('file_path', ''),
+                photo_thumb_path=data.get("photo", {}).get('thumb_path', ''),
+                document_path=data.get("document", {}).get('file_path', ''),
+                document_ext=data.get("document", {}).get('ext', ''),
+                replies_info=self._safe_str(data.get('replies_info', ''))
+            )
+            chat_objects.append(obj)
+        return chat_objects
+
     async def process_message_batch(self, batch_messages, chat_id: int, batch_num: int) -> int:
         """优化版本：批量处理消息，使用SQLAlchemy自动事务管理"""
         if not batch_messages:
@@ -248,27 +304,8 @@ class BaseTgHistoryFetcher:
                          message_count=len(batch_messages))
 
         try:
-            # 1. 批量检查重复消息
-            message_ids = [str(msg.get("message_id", 0)) for msg in batch_messages if msg.get("message_id")]
-            existing_ids = set()
-
-            if message_ids:
-                existing_records = TgGroupChatHistory.query.filter(
-                    TgGroupChatHistory.message_id.in_(message_ids),
-                    TgGroupChatHistory.chat_id == str(chat_id)
-                ).with_entities(TgGroupChatHistory.message_id).all()
-                existing_ids = {record.message_id for record in existing_records}
-
-            # 2. 过滤重复和无效消息
-            valid_messages = []
-            for data in batch_messages:
-                message_id = str(data.get("message_id", 0))
-                user_id = data.get("user_id", 0)
-
-                if (message_id and message_id != "0" and
-                    message_id not in existing_ids and
-                    user_id != 777000):
-                    valid_messages.append(data)
+            # 1-2. 批量检查重复消息，过滤重复和无效消息
+            valid_messages = self._filter_new_messages(batch_messages, chat_id)
 
             if not valid_messages:
                 # 没有有效消息，直接返回
@@ -284,23 +321,7 @@ class BaseTgHistoryFetcher:
                     logger.error(f'批量用户缓存预处理失败: {e}')
 
             # 4. 批量创建消息对象
-            chat_objects = []
-            for data in valid_messages:
-                obj = TgGroupChatHistory(
-                    chat_id=str(chat_id),
-                    message_id=str(data.get("message_id", 0)),
-                    nickname=self._safe_str(data.get("nick_name", "")),
-                    username=self._safe_str(data.get("user_name", "")),
-                    user_id=str(data.get("user_id", 0)),
-                    postal_time=self._process_postal_time(data.get("postal_time")),
-                    message=self._safe_str(data.get("message", "")),
-                    reply_to_msg_id=str(data.get("reply_to_msg_id", 0)),
-                    photo_path=data.get("photo", {}).get('file_path', ''),
-                    document_path=data.get("document", {}).get('file_path', ''),
-                    document_ext=data.get("document", {}).get('ext', ''),
-                    replies_info=self._safe_str(data.get('replies_info', ''))
-                )
-                chat_objects.append(obj)
+            chat_objects = self._build_chat_objects(valid_messages, chat_id)
 
             # 5. 批量插入消息记录
             if chat_objects:
@@ -333,6 +354,148 @@ class BaseTgHistoryFetcher:
             perf_logger.end(success=False, error=str(e))
             logger.error(f'第 {batch_num} 批次批量处理失败，已回滚: {e}')
             return 0
+
+    def _insert_message_batch_in_thread(self, batch_messages, chat_id: int, batch_num: int) -> tuple[list, int]:
+        """
+        在执行器线程中写入消息记录
+
+        线程内推入独立的应用上下文，使用与事件循环线程不同的数据库会话。
+
+        Returns:
+            tuple[list, int]: (写入的有效消息, 写入条数)
+        """
+        with app.app_context():
+            try:
+                valid_messages = self._filter_new_messages(batch_messages, chat_id)
+                if not valid_messages:
+                    return [], 0
+
+                chat_objects = self._build_chat_objects(valid_messages, chat_id)
+                db.session.add_all(chat_objects)
+                db.session.commit()
+
+                logger.info(f'第 {batch_num} 批次批量插入 {len(chat_objects)} 条消息 (过滤重复 {len(batch_messages) - len(valid_messages)} 条)')
+                return valid_messages, len(chat_objects)
+
+            except Exception as e:
+                if db.session.in_transaction():
+                    try:
+                        db.session.rollback()
+                    except Exception as rollback_error:
+                        logger.error(f'事务回滚失败: {rollback_error}')
+                logger.error(f'第 {batch_num} 批次批量处理失败，已回滚: {e}')
+                return [], 0
+
+    async def write_message_batch_pipelined(self, batch_messages, chat_id: int, batch_num: int) -> int:
+        """
+        流水线写库阶段：消息记录在执行器线程中写入提交，
+        用户信息处理依赖Telegram客户端，仍在事件循环中执行
+        """
+        if not batch_messages:
+            return 0
+
+        if self._db_executor is None:
+            self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tg_history_writer')
+
+        loop = asyncio.get_running_loop()
+        valid_messages, inserted_count = await loop.run_in_executor(
+            self._db_executor, self._insert_message_batch_in_thread, batch_messages, chat_id, batch_num
+        )
+
+        if valid_messages and self.user_processor:
+            try:
+                await self.user_processor.prepare_batch_user_cache(valid_messages, chat_id)
+                await self.user_processor.save_user_info_from_message_batch(valid_messages, chat_id)
+                db.session.commit()
+            except Exception as e:
+                if db.session.in_transaction():
+                    db.session.rollback()
+                logger.error(f'第 {batch_num} 批次用户信息处理失败: {e}')
+
+        return inserted_count
+
+    async def run_batch_pipeline(self, batches, chat_id: int) -> tuple[int, dict]:
+        """
+        Telegram拉取与数据库写入之间的有界队列流水线
+
+        生产者持续从batches异步迭代器拉取消息批次放入队列，队列满时阻塞（背压）；
+        写入者从队列取批次写库。网络拉取与写库时间相互重叠。
+        生产者抛出的异常在写入者处理完已入队批次后向上抛出。
+
+        Args:
+            batches: 异步迭代器，每次产出一个消息批次列表
+            chat_id: 群组ID
+
+        Returns:
+            tuple[int, dict]: (写入条数, 流水线统计)
+        """
+        queue = asyncio.Queue(maxsize=max(1, self.pipeline_queue_size))
+        stats = {
+            'batch_count': 0,
+            'saved_count': 0,
+            'queue_max_size': queue.maxsize,
+            'queue_max_depth': 0,
+            'fetch_seconds': 0.0,
+            'write_seconds': 0.0,
+            'producer_blocked_seconds': 0.0,
+            'writer_idle_seconds': 0.0,
+            'wall_seconds': 0.0,
+        }
+        started = time.monotonic()
+
+        async def producer():
+            batch_num = 0
+            iterator = batches.__aiter__()
+            try:
+                while True:
+                    fetch_started = time.monotonic()
+                    try:
+                        batch_messages = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    finally:
+                        stats['fetch_seconds'] += time.monotonic() - fetch_started
+
+                    if not batch_messages:
+                        continue
+                    batch_num += 1
+                    put_started = time.monotonic()
+                    await queue.put((batch_num, batch_messages))
+                    stats['producer_blocked_seconds'] += time.monotonic() - put_started
+                    stats['queue_max_depth'] = max(stats['queue_max_depth'], queue.qsize())
+            finally:
+                await queue.put(None)
+
+        async def writer():
+            while True:
+                idle_started = time.monotonic()
+                item = await queue.get()
+                stats['writer_idle_seconds'] += time.monotonic() - idle_started
+                if item is None:
+                    break
+                batch_num, batch_messages = item
+                write_started = time.monotonic()
+                try:
+                    stats['saved_count'] += await self.write_message_batch_pipelined(batch_messages, chat_id, batch_num)
+                except Exception as e:
+                    # 写入失败时继续消费队列，避免生产者因队列满而永久阻塞
+                    logger.error(f'第 {batch_num} 批次流水线写入失败: {e}')
+                stats['write_seconds'] += time.monotonic() - write_started
+                stats['batch_count'] += 1
+
+        writer_task = asyncio.create_task(writer())
+        try:
+            await producer()
+        finally:
+            await writer_task
+            stats['wall_seconds'] = time.monotonic() - started
+            for key in ('fetch_seconds', 'write_seconds', 'producer_blocked_seconds', 'writer_idle_seconds', 'wall_seconds'):
+                stats[key] = round(stats[key], 3)
+            logger.info(f'流水线完成|chat_id={chat_id}|批次={stats["batch_count"]}|写入={stats["saved_count"]}|'
+                        f'拉取={stats["fetch_seconds"]}s|写库={stats["write_seconds"]}s|总耗时={stats["wall_seconds"]}s|'
+                        f'最大队列深度={stats["queue_max_depth"]}/{stats["queue_max_size"]}')
+
+        return stats['saved_count'], stats
     
 
     def update_group_status(self, chat_id: int):
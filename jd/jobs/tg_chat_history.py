@@ -18,6 +18,8 @@ class ExsitedGroupHistoryFetcher(BaseTgHistoryFetcher):
 
     def __init__(self):
         super().__init__()
+        # 最近一次增量获取的流水线统计（队列深度、拉取/写库耗时）
+        self.last_pipeline_stats = {}
 
 
     def _is_temporary_error(self, exception) -> bool:
@@ -166,8 +168,63 @@ class ExsitedGroupHistoryFetcher(BaseTgHistoryFetcher):
             return -1
 
     
+    async def _iter_new_message_batches(self, chat, group_name: str, min_id: int, max_batch: int):
+        """
+        从min_id开始向新消息方向分批拉取，作为流水线的生产者
+
+        Yields:
+            list: 每批最多100条消息
+        """
+        batch_num = 0
+        # 循环获取，直到不再获取到消息，或者达到10个循环（约1000条消息）
+        while True:
+            batch_num += 1
+            if batch_num >= max_batch + 1:
+                logger.info(f'增量聊天记录获取|{group_name}|消息数到达设定上限 {max_batch * 100}, 即将暂停')
+                break
+            logger.info(f'增量聊天记录获取|{group_name}|第 {batch_num} 批次|从服务器拉取聊天记录|min_id={min_id}')
+
+            # 获取历史记录参数 - 每个批次开始时设置last_message_id
+            param = {
+                "limit": 100,  # 每次固定获取100条
+                "last_message_id": min_id,
+                "reverse": True # 从min_id开始，往新消息获取
+            }
+
+            batch_messages = []
+            batch_max_message_id = min_id  # 记录本批次的最大消息ID
+
+            # 获取当前批次的消息
+            async for data in self.tg.scan_message(chat, **param):
+                batch_messages.append(data)
+                # 记录本批次的最大消息ID，用于下一批次
+                message_id = data.get("message_id", 0)
+                if message_id and int(message_id) > batch_max_message_id:
+                    batch_max_message_id = int(message_id)
+
+                # 限制每批次最多100条
+                if len(batch_messages) >= 100:
+                    break
+
+            # 循环跳出条件：不再收到消息
+            if not batch_messages:
+                logger.info(f'增量聊天记录获取|{group_name}|第 {batch_num} 批次|获取完成')
+                break
+
+            logger.info(f'增量聊天记录获取|{group_name}|第 {batch_num} 批次|获取 {len(batch_messages)} 条信息')
+            yield batch_messages
+
+            # 更新min_id为本批次的最大消息ID，用于下一批次获取
+            if batch_max_message_id > min_id:
+                min_id = batch_max_message_id
+                logger.info(f'增量聊天记录获取|{group_name}|第 {batch_num} 批次|更新min_id为 {min_id}')
+
+            # 添加小延迟避免频繁请求
+            await asyncio.sleep(0.5)
+
     async def fetch_group_new_data(self, chat_id: int, group_name: str, max_batch: int = 10) -> tuple[bool, int]:
         logger.info(f'增量聊天记录获取|{group_name}|ID={chat_id}开始')
+        self.last_pipeline_stats = {}
         
         try:
             chat, chat_id = await self.get_dialog_with_retry(chat_id, group_name)
@@ -213,56 +270,14 @@ class ExsitedGroupHistoryFetcher(BaseTgHistoryFetcher):
                 return True, total_saved_count
             
             logger.info(f'增量聊天记录获取|{group_name}|继续从min_id={min_id}开始增量获取')
-            
-            # 循环获取，直到不再获取到消息，或者达到10个循环（约1000条消息）
-            while True:
-                batch_num += 1
-                if batch_num >= max_batch + 1:
-                    logger.info(f'增量聊天记录获取|{group_name}|消息数到达设定上限 {max_batch * 100}, 即将暂停')
-                    break
-                logger.info(f'增量聊天记录获取|{group_name}|第 {batch_num} 批次|从服务器拉取聊天记录|min_id={min_id}')
-                
-                # 获取历史记录参数 - 每个批次开始时设置last_message_id
-                param = {
-                    "limit": 100,  # 每次固定获取100条
-                    "last_message_id": min_id,
-                    "reverse": True # 从min_id开始，往新消息获取
-                }
-                
-                batch_messages = []
-                batch_max_message_id = min_id  # 记录本批次的最大消息ID
-                
-                # 获取当前批次的消息
-                async for data in self.tg.scan_message(chat, **param):
-                    batch_messages.append(data)
-                    # 记录本批次的最大消息ID，用于下一批次
-                    message_id = data.get("message_id", 0)
-                    if message_id and int(message_id) > batch_max_message_id:
-                        batch_max_message_id = int(message_id)
-                        
-                    # 限制每批次最多100条
-                    if len(batch_messages) >= 100:
-                        break
-                
-                # 循环跳出条件：不再收到消息
-                if not batch_messages:
-                    logger.info(f'增量聊天记录获取|{group_name}|第 {batch_num} 批次|获取完成')
-                    break
-                
-                logger.info(f'增量聊天记录获取|{group_name}|第 {batch_num} 批次|获取 {len(batch_messages)} 条信息')
-                
-                # 保存当前批次的消息
-                batch_saved_count = await self.process_message_batch(batch_messages, chat_id, batch_num)
-                total_saved_count += batch_saved_count
-                logger.info(f'增量聊天记录获取|{group_name}|第 {batch_num} 批次|数据库写入 {batch_saved_count} 条消息|总计 {total_saved_count} 条')
-                
-                # 更新min_id为本批次的最大消息ID，用于下一批次获取
-                if batch_max_message_id > min_id:
-                    min_id = batch_max_message_id
-                    logger.info(f'增量聊天记录获取|{group_name}|第 {batch_num} 批次|更新min_id为 {min_id}')
-                
-                # 添加小延迟避免频繁请求
-                await asyncio.sleep(0.5)
+
+            # 拉取与写库通过有界队列流水线并行：写库在执行器线程中进行时继续拉取下一批
+            total_saved_count, self.last_pipeline_stats = await self.run_batch_pipeline(
+                self._iter_new_message_batches(chat, group_name, min_id, max_batch),
+                chat_id
+            )
+            # 消息由执行器线程的会话提交，结束当前会话的读事务以便统计能看到最新数据
+            db.session.commit()
             
             logger.info(f'增量聊天记录获取|{group_name}|任务完成：获取条数 {total_saved_count} ')
 
@@ -355,7 +370,8 @@ class ExsitedGroupHistoryFetcher(BaseTgHistoryFetcher):
                         'chat_id': chat_id,
                         'session_names': session_names,
                         'status': 'success',
-                        'new_messages_count': new_messages_count
+                        'new_messages_count': new_messages_count,
+                        'pipeline': self.last_pipeline_stats
                     })
                 else:
                     # fetch_group_new_data 返回 False，可能已标记为失效，或者是临时错误
@@ -1,7 +1,9 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
 
-from jd import db
+from sqlalchemy import tuple_
+
+from jd import app, db
 from jd.models.tg_group import TgGroup
 from jd.models.tg_group_status import TgGroupStatus
 from jd.models.tg_group_info_change import TgGroupInfoChange
@@ -15,6 +17,9 @@ logger = get_logger('jd.jobs.tg.group_info', {
     'module': 'group_info'
 })
 
+# 批量同步时每个事务处理的群组数量
+BULK_SYNC_CHUNK_SIZE = 200
+
 
 class TgGroupInfoManager:
     """
@@ -23,13 +28,18 @@ class TgGroupInfoManager:
     """
     
     @staticmethod
-    async def sync_all_group_info(tg_client, session_name: str = 'default') -> Dict[str, Any]:
+    async def sync_all_group_info(tg_client, session_name: str = 'default',
+                                  bulk: Optional[bool] = None) -> Dict[str, Any]:
         """
         同步所有群组信息
         :param tg_client: TelegramAPIs客户端实例
         :param session_name: 会话名称，用于建立群组-会话关联
+        :param bulk: 是否使用批量同步模式，默认读取配置 TG_GROUP_INFO_BULK_SYNC（默认开启）
         :return: 同步结果统计
         """
+        if bulk is None:
+            bulk = app.config.get('TG_GROUP_INFO_BULK_SYNC', True)
+
         result = {
             'success': True,
             'message': '',
@@ -64,38 +74,50 @@ class TgGroupInfoManager:
             
             # 在异步上下文外处理群组数据，避免事件循环冲突
             import asyncio
-            
-            for group_data in groups:
-                try:
-                    # 使用同步方式处理群组数据，避免异步上下文问题
-                    def process_group_sync():
-                        from jd import app
-                        with app.app_context():
-                            return TgGroupInfoManager._process_single_group(group_data, session_name)
-                    
-                    # 在新的线程池中执行同步操作
-                    loop = asyncio.get_event_loop()
-                    group_result = await loop.run_in_executor(None, process_group_sync)
-                    
-                    # 将处理过的群组添加到列表中
-                    chat_id = str(group_data.get('id', ''))
-                    if chat_id:
-                        result['processed_groups'].append(chat_id)
-                    
-                    # 更新统计信息
-                    if group_result['is_new']:
-                        result['stats']['new_groups'] += 1
-                    else:
-                        result['stats']['updated_groups'] += 1
-                    
-                    result['stats']['member_changes'] += group_result['member_changes']
-                    result['stats']['info_changes'] += group_result['info_changes']
-                    
-                except Exception as e:
-                    error_msg = f"处理群组失败 chat_id={group_data.get('id', 'unknown')}: {str(e)}"
-                    logger.error(error_msg)
-                    result['stats']['errors'].append(error_msg)
-            
+
+            if bulk:
+                def process_groups_bulk():
+                    with app.app_context():
+                        return TgGroupInfoManager._sync_groups_bulk(groups, session_name)
+
+                loop = asyncio.get_event_loop()
+                bulk_result = await loop.run_in_executor(None, process_groups_bulk)
+                result['processed_groups'] = bulk_result['processed_groups']
+                for key in ('new_groups', 'updated_groups', 'member_changes', 'info_changes'):
+                    result['stats'][key] = bulk_result[key]
+                result['stats']['errors'].extend(bulk_result['errors'])
+            else:
+                for group_data in groups:
+                    try:
+                        # 使用同步方式处理群组数据，避免异步上下文问题
+                        def process_group_sync():
+                            from jd import app
+                            with app.app_context():
+                                return TgGroupInfoManager._process_single_group(group_data, session_name)
+
+                        # 在新的线程池中执行同步操作
+                        loop = asyncio.get_event_loop()
+                        group_result = await loop.run_in_executor(None, process_group_sync)
+
+                        # 将处理过的群组添加到列表中
+                        chat_id = str(group_data.get('id', ''))
+                        if chat_id:
+                            result['processed_groups'].append(chat_id)
+
+                        # 更新统计信息
+                        if group_result['is_new']:
+                            result['stats']['new_groups'] += 1
+                        else:
+                            result['stats']['updated_groups'] += 1
+
+                        result['stats']['member_changes'] += group_result['member_changes']
+                        result['stats']['info_changes'] += group_result['info_changes']
+
+                    except Exception as e:
+                        error_msg = f"处理群组失败 chat_id={group_data.get('id', 'unknown')}: {str(e)}"
+                        logger.error(error_msg)
+                        result['stats']['errors'].append(error_msg)
+
             result['message'] = f"同步完成: 总计 {result['stats']['total_groups']} 个群组, " \
                               f"新增 {result['stats']['new_groups']} 个, " \
                               f"更新 {result['stats']['updated_groups']} 个, " \
@@ -158,7 +180,41 @@ class TgGroupInfoManager:
         """
         changes_count = 0
         chat_id = existing_group.chat_id
+
+        for db_field, change_type, old_value, new_value in TgGroupInfoManager._diff_group_fields(existing_group, new_data):
+            # 记录变化
+            TgGroupInfoManager._record_group_info_change(
+                chat_id=chat_id,
+                changed_field=change_type,
+                old_value=old_value,
+                new_value=new_value
+            )
+
+            # 更新数据库字段
+            setattr(existing_group, db_field, new_value)
+            changes_count += 1
+
+            logger.info(f"群组信息变化 {chat_id}: {db_field} '{old_value}' -> '{new_value}'")
+        
+        # 更新其他字段（不记录变化）
+        existing_group.group_type = TgGroupInfoManager._resolve_group_type(new_data)
+        
+        if changes_count > 0:
+            db.session.commit()
+            logger.info(f"群组 {chat_id} 信息已更新，共 {changes_count} 处变化")
         
+        return changes_count
+    
+    @staticmethod
+    def _diff_group_fields(existing_group: TgGroup, new_data: Dict[str, Any]) -> List[Tuple[str, int, str, str]]:
+        """
+        计算现有群组与新数据之间需要记录变化的字段差异
+        :param existing_group: 现有群组记录
+        :param new_data: 新的群组数据
+        :return: [(数据库字段, 变化类型, 原值, 新值), ...]
+        """
+        chat_id = existing_group.chat_id
+
         # 定义需要检查的字段映射
         field_mappings = [
             ('name', 'username', TgGroupInfoChange.ChangedFieldType.GROUP_NAME_INVITE_LINK),
@@ -166,7 +222,8 @@ class TgGroupInfoManager:
             ('title', 'title', TgGroupInfoChange.ChangedFieldType.DISPLAY_NAME),
             ('avatar_path', 'photo_path', TgGroupInfoChange.ChangedFieldType.GROUP_AVATAR),
         ]
-        
+
+        diffs = []
         for db_field, data_field, change_type in field_mappings:
             old_value = getattr(existing_group, db_field, '') or ''
             new_value = new_data.get(data_field, '') or ''
@@ -177,47 +234,22 @@ class TgGroupInfoManager:
                 logger.debug(f"私人群组name为空，生成name: {new_value}")
 
             if old_value != new_value:
-                # 记录变化
-                TgGroupInfoManager._record_group_info_change(
-                    chat_id=chat_id,
-                    changed_field=change_type,
-                    old_value=old_value,
-                    new_value=new_value
-                )
+                diffs.append((db_field, change_type, old_value, new_value))
 
-                # 更新数据库字段
-                setattr(existing_group, db_field, new_value)
-                changes_count += 1
+        return diffs
 
-                logger.info(f"群组信息变化 {chat_id}: {db_field} '{old_value}' -> '{new_value}'")
-        
-        # 更新其他字段（不记录变化）
-        if new_data.get('megagroup') == 'channel':
-            existing_group.group_type = TgGroup.GroupType.CHANNEL
-        else:
-            existing_group.group_type = TgGroup.GroupType.GROUP
-        
-        if changes_count > 0:
-            db.session.commit()
-            logger.info(f"群组 {chat_id} 信息已更新，共 {changes_count} 处变化")
-        
-        return changes_count
-    
     @staticmethod
-    def _create_new_group(group_data: Dict[str, Any], session_name: str = 'default') -> None:
-        """
-        创建新群组记录并建立会话关联
-        :param group_data: 群组数据
-        :param session_name: 会话名称，用于建立群组-会话关联
-        """
-        chat_id = str(group_data.get('id', ''))
-        
-        # 确定群组类型
+    def _resolve_group_type(group_data: Dict[str, Any]) -> int:
+        """根据群组数据确定群组类型"""
         if group_data.get('megagroup') == 'channel':
-            group_type = TgGroup.GroupType.CHANNEL
-        else:
-            group_type = TgGroup.GroupType.GROUP
-        
+            return TgGroup.GroupType.CHANNEL
+        return TgGroup.GroupType.GROUP
+
+    @staticmethod
+    def _build_new_group(group_data: Dict[str, Any]) -> TgGroup:
+        """根据群组数据构建新的TgGroup对象（不写库）"""
+        chat_id = str(group_data.get('id', ''))
+
         # 处理name字段，避免空字符串导致的唯一约束冲突
         username = group_data.get('username', '') or ''
         if not username.strip():
@@ -225,16 +257,26 @@ class TgGroupInfoManager:
             username = f"<private_chat>_{chat_id}"
             logger.debug(f"私人群组username为空，生成name: {username}")
 
-        new_group = TgGroup(
+        return TgGroup(
             chat_id=chat_id,
             name=username,
             desc=group_data.get('channel_description', '') or '',
             title=group_data.get('title', '') or '',
             avatar_path=group_data.get('photo_path', '') or '',
             status=TgGroup.StatusType.JOIN_SUCCESS,
-            group_type=group_type,
+            group_type=TgGroupInfoManager._resolve_group_type(group_data),
             account_id=group_data.get('account_id', '') or ''
         )
+
+    @staticmethod
+    def _create_new_group(group_data: Dict[str, Any], session_name: str = 'default') -> None:
+        """
+        创建新群组记录并建立会话关联
+        :param group_data: 群组数据
+        :param session_name: 会话名称，用于建立群组-会话关联
+        """
+        chat_id = str(group_data.get('id', ''))
+        new_group = TgGroupInfoManager._build_new_group(group_data)
         
         db.session.add(new_group)
         db.session.flush()  # 确保获取到new_group的ID
@@ -314,6 +356,235 @@ class TgGroupInfoManager:
             logger.info(f"新增群组状态: {chat_id}, 成员数: {current_members}")
             return 1
     
+    @staticmethod
+    def _sync_groups_bulk(groups: List[Dict[str, Any]], session_name: str = 'default') -> Dict[str, Any]:
+        """
+        批量同步群组信息：按块一次性加载已有记录，在内存中计算差异，每块一个事务提交；
+        某块提交失败时回滚该块，并逐个群组用单条处理路径重试，只有出错的群组被跳过
+        :param groups: 群组数据列表
+        :param session_name: 会话名称，用于建立群组-会话关联
+        :return: 同步统计
+        """
+        result = {
+            'processed_groups': [],
+            'new_groups': 0,
+            'updated_groups': 0,
+            'member_changes': 0,
+            'info_changes': 0,
+            'errors': []
+        }
+
+        # 同一chat_id重复出现时以最后一条为准
+        groups_by_chat_id = {}
+        for group_data in groups:
+            chat_id = str(group_data.get('id', ''))
+            if not chat_id:
+                logger.warning(f"群组ID为空: {group_data}")
+                continue
+            groups_by_chat_id[chat_id] = group_data
+
+        chat_ids = list(groups_by_chat_id.keys())
+        for start in range(0, len(chat_ids), BULK_SYNC_CHUNK_SIZE):
+            chunk = {chat_id: groups_by_chat_id[chat_id] for chat_id in chat_ids[start:start + BULK_SYNC_CHUNK_SIZE]}
+            try:
+                chunk_result = TgGroupInfoManager._sync_group_chunk(chunk, session_name)
+                db.session.commit()
+            except Exception as e:
+                if db.session.in_transaction():
+                    db.session.rollback()
+                logger.warning(f"批量同步群组失败 chunk={start}-{start + len(chunk)}，改为逐个群组重试: {str(e)}")
+                TgGroupInfoManager._sync_groups_one_by_one(chunk, session_name, result)
+                continue
+
+            result['processed_groups'].extend(chunk.keys())
+            for key in ('new_groups', 'updated_groups', 'member_changes', 'info_changes'):
+                result[key] += chunk_result[key]
+            logger.info(f"批量同步群组块完成: {start + len(chunk)}/{len(chat_ids)}")
+
+        return result
+
+    @staticmethod
+    def _sync_groups_one_by_one(chunk: Dict[str, Dict[str, Any]], session_name: str,
+                                result: Dict[str, Any]) -> None:
+        """
+        逐个群组同步（批量块失败后的回退路径），结果累加到 result
+        :param chunk: chat_id -> 群组数据
+        :param session_name: 会话名称
+        :param result: _sync_groups_bulk 的同步统计
+        """
+        for chat_id, group_data in chunk.items():
+            try:
+                group_result = TgGroupInfoManager._process_single_group(group_data, session_name)
+            except Exception as e:
+                if db.session.in_transaction():
+                    db.session.rollback()
+                error_msg = f"处理群组失败 chat_id={chat_id}: {str(e)}"
+                logger.error(error_msg)
+                result['errors'].append(error_msg)
+                continue
+
+            result['processed_groups'].append(chat_id)
+            if group_result['is_new']:
+                result['new_groups'] += 1
+            else:
+                result['updated_groups'] += 1
+            result['member_changes'] += group_result['member_changes']
+            result['info_changes'] += group_result['info_changes']
+
+    @staticmethod
+    def _sync_group_chunk(chunk: Dict[str, Dict[str, Any]], session_name: str) -> Dict[str, int]:
+        """
+        同步一块群组数据，只写入session不提交，由调用方统一提交
+        :param chunk: chat_id -> 群组数据
+        :param session_name: 会话名称
+        :return: 本块统计
+        """
+        stats = {'new_groups': 0, 'updated_groups': 0, 'member_changes': 0, 'info_changes': 0}
+        chat_ids = list(chunk.keys())
+        now = datetime.now()
+
+        # 1. 一次性加载已有记录（同一chat_id存在多条时与逐条模式一样取第一条）
+        existing_groups = {}
+        for group in TgGroup.query.filter(TgGroup.chat_id.in_(chat_ids)).order_by(TgGroup.id.asc()).all():
+            existing_groups.setdefault(group.chat_id, group)
+
+        existing_statuses = {}
+        for status in TgGroupStatus.query.filter(TgGroupStatus.chat_id.in_(chat_ids)).order_by(TgGroupStatus.id.asc()).all():
+            existing_statuses.setdefault(status.chat_id, status)
+
+        existing_session_chat_ids = {
+            row.chat_id for row in db.session.query(TgGroupSession.chat_id).filter(
+                TgGroupSession.chat_id.in_(chat_ids),
+                TgGroupSession.session_name == session_name
+            ).all()
+        }
+
+        message_stats = TgGroupInfoManager._load_message_stats_bulk(chat_ids)
+
+        # 2. 在内存中计算差异
+        new_objects = []
+        for chat_id, group_data in chunk.items():
+            existing_group = existing_groups.get(chat_id)
+            if existing_group:
+                diffs = TgGroupInfoManager._diff_group_fields(existing_group, group_data)
+                for db_field, change_type, old_value, new_value in diffs:
+                    new_objects.append(TgGroupInfoChange(
+                        chat_id=chat_id,
+                        changed_fields=change_type,
+                        original_value=old_value,
+                        new_value=new_value,
+                        update_time=now
+                    ))
+                    setattr(existing_group, db_field, new_value)
+                    logger.info(f"群组信息变化 {chat_id}: {db_field} '{old_value}' -> '{new_value}'")
+                existing_group.group_type = TgGroupInfoManager._resolve_group_type(group_data)
+                stats['updated_groups'] += 1
+                stats['info_changes'] += len(diffs)
+            else:
+                new_objects.append(TgGroupInfoManager._build_new_group(group_data))
+                if chat_id not in existing_session_chat_ids:
+                    new_objects.append(TgGroupSession(
+                        user_id=group_data.get('account_id', '') or '',
+                        chat_id=chat_id,
+                        session_name=session_name
+                    ))
+                    existing_session_chat_ids.add(chat_id)
+                stats['new_groups'] += 1
+                logger.info(f"新增群组: {chat_id} - {group_data.get('title', '')}")
+
+            current_members = group_data.get('member_count', 0)
+            status = existing_statuses.get(chat_id)
+            if status:
+                # previous字段由每日备份任务统一更新
+                if status.members_now != current_members:
+                    stats['member_changes'] += 1
+                status.members_now = current_members
+            else:
+                status = TgGroupStatus(
+                    chat_id=chat_id,
+                    members_now=current_members,
+                    members_previous=0,
+                    records_now=0,
+                    records_previous=0
+                )
+                new_objects.append(status)
+                stats['member_changes'] += 1
+            TgGroupInfoManager._apply_message_stats(status, message_stats.get(chat_id))
+
+        # 3. 写入session，由调用方在同一事务中提交
+        if new_objects:
+            db.session.add_all(new_objects)
+
+        return stats
+
+    @staticmethod
+    def _load_message_stats_bulk(chat_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量查询多个群组的消息统计
+        :param chat_ids: 群组ID列表
+        :return: chat_id -> {total_count, first_date, last_date, first_id, last_id}
+        """
+        stats = {}
+        try:
+            rows = db.session.query(
+                TgGroupChatHistory.chat_id,
+                db.func.count(TgGroupChatHistory.id).label('total_count'),
+                db.func.min(TgGroupChatHistory.postal_time).label('first_date'),
+                db.func.max(TgGroupChatHistory.postal_time).label('last_date')
+            ).filter(TgGroupChatHistory.chat_id.in_(chat_ids)).group_by(TgGroupChatHistory.chat_id).all()
+
+            for row in rows:
+                stats[row.chat_id] = {
+                    'total_count': row.total_count or 0,
+                    'first_date': row.first_date,
+                    'last_date': row.last_date,
+                    'first_id': None,
+                    'last_id': None,
+                }
+
+            # 一次查询取出所有边界时间点对应的message_id
+            boundaries = {}
+            for chat_id, item in stats.items():
+                for date_key, id_key in (('first_date', 'first_id'), ('last_date', 'last_id')):
+                    if item[date_key]:
+                        boundaries.setdefault((chat_id, item[date_key]), []).append(id_key)
+
+            if boundaries:
+                id_rows = db.session.query(
+                    TgGroupChatHistory.chat_id,
+                    TgGroupChatHistory.postal_time,
+                    TgGroupChatHistory.message_id
+                ).filter(
+                    tuple_(TgGroupChatHistory.chat_id, TgGroupChatHistory.postal_time).in_(list(boundaries.keys()))
+                ).all()
+                for id_row in id_rows:
+                    for id_key in boundaries.get((id_row.chat_id, id_row.postal_time), []):
+                        if stats[id_row.chat_id][id_key] is None:
+                            stats[id_row.chat_id][id_key] = id_row.message_id or ''
+
+        except Exception as e:
+            logger.warning(f"批量查询消息统计失败: {e}")
+
+        return stats
+
+    @staticmethod
+    def _apply_message_stats(status_record: TgGroupStatus, message_stats: Optional[Dict[str, Any]]) -> None:
+        """将批量查询得到的消息统计写入状态记录"""
+        if not message_stats:
+            # 与逐条模式一致：无消息时count为0，时间范围为空
+            status_record.records_now = 0
+            status_record.first_record_date = None
+            status_record.last_record_date = None
+            return
+
+        status_record.records_now = message_stats['total_count']
+        status_record.first_record_date = message_stats['first_date']
+        status_record.last_record_date = message_stats['last_date']
+        if message_stats['first_id'] is not None:
+            status_record.first_record_id = message_stats['first_id']
+        if message_stats['last_id'] is not None:
+            status_record.last_record_id = message_stats['last_id']
+
     @staticmethod
     def _update_message_stats(status_record: TgGroupStatus, chat_id: str) -> None:
         """
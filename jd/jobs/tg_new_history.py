@@ -2,7 +2,10 @@ import asyncio
 import datetime
 from zoneinfo import ZoneInfo
 
+from telethon import errors
+
 from jd import app, db
+from jd.models.tg_group_backfill_range import TgGroupBackfillRange
 from jd.models.tg_group_chat_history import TgGroupChatHistory
 from jd.jobs.tg_base_history_fetcher import BaseTgHistoryFetcher
 from jd.utils.logging_config import get_logger
@@ -125,3 +128,308 @@ class NewJoinedGroupHistoryFetcher(BaseTgHistoryFetcher):
         except Exception as e:
             logger.error(f'处理群组 {group_name} 时发生错误: {e}')
             return False
+
+    async def get_history_bounds(self, chat) -> tuple[int, int]:
+        """
+        获取回溯范围的message_id边界
+
+        Returns:
+            tuple[int, int]: (下界ID（不含），最新消息ID)
+        """
+        latest = await self.tg.client.get_messages(chat, limit=1)
+        top_id = latest[0].id if latest else 0
+
+        end_date = datetime.datetime.now(ZoneInfo('UTC')) - datetime.timedelta(days=self.history_days)
+        older = await self.tg.client.get_messages(chat, limit=1, offset_date=end_date)
+        lower_id = older[0].id if older else 0
+        return lower_id, top_id
+
+    async def fetch_backfill_range(self, chat, chat_id: int, backfill_range: TgGroupBackfillRange,
+                                   write_lock: asyncio.Lock, batch_size: int = 100) -> int:
+        """
+        拉取一个message_id区间，每批写入后推进cursor_id，中断后可从检查点继续
+
+        Args:
+            chat: Telegram聊天实体
+            chat_id: 群组ID
+            backfill_range: 已认领的区间记录
+            write_lock: 多个session共享的写库锁
+            batch_size: 每批拉取数量
+
+        Returns:
+            int: 写入的消息数量
+        """
+        total_saved_count = 0
+        batch_num = 0
+        while backfill_range.cursor_id - 1 > backfill_range.range_start_id:
+            batch_num += 1
+            param = {
+                "limit": batch_size,
+                "last_message_id": 0,
+                "min_id": backfill_range.range_start_id,
+                "max_id": backfill_range.cursor_id,
+            }
+
+            # scan_message 不会yield服务消息（入群、退群、置顶等），
+            # 检查点按Telegram实际返回的最小消息ID推进，只有Telegram未返回任何消息时区间才结束
+            scan_progress = {}
+            batch_messages = []
+            async for data in self.tg.scan_message(chat, scan_progress=scan_progress, **param):
+                batch_messages.append(data)
+
+            async with write_lock:
+                if not scan_progress.get('raw_count'):
+                    backfill_range.cursor_id = backfill_range.range_start_id + 1
+                    db.session.commit()
+                    break
+
+                saved_count = 0
+                if batch_messages:
+                    saved_count = await self.process_message_batch(batch_messages, chat_id, batch_num)
+                    total_saved_count += saved_count
+
+                # 记录检查点：从新到旧推进，下一批只拉取更早的消息
+                backfill_range.cursor_id = scan_progress['min_message_id']
+                backfill_range.fetched_count += len(batch_messages)
+                backfill_range.saved_count += saved_count
+                db.session.commit()
+
+            logger.info(f'群聊历史分段回溯|chat_id={chat_id}|区间=({backfill_range.range_start_id}, '
+                        f'{backfill_range.range_end_id}]|cursor={backfill_range.cursor_id}|本批写入 {saved_count} 条')
+
+        return total_saved_count
+
+
+class GroupHistoryBackfillEngine:
+    """
+    可断点续传的分段历史回溯引擎
+
+    将群组历史按message_id切分为固定大小的区间并持久化到tg_group_backfill_range，
+    共享该群组的多个session各自认领不同区间并行拉取；
+    区间内每批写入后更新cursor_id，重启或FloodWait后从检查点继续。
+    """
+
+    def __init__(self, chat_id: int, group_name: str, session_names: list,
+                 range_size: int = None, max_sessions: int = None):
+        self.chat_id = chat_id
+        self.group_name = group_name
+        self.session_names = [name for name in session_names if name] or ['']
+        self.range_size = range_size or app.config.get('TG_BACKFILL_RANGE_SIZE', 5000)
+        self.max_sessions = max_sessions or app.config.get('TG_BACKFILL_MAX_SESSIONS', 3)
+        self.max_attempts = app.config.get('TG_BACKFILL_MAX_ATTEMPTS', 3)
+        # running状态超过该时间未更新视为worker已退出，可被重新认领
+        self.stale_minutes = app.config.get('TG_BACKFILL_STALE_MINUTES', 30)
+        self.max_flood_wait = app.config.get('TG_BACKFILL_MAX_FLOOD_WAIT', 300)
+        self._write_lock = asyncio.Lock()
+        self.used_sessions = []
+        self.stats = {
+            'planned_ranges': 0,
+            'completed_ranges': 0,
+            'failed_ranges': 0,
+            'saved_count': 0,
+        }
+
+    @staticmethod
+    def split_ranges(lower_id: int, top_id: int, covered_low: int = None, covered_high: int = None,
+                     range_size: int = 5000) -> list:
+        """
+        将 (lower_id, top_id] 中未被 (covered_low, covered_high] 覆盖的部分切分为区间
+
+        Returns:
+            list: [(range_start_id, range_end_id), ...]，从新到旧排列
+        """
+        spans = []
+        if covered_low is None:
+            spans.append((lower_id, top_id))
+        else:
+            if top_id > covered_high:
+                spans.append((covered_high, top_id))
+            if lower_id < covered_low:
+                spans.append((lower_id, covered_low))
+
+        ranges = []
+        for span_low, span_high in spans:
+            end_id = span_high
+            while end_id > span_low:
+                start_id = max(span_low, end_id - range_size)
+                ranges.append((start_id, end_id))
+                end_id = start_id
+        return ranges
+
+    def plan_ranges(self, lower_id: int, top_id: int) -> int:
+        """
+        按区间大小切分 (lower_id, top_id]，只补充尚未覆盖的部分，已有区间保持不变
+
+        Returns:
+            int: 新增的区间数量
+        """
+        chat_id_str = str(self.chat_id)
+        existing = db.session.query(
+            db.func.min(TgGroupBackfillRange.range_start_id),
+            db.func.max(TgGroupBackfillRange.range_end_id)
+        ).filter(TgGroupBackfillRange.chat_id == chat_id_str).first()
+        covered_low, covered_high = existing if existing and existing[0] is not None else (None, None)
+
+        new_ranges = [
+            TgGroupBackfillRange(
+                chat_id=chat_id_str,
+                range_start_id=start_id,
+                range_end_id=end_id,
+                cursor_id=end_id + 1,
+                status=TgGroupBackfillRange.Status.PENDING
+            )
+            for start_id, end_id in self.split_ranges(lower_id, top_id, covered_low, covered_high, self.range_size)
+        ]
+
+        if new_ranges:
+            db.session.add_all(new_ranges)
+            db.session.commit()
+
+        self.stats['planned_ranges'] = TgGroupBackfillRange.query.filter_by(chat_id=chat_id_str).count()
+        logger.info(f'群聊历史分段回溯|{self.group_name}|范围=({lower_id}, {top_id}]|新增区间 {len(new_ranges)} 个|'
+                    f'总区间 {self.stats["planned_ranges"]} 个')
+        return len(new_ranges)
+
+    def claim_next_range(self, session_name: str):
+        """
+        认领下一个待处理区间（从新到旧），使用条件更新保证多个worker不会认领同一区间
+
+        Returns:
+            TgGroupBackfillRange | None
+        """
+        stale_before = datetime.datetime.now() - datetime.timedelta(minutes=self.stale_minutes)
+        Status = TgGroupBackfillRange.Status
+        candidates = TgGroupBackfillRange.query.filter(
+            TgGroupBackfillRange.chat_id == str(self.chat_id),
+            db.or_(
+                TgGroupBackfillRange.status == Status.PENDING,
+                db.and_(TgGroupBackfillRange.status == Status.FAILED,
+                        TgGroupBackfillRange.attempts < self.max_attempts),
+                db.and_(TgGroupBackfillRange.status == Status.RUNNING,
+                        TgGroupBackfillRange.updated_at < stale_before)
+            )
+        ).order_by(TgGroupBackfillRange.range_end_id.desc()).limit(10).all()
+
+        for candidate in candidates:
+            claimed = TgGroupBackfillRange.query.filter(
+                TgGroupBackfillRange.id == candidate.id,
+                TgGroupBackfillRange.status == candidate.status,
+                TgGroupBackfillRange.updated_at == candidate.updated_at
+            ).update({
+                TgGroupBackfillRange.status: Status.RUNNING,
+                TgGroupBackfillRange.session_name: session_name,
+                TgGroupBackfillRange.updated_at: datetime.datetime.now()
+            }, synchronize_session=False)
+            db.session.commit()
+            if claimed:
+                db.session.refresh(candidate)
+                return candidate
+
+        return None
+
+    async def _run_worker(self, fetcher: NewJoinedGroupHistoryFetcher, session_name: str, chat, chat_id: int,
+                          max_ranges: int = None) -> None:
+        """单个session的工作循环：不断认领区间并拉取，直到没有可认领区间"""
+        processed = 0
+        while max_ranges is None or processed < max_ranges:
+            async with self._write_lock:
+                backfill_range = self.claim_next_range(session_name)
+            if not backfill_range:
+                break
+            processed += 1
+
+            try:
+                saved_count = await fetcher.fetch_backfill_range(chat, chat_id, backfill_range, self._write_lock)
+                async with self._write_lock:
+                    backfill_range.status = TgGroupBackfillRange.Status.DONE
+                    backfill_range.error_message = ''
+                    db.session.commit()
+                self.stats['completed_ranges'] += 1
+                self.stats['saved_count'] += saved_count
+
+            except errors.FloodWaitError as e:
+                # 释放区间，保留cursor_id，由其他session或下次运行继续
+                async with self._write_lock:
+                    backfill_range.status = TgGroupBackfillRange.Status.PENDING
+                    backfill_range.error_message = f'FloodWait {e.seconds}s'
+                    db.session.commit()
+                if e.seconds > self.max_flood_wait:
+                    logger.warning(f'群聊历史分段回溯|{self.group_name}|{session_name}|FloodWait {e.seconds}秒，退出该session')
+                    break
+                logger.warning(f'群聊历史分段回溯|{self.group_name}|{session_name}|FloodWait {e.seconds}秒，等待后继续')
+                await asyncio.sleep(e.seconds)
+
+            except Exception as e:
+                logger.error(f'群聊历史分段回溯|{self.group_name}|{session_name}|区间 '
+                             f'({backfill_range.range_start_id}, {backfill_range.range_end_id}] 失败: {e}')
+                async with self._write_lock:
+                    if db.session.in_transaction():
+                        db.session.rollback()
+                    backfill_range.status = TgGroupBackfillRange.Status.FAILED
+                    backfill_range.attempts += 1
+                    backfill_range.error_message = str(e)[:512]
+                    db.session.commit()
+                self.stats['failed_ranges'] += 1
+
+    async def run(self, max_ranges_per_session: int = None) -> dict:
+        """
+        执行分段回溯
+
+        Args:
+            max_ranges_per_session: 每个session本次最多处理的区间数，None表示处理到全部完成
+
+        Returns:
+            dict: 包含success、剩余区间数等统计信息
+        """
+        fetchers = []
+        try:
+            for session_name in self.session_names[:self.max_sessions]:
+                fetcher = NewJoinedGroupHistoryFetcher()
+                if await fetcher.init_telegram_service([session_name] if session_name else []):
+                    fetchers.append((session_name, fetcher))
+                else:
+                    await fetcher.close_telegram_service()
+
+            if not fetchers:
+                logger.error(f'群聊历史分段回溯|{self.group_name}|所有session初始化失败: {self.session_names}')
+                return dict(self.stats, success=False, used_sessions=[])
+
+            # 使用第一个session获取dialog并规划区间
+            planner_session, planner = fetchers[0]
+            chat, chat_id = await planner.get_dialog_with_retry(self.chat_id, self.group_name)
+            if not chat:
+                return dict(self.stats, success=False, used_sessions=[planner_session])
+            self.chat_id = chat_id
+            lower_id, top_id = await planner.get_history_bounds(chat)
+            self.plan_ranges(lower_id, top_id)
+
+            workers = []
+            for session_name, fetcher in fetchers:
+                worker_chat = chat if fetcher is planner else await fetcher.tg.get_dialog(chat_id)
+                if not worker_chat:
+                    logger.warning(f'群聊历史分段回溯|{self.group_name}|{session_name} 无法获取dialog，跳过')
+                    continue
+                self.used_sessions.append(session_name)
+                workers.append(self._run_worker(fetcher, session_name, worker_chat, chat_id, max_ranges_per_session))
+
+            logger.info(f'群聊历史分段回溯|{self.group_name}|并行session: {self.used_sessions}')
+            await asyncio.gather(*workers)
+
+            planner.update_group_status(chat_id)
+
+            Status = TgGroupBackfillRange.Status
+            remaining = TgGroupBackfillRange.query.filter(
+                TgGroupBackfillRange.chat_id == str(chat_id),
+                TgGroupBackfillRange.status != Status.DONE
+            ).count()
+            logger.info(f'群聊历史分段回溯|{self.group_name}|完成区间 {self.stats["completed_ranges"]} 个|'
+                        f'失败 {self.stats["failed_ranges"]} 个|剩余 {remaining} 个|写入 {self.stats["saved_count"]} 条')
+            return dict(self.stats, success=self.stats['failed_ranges'] == 0,
+                        remaining_ranges=remaining, used_sessions=self.used_sessions)
+
+        finally:
+            for _, fetcher in fetchers:
+                try:
+                    await fetcher.close_telegram_service()
+                except Exception as e:
+                    logger.error(f'群聊历史分段回溯|关闭Telegram服务失败: {e}')
@@ -10,6 +10,8 @@ import datetime
 from typing import Dict, Any
 from zoneinfo import ZoneInfo
 
+from telethon import errors
+
 from jCelery import celery
 from jd import app, db
 from jd.utils.logging_config import get_logger
@@ -17,6 +19,8 @@ from jd.models.tg_account import TgAccount
 from jd.models.tg_person_chat_history import TgPersonChatHistory
 from jd.jobs.tg_base_history_fetcher import BaseTgHistoryFetcher
 from jd.jobs.tg_user_info import TgUserInfoProcessor
+from jd.services.cache_service import CacheService
+from jd.services.spider.tg_rate_governor import TgRateGovernor
 from jd.tasks.base_task import AsyncBaseTask
 
 logger = get_logger('jd.jobs.tg.person_dialog', {
@@ -25,6 +29,11 @@ logger = get_logger('jd.jobs.tg.person_dialog', {
 })
 
 
+# 上次同步时各对话最新消息ID的缓存键与有效期
+TOP_MESSAGE_CACHE_KEY = 'tg:person_dialog:top_message:{account_id}'
+TOP_MESSAGE_CACHE_TTL = 30 * 24 * 3600
+
+
 class PersonChatHistoryFetcher(BaseTgHistoryFetcher):
     """私人聊天记录获取器，继承自BaseTgHistoryFetcher"""
 
@@ -34,6 +43,12 @@ class PersonChatHistoryFetcher(BaseTgHistoryFetcher):
         self.account = None
         self.owner_user_id = None
         self.user_info_processor = None  # 用户信息处理器
+        # 同一账户内并发对话数及共享速率调控器
+        self.concurrency = max(1, int(app.config.get('TG_PERSON_DIALOG_CONCURRENCY', 4)))
+        self.rate_governor = TgRateGovernor(app.config.get('TG_PERSON_DIALOG_MIN_INTERVAL', 0.3))
+        # 并发对话共享同一个db.session，写库阶段需串行
+        self._write_lock = asyncio.Lock()
+        self.skipped_dialog_count = 0
 
     def _load_account_info(self):
         """加载账户信息"""
@@ -65,6 +80,7 @@ class PersonChatHistoryFetcher(BaseTgHistoryFetcher):
                         'chat_id': chat_id,
                         'title': username or str(chat_id),  # 使用username作为title，或使用ID
                         'username': username,
+                        'top_message_id': dialog_data.get('top_message_id', 0),
                     })
                     logger.info(f'✓ 找到私人对话|chat_id={chat_id}|username={username}')
 
@@ -75,7 +91,8 @@ class PersonChatHistoryFetcher(BaseTgHistoryFetcher):
             logger.error(f'获取私人对话列表失败: {e}')
             raise
 
-    async def process_message_batch(self, batch_messages, chat_id: int, batch_num: int, peer_user_id: str) -> int:
+    async def process_message_batch(self, batch_messages, chat_id: int, batch_num: int, peer_user_id: str,
+                                    raise_on_error: bool = False) -> int:
         """
         重写批量处理消息方法，保存到tg_person_chat_history表
 
@@ -84,6 +101,7 @@ class PersonChatHistoryFetcher(BaseTgHistoryFetcher):
             chat_id: 聊天ID
             batch_num: 批次号
             peer_user_id: 对方用户ID
+            raise_on_error: 为True时写库失败回滚后重新抛出异常，由调用方决定是否记录同步进度
 
         Returns:
             保存的消息数量
@@ -154,6 +172,7 @@ class PersonChatHistoryFetcher(BaseTgHistoryFetcher):
                     message=self._safe_str(data.get("message", "")),
                     reply_to_msg_id=str(data.get("reply_to_msg_id", 0)),
                     photo_path=data.get("photo", {}).get('file_path', ''),
+                    photo_thumb_path=data.get("photo", {}).get('thumb_path', ''),
                     document_path=data.get("document", {}).get('file_path', ''),
                     document_ext=data.get("document", {}).get('ext', ''),
                     replies_info=self._safe_str(data.get('replies_info', ''))
@@ -172,6 +191,8 @@ class PersonChatHistoryFetcher(BaseTgHistoryFetcher):
             if db.session.in_transaction():
                 db.session.rollback()
             logger.error(f'第 {batch_num} 批次|保存私聊消息失败: {e}')
+            if raise_on_error:
+                raise
             return 0
 
     async def fetch_private_chat_history(self, chat_id: int, peer_user_id: str, limit: int = 100):
@@ -183,10 +204,19 @@ class PersonChatHistoryFetcher(BaseTgHistoryFetcher):
             peer_user_id: 对方用户ID
             limit: 每批次获取数量
         """
+        try:
+            return await self._fetch_private_chat_history(chat_id, peer_user_id, limit)
+        except Exception as e:
+            logger.error(f'获取私聊历史失败|chat_id={chat_id}: {e}')
+            return 0
+
+    async def _fetch_private_chat_history(self, chat_id: int, peer_user_id: str, limit: int = 100) -> int:
+        """获取单个私聊的历史记录，异常向上抛出，由调用方决定是否记录同步进度"""
         logger.info(f'开始获取私聊历史|chat_id={chat_id}|peer={peer_user_id}')
 
         try:
             # 获取dialog
+            await self.rate_governor.acquire()
             chat = await self.tg.get_dialog(chat_id)
             if not chat:
                 logger.warning(f'无法获取私聊dialog|chat_id={chat_id}')
@@ -209,32 +239,57 @@ class PersonChatHistoryFetcher(BaseTgHistoryFetcher):
                 # 每批次处理
                 if len(batch_messages) >= limit:
                     batch_num += 1
-                    saved_count = await self.process_message_batch(
-                        batch_messages, chat_id, batch_num, peer_user_id
-                    )
+                    async with self._write_lock:
+                        saved_count = await self.process_message_batch(
+                            batch_messages, chat_id, batch_num, peer_user_id, raise_on_error=True
+                        )
                     total_saved_count += saved_count
                     batch_messages = []
 
-                    # 添加小延迟
-                    await asyncio.sleep(0.5)
+                    # 由共享调控器控制请求节奏，替代固定延迟
+                    await self.rate_governor.acquire()
 
             # 处理剩余消息
             if batch_messages:
                 batch_num += 1
-                saved_count = await self.process_message_batch(
-                    batch_messages, chat_id, batch_num, peer_user_id
-                )
+                async with self._write_lock:
+                    saved_count = await self.process_message_batch(
+                        batch_messages, chat_id, batch_num, peer_user_id, raise_on_error=True
+                    )
                 total_saved_count += saved_count
 
             logger.info(f'私聊历史获取完成|chat_id={chat_id}|保存={total_saved_count}条')
             return total_saved_count
 
-        except Exception as e:
-            logger.error(f'获取私聊历史失败|chat_id={chat_id}: {e}')
-            return 0
+        except errors.FloodWaitError as e:
+            # 限流时暂停整个账户的请求，而不仅是当前对话
+            logger.warning(f'私聊历史获取触发限流|chat_id={chat_id}|等待{e.seconds}秒')
+            self.rate_governor.pause(e.seconds)
+            raise
+
+    def _load_synced_top_messages(self) -> Dict[str, int]:
+        """读取上次同步时各对话的最新消息ID"""
+        cached = CacheService.get(TOP_MESSAGE_CACHE_KEY.format(account_id=self.account_id))
+        return cached if isinstance(cached, dict) else {}
+
+    def _save_synced_top_messages(self, synced: Dict[str, int]) -> None:
+        """保存本次同步后各对话的最新消息ID"""
+        CacheService.set(
+            TOP_MESSAGE_CACHE_KEY.format(account_id=self.account_id),
+            synced,
+            ttl=TOP_MESSAGE_CACHE_TTL
+        )
+
+    async def process_all_private_chats(self, force: bool = False):
+        """
+        处理所有私人对话
 
-    async def process_all_private_chats(self):
-        """处理所有私人对话"""
+        多个对话并发获取，并发数由 TG_PERSON_DIALOG_CONCURRENCY 控制；
+        最新消息ID与上次同步时相同的对话直接跳过。
+
+        Args:
+            force: 为True时忽略上次同步进度，处理全部对话
+        """
         try:
             # 1. 加载账户信息
             self._load_account_info()
@@ -258,17 +313,42 @@ class PersonChatHistoryFetcher(BaseTgHistoryFetcher):
             # 保存对话数量供外部使用
             self.dialog_count = len(dialog_list)
 
-            # 4. 逐个处理私聊
-            total_count = 0
+            # 4. 过滤自上次同步以来没有新消息的对话
+            synced = {} if force else self._load_synced_top_messages()
+            pending_dialogs = []
             for dialog in dialog_list:
+                top_message_id = dialog.get('top_message_id', 0)
+                if top_message_id and synced.get(str(dialog['chat_id'])) == top_message_id:
+                    continue
+                pending_dialogs.append(dialog)
+            self.skipped_dialog_count = len(dialog_list) - len(pending_dialogs)
+            logger.info(f'待处理私聊 {len(pending_dialogs)} 个|跳过未变化 {self.skipped_dialog_count} 个|并发={self.concurrency}')
+
+            # 5. 并发处理私聊
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def process_dialog(dialog):
                 chat_id = dialog['chat_id']
                 # 对于私聊，peer_user_id就是chat_id
                 peer_user_id = str(chat_id)
-
-                saved_count = await self.fetch_private_chat_history(chat_id, peer_user_id)
-                total_count += saved_count
-
-            logger.info(f'所有私聊处理完成|总保存={total_count}条')
+                async with semaphore:
+                    try:
+                        saved_count = await self._fetch_private_chat_history(chat_id, peer_user_id)
+                    except Exception as e:
+                        logger.error(f'获取私聊历史失败|chat_id={chat_id}: {e}')
+                        return 0
+                # 仅在成功获取后记录进度，失败的对话下次重试
+                if dialog.get('top_message_id'):
+                    synced[str(chat_id)] = dialog['top_message_id']
+                return saved_count
+
+            results = await asyncio.gather(*(process_dialog(dialog) for dialog in pending_dialogs))
+            total_count = sum(results)
+
+            if pending_dialogs:
+                self._save_synced_top_messages(synced)
+
+            logger.info(f'所有私聊处理完成|总保存={total_count}条|速率调控={self.rate_governor.get_stats()}')
             return True, total_count
 
         except Exception as e:
@@ -358,6 +438,7 @@ class FetchPersonChatHistoryTask(AsyncBaseTask):
 
             # 获取对话数量（从 fetcher 中）
             dialog_count = getattr(fetcher, 'dialog_count', 0) if hasattr(fetcher, 'dialog_count') else 0
+            skipped_dialog_count = fetcher.skipped_dialog_count
 
             if success:
                 logger.info(f'私人聊天历史获取任务完成|账户ID={self.account_id}|保存={count}条')
@@ -370,6 +451,7 @@ class FetchPersonChatHistoryTask(AsyncBaseTask):
                         'account_id': self.account_id,
                         'message_count': count,
                         'dialog_count': dialog_count,
+                        'skipped_dialog_count': skipped_dialog_count,
                         'start_time': start_time.isoformat(),
                         'end_time': end_time.isoformat(),
                         'duration_seconds': (end_time - start_time).total_seconds(),
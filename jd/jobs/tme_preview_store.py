@@ -0,0 +1,388 @@
+"""
+t.me 账户预览存储与刷新队列
+
+账户被提及时只读 tme_preview 表（record_sightings + lookup），不发起 HTTP 请求；
+从未抓取过的账户先返回 pending 结果，由后台刷新任务（refresh_due）抓取。
+
+刷新队列即 next_refresh_at 列，每次抓取后按以下策略安排下次刷新：
+
+- 提及频率：上次抓取以来的提及次数 / 经过天数，提及越频繁间隔越短；
+  抓取后再未被提及的条目间隔放大
+- 变化频率：change_count / (fetch_count - 1)，名称、简介、类型、头像或
+  成员数（相对变化超过 5%）经常变化的条目间隔更短
+- 抓取失败：按连续失败次数指数退避，保留上次成功的预览
+- 间隔限制在 [min_interval, max_interval] 内；提及次数在两次抓取之间
+  突增到 hot_sightings 时，record_sightings 会把到期时间提前
+
+预览变化（或首次抓取成功）时同步更新 ad_tracking 中对应 telegram_account 记录的 extra_info。
+"""
+
+import json
+import math
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.mysql import insert
+
+from jd import db
+from jd.jobs.ad_tracking_writer import content_hash
+from jd.models.ad_tracking import AdTracking
+from jd.models.tme_preview import TmePreview
+from jd.utils.logging_config import get_logger
+
+logger = get_logger(__name__, {
+    'component': 'ad_tracking',
+    'module': 'tme_preview_store'
+})
+
+# 参与变化检测的预览字段（成员数单独按相对变化判断）
+PREVIEW_FIELDS = ('name', 'desc', 'type', 'avatar')
+
+
+def tme_url(username: str) -> str:
+    return f'https://t.me/{username}'
+
+
+def preview_changed(old: Optional[Dict], new: Dict, members_tolerance: float = 0.05) -> bool:
+    """
+    判断两次抓取的预览是否有实质变化
+
+    Args:
+        old: 上次预览（None 表示首次抓取）
+        new: 本次预览
+        members_tolerance: 成员数相对变化阈值
+
+    Returns:
+        是否变化
+    """
+    if old is None:
+        return True
+    if any(old.get(field) != new.get(field) for field in PREVIEW_FIELDS):
+        return True
+
+    old_members, new_members = old.get('members'), new.get('members')
+    if old_members is None or new_members is None:
+        return old_members != new_members
+    return abs(new_members - old_members) > max(old_members, 1) * members_tolerance
+
+
+def account_extra_info(analysis: Dict) -> Dict[str, Any]:
+    """
+    由账户分析结果生成 ad_tracking.extra_info
+
+    Args:
+        analysis: analyze_telegram_account() 结构的结果，可带 pending 标记
+
+    Returns:
+        extra_info 字典
+    """
+    if analysis.get('pending'):
+        return {
+            'tme_url': analysis.get('tme_url'),
+            'username': analysis.get('username'),
+            'pending': True
+        }
+    if analysis.get('error'):
+        return {
+            'account_type': 'user',
+            'tme_url': analysis.get('tme_url'),
+            'error': analysis.get('error')
+        }
+
+    preview = analysis.get('preview') or {}
+    return {
+        'account_type': preview.get('type', 'user'),  # channel/group/user
+        'tme_url': analysis.get('tme_url'),
+        'name': preview.get('name'),
+        'username': analysis.get('username'),
+        'avatar': preview.get('avatar'),
+        'desc': preview.get('desc'),
+        'members': preview.get('members')
+    }
+
+
+class TmePreviewStore:
+    """t.me 预览存储：提及时读、后台按到期时间刷新"""
+
+    def __init__(self, base_interval: int = 86400, min_interval: int = 3600,
+                 max_interval: int = 7 * 86400, error_interval: int = 6 * 3600,
+                 hot_sightings: int = 50, query_chunk_size: int = 1000):
+        """
+        Args:
+            base_interval: 基准刷新间隔（秒）
+            min_interval: 最短刷新间隔（秒）
+            max_interval: 最长刷新间隔（秒）
+            error_interval: 首次抓取失败后的重试间隔（秒），连续失败时翻倍
+            hot_sightings: 两次抓取之间提及达到该次数时提前刷新
+            query_chunk_size: IN 查询与批量写入的分块大小
+        """
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.error_interval = error_interval
+        self.hot_sightings = hot_sightings
+        self.query_chunk_size = query_chunk_size
+
+    # ============================================
+    # 刷新策略
+    # ============================================
+
+    def refresh_interval(self, sightings_per_day: float, change_ratio: float) -> timedelta:
+        """
+        计算成功抓取后的刷新间隔
+
+        Args:
+            sightings_per_day: 上次抓取以来的日均提及次数
+            change_ratio: 历次抓取中预览发生变化的比例（0~1）
+
+        Returns:
+            刷新间隔
+        """
+        seconds = self.base_interval / (1 + math.log2(1 + sightings_per_day))
+        # 从不变化的条目放大到 1.75 倍，每次都变化的缩短到 0.25 倍
+        seconds *= 0.25 + 1.5 * (1 - change_ratio)
+        if sightings_per_day == 0:
+            seconds *= 4
+        return timedelta(seconds=min(max(seconds, self.min_interval), self.max_interval))
+
+    def retry_interval(self, error_streak: int) -> timedelta:
+        """连续失败 error_streak 次后的重试间隔"""
+        seconds = self.error_interval * 2 ** min(max(error_streak - 1, 0), 16)
+        return timedelta(seconds=min(seconds, self.max_interval))
+
+    @staticmethod
+    def change_ratio(fetch_count: int, change_count: int) -> float:
+        """历次抓取的变化比例，抓取不足两次时按 0.5 计"""
+        if fetch_count < 2:
+            return 0.5
+        return min(change_count / (fetch_count - 1), 1.0)
+
+    # ============================================
+    # 提及（只读数据库，不发起请求）
+    # ============================================
+
+    def record_sightings(self, counts: Dict[str, int], seen_at: datetime = None):
+        """
+        累加账户提及次数（一条 INSERT ... ON DUPLICATE KEY UPDATE），新账户立即进入刷新队列
+
+        Args:
+            counts: {小写用户名: 本批提及次数}
+            seen_at: 提及时间，默认当前时间
+        """
+        counts = {username: count for username, count in counts.items() if username and len(username) <= 64}
+        if not counts:
+            return
+
+        seen_at = seen_at or datetime.now()
+        table = TmePreview.__table__
+        items = list(counts.items())
+        try:
+            for start in range(0, len(items), self.query_chunk_size):
+                stmt = insert(table).values([
+                    {
+                        'username': username,
+                        'sighting_count': count,
+                        'recent_sightings': count,
+                        'last_seen_at': seen_at,
+                        'next_refresh_at': seen_at
+                    }
+                    for username, count in items[start:start + self.query_chunk_size]
+                ])
+                new = stmt.inserted
+                # MySQL 按顺序求值赋值，next_refresh_at 必须在 recent_sightings 之前，读到的才是旧值
+                stmt = stmt.on_duplicate_key_update([
+                    ('next_refresh_at', func.IF(
+                        table.c.recent_sightings + new.recent_sightings >= self.hot_sightings,
+                        func.LEAST(table.c.next_refresh_at, func.COALESCE(
+                            func.TIMESTAMPADD(text('SECOND'), self.min_interval, table.c.fetched_at),
+                            table.c.next_refresh_at
+                        )),
+                        table.c.next_refresh_at
+                    )),
+                    ('sighting_count', table.c.sighting_count + new.sighting_count),
+                    ('recent_sightings', table.c.recent_sightings + new.recent_sightings),
+                    ('last_seen_at', func.greatest(func.COALESCE(table.c.last_seen_at, new.last_seen_at),
+                                                   new.last_seen_at)),
+                ])
+                db.session.execute(stmt)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.error("t.me 账户提及记录失败", extra={
+                'extra_fields': {'account_count': len(counts)}
+            }, exc_info=True)
+            raise
+
+    def lookup(self, usernames: Iterable[str]) -> Dict[str, Dict]:
+        """
+        读取已存储的预览，返回 analyze_telegram_account() 结构的结果
+
+        已有成功预览的条目即使最近一次刷新失败也返回上次的预览；
+        从未抓取过的条目返回 pending=True
+
+        Args:
+            usernames: 小写用户名
+
+        Returns:
+            {小写用户名: 分析结果}
+        """
+        usernames = list(dict.fromkeys(usernames))
+        rows = {}
+        for start in range(0, len(usernames), self.query_chunk_size):
+            chunk = usernames[start:start + self.query_chunk_size]
+            for username, preview, error in db.session.query(
+                TmePreview.username, TmePreview.preview, TmePreview.error
+            ).filter(TmePreview.username.in_(chunk)):
+                rows[username.lower()] = (preview, error)
+
+        analyses = {}
+        for username in usernames:
+            preview, error = rows.get(username, (None, ''))
+            analysis = {
+                'account': f'@{username}',
+                'username': username,
+                'tme_url': tme_url(username),
+                'preview': preview or {},
+                'error': None
+            }
+            if preview is None:
+                if error:
+                    analysis['error'] = error
+                else:
+                    analysis['pending'] = True
+            analyses[username] = analysis
+        return analyses
+
+    def sight(self, accounts: List[str]) -> Dict[str, Dict]:
+        """
+        记录一批账户提及并读取其预览
+
+        Args:
+            accounts: 账户列表（@username 或 username，可重复）
+
+        Returns:
+            {原始账户: 分析结果}
+        """
+        counts = Counter(account.lstrip('@').lower() for account in accounts if account)
+        self.record_sightings(counts)
+        analyses = self.lookup(counts)
+        return {account: analyses[account.lstrip('@').lower()] for account in accounts if account}
+
+    # ============================================
+    # 刷新队列
+    # ============================================
+
+    def due(self, limit: int, now: datetime = None) -> List[str]:
+        """按到期先后返回需要刷新的用户名"""
+        now = now or datetime.now()
+        rows = db.session.query(TmePreview.username).filter(
+            TmePreview.next_refresh_at <= now
+        ).order_by(TmePreview.next_refresh_at).limit(limit).all()
+        return [row[0] for row in rows]
+
+    def refresh_due(self, spider, limit: int = 500) -> Dict[str, int]:
+        """
+        抓取一批到期条目并保存结果（HTTP 请求只花在到期条目上）
+
+        Args:
+            spider: TmeSpider 实例（使用 analyze_telegram_accounts_batch 并发抓取）
+            limit: 本次最多抓取的条目数
+
+        Returns:
+            {'due': int, 'fetched': int, 'changed': int, 'failed': int}
+        """
+        usernames = self.due(limit)
+        if not usernames:
+            return {'due': 0, 'fetched': 0, 'changed': 0, 'failed': 0}
+
+        results = spider.analyze_telegram_accounts_batch([f'@{username}' for username in usernames])
+        analyses = {
+            username: results[f'@{username}'] for username in usernames if f'@{username}' in results
+        }
+        stats = self.save_results(analyses)
+        stats['due'] = len(usernames)
+        return stats
+
+    def save_results(self, analyses: Dict[str, Dict], fetched_at: datetime = None) -> Dict[str, int]:
+        """
+        保存抓取结果并安排下次刷新，预览变化时同步更新追踪记录
+
+        Args:
+            analyses: {用户名: analyze_telegram_account() 结构的结果}
+            fetched_at: 抓取时间，默认当前时间
+
+        Returns:
+            {'fetched': int, 'changed': int, 'failed': int}
+        """
+        now = fetched_at or datetime.now()
+        stats = {'fetched': 0, 'changed': 0, 'failed': 0}
+        if not analyses:
+            return stats
+
+        try:
+            rows = {
+                row.username.lower(): row
+                for row in TmePreview.query.filter(TmePreview.username.in_(list(analyses))).all()
+            }
+            for username, analysis in analyses.items():
+                row = rows.get(username.lower())
+                if row is None:
+                    continue
+
+                error = analysis.get('error')
+                if error:
+                    row.error = str(error)[:512]
+                    row.error_streak += 1
+                    row.next_refresh_at = now + self.retry_interval(row.error_streak)
+                    stats['failed'] += 1
+                    continue
+
+                preview = analysis.get('preview') or {}
+                changed = preview_changed(row.preview, preview)
+                elapsed_days = max((now - (row.fetched_at or row.created_at or now)).total_seconds() / 86400,
+                                   1 / 24)
+                if changed and row.preview is not None:
+                    row.change_count += 1
+                row.fetch_count += 1
+                interval = self.refresh_interval(row.recent_sightings / elapsed_days,
+                                                 self.change_ratio(row.fetch_count, row.change_count))
+
+                # 只减去本次计算用到的提及数，保留抓取期间新增的提及
+                row.recent_sightings = TmePreview.recent_sightings - row.recent_sightings
+                row.preview = preview
+                row.error = ''
+                row.error_streak = 0
+                row.fetched_at = now
+                row.next_refresh_at = now + interval
+                stats['fetched'] += 1
+
+                if changed:
+                    self._update_tracking(username, analysis)
+                    stats['changed'] += 1
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.error("t.me 预览保存失败", extra={
+                'extra_fields': {'account_count': len(analyses)}
+            }, exc_info=True)
+            raise
+
+        logger.info("t.me 预览刷新完成", extra={'extra_fields': stats})
+        return stats
+
+    @staticmethod
+    def _update_tracking(username: str, analysis: Dict):
+        """把新预览合并到该账户的 telegram_account 追踪记录（清除 pending / error 标记）"""
+        patch = dict(account_extra_info(analysis), pending=None, error=None)
+        db.session.query(AdTracking).filter(
+            AdTracking.content_hash == content_hash(username.lower()),
+            AdTracking.content_type == 'telegram_account'
+        ).update({
+            AdTracking.extra_info: func.JSON_MERGE_PATCH(
+                func.COALESCE(AdTracking.extra_info, func.JSON_OBJECT()),
+                json.dumps(patch, ensure_ascii=False)
+            )
+        }, synchronize_session=False)
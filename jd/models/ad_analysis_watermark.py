@@ -0,0 +1,25 @@
+from jd import db
+from jd.models.base import BaseModel
+
+
+class AdAnalysisWatermark(BaseModel):
+    """
+    群组分析提取水位线
+
+    按 (群组, 提取器) 记录已处理到的最大消息ID和产生这些结果的词典版本；
+    常规运行只处理水位线之后的新消息，词典版本变化时删除该群组的旧结果并全量重新提取
+    """
+    __tablename__ = 'ad_analysis_watermark'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    chat_id = db.Column(db.String(128), nullable=False, comment='群组ID')
+    extractor = db.Column(db.String(32), nullable=False, comment='提取器（price/transaction/geo/dark_keyword）')
+    last_message_id = db.Column(db.BigInteger, nullable=False, default=0,
+                                comment='已处理的最大消息ID（tg_group_chat_history.id）')
+    dictionary_version = db.Column(db.String(64), nullable=False, default='', comment='提取时使用的词典版本')
+    created_at = db.Column(db.DateTime, default=db.func.now(), comment='创建时间')
+    updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now(), comment='更新时间')
+
+    __table_args__ = (
+        db.UniqueConstraint('chat_id', 'extractor', name='uk_chat_extractor'),
+    )
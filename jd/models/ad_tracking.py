@@ -15,6 +15,8 @@ class AdTracking(BaseModel):
         comment='内容类型'
     )
     normalized_content = db.Column(db.Text, nullable=False, comment='标准化后的内容')
+    content_hash = db.Column(db.CHAR(40), db.Computed('SHA1(LOWER(normalized_content))', persisted=True),
+                             comment='标准化内容转小写后的SHA1（生成列，用于唯一键）')
     extra_info = db.Column(JSON, nullable=True, comment='额外信息（JSON格式，如网站类型、钓鱼检测结果、@账户类型等）')
     merchant_name = db.Column(db.String(255), nullable=True, comment='商家名称')
     source_type = db.Column(
@@ -41,6 +43,7 @@ class AdTracking(BaseModel):
         db.Index('idx_merchant_name', 'merchant_name', mysql_length=100),
         db.Index('idx_first_seen', 'first_seen'),
         db.Index('idx_last_seen', 'last_seen'),
+        db.UniqueConstraint('content_hash', 'source_type', 'source_id', name='uk_content_source'),
     )
 
     def to_dict(self):
@@ -86,6 +86,7 @@ class AdTrackingBatchProcessLog(BaseModel):
         base_dict['duration_seconds'] = self.get_duration_seconds()
         base_dict['error_count'] = self.fail_count
         base_dict['success_rate'] = self.get_success_rate()
+        base_dict['throughput'] = self.get_throughput()
         return base_dict
 
     def start_processing(self):
@@ -95,13 +96,14 @@ class AdTrackingBatchProcessLog(BaseModel):
         self.progress = 0
         db.session.commit()
 
-    def update_progress(self, success_count, fail_count, total_count=None):
+    def update_progress(self, success_count, fail_count, total_count=None, commit=True):
         """更新处理进度
 
         Args:
             success_count: 成功处理数
             fail_count: 失败处理数
             total_count: 总数（可选，如果不提供则使用self.total_messages）
+            commit: 是否立即提交；为 False 时只修改会话中的对象，由调用方随其他写入一并提交
         """
         self.success_count = success_count
         self.fail_count = fail_count
@@ -111,7 +113,8 @@ class AdTrackingBatchProcessLog(BaseModel):
         if self.total_messages > 0:
             self.progress = int((success_count + fail_count) / self.total_messages * 100)
 
-        db.session.commit()
+        if commit:
+            db.session.commit()
 
     def mark_as_completed(self):
         """标记批次处理完成"""
@@ -143,6 +146,15 @@ class AdTrackingBatchProcessLog(BaseModel):
             return int(delta.total_seconds())
         return None
 
+    def get_throughput(self):
+        """获取处理吞吐量（条/秒），处理中的批次按当前时间计算"""
+        if not self.start_time:
+            return None
+        elapsed = ((self.end_time or datetime.now()) - self.start_time).total_seconds()
+        if elapsed <= 0:
+            return None
+        return round(((self.success_count or 0) + (self.fail_count or 0)) / elapsed, 2)
+
     def get_success_rate(self):
         """获取成功率（百分比）"""
         if self.total_messages > 0:
@@ -0,0 +1,29 @@
+from jd import db
+from jd.models.base import BaseModel
+
+
+class AdTrackingLLMVerdict(BaseModel):
+    """
+    LLM 高价值信息判别结果缓存
+
+    按内容键保存 _parse_llm_response 的解析结果；内容键由标准化文本哈希、
+    排序后的图片内容哈希与提示词/模型版本组成，相同的广告在其他群组或其他日期
+    再次出现时直接复用判别结果，不再请求 LLM
+    """
+    __tablename__ = 'ad_tracking_llm_verdict'
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    cache_key = db.Column(db.String(40), nullable=False, comment='内容键（SHA1）')
+    prompt_version = db.Column(db.String(16), nullable=False, comment='提示词/模型版本')
+    ai_judgment = db.Column(db.Text, nullable=False, comment='大模型判断结果')
+    importance_score = db.Column(db.Float, nullable=False, default=0, comment='重要程度评分（0-100）')
+    is_high_priority = db.Column(db.Boolean, nullable=False, default=False, comment='是否为高优先级')
+    image_count = db.Column(db.Integer, nullable=False, default=0, comment='图片数量')
+    hit_count = db.Column(db.Integer, nullable=False, default=0, comment='缓存命中次数')
+    last_hit_at = db.Column(db.DateTime, nullable=True, comment='最近一次命中时间')
+    created_at = db.Column(db.DateTime, default=db.func.now(), comment='创建时间')
+    updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now(), comment='更新时间')
+
+    __table_args__ = (
+        db.UniqueConstraint('cache_key', name='uk_cache_key'),
+    )
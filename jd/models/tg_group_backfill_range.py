@@ -0,0 +1,38 @@
+from jd import db
+from jd.models.base import BaseModel
+
+
+class TgGroupBackfillRange(BaseModel):
+    """
+    群组历史回溯分段检查点
+
+    将群组历史按message_id切分为区间 (range_start_id, range_end_id]，
+    每个区间独立认领、拉取并记录进度，任务中断后可从cursor_id继续
+    """
+    __tablename__ = 'tg_group_backfill_range'
+
+    id = db.Column(db.Integer, primary_key=True)
+    chat_id = db.Column(db.String(128), nullable=False, comment='群聊id')
+    range_start_id = db.Column(db.BigInteger, nullable=False, default=0, comment='区间下界message_id（不含）')
+    range_end_id = db.Column(db.BigInteger, nullable=False, default=0, comment='区间上界message_id（含）')
+    cursor_id = db.Column(db.BigInteger, nullable=False, default=0, comment='下次拉取的上界message_id（不含），从新到旧推进')
+    status = db.Column(db.Enum('pending', 'running', 'done', 'failed'), nullable=False,
+                       default='pending', comment='区间状态')
+    session_name = db.Column(db.String(128), nullable=False, default='', comment='认领该区间的session')
+    attempts = db.Column(db.Integer, nullable=False, default=0, comment='失败次数')
+    fetched_count = db.Column(db.Integer, nullable=False, default=0, comment='已拉取消息数')
+    saved_count = db.Column(db.Integer, nullable=False, default=0, comment='已写入消息数')
+    error_message = db.Column(db.String(512), nullable=False, default='', comment='最近一次错误')
+    created_at = db.Column(db.DateTime, default=db.func.now())
+    updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now())
+
+    __table_args__ = (
+        db.UniqueConstraint('chat_id', 'range_start_id', name='uk_chat_range'),
+        db.Index('idx_chat_status', 'chat_id', 'status'),
+    )
+
+    class Status:
+        PENDING = 'pending'
+        RUNNING = 'running'
+        DONE = 'done'
+        FAILED = 'failed'
@@ -14,6 +14,7 @@ class TgGroupChatHistory(BaseModel):
     reply_to_msg_id = db.Column(db.String(128), nullable=False, default='', comment='回复的消息id')
     message = db.Column(db.Text, nullable=False, comment='消息')
     photo_path = db.Column(db.String(256), nullable=False, default='', comment='图片路径')
+    photo_thumb_path = db.Column(db.String(256), nullable=False, default='', comment='图片缩略图路径')
     document_path = db.Column(db.String(256), nullable=False, default='', comment='视频/文件路径')
     document_ext = db.Column(db.String(16), nullable=False, default='', comment='文件后缀')
     status = db.Column(db.Integer, nullable=False, default=0, comment='')
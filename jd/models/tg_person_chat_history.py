@@ -28,6 +28,7 @@ class TgPersonChatHistory(BaseModel):
 
     # 附件
     photo_path = db.Column(db.String(256), nullable=False, default='', comment='图片路径')
+    photo_thumb_path = db.Column(db.String(256), nullable=False, default='', comment='图片缩略图路径')
     document_path = db.Column(db.String(256), nullable=False, default='', comment='文档路径')
     document_ext = db.Column(db.String(16), nullable=False, default='', comment='文件后缀')
 
@@ -90,6 +91,7 @@ class TgPersonChatHistory(BaseModel):
             'postal_time': self.postal_time.isoformat() if self.postal_time else None,
             'reply_to_msg_id': self.reply_to_msg_id,
             'photo_path': self.photo_path,
+            'photo_thumb_path': self.photo_thumb_path,
             'document_path': self.document_path,
             'document_ext': self.document_ext,
             'replies_info': self.replies_info,
@@ -0,0 +1,33 @@
+from jd import db
+from jd.models.base import BaseModel
+from sqlalchemy.dialects.mysql import JSON
+
+
+class TmePreview(BaseModel):
+    """
+    t.me 账户预览存储
+
+    按用户名保存最近一次抓取的 t.me 预览，账户被提及时只读取本表；
+    next_refresh_at 即刷新队列，由后台刷新任务按提及频率与变化频率安排下次抓取
+    """
+    __tablename__ = 'tme_preview'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    username = db.Column(db.String(64), nullable=False, comment='用户名（小写，不带@）')
+    preview = db.Column(JSON, nullable=True, comment='最近一次成功抓取的预览信息')
+    error = db.Column(db.String(512), nullable=False, default='', comment='最近一次抓取错误')
+    fetched_at = db.Column(db.DateTime, nullable=True, comment='最近一次抓取时间')
+    next_refresh_at = db.Column(db.DateTime, nullable=False, default=db.func.now(), comment='计划刷新时间')
+    sighting_count = db.Column(db.Integer, nullable=False, default=0, comment='累计提及次数')
+    recent_sightings = db.Column(db.Integer, nullable=False, default=0, comment='上次抓取以来的提及次数')
+    last_seen_at = db.Column(db.DateTime, nullable=True, comment='最近一次提及时间')
+    fetch_count = db.Column(db.Integer, nullable=False, default=0, comment='成功抓取次数')
+    change_count = db.Column(db.Integer, nullable=False, default=0, comment='抓取结果发生变化的次数')
+    error_streak = db.Column(db.Integer, nullable=False, default=0, comment='连续抓取失败次数')
+    created_at = db.Column(db.DateTime, default=db.func.now(), comment='创建时间')
+    updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now(), comment='更新时间')
+
+    __table_args__ = (
+        db.UniqueConstraint('username', name='uk_username'),
+        db.Index('idx_next_refresh_at', 'next_refresh_at'),
+    )
@@ -79,6 +79,57 @@ class CacheService:
             logger.warning(f"Redis set 失败: key={key}, error={e}")
             return False
 
+    @staticmethod
+    def get_many(keys: list) -> list:
+        """
+        批量获取缓存值
+
+        Args:
+            keys: 缓存键列表
+
+        Returns:
+            list: 与 keys 一一对应的缓存值，不存在或出错时为 None
+        """
+        if not keys:
+            return []
+        try:
+            redis = CacheService.get_redis()
+            if redis is None:
+                return [None] * len(keys)
+
+            return [json.loads(value) if value else None for value in redis.mget(keys)]
+        except Exception as e:
+            logger.warning(f"Redis mget 失败: keys={len(keys)}, error={e}")
+            return [None] * len(keys)
+
+    @staticmethod
+    def set_many(mapping: dict, ttl: int = 3600) -> bool:
+        """
+        批量设置缓存值（同一过期时间，使用 pipeline 一次提交）
+
+        Args:
+            mapping: 缓存键 -> 缓存值（将被 JSON 序列化）
+            ttl: 过期时间（秒），默认1小时
+
+        Returns:
+            bool: 是否设置成功
+        """
+        if not mapping:
+            return True
+        try:
+            redis = CacheService.get_redis()
+            if redis is None:
+                return False
+
+            pipe = redis.pipeline(transaction=False)
+            for key, value in mapping.items():
+                pipe.setex(key, ttl, json.dumps(value))
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"Redis 批量 set 失败: keys={len(mapping)}, error={e}")
+            return False
+
     @staticmethod
     def delete(key: str) -> bool:
         """
@@ -0,0 +1,156 @@
+"""
+地理位置名录索引
+
+GeoGazetteer 把地理位置主表编译为：
+1. id → 节点字典，节点上预先算好祖先链（province/city/district 名称），
+   匹配到任一地名后取省市区都是 O(1)
+2. 关键词列表：地名、别名、简称展开为 (关键词, 节点ID)
+
+构建按行政级别分层处理（父级总在更低级别），整体线性时间。
+快照为紧凑的 JSON 结构，按版本存入 Redis，其他进程直接加载，无需查询主表。
+"""
+
+import hashlib
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from jd.helpers.keyword_matcher import AhoCorasickMatcher
+
+LEVEL_TYPES = {1: 'province', 2: 'city', 3: 'district'}
+
+# 快照中每个节点的字段顺序
+SNAPSHOT_FIELDS = ('id', 'level', 'name', 'parent_id', 'latitude', 'longitude')
+
+SNAPSHOT_FORMAT = 1
+
+
+def gazetteer_version(row_count: int, max_updated_at: Any) -> str:
+    """主表 (行数, 最大 updated_at) 对应的名录版本"""
+    raw = f'{SNAPSHOT_FORMAT}:{row_count}:{max_updated_at}'
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def _location_keywords(name: str, aliases: Optional[str], short_name: Optional[str]) -> List[str]:
+    """地名 + 别名（逗号分隔）+ 简称，去重保序"""
+    keywords = [name]
+    if aliases:
+        keywords.extend(alias.strip() for alias in aliases.split(','))
+    if short_name:
+        keywords.append(short_name.strip())
+    return list(dict.fromkeys(keyword for keyword in keywords if keyword))
+
+
+class GeoGazetteer:
+    """地理位置名录：节点索引 + 关键词展开"""
+
+    def __init__(self, nodes: Dict[int, Dict[str, Any]], keywords: List[list], version: str = None):
+        """
+        Args:
+            nodes: {节点ID: 节点字典}，节点字典已包含祖先链
+            keywords: [[关键词, 节点ID], ...]
+            version: 名录版本
+        """
+        self.nodes = nodes
+        self.keywords = keywords
+        self.version = version
+        self._city_provinces = None
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Any], version: str = None) -> 'GeoGazetteer':
+        """
+        从主表行构建名录
+
+        Args:
+            rows: 具有 id、level、name、parent_id、latitude、longitude、aliases、short_name
+                  属性的行（ORM 对象或查询行），只应包含启用的地点
+            version: 名录版本
+        """
+        by_level = defaultdict(list)
+        keywords = []
+        for row in rows:
+            if row.level not in LEVEL_TYPES:
+                continue
+            by_level[row.level].append({
+                'id': row.id,
+                'level': row.level,
+                'name': row.name,
+                'parent_id': row.parent_id,
+                'latitude': float(row.latitude) if row.latitude is not None else None,
+                'longitude': float(row.longitude) if row.longitude is not None else None,
+            })
+            keywords.extend([keyword, row.id] for keyword in _location_keywords(row.name, row.aliases, row.short_name))
+
+        nodes = {}
+        for level in sorted(by_level):
+            for node in by_level[level]:
+                nodes[node['id']] = cls._link(node, nodes)
+        return cls(nodes, keywords, version)
+
+    @staticmethod
+    def _link(node: Dict[str, Any], nodes: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+        """根据已处理的父节点补全祖先链（父节点缺失或未启用时只保留自身）"""
+        node_type = LEVEL_TYPES[node['level']]
+        parent = nodes.get(node['parent_id']) if node['parent_id'] else None
+        node['type'] = node_type
+        node['parent_name'] = parent['name'] if parent else None
+        for field in LEVEL_TYPES.values():
+            node[field] = parent[field] if parent else None
+        node[node_type] = node['name']
+        return node
+
+    def to_snapshot(self) -> Dict[str, Any]:
+        """序列化为可 JSON 编码的快照（祖先链在加载时按级别重建）"""
+        return {
+            'format': SNAPSHOT_FORMAT,
+            'version': self.version,
+            'nodes': [[node[field] for field in SNAPSHOT_FIELDS] for node in self.nodes.values()],
+            'keywords': self.keywords,
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, Any]) -> Optional['GeoGazetteer']:
+        """从快照加载，格式不符时返回 None"""
+        if not snapshot or snapshot.get('format') != SNAPSHOT_FORMAT:
+            return None
+        by_level = defaultdict(list)
+        for values in snapshot['nodes']:
+            node = dict(zip(SNAPSHOT_FIELDS, values))
+            by_level[node['level']].append(node)
+
+        nodes = {}
+        for level in sorted(by_level):
+            for node in by_level[level]:
+                nodes[node['id']] = cls._link(node, nodes)
+        return cls(nodes, snapshot['keywords'], snapshot.get('version'))
+
+    def build_matcher(self) -> AhoCorasickMatcher:
+        """构建 AC 自动机，关键词的元数据就是节点字典本身（不复制）"""
+        matcher = AhoCorasickMatcher(case_sensitive=False)
+        for keyword, node_id in self.keywords:
+            node = self.nodes.get(node_id)
+            if node is not None:
+                matcher.add_keyword(keyword, node)
+        matcher.build()
+        return matcher
+
+    def resolve(self, node_id: int) -> Optional[Dict[str, Any]]:
+        """按ID取节点（含 province/city/district）"""
+        return self.nodes.get(node_id)
+
+    def city_provinces(self) -> Dict[str, str]:
+        """
+        城市名 → 省份名
+
+        同名城市属于多个省份时取ID最小的一个，与按主表顺序 LIMIT 1 的查找一致
+        """
+        if self._city_provinces is None:
+            mapping = {}
+            for node_id in sorted(self.nodes):
+                node = self.nodes[node_id]
+                if node['type'] == 'city' and node['province']:
+                    mapping.setdefault(node['name'], node['province'])
+            self._city_provinces = mapping
+        return self._city_provinces
@@ -1,10 +1,14 @@
 """地理位置服务 - 管理地理数据和地名提取"""
 import logging
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Optional
+
+from flask import has_app_context
+from sqlalchemy import func
 
-from flask import has_app_context, current_app
 from jd.helpers.keyword_matcher import AhoCorasickMatcher
+from jd.services.cache_service import CacheService
+from jd.services.geo_gazetteer import GeoGazetteer, gazetteer_version
 
 logger = logging.getLogger(__name__)
 
@@ -13,8 +17,12 @@ class GeoLocationService:
     """地理位置处理服务 - 数据库驱动 + AC自动机优化"""
 
     _GEO_MATCHER = None
+    _GAZETTEER = None
     _LAST_LOAD_TIME = None
-    _LOAD_INTERVAL = 3600  # 1小时更新一次
+    _LOAD_INTERVAL = 3600  # 1小时检查一次主表版本
+
+    SNAPSHOT_KEY = 'geo_gazetteer:snapshot:{version}'
+    SNAPSHOT_TTL = 7 * 86400
 
     @classmethod
     def _should_reload_geo_data(cls) -> bool:
@@ -27,84 +35,83 @@ class GeoLocationService:
         return (current_time - cls._LAST_LOAD_TIME) > cls._LOAD_INTERVAL
 
     @classmethod
-    def _build_geo_matcher(cls) -> AhoCorasickMatcher:
-        """从数据库构建地理位置AC自动机"""
-        try:
-            from jd.models.ad_tracking_geo_location_master import AdTrackingGeoLocationMaster
-            from jd import db as app_db
-        except ImportError:
-            logger.warning("无法导入地理位置主表模型，返回空匹配器")
-            return AhoCorasickMatcher(case_sensitive=False)
-
-        if cls._GEO_MATCHER and not cls._should_reload_geo_data():
-            return cls._GEO_MATCHER
+    def _current_version(cls) -> str:
+        from jd.models.ad_tracking_geo_location_master import AdTrackingGeoLocationMaster
+        from jd import db as app_db
 
-        logger.info("Building geographic AC matcher from database")
+        row_count, max_updated_at = app_db.session.query(
+            func.count(AdTrackingGeoLocationMaster.id), func.max(AdTrackingGeoLocationMaster.updated_at)
+        ).one()
+        return gazetteer_version(row_count, max_updated_at)
 
-        matcher = AhoCorasickMatcher(case_sensitive=False)
-
-        try:
-            # 如果没有应用上下文，从 Flask 应用获取
-            if not has_app_context():
-                logger.warning("无应用上下文，尝试从 current_app 获取...")
-                try:
-                    # 尝试直接从 SQLAlchemy session 查询
-                    geo_data = app_db.session.query(AdTrackingGeoLocationMaster).filter_by(is_active=True).all()
-                except Exception as ctx_error:
-                    logger.warning(f"无应用上下文，无法从数据库加载地理位置数据: {ctx_error}")
-                    matcher.build()
-                    return matcher
-            else:
-                geo_data = AdTrackingGeoLocationMaster.query.filter_by(is_active=True).all()
-
-            # 为地理位置数据添加父级名称
-            parent_map = {}  # parent_id -> parent_name
-            for location in geo_data:
-                if location.parent_id and location.level > 1:  # 非省级别，查找父级
-                    parent = next((p for p in geo_data if p.id == location.parent_id), None)
-                    if parent:
-                        parent_map[location.parent_id] = parent.name
-
-            for location in geo_data:
-                # 添加主名称
-                parent_name = parent_map.get(location.parent_id) if location.parent_id else None
-
-                metadata = {
-                    'type': ['province', 'city', 'district'][location.level - 1],
-                    'id': location.id,
-                    'name': location.name,
-                    'level': location.level,
-                    'parent_id': location.parent_id,
-                    'parent_name': parent_name,  # 填充父级名称
-                    'latitude': float(location.latitude) if location.latitude else None,
-                    'longitude': float(location.longitude) if location.longitude else None,
-                }
-                matcher.add_keyword(location.name, metadata)
+    @classmethod
+    def _compile_gazetteer(cls, version: str) -> GeoGazetteer:
+        """从主表编译名录（一次查询，线性构建）并写入快照"""
+        from jd.models.ad_tracking_geo_location_master import AdTrackingGeoLocationMaster
+        from jd import db as app_db
+
+        Master = AdTrackingGeoLocationMaster
+        rows = app_db.session.query(
+            Master.id, Master.level, Master.name, Master.parent_id,
+            Master.latitude, Master.longitude, Master.aliases, Master.short_name
+        ).filter(Master.is_active == True).all()  # noqa: E712
+
+        gazetteer = GeoGazetteer.from_rows(rows, version)
+        CacheService.set(cls.SNAPSHOT_KEY.format(version=version), gazetteer.to_snapshot(), ttl=cls.SNAPSHOT_TTL)
+        logger.info(f"地理位置名录已编译: {len(gazetteer)} 个地点, {len(gazetteer.keywords)} 个关键词, 版本 {version}")
+        return gazetteer
 
-                # 添加别名（使用相同的metadata，包括parent_name）
-                if location.aliases:
-                    for alias in location.aliases.split(','):
-                        alias = alias.strip()
-                        if alias:
-                            matcher.add_keyword(alias, metadata)
+    @classmethod
+    def get_gazetteer(cls) -> Optional[GeoGazetteer]:
+        """
+        获取当前版本的地理位置名录
 
-                # 添加简称（使用相同的metadata，包括parent_name）
-                if location.short_name:
-                    matcher.add_keyword(location.short_name, metadata)
+        每小时检查一次主表版本（一条聚合查询），版本未变时沿用内存中的名录；
+        版本变化时优先加载 Redis 中的快照，没有快照才从主表编译
 
-            matcher.build()
+        Returns:
+            名录；无法访问数据库时返回已加载的名录（可能为 None）
+        """
+        if cls._GAZETTEER is not None and not cls._should_reload_geo_data():
+            return cls._GAZETTEER
 
-            cls._GEO_MATCHER = matcher
+        try:
+            version = cls._current_version()
+            if cls._GAZETTEER is None or cls._GAZETTEER.version != version:
+                gazetteer = GeoGazetteer.from_snapshot(CacheService.get(cls.SNAPSHOT_KEY.format(version=version)))
+                if gazetteer is None:
+                    gazetteer = cls._compile_gazetteer(version)
+                else:
+                    logger.info(f"地理位置名录从快照加载: {len(gazetteer)} 个地点, 版本 {version}")
+                cls._GAZETTEER = gazetteer
+                cls._GEO_MATCHER = None
             cls._LAST_LOAD_TIME = time.time()
-
-            stats = matcher.get_stats()
-            logger.info(f"Geographic matcher built: {stats['keyword_count']} keywords")
         except Exception as e:
-            logger.error(f"构建地理位置matcher失败: {e}")
-            # 返回空matcher
+            logger.warning(f"加载地理位置名录失败: {e}")
+
+        return cls._GAZETTEER
+
+    @classmethod
+    def _build_geo_matcher(cls) -> AhoCorasickMatcher:
+        """从地理位置名录构建AC自动机（名录版本未变时复用）"""
+        gazetteer = cls.get_gazetteer()
+        if gazetteer is None:
+            matcher = AhoCorasickMatcher(case_sensitive=False)
             matcher.build()
+            return matcher
+
+        if cls._GEO_MATCHER is None:
+            try:
+                cls._GEO_MATCHER = gazetteer.build_matcher()
+                stats = cls._GEO_MATCHER.get_stats()
+                logger.info(f"Geographic matcher built: {stats['keyword_count']} keywords")
+            except Exception as e:
+                logger.error(f"构建地理位置matcher失败: {e}")
+                matcher = AhoCorasickMatcher(case_sensitive=False)
+                matcher.build()
+                return matcher
 
-        return matcher
+        return cls._GEO_MATCHER
 
     @classmethod
     def extract_locations(cls, text: str, chat_id: int) -> List[Dict]:
@@ -112,7 +119,7 @@ class GeoLocationService:
         从文本中提取地理位置
 
         使用 AC自动机 进行高效匹配
-        性能：O(n + z) 其中 n=文本长度，z=匹配数
+        性能：O(n + z) 其中 n=文本长度，z=匹配数；省市区取自名录节点的祖先链，O(1)
 
         Args:
             text: 输入文本
@@ -123,13 +130,15 @@ class GeoLocationService:
                 {
                     'id': 地理位置ID,
                     'type': 'province'|'city'|'district',
-                    'name': '山东省',
-                    'level': 1,
-                    'parent_id': None,
-                    'parent_name': '省份名称',  # 新增字段
+                    'name': '槐荫区',
+                    'level': 3,
+                    'parent_id': 父级ID,
                     'latitude': 36.5,
                     'longitude': 117.1,
-                    'keyword_matched': '山东'
+                    'keyword_matched': '槐荫',
+                    'province': '山东省',
+                    'city': '济南市',       # 匹配到省份时为 None
+                    'district': '槐荫区'    # 只对区县有效
                 }
         """
         if not text or not text.strip():
@@ -141,41 +150,20 @@ class GeoLocationService:
 
             locations = []
             for match in matches:
-                metadata = match['metadata']
-
-                # 构建返回结果，省份字段将根据匹配到的类型填充
-                location_info = {
-                    'id': metadata['id'],
-                    'type': metadata['type'],
-                    'name': metadata['name'],
-                    'level': metadata['level'],
-                    'parent_id': metadata['parent_id'],
-                    'latitude': metadata['latitude'],
-                    'longitude': metadata['longitude'],
-                    'keyword_matched': match['keyword']
-                }
-
-                # 如果匹配到的是城市或区县，且有其省份信息，则在province字段填充
-                if metadata['type'] in ['city', 'district'] and metadata['parent_name']:
-                    location_info['province'] = metadata['parent_name']
-                elif metadata['type'] == 'province':
-                    location_info['province'] = metadata['name']
-                else:
-                    location_info['province'] = None
-
-                # city字段只对city类型有效
-                if metadata['type'] == 'city':
-                    location_info['city'] = metadata['name']
-                else:
-                    location_info['city'] = None
-
-                # district字段只对district类型有效
-                if metadata['type'] == 'district':
-                    location_info['district'] = metadata['name']
-                else:
-                    location_info['district'] = None
-
-                locations.append(location_info)
+                node = match['metadata']
+                locations.append({
+                    'id': node['id'],
+                    'type': node['type'],
+                    'name': node['name'],
+                    'level': node['level'],
+                    'parent_id': node['parent_id'],
+                    'latitude': node['latitude'],
+                    'longitude': node['longitude'],
+                    'keyword_matched': match['keyword'],
+                    'province': node['province'],
+                    'city': node['city'],
+                    'district': node['district'],
+                })
 
             return locations
         except Exception as e:
@@ -186,6 +174,7 @@ class GeoLocationService:
     def refresh_geo_matcher_cache():
         """刷新地理位置matcher缓存（在更新配置后调用）"""
         GeoLocationService._GEO_MATCHER = None
+        GeoLocationService._GAZETTEER = None
         GeoLocationService._LAST_LOAD_TIME = None
         logger.info("Geographic matcher cache cleared")
 
@@ -9,6 +9,30 @@ from jd.helpers.keyword_matcher import AhoCorasickMatcher
 
 logger = logging.getLogger(__name__)
 
+# 价格单位字符 → 单位
+_PRICE_UNITS = {'克': 'g', '块': 'piece', '份': 'portion', '条': 'stick', '片': 'tablet'}
+
+# 价格必须包含单位字符或货币符号（范围价格以货币结尾），先用子串查找快速排除
+_PRICE_MARKERS = tuple(_PRICE_UNITS) + ('元', '￥', '¥')
+
+# 数字紧跟（可隔空白）单位、货币、斜杠或范围符号
+_PRICE_HINT = re.compile(r'\d\s*[克块份条片元￥¥/\-~]')
+
+# 一次扫描同时识别两种格式：
+#   单位价格 100元/克、100块：value + 可选货币 + 可选斜杠 + unit
+#   范围价格 100-200元：low + [-~] + value + currency
+_PRICE_PATTERN = re.compile(
+    r'(?:(?P<low>\d+(?:\.\d+)?)\s*[-~]\s*)?'
+    r'(?P<value>\d+(?:\.\d+)?)'
+    r'(?:\s*(?P<currency>元|￥|¥))?'
+    r'(?:\s*/?(?P<unit>[克块份条片]))?'
+)
+
+
+def _has_price_hint(text: str) -> bool:
+    """快速判断文本是否可能包含价格（不含单位/货币字符或数字不与之相邻时直接跳过）"""
+    return any(marker in text for marker in _PRICE_MARKERS) and _PRICE_HINT.search(text) is not None
+
 
 class KeywordExtractionService:
     """关键词提取服务 - 数据库驱动 + AC自动机优化"""
@@ -18,6 +42,9 @@ class KeywordExtractionService:
     _matcher_update_time = None
     _matcher_cache_ttl = 3600  # 缓存1小时
 
+    # 价格提取规则版本：修改 extract_prices 的规则后递增，已提取的价格会按新规则重新提取
+    PRICE_RULES_VERSION = 1
+
     @classmethod
     def _should_refresh_transaction_matcher(cls) -> bool:
         """检查是否需要刷新交易方式matcher缓存"""
@@ -110,52 +137,46 @@ class KeywordExtractionService:
                     'confidence': 0.95
                 }
         """
-        results = []
-
-        if not text or not text.strip():
-            return results
+        if not text or not _has_price_hint(text):
+            return []
 
-        # ✅ 优化：模式1 - 数值单位组合（覆盖大多数场景）
-        pattern1 = r'(\d+(?:\.\d+)?)\s*(?:元|￥|¥)?\s*(?:/)?(?:克|块|份|条|片)'
-        for match in re.finditer(pattern1, text, re.IGNORECASE):
-            try:
-                value = float(match.group(1))
+        # 单位价格与范围价格分别收集，保持"单位价格在前"的去重优先级
+        unit_prices = []
+        range_prices = []
+        pos = 0
+        while True:
+            match = _PRICE_PATTERN.search(text, pos)
+            if match is None:
+                break
+            pos = match.end()
+
+            unit_char = match.group('unit')
+            if unit_char:
+                value = float(match.group('value'))
                 if 1 <= value <= 100000:
-                    # 根据单位词分类
-                    text_matched = match.group(0)
-                    unit = 'g'  # 默认克
-                    if '块' in text_matched:
-                        unit = 'piece'
-                    elif '份' in text_matched:
-                        unit = 'portion'
-                    elif '条' in text_matched:
-                        unit = 'stick'
-                    elif '片' in text_matched:
-                        unit = 'tablet'
-
-                    results.append({
+                    unit_prices.append({
                         'value': round(value, 2),
-                        'unit': unit,
-                        'original_text': text_matched,
+                        'unit': _PRICE_UNITS[unit_char],
+                        'original_text': text[match.start('value'):match.end('unit')],
                         'confidence': 0.95
                     })
-            except ValueError:
-                continue
-
-        # ✅ 优化：模式2 - 范围价格（100-200元 → 平均值150）
-        pattern2 = r'(\d+(?:\.\d+)?)\s*[-~]\s*(\d+(?:\.\d+)?)\s*(?:元|￥|¥)'
-        for match in re.finditer(pattern2, text, re.IGNORECASE):
-            try:
-                value = (float(match.group(1)) + float(match.group(2))) / 2
+
+            if match.group('low') is not None and match.group('currency'):
+                # 范围价格（100-200元 → 平均值150）
+                value = (float(match.group('low')) + float(match.group('value'))) / 2
                 if 1 <= value <= 100000:
-                    results.append({
+                    range_prices.append({
                         'value': round(value, 2),
                         'unit': 'g',
-                        'original_text': match.group(0),
+                        'original_text': text[match.start('low'):match.end('currency')],
                         'confidence': 0.95
                     })
-            except ValueError:
-                continue
+            elif not unit_char:
+                # 只匹配到数字：从下一个字符重试（1~2~3元 的上限可能是下一个范围的下限，
+                # 1.2.3克 的后半段可能是单位价格）
+                pos = match.start() + 1
+
+        results = unit_prices + range_prices
 
         # 去重
         return KeywordExtractionService._deduplicate(results)
@@ -0,0 +1,238 @@
+"""
+异步HTTP抓取引擎
+
+为 TmeSpider 的批量URL分析提供共享的异步HTTP客户端：
+1. 连接池：同一主机复用TCP/TLS连接，避免每个请求重新握手
+2. 全局并发上限：限制同时进行中的请求总数
+3. 按域名礼貌限制：每个主机的并发数和相邻请求最小间隔
+   （重定向逐跳跟随，每一跳都占用目标主机的并发名额与请求时隙）
+4. TLS证书探测：与页面抓取共享全局并发上限，可与抓取并行进行
+
+返回结果统一为字典，不抛出网络异常，由调用方按 error 字段处理。
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from jd.services.spider.certificate_probe import probe_certificate_async
+from jd.utils.logging_config import get_logger
+
+logger = get_logger(__name__, {
+    'component': 'spider',
+    'module': 'async_http_engine'
+})
+
+
+class _HostPolicy:
+    """单个主机的并发与间隔控制"""
+
+    def __init__(self, limit: int, min_interval: float):
+        self.semaphore = asyncio.Semaphore(max(1, limit))
+        self.min_interval = max(0.0, min_interval)
+        self._lock = asyncio.Lock()
+        self._next_slot = 0.0
+
+    async def wait_slot(self) -> float:
+        """等待该主机的下一个请求时隙，返回等待秒数"""
+        if self.min_interval <= 0:
+            return 0.0
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+
+class AsyncHttpEngine:
+    """带连接池、全局并发和按域名限速的异步HTTP引擎"""
+
+    def __init__(self, max_concurrency: int = 64, per_host_limit: int = 4,
+                 per_host_interval: float = 0.0, timeout: float = 10,
+                 headers: Dict = None, host_intervals: Dict[str, float] = None,
+                 max_redirects: int = 10):
+        """
+        Args:
+            max_concurrency: 全局最大并发请求数
+            per_host_limit: 单个主机最大并发请求数
+            per_host_interval: 同一主机相邻请求的最小间隔（秒）
+            timeout: 单个请求超时（秒）
+            headers: 默认请求头
+            host_intervals: 指定主机的请求间隔，覆盖 per_host_interval
+            max_redirects: 最多跟随的重定向次数，超过时返回最后一跳的重定向响应
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_host_limit = max(1, per_host_limit)
+        self.per_host_interval = per_host_interval
+        self.timeout = timeout
+        self.headers = headers or {}
+        self.host_intervals = host_intervals or {}
+        self.max_redirects = max_redirects
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._host_policies: Dict[str, _HostPolicy] = {}
+
+        self.stats = {
+            'request_count': 0,
+            'error_count': 0,
+            'timeout_count': 0,
+            'bytes_read': 0,
+            'host_wait_seconds': 0.0,
+            'in_flight_max': 0,
+            'certificate_probes': 0,
+        }
+        self._in_flight = 0
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def start(self):
+        """创建共享客户端（需在事件循环内调用）"""
+        if self._client is not None:
+            return
+        limits = httpx.Limits(
+            max_connections=self.max_concurrency,
+            max_keepalive_connections=self.max_concurrency,
+        )
+        self._client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            limits=limits,
+            follow_redirects=False,
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._host_policies = {}
+
+    async def aclose(self):
+        """关闭客户端并释放连接池"""
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._semaphore = None
+
+    def _get_host_policy(self, host: str) -> _HostPolicy:
+        policy = self._host_policies.get(host)
+        if policy is None:
+            interval = self.host_intervals.get(host, self.per_host_interval)
+            policy = _HostPolicy(self.per_host_limit, interval)
+            self._host_policies[host] = policy
+        return policy
+
+    async def fetch(self, url: str, max_bytes: Optional[int] = None,
+                    headers: Dict = None) -> Dict:
+        """
+        GET 请求并读取响应内容
+
+        Args:
+            url: 请求地址（需包含协议）
+            max_bytes: 最多读取的字节数，None 表示读取全部
+            headers: 额外请求头
+
+        Returns:
+            {
+                'url': str,              # 请求地址
+                'final_url': str,        # 跟随重定向后的地址
+                'status_code': int,
+                'headers': dict,
+                'content': bytes,
+                'redirect_count': int,
+                'elapsed': float,
+                'error': str             # 仅失败时存在，超时为 'timeout'
+            }
+        """
+        if self._client is None:
+            await self.start()
+
+        started = time.monotonic()
+        async with self._semaphore:
+            try:
+                request = self._client.build_request('GET', url, headers=headers)
+                redirect_count = 0
+                while True:
+                    response = await self._send(request, max_bytes)
+                    next_request = response.pop('next_request')
+                    if next_request is None or redirect_count >= self.max_redirects:
+                        break
+                    request = next_request
+                    redirect_count += 1
+                response.update({'url': url, 'redirect_count': redirect_count,
+                                 'elapsed': time.monotonic() - started})
+                return response
+            except httpx.TimeoutException:
+                self.stats['timeout_count'] += 1
+                self.stats['error_count'] += 1
+                return {'url': url, 'error': 'timeout', 'elapsed': time.monotonic() - started}
+            except (httpx.HTTPError, httpx.InvalidURL, ValueError) as e:
+                self.stats['error_count'] += 1
+                logger.debug("异步请求失败", extra={
+                    'extra_fields': {
+                        'url': url,
+                        'error_type': type(e).__name__,
+                        'error_message': str(e)
+                    }
+                })
+                return {'url': url, 'error': str(e) or type(e).__name__,
+                        'elapsed': time.monotonic() - started}
+
+    async def _send(self, request: httpx.Request, max_bytes: Optional[int]) -> Dict:
+        """在目标主机的并发名额与请求时隙内发送一跳请求（不跟随重定向）"""
+        policy = self._get_host_policy((request.url.host or '').lower())
+        async with policy.semaphore:
+            waited = await policy.wait_slot()
+            self.stats['host_wait_seconds'] += waited
+            self.stats['request_count'] += 1
+            self._in_flight += 1
+            self.stats['in_flight_max'] = max(self.stats['in_flight_max'], self._in_flight)
+            try:
+                response = await self._client.send(request, stream=True)
+                try:
+                    content = bytearray()
+                    if response.next_request is None:
+                        async for chunk in response.aiter_bytes():
+                            content += chunk
+                            if max_bytes and len(content) >= max_bytes:
+                                del content[max_bytes:]
+                                break
+                        self.stats['bytes_read'] += len(content)
+                    return {
+                        'final_url': str(response.url),
+                        'status_code': response.status_code,
+                        'headers': dict(response.headers),
+                        'content': bytes(content),
+                        'next_request': response.next_request,
+                    }
+                finally:
+                    await response.aclose()
+            finally:
+                self._in_flight -= 1
+
+    async def probe_certificate(self, hostname: str, port: int = 443) -> Dict:
+        """
+        探测主机TLS证书（占用一个全局并发名额）
+
+        Returns:
+            {'issuer', 'valid_from', 'valid_to', 'verified', 'verify_error'（仅校验失败时）}
+            或 {'error': str}
+        """
+        if self._semaphore is None:
+            await self.start()
+        async with self._semaphore:
+            self.stats['certificate_probes'] += 1
+            return await probe_certificate_async(hostname, port, self.timeout)
+
+    def get_stats(self) -> Dict:
+        """返回引擎统计信息"""
+        stats = dict(self.stats)
+        stats['host_wait_seconds'] = round(stats['host_wait_seconds'], 2)
+        stats['host_count'] = len(self._host_policies)
+        return stats
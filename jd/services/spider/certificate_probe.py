@@ -0,0 +1,296 @@
+"""
+TLS 证书探测与缓存
+
+- probe_certificate / probe_certificate_async：对 (host, port) 做一次TLS握手并解析证书
+- CertificateCache：按 (host, port) 缓存证书结果（进程内LRU + Redis，worker间共享），
+  成功结果的TTL为“距证书过期时间”和“最长缓存时间（默认1天）”中的较小者，
+  失败结果使用较短的TTL
+
+注意：握手先使用系统CA校验证书链（不校验主机名）；校验失败（自签名、过期等）时
+以 CERT_NONE 重新握手取得证书，仍然记录颁发者与有效期，并在 verified / verify_error
+字段中记录校验结果。证书按 getpeercert(binary_form=True) 返回的 DER 解析，
+不依赖握手是否校验通过。
+"""
+
+import asyncio
+import socket
+import ssl
+import time
+from typing import Dict, List, Optional, Tuple
+
+from jd.services.cache_service import CacheService
+from jd.services.spider.url_analysis_cache import LruCache
+
+REDIS_KEY_PREFIX = 'tme_spider:certificate:'
+
+CertificateKey = Tuple[str, int]
+
+# X.509 organizationName 属性的 OID（2.5.4.10）
+_OID_ORGANIZATION_NAME = bytes([0x55, 0x04, 0x0A])
+
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def _build_ssl_context(verify: bool = True) -> ssl.SSLContext:
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_REQUIRED if verify else ssl.CERT_NONE
+    return context
+
+
+def parse_certificate(cert: Optional[Dict]) -> Dict:
+    """
+    解析 getpeercert() 返回的证书字典
+
+    Returns:
+        {'issuer': str, 'valid_from': str, 'valid_to': str}，证书为空时返回错误
+    """
+    if not cert:
+        return {'error': 'certificate_empty'}
+
+    # 解析证书颁发者
+    issuer = ''
+    issuer_tuple = cert.get('issuer')
+    if issuer_tuple:
+        issuer_dict = dict(x[0] for x in issuer_tuple)
+        issuer = issuer_dict.get('organizationName', '')
+
+    return {
+        'issuer': issuer,
+        'valid_from': cert.get('notBefore', ''),
+        'valid_to': cert.get('notAfter', '')
+    }
+
+
+def _der_element(data: bytes, offset: int) -> Tuple[int, int, int]:
+    """读取 offset 处的 DER 元素，返回 (tag, 内容起点, 内容终点)"""
+    tag = data[offset]
+    length = data[offset + 1]
+    start = offset + 2
+    if length & 0x80:
+        size = length & 0x7F
+        if not size or start + size > len(data):
+            raise ValueError('unsupported DER length')
+        length = int.from_bytes(data[start:start + size], 'big')
+        start += size
+    end = start + length
+    if end > len(data):
+        raise ValueError('truncated DER element')
+    return tag, start, end
+
+
+def _der_children(data: bytes, start: int, end: int) -> List[Tuple[int, int, int]]:
+    children = []
+    while start < end:
+        child = _der_element(data, start)
+        children.append(child)
+        start = child[2]
+    return children
+
+
+def _der_string(tag: int, value: bytes) -> str:
+    if tag == 0x1E:  # BMPString
+        return value.decode('utf-16-be', errors='replace')
+    return value.decode('utf-8', errors='replace')
+
+
+def _der_time(tag: int, value: bytes) -> str:
+    """UTCTime / GeneralizedTime 转为 getpeercert() 的格式（如 'Jan  1 00:00:00 2026 GMT'）"""
+    text = value.decode('ascii')
+    if tag == 0x17:  # UTCTime: YYMMDDHHMMSSZ
+        year = int(text[:2])
+        year += 1900 if year >= 50 else 2000
+        text = text[2:]
+    else:  # GeneralizedTime: YYYYMMDDHHMMSSZ
+        year = int(text[:4])
+        text = text[4:]
+    month, day, hour, minute, second = (int(text[i:i + 2]) for i in range(0, 10, 2))
+    return f'{_MONTHS[month - 1]} {day:2d} {hour:02d}:{minute:02d}:{second:02d} {year} GMT'
+
+
+def parse_der_certificate(der: Optional[bytes]) -> Dict:
+    """
+    解析 getpeercert(binary_form=True) 返回的 DER 证书
+
+    只读取颁发者的 organizationName 与有效期，校验失败的证书同样可以解析
+
+    Returns:
+        {'issuer': str, 'valid_from': str, 'valid_to': str}，格式同 parse_certificate()，
+        证书为空或无法解析时返回错误
+    """
+    if not der:
+        return {'error': 'certificate_empty'}
+    try:
+        _, start, end = _der_element(der, 0)
+        _, tbs_start, tbs_end = _der_element(der, start)
+        fields = _der_children(der, tbs_start, tbs_end)
+        if fields[0][0] == 0xA0:  # [0] version（v1 证书省略）
+            fields = fields[1:]
+        # serialNumber, signature, issuer, validity, ...
+        _, issuer_start, issuer_end = fields[2]
+        _, validity_start, validity_end = fields[3]
+
+        issuer = ''
+        for _, rdn_start, rdn_end in _der_children(der, issuer_start, issuer_end):
+            for _, attr_start, attr_end in _der_children(der, rdn_start, rdn_end):
+                (_, oid_start, oid_end), (value_tag, value_start, value_end) = \
+                    _der_children(der, attr_start, attr_end)[:2]
+                if der[oid_start:oid_end] == _OID_ORGANIZATION_NAME:
+                    issuer = _der_string(value_tag, der[value_start:value_end])
+
+        (from_tag, from_start, from_end), (to_tag, to_start, to_end) = \
+            _der_children(der, validity_start, validity_end)[:2]
+        return {
+            'issuer': issuer,
+            'valid_from': _der_time(from_tag, der[from_start:from_end]),
+            'valid_to': _der_time(to_tag, der[to_start:to_end])
+        }
+    except (IndexError, ValueError):
+        return {'error': 'certificate_parse_failed'}
+
+
+def _certificate_result(der: Optional[bytes], verify_error: Optional[str]) -> Dict:
+    """解析证书并记录校验结果：verified，校验失败时另有 verify_error"""
+    info = parse_der_certificate(der)
+    if 'error' in info:
+        return info
+    info['verified'] = verify_error is None
+    if verify_error is not None:
+        info['verify_error'] = verify_error
+    return info
+
+
+def _handshake_error(e: Exception) -> Dict:
+    if isinstance(e, (socket.timeout, asyncio.TimeoutError)):
+        return {'error': 'connection_timeout'}
+    return {'error': f'certificate_fetch_failed: {str(e)}'}
+
+
+def _fetch_der(hostname: str, port: int, timeout: float, verify: bool) -> Optional[bytes]:
+    with socket.create_connection((hostname, port), timeout=timeout) as raw_sock:
+        with _build_ssl_context(verify).wrap_socket(raw_sock, server_hostname=hostname) as sock:
+            return sock.getpeercert(binary_form=True)
+
+
+def probe_certificate(hostname: str, port: int = 443, timeout: float = 10) -> Dict:
+    """
+    同步探测证书信息
+
+    Returns:
+        {'issuer', 'valid_from', 'valid_to', 'verified': bool, 'verify_error': str（仅校验失败时）}
+        或 {'error': str}
+    """
+    try:
+        return _certificate_result(_fetch_der(hostname, port, timeout, verify=True), None)
+    except ssl.SSLCertVerificationError as e:
+        verify_error = e.verify_message or str(e)
+    except (OSError, ValueError) as e:
+        return _handshake_error(e)
+
+    # 自签名、过期等：不校验重新握手，仍记录证书字段
+    try:
+        return _certificate_result(_fetch_der(hostname, port, timeout, verify=False), verify_error)
+    except (OSError, ValueError) as e:
+        return _handshake_error(e)
+
+
+async def _fetch_der_async(hostname: str, port: int, timeout: float, verify: bool) -> Optional[bytes]:
+    _, writer = await asyncio.wait_for(
+        asyncio.open_connection(hostname, port, ssl=_build_ssl_context(verify),
+                                server_hostname=hostname),
+        timeout
+    )
+    try:
+        return writer.get_extra_info('ssl_object').getpeercert(binary_form=True)
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (OSError, ssl.SSLError):
+            pass
+
+
+async def probe_certificate_async(hostname: str, port: int = 443, timeout: float = 10) -> Dict:
+    """异步探测证书信息，返回结构同 probe_certificate()"""
+    try:
+        return _certificate_result(await _fetch_der_async(hostname, port, timeout, verify=True), None)
+    except ssl.SSLCertVerificationError as e:
+        verify_error = e.verify_message or str(e)
+    except (OSError, ValueError, asyncio.TimeoutError) as e:
+        return _handshake_error(e)
+
+    try:
+        return _certificate_result(await _fetch_der_async(hostname, port, timeout, verify=False), verify_error)
+    except (OSError, ValueError, asyncio.TimeoutError) as e:
+        return _handshake_error(e)
+
+
+class CertificateCache:
+    """按 (host, port) 缓存证书探测结果（进程内LRU + Redis）"""
+
+    def __init__(self, max_entries: int = 10000, max_ttl: int = 86400,
+                 failure_ttl: int = 3600, use_redis: bool = True):
+        """
+        Args:
+            max_entries: 进程内LRU最大条目数
+            max_ttl: 成功结果的最长缓存时间（秒），默认1天
+            failure_ttl: 失败结果的缓存时间（秒）
+            use_redis: 是否启用Redis共享缓存
+        """
+        self.local = LruCache(max_entries)
+        self.max_ttl = max_ttl
+        self.failure_ttl = failure_ttl
+        self.use_redis = use_redis
+
+    @staticmethod
+    def _redis_key(key: CertificateKey) -> str:
+        return f'{REDIS_KEY_PREFIX}{key[0]}:{key[1]}'
+
+    def get_ttl(self, info: Dict) -> int:
+        """成功结果不超过证书剩余有效期，失败结果使用 failure_ttl"""
+        if info.get('error') or not info.get('valid_to'):
+            return self.failure_ttl
+        try:
+            remaining = ssl.cert_time_to_seconds(info['valid_to']) - time.time()
+        except ValueError:
+            return self.failure_ttl
+        if remaining <= 0:
+            return self.failure_ttl
+        return int(max(60, min(self.max_ttl, remaining)))
+
+    def get_many(self, keys: List[CertificateKey]) -> Dict[CertificateKey, Dict]:
+        """批量读取缓存，返回命中的 {key: info}"""
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(key)
+            if value is not None:
+                found[key] = value
+            else:
+                missing.append(key)
+
+        if missing and self.use_redis:
+            values = CacheService.get_many([self._redis_key(key) for key in missing])
+            for key, value in zip(missing, values):
+                if value is not None:
+                    found[key] = value
+                    self.local.set(key, value, self.get_ttl(value))
+        return found
+
+    def get(self, key: CertificateKey) -> Optional[Dict]:
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items: Dict[CertificateKey, Dict]):
+        """批量写入，按TTL分组写入Redis"""
+        by_ttl = {}
+        for key, info in items.items():
+            ttl = self.get_ttl(info)
+            self.local.set(key, info, ttl)
+            by_ttl.setdefault(ttl, {})[self._redis_key(key)] = info
+
+        if self.use_redis:
+            for ttl, mapping in by_ttl.items():
+                CacheService.set_many(mapping, ttl)
+
+    def set(self, key: CertificateKey, info: Dict):
+        self.set_many({key: info})
@@ -0,0 +1,138 @@
+"""
+文本实体单遍提取
+
+用一个预编译的组合正则从左到右扫描一次文本，返回带位置的类型化实体：
+
+- url: 普通URL（带协议，或 example.com/path 形式的裸域名）
+- tme_link: t.me 链接
+- telegraph: telegra.ph 链接
+- account: @账户（原样返回，可能带 +，长度由调用方按场景过滤）
+- phone: 中国大陆手机号
+- qq: QQ号（9-11位数字，可带 qq 前缀，返回值不含前缀）
+
+TmeSpider 的 extract_* 方法与 utils/search_filter.find_accounts 均基于本模块，
+每条消息只做一次正则扫描；实体之间不重叠（URL 内部的 @xxx 不会再被识别为账户）。
+"""
+
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+# 各分支按顺序尝试，同一位置优先匹配靠前的分支
+_TOKEN_RE = re.compile(r'''
+    (?P<url>https?://[^\s<>"{}|\\^`\[\]]+)
+  | (?<![A-Za-z0-9_@./-])(?P<bare>(?:[A-Za-z0-9-]+\.)+[A-Za-z]{2,}(?:/\S*)?)
+  | (?P<account>@\+?[A-Za-z0-9_]{4,})
+  | (?<![A-Za-z0-9_])(?P<qq_prefix>qq)?(?P<number>[1-9][0-9]{8,10})(?![A-Za-z0-9_])
+''', re.VERBOSE)
+
+_PHONE_RE = re.compile(r'1[3-9][0-9]{9}')
+
+# t.me 链接路径（不含主机部分）
+_TME_PATH_RE = re.compile(r'''
+    \+(?P<invite>[A-Za-z0-9_-]+)
+  | joinchat/(?P<joinchat>[A-Za-z0-9_-]+)
+  | addlist/(?P<addlist>[A-Za-z0-9_-]+)
+  | (?P<name>[A-Za-z0-9_]+)(?:/(?P<message_id>[0-9]+))?
+''', re.VERBOSE)
+
+_TELEGRAPH_PATH_RE = re.compile(r'[A-Za-z0-9-]+')
+
+URL_ENTITY_TYPES = frozenset({'url', 'tme_link', 'telegraph'})
+
+
+class Entity(NamedTuple):
+    """文本中的一个实体"""
+    type: str
+    value: str
+    start: int
+    end: int
+
+
+def _split_host(url: str):
+    """返回 (小写主机名, 路径)，路径不含开头的 /"""
+    rest = url.split('://', 1)[1] if '://' in url else url
+    host, _, path = rest.partition('/')
+    return host.lower(), path
+
+
+def _url_entity_type(url: str) -> str:
+    host = _split_host(url)[0]
+    if host == 't.me':
+        return 'tme_link'
+    if host == 'telegra.ph':
+        return 'telegraph'
+    return 'url'
+
+
+def tokenize(text: str) -> List[Entity]:
+    """
+    单遍扫描文本，按出现顺序返回实体列表
+
+    Args:
+        text: 待分析的文本
+
+    Returns:
+        Entity 列表
+    """
+    entities = []
+    if not text:
+        return entities
+
+    for match in _TOKEN_RE.finditer(text):
+        group = match.lastgroup
+        if group in ('url', 'bare'):
+            value = match.group(group)
+            entities.append(Entity(_url_entity_type(value), value, match.start(group), match.end(group)))
+        elif group == 'account':
+            entities.append(Entity('account', match.group(group), match.start(), match.end()))
+        else:
+            number = match.group('number')
+            is_phone = not match.group('qq_prefix') and _PHONE_RE.fullmatch(number)
+            entities.append(Entity('phone' if is_phone else 'qq', number,
+                                   match.start('number'), match.end('number')))
+    return entities
+
+
+def classify_tme_link(url: str) -> Optional[Dict]:
+    """
+    解析 t.me 链接类型
+
+    Args:
+        url: t.me 链接（带或不带协议）
+
+    Returns:
+        {'url': 't.me/...', 'type': ..., 'target': ...[, 'message_id': ...]}，无法识别时返回 None
+    """
+    host, path = _split_host(url)
+    if host != 't.me':
+        return None
+    match = _TME_PATH_RE.match(path)
+    if not match:
+        return None
+
+    if match.group('invite'):
+        target = f"+{match.group('invite')}"
+        return {'url': f't.me/{target}', 'type': 't_me_private_invite', 'target': target}
+    if match.group('joinchat'):
+        target = f"joinchat/{match.group('joinchat')}"
+        return {'url': f't.me/{target}', 'type': 't_me_private_invite', 'target': target}
+    if match.group('addlist'):
+        target = f"addlist/{match.group('addlist')}"
+        # 打包群组，归类为邀请类型
+        return {'url': f't.me/{target}', 'type': 't_me_invite', 'target': target}
+
+    name = match.group('name')
+    message_id = match.group('message_id')
+    if message_id:
+        return {'url': f't.me/{name}/{message_id}', 'type': 't_me_channel_msg',
+                'target': name, 'message_id': message_id}
+    return {'url': f't.me/{name}', 'type': 't_me_invite', 'target': name}
+
+
+def telegraph_link(url: str) -> Optional[str]:
+    """将 telegra.ph 链接规范为 https://telegra.ph/<slug>，无文章路径时返回 None"""
+    host, path = _split_host(url)
+    if host != 'telegra.ph':
+        return None
+    match = _TELEGRAPH_PATH_RE.match(path)
+    return f'https://telegra.ph/{match.group(0)}' if match else None
@@ -0,0 +1,353 @@
+"""
+本地IP解析与地理位置查询
+
+1. DnsCache：带TTL的DNS解析缓存（成功/失败分别缓存），同步与异步两种解析方式
+2. OfflineIpGeoDatabase：从本地IP段文件加载到有序数组，bisect 二分查找，
+   不依赖外部接口，结果确定且查询为微秒级
+3. IpApiGeoLookup：在线查询 ip-api.com（免费接口，约45次/分钟），
+   仅在未配置离线库时作为回退
+4. IpGeoResolver：组合以上三者，返回 (ip_address, ip_location)
+
+IP段文件为CSV（可带表头），列顺序兼容 IP2Location LITE：
+    ip_from, ip_to, country_code, country, region, city[, isp[, organization]]
+ip_from/ip_to 可为整数或点分IPv4，仅加载IPv4段。
+
+文件路径由配置项 GEOIP_RANGE_DB_PATH 指定，文件由 scripts/import_ip_geo_ranges.py
+下载并转换生成；未配置或文件不存在时回退到在线查询（进程内只记录一次警告）。
+"""
+
+import asyncio
+import csv
+import ipaddress
+import os
+import socket
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from typing import Dict, Optional, Tuple
+
+import requests
+
+from jd.services.spider.url_analysis_cache import LruCache
+from jd.utils.logging_config import get_logger
+
+logger = get_logger(__name__, {
+    'component': 'spider',
+    'module': 'ip_geo_resolver'
+})
+
+LOCATION_FIELDS = ('country_code', 'country', 'region', 'city', 'isp', 'organization')
+
+# IP 地理位置在线查询服务（免费，无需API key，限制约45次/分钟）
+IP_API_URL = 'http://ip-api.com/json/{ip}?fields=status,country,countryCode,region,regionName,city,isp,org'
+IP_API_MIN_INTERVAL = 1.4
+
+
+def _parse_ipv4(value: str) -> Optional[int]:
+    """将整数或点分格式的IPv4转换为整数，非IPv4返回None"""
+    value = value.strip().strip('"')
+    if value.isdigit():
+        number = int(value)
+        return number if number <= 0xFFFFFFFF else None
+    try:
+        address = ipaddress.ip_address(value)
+    except ValueError:
+        return None
+    return int(address) if address.version == 4 else None
+
+
+class OfflineIpGeoDatabase:
+    """基于IP段有序数组的离线地理位置库"""
+
+    def __init__(self):
+        self._starts = array('I')
+        self._ends = array('I')
+        self._record_ids = array('I')
+        self._records = []
+        self.path = None
+        self.loaded_at = None
+
+    def __len__(self):
+        return len(self._starts)
+
+    def load_file(self, path: str) -> int:
+        """
+        加载IP段CSV文件，替换当前内容
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            加载的IP段数量
+        """
+        started = time.monotonic()
+        rows = []
+        record_index = {}
+        records = []
+
+        with open(path, newline='', encoding='utf-8', errors='ignore') as f:
+            for row in csv.reader(f):
+                if len(row) < 3:
+                    continue
+                ip_from = _parse_ipv4(row[0])
+                ip_to = _parse_ipv4(row[1])
+                if ip_from is None or ip_to is None:
+                    continue  # 表头、IPv6 段
+
+                values = tuple((row[i].strip() or None) if i < len(row) else None
+                               for i in range(2, 2 + len(LOCATION_FIELDS)))
+                if values[0] in (None, '-'):
+                    continue  # 未分配段
+                record_id = record_index.get(values)
+                if record_id is None:
+                    record_id = len(records)
+                    record_index[values] = record_id
+                    records.append(values)
+                rows.append((ip_from, ip_to, record_id))
+
+        rows.sort()
+        self._starts = array('I', (r[0] for r in rows))
+        self._ends = array('I', (r[1] for r in rows))
+        self._record_ids = array('I', (r[2] for r in rows))
+        self._records = records
+        self.path = path
+        self.loaded_at = time.time()
+
+        logger.info("离线IP地理位置库已加载", extra={
+            'extra_fields': {
+                'path': path,
+                'range_count': len(rows),
+                'record_count': len(records),
+                'elapsed_ms': round((time.monotonic() - started) * 1000, 1)
+            }
+        })
+        return len(rows)
+
+    def lookup(self, ip_address: str) -> Dict:
+        """
+        查询IP地理位置
+
+        Args:
+            ip_address: IPv4地址
+
+        Returns:
+            {'country', 'country_code', 'region', 'city', 'isp', 'organization'}，未命中返回空字典
+        """
+        ip_number = _parse_ipv4(ip_address or '')
+        if ip_number is None or not self._starts:
+            return {}
+
+        position = bisect_right(self._starts, ip_number) - 1
+        if position < 0 or ip_number > self._ends[position]:
+            return {}
+        return dict(zip(LOCATION_FIELDS, self._records[self._record_ids[position]]))
+
+
+class DnsCache:
+    """带TTL的DNS解析缓存"""
+
+    def __init__(self, ttl: int = 600, negative_ttl: int = 60, max_entries: int = 20000):
+        """
+        Args:
+            ttl: 解析成功结果的缓存时间（秒）
+            negative_ttl: 解析失败结果的缓存时间（秒）
+            max_entries: 最大缓存条目数
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._cache = LruCache(max_entries)
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def _cached(self, hostname: str):
+        entry = self._cache.get(hostname)
+        if entry is not None:
+            self.stats['hits'] += 1
+        else:
+            self.stats['misses'] += 1
+        return entry
+
+    def _store(self, hostname: str, ip_address: Optional[str], error: Optional[str]):
+        entry = (ip_address, error)
+        self._cache.set(hostname, entry, self.ttl if ip_address else self.negative_ttl)
+        return entry
+
+    def resolve(self, hostname: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        同步解析主机名
+
+        Returns:
+            (ip_address, error)，失败时 ip_address 为 None
+        """
+        entry = self._cached(hostname)
+        if entry is not None:
+            return entry
+        try:
+            return self._store(hostname, socket.gethostbyname(hostname), None)
+        except (OSError, UnicodeError) as e:
+            return self._store(hostname, None, str(e))
+
+    async def resolve_async(self, hostname: str) -> Tuple[Optional[str], Optional[str]]:
+        """异步解析主机名，返回结构同 resolve()"""
+        entry = self._cached(hostname)
+        if entry is not None:
+            return entry
+        try:
+            loop = asyncio.get_running_loop()
+            addr_info = await loop.getaddrinfo(hostname, None, family=socket.AF_INET)
+            return self._store(hostname, addr_info[0][4][0], None)
+        except (OSError, UnicodeError) as e:
+            return self._store(hostname, None, str(e))
+
+
+class IpApiGeoLookup:
+    """ip-api.com 在线地理位置查询（进程内缓存，相邻请求保持最小间隔）"""
+
+    def __init__(self, min_interval: float = IP_API_MIN_INTERVAL, timeout: float = 3,
+                 max_entries: int = 20000):
+        """
+        Args:
+            min_interval: 相邻请求的最小间隔（秒），免费接口限制约45次/分钟
+            timeout: 请求超时（秒）
+            max_entries: 最大缓存条目数
+        """
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self._cache = LruCache(max_entries)
+        self._lock = threading.Lock()
+        self._last_request_at = 0.0
+        self.session = requests.Session()
+
+    @staticmethod
+    def parse(ip_data: Dict) -> Dict:
+        """解析 ip-api.com 返回的地理位置数据，查询失败返回空字典"""
+        if ip_data.get('status') != 'success':
+            return {}
+        return {
+            'country': ip_data.get('country'),
+            'country_code': ip_data.get('countryCode'),
+            'region': ip_data.get('regionName'),
+            'city': ip_data.get('city'),
+            'isp': ip_data.get('isp'),
+            'organization': ip_data.get('org')
+        }
+
+    def lookup(self, ip_address: str) -> Dict:
+        """查询IP地理位置，请求失败返回空字典（不缓存，下次重试）"""
+        location = self._cache.get(ip_address)
+        if location is not None:
+            return location
+
+        with self._lock:
+            wait = self._last_request_at + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_request_at = time.monotonic()
+
+        try:
+            response = self.session.get(IP_API_URL.format(ip=ip_address), timeout=self.timeout)
+            if response.status_code != 200:
+                return {}
+            location = self.parse(response.json())
+        except (requests.RequestException, ValueError) as e:
+            logger.warning("在线IP地理位置查询失败", extra={
+                'extra_fields': {'ip': ip_address, 'error_message': str(e)}
+            })
+            return {}
+        self._cache.set(ip_address, location, 24 * 3600)
+        return location
+
+
+_online_fallback_warned = False
+
+
+class IpGeoResolver:
+    """主机名 -> (IP, 地理位置) 本地解析器"""
+
+    def __init__(self, geo_db_path: str = None, dns_cache: DnsCache = None,
+                 online_fallback: IpApiGeoLookup = None):
+        """
+        Args:
+            geo_db_path: 离线IP段文件路径（配置项 GEOIP_RANGE_DB_PATH）
+            dns_cache: DNS缓存（默认新建）
+            online_fallback: 未加载离线库时使用的在线查询（默认新建 IpApiGeoLookup）
+        """
+        self.dns_cache = dns_cache or DnsCache()
+        self.geo_db = get_offline_ip_geo_database(geo_db_path)
+        self.online = None
+        if self.geo_db is None:
+            self.online = online_fallback or IpApiGeoLookup()
+            _warn_online_fallback(geo_db_path)
+
+    def _check(self, hostname: str, ip_address: Optional[str], error: Optional[str]):
+        if ip_address is None:
+            logger.warning("IP 地址获取失败", extra={
+                'extra_fields': {
+                    'domain': hostname,
+                    'error_message': error
+                }
+            })
+            return False
+        return True
+
+    def lookup(self, hostname: str):
+        """同步解析主机IP及地理位置，返回 (ip_address, ip_location)"""
+        ip_address, error = self.dns_cache.resolve(hostname)
+        if not self._check(hostname, ip_address, error):
+            return None, {'error': error}
+        if self.geo_db is not None:
+            return ip_address, self.geo_db.lookup(ip_address)
+        return ip_address, self.online.lookup(ip_address)
+
+    async def lookup_async(self, hostname: str):
+        """异步解析主机IP及地理位置，返回 (ip_address, ip_location)"""
+        ip_address, error = await self.dns_cache.resolve_async(hostname)
+        if not self._check(hostname, ip_address, error):
+            return None, {'error': error}
+        if self.geo_db is not None:
+            return ip_address, self.geo_db.lookup(ip_address)
+        return ip_address, await asyncio.to_thread(self.online.lookup, ip_address)
+
+
+def _warn_online_fallback(path: Optional[str]) -> None:
+    """未加载离线库时在进程内只记录一次警告"""
+    global _online_fallback_warned
+    if _online_fallback_warned:
+        return
+    _online_fallback_warned = True
+    logger.warning("未加载离线IP地理位置库，回退到在线查询 ip-api.com（约45次/分钟）；"
+                   "请用 scripts/import_ip_geo_ranges.py 生成IP段文件并配置 GEOIP_RANGE_DB_PATH", extra={
+                       'extra_fields': {'path': path}
+                   })
+
+
+_geo_databases = {}
+_geo_databases_lock = threading.Lock()
+
+
+def get_offline_ip_geo_database(path: str = None) -> Optional[OfflineIpGeoDatabase]:
+    """
+    返回进程内共享的离线IP地理位置库（按路径缓存，文件更新后自动重新加载）
+
+    Args:
+        path: IP段文件路径
+
+    Returns:
+        OfflineIpGeoDatabase，路径为空或文件不存在时返回 None
+    """
+    if not path or not os.path.exists(path):
+        if path:
+            logger.warning("离线IP地理位置库文件不存在", extra={
+                'extra_fields': {'path': path}
+            })
+        return None
+
+    mtime = os.path.getmtime(path)
+    with _geo_databases_lock:
+        cached = _geo_databases.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        database = OfflineIpGeoDatabase()
+        database.load_file(path)
+        _geo_databases[path] = (mtime, database)
+        return database
@@ -0,0 +1,217 @@
+"""
+主流域名内存索引
+
+将 mainstream_domains 表（由 scripts/import_tranco_mainstream.py 从 Tranco 导入）
+中启用的域名一次性加载为哈希集合，查询时沿主机名逐级向上匹配父域名，
+直到可注册域名为止（不会匹配到 com、co.uk 这类公共后缀）：
+
+    sub.google.com -> sub.google.com, google.com
+    news.bbc.co.uk -> news.bbc.co.uk, bbc.co.uk
+
+github.io、wordpress.com 这类公共托管后缀本身仍可精确匹配，
+但其下的用户站点（foo.github.io）不会向上继承匹配结果。
+
+每个 worker 进程持有一份索引，定期用一条聚合查询检查数据版本
+（启用域名数量 + 最大ID + 最后更新时间），版本变化时整体重新加载。
+"""
+
+import threading
+import time
+from typing import Iterable, Optional
+
+from jd.utils.logging_config import get_logger
+
+logger = get_logger(__name__, {
+    'component': 'spider',
+    'module': 'mainstream_domain_index'
+})
+
+# 常见的多级注册后缀（单级后缀如 com、cn 一律视为公共后缀），不会出现在索引中
+REGISTRY_SUFFIXES = frozenset({
+    # 英国、日本、韩国等
+    'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'me.uk', 'ltd.uk', 'plc.uk',
+    'co.jp', 'ne.jp', 'or.jp', 'ac.jp', 'go.jp',
+    'co.kr', 'or.kr', 'ne.kr', 'go.kr',
+    # 中国大陆、港澳台
+    'com.cn', 'net.cn', 'org.cn', 'gov.cn', 'edu.cn', 'ac.cn',
+    'com.hk', 'net.hk', 'org.hk', 'edu.hk', 'gov.hk',
+    'com.tw', 'net.tw', 'org.tw', 'edu.tw', 'gov.tw', 'idv.tw',
+    'com.mo',
+    # 东南亚
+    'com.sg', 'edu.sg', 'gov.sg', 'com.my', 'com.ph', 'com.vn', 'co.th', 'in.th',
+    'co.id', 'or.id', 'ac.id', 'go.id', 'web.id',
+    'com.kh', 'com.mm', 'com.la',
+    # 其他地区
+    'com.au', 'net.au', 'org.au', 'edu.au', 'gov.au',
+    'co.nz', 'org.nz', 'co.in', 'net.in', 'org.in', 'gov.in',
+    'com.br', 'net.br', 'org.br', 'gov.br', 'com.mx', 'com.ar', 'com.co',
+    'com.tr', 'gov.tr', 'com.ua', 'com.ru', 'co.za', 'com.eg', 'com.sa', 'com.pk',
+})
+
+# 常见的公共托管后缀：域名本身可以是主流域名（精确匹配），但子域名属于不同的用户
+HOSTING_SUFFIXES = frozenset({
+    'github.io', 'gitlab.io', 'blogspot.com', 'herokuapp.com', 'vercel.app',
+    'netlify.app', 'pages.dev', 'workers.dev', 'web.app', 'firebaseapp.com',
+    'appspot.com', 'azurewebsites.net', 'cloudfront.net', 'wordpress.com',
+})
+
+MULTI_LABEL_PUBLIC_SUFFIXES = REGISTRY_SUFFIXES | HOSTING_SUFFIXES
+
+
+def normalize_host(domain: str) -> str:
+    """标准化主机名：小写、去端口、去首尾点号"""
+    host = (domain or '').strip().lower()
+    if '@' in host:
+        host = host.rsplit('@', 1)[1]
+    if host.startswith('['):
+        return host
+    return host.split(':', 1)[0].strip('.')
+
+
+def is_public_suffix(domain: str) -> bool:
+    """判断域名本身是否为公共后缀"""
+    return '.' not in domain or domain in MULTI_LABEL_PUBLIC_SUFFIXES
+
+
+def registrable_domain(domain: str) -> Optional[str]:
+    """
+    返回主机名对应的可注册域名
+
+    Args:
+        domain: 主机名，如 news.bbc.co.uk
+
+    Returns:
+        可注册域名，如 bbc.co.uk；主机名本身是公共后缀时返回 None
+    """
+    host = normalize_host(domain)
+    if not host or is_public_suffix(host):
+        return None
+    labels = host.split('.')
+    for i in range(len(labels) - 1):
+        if is_public_suffix('.'.join(labels[i + 1:])):
+            return '.'.join(labels[i:])
+    return None
+
+
+class MainstreamDomainIndex:
+    """主流域名哈希索引（覆盖子域名，按数据版本刷新）"""
+
+    def __init__(self, refresh_interval: int = 300):
+        """
+        Args:
+            refresh_interval: 检查数据版本的最小间隔（秒）
+        """
+        self.refresh_interval = refresh_interval
+        self._domains = frozenset()
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self._version
+
+    def load(self, domains: Iterable[str], version=None):
+        """用给定的域名列表替换索引内容"""
+        normalized = set()
+        for domain in domains:
+            host = normalize_host(domain)
+            if host.startswith('www.'):
+                host = host[4:]
+            if host and (host in HOSTING_SUFFIXES or not is_public_suffix(host)):
+                normalized.add(host)
+        self._domains = frozenset(normalized)
+        self._version = version
+
+    def contains(self, domain: str) -> bool:
+        """
+        判断主机名本身或其任一父域名（不超过可注册域名）是否在主流列表中
+
+        主机名本身精确匹配（包括托管后缀 github.io 等），向上查找父域名时遇到公共后缀即停止
+
+        Args:
+            domain: 主机名，可带端口
+
+        Returns:
+            bool
+        """
+        host = normalize_host(domain)
+        domains = self._domains
+        if host in domains:
+            return True
+        while '.' in host:
+            host = host.split('.', 1)[1]
+            if is_public_suffix(host):
+                break
+            if host in domains:
+                return True
+        return False
+
+    def __len__(self):
+        return len(self._domains)
+
+    def ensure_fresh(self, force: bool = False) -> bool:
+        """
+        检查数据版本，变化时从数据库重新加载（需在应用上下文中调用）
+
+        Args:
+            force: 忽略检查间隔立即检查
+
+        Returns:
+            bool: 是否重新加载
+        """
+        now = time.monotonic()
+        if not force and self._version is not None and now - self._checked_at < self.refresh_interval:
+            return False
+
+        with self._lock:
+            if not force and self._version is not None and now - self._checked_at < self.refresh_interval:
+                return False
+
+            version = self._query_version()
+            self._checked_at = now
+            if version == self._version:
+                return False
+
+            started = time.monotonic()
+            self.load(self._query_domains(), version)
+            logger.info("主流域名索引已加载", extra={
+                'extra_fields': {
+                    'domain_count': len(self._domains),
+                    'version': str(version),
+                    'elapsed_ms': round((time.monotonic() - started) * 1000, 1)
+                }
+            })
+            return True
+
+    @staticmethod
+    def _query_version():
+        """用一条聚合查询生成数据版本"""
+        from jd import db
+        from jd.models.mainstream_domain import MainstreamDomain
+
+        count, max_id, max_updated = db.session.query(
+            db.func.count(MainstreamDomain.id),
+            db.func.max(MainstreamDomain.id),
+            db.func.max(MainstreamDomain.updated_at)
+        ).filter(MainstreamDomain.is_active == True).one()
+        return (count, max_id, max_updated.isoformat() if max_updated else None)
+
+    @staticmethod
+    def _query_domains():
+        """只查询域名列"""
+        from jd import db
+        from jd.models.mainstream_domain import MainstreamDomain
+
+        rows = db.session.query(MainstreamDomain.domain).filter(
+            MainstreamDomain.is_active == True
+        ).all()
+        return [row.domain for row in rows]
+
+
+_shared_index = MainstreamDomainIndex()
+
+
+def get_mainstream_domain_index() -> MainstreamDomainIndex:
+    """返回进程内共享的主流域名索引"""
+    return _shared_index
@@ -668,7 +668,8 @@ class TelegramAPIs(object):
                     "id": int,           # 用户ID
                     "username": str,     # 用户名
                     "user_id": int,      # 用户ID（重复）
-                    "unread_count": int  # 未读消息数
+                    "unread_count": int, # 未读消息数
+                    "top_message_id": int  # 对话最新消息ID，用于判断对话是否有新消息
                 }
         """
         result = []
@@ -687,6 +688,7 @@ class TelegramAPIs(object):
                 "username": username,
                 "user_id": user_id,
                 "unread_count": dialog.unread_count,
+                "top_message_id": dialog.message.id if dialog.message else 0,
             }
             result.append(out)
         return result
@@ -738,6 +740,10 @@ class TelegramAPIs(object):
                 - last_message_id (int): 起始消息ID
                 - offset_date (datetime, optional): 起始日期
                 - reverse (bool, optional): 遍历方向，默认False（新到旧），True为旧到新
+                - min_id (int, optional): 只返回ID大于该值的消息，默认0不限制
+                - max_id (int, optional): 只返回ID小于该值的消息，默认0不限制
+                - scan_progress (dict, optional): 由调用方传入，记录Telegram实际返回的消息数
+                  raw_count 与最小消息ID min_message_id（包含不会被yield的服务消息）
                 
         Yields:
             dict: 每条消息的详细信息，包含：
@@ -759,6 +765,9 @@ class TelegramAPIs(object):
         # 默认只能从最远开始爬取
         offset_date = kwargs.get("offset_date", None)
         reverse = kwargs.get("reverse", False)
+        range_min_id = kwargs.get("min_id", 0)
+        range_max_id = kwargs.get("max_id", 0)
+        scan_progress = kwargs.get("scan_progress")
         count = 0
         image_path = os.path.join(app.static_folder, 'images')
         self._ensure_directory(image_path)
@@ -769,9 +778,14 @@ class TelegramAPIs(object):
                 limit=limit,
                 offset_date=offset_date,
                 offset_id=min_id,
+                min_id=range_min_id,
+                max_id=range_max_id,
                 wait_time=1,
                 reverse=reverse,
         ):
+            if scan_progress is not None:
+                scan_progress['raw_count'] = scan_progress.get('raw_count', 0) + 1
+                scan_progress['min_message_id'] = min(scan_progress.get('min_message_id', message.id), message.id)
 
             if isinstance(message, Message):
                 logger.debug(f'message | chat_id:{chat.id}, info:{message.to_dict()}')
@@ -1,8 +1,10 @@
 import os
 import time
+import asyncio
 import hashlib
 import logging
 from telethon.tl.types import DocumentAttributeFilename
+from jd.helpers.photo_thumbnail import generate_thumbnails, get_thumbnail_path
 from jd.jobs.tg_file_info import TgFileInfoManager
 
 logger = logging.getLogger(__name__)
@@ -173,11 +175,18 @@ class TelegramDownloadManager:
                     os.rename(temp_file_path, final_file_path)
             else:
                 unique_file_name = file_name
+
+            # 生成列表展示用的WebP缩略图（CPU密集，放到线程池避免阻塞事件循环）
+            thumbnails = await asyncio.get_running_loop().run_in_executor(
+                None, generate_thumbnails, os.path.join(image_path, unique_file_name)
+            )
             
             photo_data = {
                 'photo_id': photo.id,
                 'access_hash': photo.access_hash,
-                'file_path': f'images/{unique_file_name}'
+                'file_path': f'images/{unique_file_name}',
+                # 缩略图生成失败时为空，列表接口回退为原图
+                'thumb_path': get_thumbnail_path(f'images/{unique_file_name}') if 'medium' in thumbnails else ''
             }
         return photo_data
 
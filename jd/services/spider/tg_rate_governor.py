@@ -0,0 +1,50 @@
+"""
+Telegram请求速率调控器
+
+同一账户下并发运行的多个协程共享一个调控器实例，
+按固定最小间隔分配请求时隙，遇到FloodWait时整体暂停。
+"""
+
+import asyncio
+import time
+
+
+class TgRateGovernor:
+    """按最小间隔分配请求时隙的异步速率调控器"""
+
+    def __init__(self, min_interval: float = 0.5):
+        """
+        Args:
+            min_interval: 相邻两次请求之间的最小间隔（秒）
+        """
+        self.min_interval = max(0.0, min_interval)
+        self._lock = asyncio.Lock()
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self.acquired_count = 0
+        self.waited_seconds = 0.0
+
+    async def acquire(self) -> None:
+        """等待下一个可用时隙"""
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._paused_until)
+            self._next_slot = slot + self.min_interval
+            self.acquired_count += 1
+
+        delay = slot - now
+        if delay > 0:
+            self.waited_seconds += delay
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """收到FloodWait等限流响应时，暂停所有后续时隙分配"""
+        self._paused_until = max(self._paused_until, time.monotonic() + max(0.0, seconds))
+
+    def get_stats(self) -> dict:
+        """返回调控统计信息"""
+        return {
+            'acquired_count': self.acquired_count,
+            'waited_seconds': round(self.waited_seconds, 2),
+            'min_interval': self.min_interval,
+        }
@@ -11,21 +11,35 @@ TmeSpider - 广告追踪系统的核心爬虫服务
 
 核心方法：
 - classify_and_process_url(url) - 推荐使用，自动判断URL类型并处理
+- analyze_urls_batch(urls) - 批量并发处理URL（共享连接池，按域名限速）
 - classify_url_type(url) - 判断URL类型
 - extract_urls(text) - 提取文本中所有URL
+- extract_entities(text) - 单遍提取文本中的全部实体（见 entity_tokenizer）
 
 注意：此服务只负责文本分析和数据提取，返回JSON格式结果，不执行数据库写入操作
 """
 
+import asyncio
 import re
-import socket
-import time
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from urllib.parse import urlparse, urlunparse
 
 import requests
 from bs4 import BeautifulSoup
-
+from requests.adapters import HTTPAdapter
+
+from jd.services.spider.async_http_engine import AsyncHttpEngine
+from jd.services.spider.certificate_probe import CertificateCache, probe_certificate
+from jd.services.spider.entity_tokenizer import (
+    URL_ENTITY_TYPES,
+    Entity,
+    classify_tme_link,
+    telegraph_link,
+    tokenize,
+)
+from jd.services.spider.ip_geo_resolver import IpGeoResolver
+from jd.services.spider.mainstream_domain_index import get_mainstream_domain_index
+from jd.services.spider.url_analysis_cache import UrlAnalysisCache
 from jd.utils.logging_config import get_logger, PerformanceLogger
 
 logger = get_logger(__name__, {
@@ -33,29 +47,69 @@ logger = get_logger(__name__, {
     'module': 'tme_spider'
 })
 
+# 短链接服务域名
+SHORT_URL_SERVICES = [
+    # 国际短链
+    'bit.ly', 'tinyurl.com', 't.co', 'goo.gl', 'ow.ly',
+    'buff.ly', 'is.gd', 'cli.gs', 'short.link', 'rebrand.ly',
+    's.id', 'cutt.ly', 'bitly.com', 'bl.ink', '1url.com',
+    # 中国短链
+    'dwz.cn', 'suo.im', 'mrw.so', 't.cn', 'url.cn',
+    'u.nu', '0rz.tw', 'reurl.cc', 'ppt.cc', '4url.cc'
+]
+
+# 网页标题只读取前10KB内容
+TITLE_MAX_BYTES = 10240
+
 
 class TmeSpider:
     """t.me 链接和广告内容分析爬虫服务"""
 
-    def __init__(self, check_mainstream=True):
+    def __init__(self, check_mainstream=True, max_concurrency=64, per_host_limit=4,
+                 per_host_interval=0.0, url_cache: UrlAnalysisCache = None,
+                 ip_resolver: IpGeoResolver = None, cert_cache: CertificateCache = None):
         """
         初始化爬虫实例
 
         Args:
             check_mainstream: 是否启用主流域名检查（默认启用）
+            max_concurrency: 批量分析时的全局最大并发请求数
+            per_host_limit: 批量分析时单个主机的最大并发请求数
+            per_host_interval: 批量分析时同一主机相邻请求的最小间隔（秒）
+            url_cache: URL分析结果缓存（默认使用进程内LRU + Redis两级缓存）
+            ip_resolver: 本地IP解析器（DNS缓存 + 离线IP地理位置库）
+            cert_cache: 证书缓存（按 host:port，默认进程内LRU + Redis）
         """
         self.timeout = 10
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
 
-        # URL 请求缓存（解决性能问题）
-        self._url_cache = {}  # {normalized_url: {'data': result, 'timestamp': time}}
-        self._cache_ttl = 3600  # 缓存1小时
+        # 同步请求共享 Session，复用连接
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # 批量分析使用的异步引擎参数
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.per_host_interval = per_host_interval
+        self.last_batch_stats = {}
+
+        # 本地IP解析（DNS缓存 + 离线地理位置库，不依赖外部接口）
+        self.ip_resolver = ip_resolver or IpGeoResolver()
+
+        # TLS 证书缓存（按 host:port，TTL不超过证书剩余有效期）
+        self.cert_cache = cert_cache or CertificateCache()
+
+        # URL 分析结果缓存（进程内LRU + Redis，worker间共享）
+        self._url_cache = url_cache or UrlAnalysisCache()
 
         # 主流域名检查相关
         self._check_mainstream = check_mainstream
-        self._mainstream_cache = {}  # {domain: True/False}
+        self._mainstream_index = get_mainstream_domain_index()
 
     # ============================================
     # 1. URL分类与智能处理
@@ -101,27 +155,10 @@ class TmeSpider:
         normalized_url = self.normalize_url(url)
 
         # 检查缓存
-        if normalized_url in self._url_cache:
-            cache_entry = self._url_cache[normalized_url]
-            if time.time() - cache_entry['timestamp'] < self._cache_ttl:
-                logger.debug("URL 缓存命中", extra={
-                    'extra_fields': {
-                        'url': url,
-                        'normalized_url': normalized_url,
-                        'cache_age': time.time() - cache_entry['timestamp']
-                    }
-                })
-                perf_logger.end(success=True, cache_hit=True)
-                return cache_entry['data']
-            else:
-                # 缓存过期，删除
-                logger.debug("URL 缓存已过期", extra={
-                    'extra_fields': {
-                        'normalized_url': normalized_url,
-                        'cache_age': time.time() - cache_entry['timestamp']
-                    }
-                })
-                del self._url_cache[normalized_url]
+        cached = self._get_cached_url_result(normalized_url)
+        if cached is not None:
+            perf_logger.end(success=True, cache_hit=True)
+            return cached
 
         # 缓存未命中，执行处理
         url_type = self.classify_url_type(normalized_url)
@@ -183,21 +220,14 @@ class TmeSpider:
                 result['data'] = {
                     'normalized_url': normalized_url,
                     'phishing': phishing_result,
-                    'website': website_info
+                    'website': website_info,
+                    # 3. 综合分析结果（证书、主流域名），复用已获取的基本信息
+                    'analysis': self.analyze_url(normalized_url, basic_info=website_info,
+                                                 phishing_info=phishing_result)
                 }
 
             # 写入缓存
-            self._url_cache[normalized_url] = {
-                'data': result,
-                'timestamp': time.time()
-            }
-            logger.debug("URL 写入缓存", extra={
-                'extra_fields': {
-                    'normalized_url': normalized_url,
-                    'url_type': url_type,
-                    'has_error': result.get('error') is not None
-                }
-            })
+            self._set_cached_url_result(normalized_url, result)
 
             logger.info("URL 处理完成", extra={
                 'extra_fields': {
@@ -223,6 +253,26 @@ class TmeSpider:
 
         return result
 
+    def _get_cached_url_result(self, normalized_url: str) -> Optional[Dict]:
+        """读取URL处理结果缓存，未命中或已过期返回None"""
+        cached = self._url_cache.get(normalized_url)
+        if cached is not None:
+            logger.debug("URL 缓存命中", extra={
+                'extra_fields': {'normalized_url': normalized_url}
+            })
+        return cached
+
+    def _set_cached_url_result(self, normalized_url: str, result: Dict):
+        """写入URL处理结果缓存，TTL按成功/重定向/失败区分"""
+        self._url_cache.set(normalized_url, result)
+        logger.debug("URL 写入缓存", extra={
+            'extra_fields': {
+                'normalized_url': normalized_url,
+                'url_type': result.get('url_type'),
+                'has_error': result.get('error') is not None
+            }
+        })
+
     def extract_urls(self, text: str) -> List[str]:
         """
         提取文本中的所有URL（包括 t.me 和 telegra.ph）
@@ -231,19 +281,37 @@ class TmeSpider:
             text: 待分析的文本内容
 
         Returns:
-            URL列表（已去重）
+            URL列表（已去重，保持出现顺序）
         """
-        urls = []
+        return self.extract_urls_and_accounts(text)[0]
 
-        # 匹配带协议的URL
-        url_pattern_with_protocol = r'https?://[^\s<>"{}|\\^`\[\]]+'
-        urls.extend(re.findall(url_pattern_with_protocol, text))
+    def extract_entities(self, text: str) -> List[Entity]:
+        """
+        单遍提取文本中的全部实体（URL、t.me链接、Telegraph链接、@账户、手机号、QQ号）
 
-        # 匹配不带协议的URL
-        url_pattern_without_protocol = r'(?:(?:www\.)|(?:[a-zA-Z0-9-]+\.)+[a-zA-Z]{2,})(?:/[^\s]*)?'
-        urls.extend(re.findall(url_pattern_without_protocol, text))
+        Args:
+            text: 待分析的文本内容
+
+        Returns:
+            Entity(type, value, start, end) 列表，按出现顺序
+        """
+        return tokenize(text)
 
-        return list(set(urls))  # 去重
+    def extract_urls_and_accounts(self, text: str) -> Tuple[List[str], List[str]]:
+        """
+        单遍提取URL与Telegram账户，等价于分别调用 extract_urls() 和 extract_telegram_accounts()
+
+        Returns:
+            (URL列表, 账户列表)
+        """
+        urls = []
+        accounts = []
+        for entity in tokenize(text):
+            if entity.type in URL_ENTITY_TYPES:
+                urls.append(entity.value)
+            elif entity.type == 'account' and self._is_tme_username(entity.value):
+                accounts.append(entity.value)
+        return list(dict.fromkeys(urls)), accounts
 
     def check_phishing_url(self, url: str) -> Dict:
         """
@@ -357,23 +425,13 @@ class TmeSpider:
             domain = parsed.netloc
 
             # 1. 检测短链接服务
-            short_url_services = [
-                # 国际短链
-                'bit.ly', 'tinyurl.com', 't.co', 'goo.gl', 'ow.ly',
-                'buff.ly', 'is.gd', 'cli.gs', 'short.link', 'rebrand.ly',
-                's.id', 'cutt.ly', 'bitly.com', 'bl.ink', '1url.com',
-                # 中国短链
-                'dwz.cn', 'suo.im', 'mrw.so', 't.cn', 'url.cn',
-                'u.nu', '0rz.tw', 'reurl.cc', 'ppt.cc', '4url.cc'
-            ]
-            is_short_url = any(service in domain.lower() for service in short_url_services)
+            is_short_url = self._is_short_url_domain(domain)
 
             # 2. 发送GET请求获取完整信息（包含重定向跟踪）
-            response = requests.get(
+            response = self.session.get(
                 url,
                 timeout=self.timeout,
                 stream=True,
-                headers=self.headers,
                 allow_redirects=True
             )
 
@@ -384,48 +442,15 @@ class TmeSpider:
             content = b''
             for chunk in response.iter_content(chunk_size=1024):
                 content += chunk
-                if len(content) >= 10240:  # 10KB
+                if len(content) >= TITLE_MAX_BYTES:
                     break
+            response.close()
 
             # 提取网页标题
-            title_match = re.search(
-                r'<title[^>]*>([^<]+)</title>',
-                content.decode('utf-8', errors='ignore'),
-                re.IGNORECASE
-            )
-            title = title_match.group(1).strip() if title_match else None
+            title = self._extract_html_title(content)
 
-            # 3. 获取网站IP地址
-            ip_address = None
-            ip_location = {}
-            try:
-                ip_address = socket.gethostbyname(final_parsed.netloc)
-
-                # 使用IP地理位置查询服务（免费API）
-                # ip-api.com (免费，无需API key)
-                ip_api_url = f'http://ip-api.com/json/{ip_address}?fields=status,country,countryCode,region,regionName,city,isp,org'
-                ip_response = requests.get(ip_api_url, timeout=3)
-                if ip_response.status_code == 200:
-                    ip_data = ip_response.json()
-                    if ip_data.get('status') == 'success':
-                        ip_location = {
-                            'country': ip_data.get('country'),
-                            'country_code': ip_data.get('countryCode'),
-                            'region': ip_data.get('regionName'),
-                            'city': ip_data.get('city'),
-                            'isp': ip_data.get('isp'),
-                            'organization': ip_data.get('org')
-                        }
-            except (socket.gaierror, requests.RequestException) as e:
-                logger.warning("IP 地址获取失败", extra={
-                    'extra_fields': {
-                        'domain': final_parsed.netloc,
-                        'error_type': type(e).__name__,
-                        'error_message': str(e)
-                    }
-                })
-                ip_address = None
-                ip_location = {'error': str(e)}
+            # 3. 获取网站IP地址及地理位置（本地DNS缓存 + 离线IP库）
+            ip_address, ip_location = self.ip_resolver.lookup(final_parsed.hostname or final_parsed.netloc)
 
             result = {
                 'domain': final_parsed.netloc,
@@ -491,9 +516,25 @@ class TmeSpider:
             perf_logger.end(success=False, error=str(e))
             return {'error': f'unexpected: {str(e)}', 'domain': urlparse(url).netloc}
 
+    @staticmethod
+    def _is_short_url_domain(domain: str) -> bool:
+        """判断域名是否属于短链接服务"""
+        domain_lower = (domain or '').lower()
+        return any(service in domain_lower for service in SHORT_URL_SERVICES)
+
+    @staticmethod
+    def _extract_html_title(content: bytes) -> Optional[str]:
+        """从网页内容中提取标题"""
+        title_match = re.search(
+            r'<title[^>]*>([^<]+)</title>',
+            content.decode('utf-8', errors='ignore'),
+            re.IGNORECASE
+        )
+        return title_match.group(1).strip() if title_match else None
+
     def _get_certificate_info(self, url: str) -> Dict:
         """
-        获取网站的 SSL 证书信息
+        获取网站的 SSL 证书信息（按 host:port 缓存，同一主机每天最多握手一次）
 
         Args:
             url: 待分析的URL
@@ -503,55 +544,18 @@ class TmeSpider:
                 'issuer': str,           # 证书颁发者
                 'valid_from': str,       # 证书有效期开始
                 'valid_to': str,         # 证书有效期结束
-                'error': str             # 错误信息（如果有）
+                'verified': bool,        # 证书链是否通过系统CA校验
+                'verify_error': str,     # 校验失败原因（自签名、过期等，仅校验失败时）
+                'error': str             # 错误信息（握手失败时）
             }
         """
         try:
-            import ssl
-            from datetime import datetime
-
-            # 确保使用 https
-            if not url.startswith('https://'):
-                # 尝试转换为 https
-                parsed = urlparse(url)
-                url = f'https://{parsed.netloc}{parsed.path}'
-
-            parsed = urlparse(url)
-            hostname = parsed.hostname or parsed.netloc.split(':')[0]
-
-            # 创建 SSL 上下文
-            context = ssl.create_default_context()
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_NONE
-
-            # 获取证书信息
-            with context.wrap_socket(socket.socket(), server_hostname=hostname) as sock:
-                try:
-                    sock.connect((hostname, 443))
-                    cert = sock.getpeercert()
-
-                    if cert:
-                        # 解析证书主题
-                        issuer = ''
-                        if 'issuer' in cert:
-                            issuer_tuple = cert['issuer']
-                            if issuer_tuple and len(issuer_tuple) > 0:
-                                issuer_dict = dict(x[0] for x in issuer_tuple)
-                                issuer = issuer_dict.get('organizationName', '')
-
-                        # 解析有效期
-                        valid_from = cert.get('notBefore', '')
-                        valid_to = cert.get('notAfter', '')
-
-                        return {
-                            'issuer': issuer,
-                            'valid_from': valid_from,
-                            'valid_to': valid_to
-                        }
-                except socket.timeout:
-                    return {'error': 'connection_timeout'}
-                except Exception as e:
-                    return {'error': f'certificate_fetch_failed: {str(e)}'}
+            key = self._certificate_key(url)
+            cert_info = self.cert_cache.get(key)
+            if cert_info is None:
+                cert_info = probe_certificate(key[0], key[1], self.timeout)
+                self.cert_cache.set(key, cert_info)
+            return cert_info
         except Exception as e:
             logger.warning("SSL 证书获取失败", extra={
                 'extra_fields': {
@@ -562,7 +566,17 @@ class TmeSpider:
             })
             return {'error': f'ssl_error: {str(e)}'}
 
-    def analyze_url(self, url: str) -> Dict:
+    @staticmethod
+    def _certificate_key(url: str):
+        """证书缓存键 (host, port)，非 https 地址按 443 端口探测"""
+        if not url.startswith(('http://', 'https://')):
+            url = 'https://' + url
+        parsed = urlparse(url)
+        hostname = (parsed.hostname or parsed.netloc.split(':')[0]).lower()
+        port = parsed.port if parsed.scheme == 'https' and parsed.port else 443
+        return hostname, port
+
+    def analyze_url(self, url: str, basic_info: Dict = None, phishing_info: Dict = None) -> Dict:
         """
         综合分析 URL 的详细信息（为广告追踪优化）
 
@@ -570,6 +584,8 @@ class TmeSpider:
 
         Args:
             url: 待分析的URL
+            basic_info: 已获取的网站基本信息（可选，避免重复请求）
+            phishing_info: 已获取的钓鱼检测结果（可选）
 
         Returns:
             {
@@ -590,16 +606,34 @@ class TmeSpider:
         """
         try:
             # 1. 获取网站基本信息
-            basic_info = self.get_website_basic_info(url)
+            if basic_info is None:
+                basic_info = self.get_website_basic_info(url)
 
             # 2. 检查钓鱼网站
-            phishing_info = self.check_phishing_url(url)
+            if phishing_info is None:
+                phishing_info = self.check_phishing_url(url)
 
             # 3. 获取 SSL 证书信息
             cert_info = {}
             if url.startswith('https://') or url.startswith('http://'):
                 cert_info = self._get_certificate_info(url)
 
+            return self._build_url_analysis(url, basic_info, phishing_info, cert_info)
+
+        except Exception as e:
+            logger.error("URL 综合分析失败", extra={
+                'extra_fields': {
+                    'url': url,
+                    'error_type': type(e).__name__,
+                    'error_message': str(e)
+                }
+            }, exc_info=True)
+            return self._empty_url_analysis(str(e))
+
+    def _build_url_analysis(self, url: str, basic_info: Dict, phishing_info: Dict,
+                            cert_info: Dict) -> Dict:
+        """合并基本信息、钓鱼检测、证书信息并完成主流域名检查"""
+        try:
             # 4. 提取 Server 信息（如果可用）
             server_info = ''
             # Server 信息可能在 HTTP 响应头中，但 get_website_basic_info 没有返回
@@ -649,21 +683,26 @@ class TmeSpider:
                     'error_message': str(e)
                 }
             }, exc_info=True)
-            return {
-                'error': str(e),
-                'domain': None,
-                'title': None,
-                'status_code': None,
-                'content_type': '',
-                'server': '',
-                'ip_address': None,
-                'ip_location': {},
-                'is_short_url': False,
-                'redirect_chain_length': 0,
-                'phishing': {},
-                'certificate': {},
-                'is_mainstream': None
-            }
+            return self._empty_url_analysis(str(e))
+
+    @staticmethod
+    def _empty_url_analysis(error: str) -> Dict:
+        """综合分析失败时的默认结果"""
+        return {
+            'error': error,
+            'domain': None,
+            'title': None,
+            'status_code': None,
+            'content_type': '',
+            'server': '',
+            'ip_address': None,
+            'ip_location': {},
+            'is_short_url': False,
+            'redirect_chain_length': 0,
+            'phishing': {},
+            'certificate': {},
+            'is_mainstream': None
+        }
 
     # ============================================
     # 2. Telegram账户识别
@@ -679,10 +718,12 @@ class TmeSpider:
         Returns:
             Telegram账户列表（包含@符号）
         """
-        # @开头，后跟字母数字下划线，长度5-32
-        pattern = r'@([a-zA-Z0-9_]{5,32})'
-        accounts = re.findall(pattern, text)
-        return ['@' + acc for acc in accounts]
+        return self.extract_urls_and_accounts(text)[1]
+
+    @staticmethod
+    def _is_tme_username(account: str) -> bool:
+        """@开头，后跟字母数字下划线，长度5-32"""
+        return not account.startswith('@+') and 5 <= len(account) - 1 <= 32
 
     def convert_account_to_tme_url(self, account: str) -> str:
         """
@@ -724,24 +765,13 @@ class TmeSpider:
             if not account.startswith('@'):
                 account = '@' + account
 
-            # 提取用户名（不带@）
-            username = account.lstrip('@')
-
             # 转换为 t.me URL
             tme_url = self.convert_account_to_tme_url(account)
 
             # 获取预览信息
             preview = self.fetch_tme_preview(tme_url)
 
-            result = {
-                'account': account,
-                'username': username,
-                'tme_url': tme_url,
-                'preview': preview,
-                'error': preview.get('error') if 'error' in preview else None
-            }
-
-            return result
+            return self._build_account_analysis(account, tme_url, preview)
 
         except Exception as e:
             logger.error("Telegram 账户分析失败", extra={
@@ -759,6 +789,17 @@ class TmeSpider:
                 'error': str(e)
             }
 
+    @staticmethod
+    def _build_account_analysis(account: str, tme_url: str, preview: Dict) -> Dict:
+        """组装账户分析结果，结构见 analyze_telegram_account()"""
+        return {
+            'account': account,
+            'username': account.lstrip('@'),
+            'tme_url': tme_url,
+            'preview': preview,
+            'error': preview.get('error') if 'error' in preview else None
+        }
+
     # ============================================
     # 3. t.me链接识别与爬虫解析
     # ============================================
@@ -781,56 +822,14 @@ class TmeSpider:
             ]
         """
         results = []
-
-        # 1. 私有频道邀请：t.me/+xxxx
-        private_invite_pattern = r't\.me/\+([a-zA-Z0-9_-]+)'
-        for match in re.finditer(private_invite_pattern, text):
-            results.append({
-                'url': f't.me/+{match.group(1)}',
-                'type': 't_me_private_invite',
-                'target': f'+{match.group(1)}'
-            })
-
-        # 2. 旧版私有群组：t.me/joinchat/xxxx
-        joinchat_pattern = r't\.me/joinchat/([a-zA-Z0-9_-]+)'
-        for match in re.finditer(joinchat_pattern, text):
-            results.append({
-                'url': f't.me/joinchat/{match.group(1)}',
-                'type': 't_me_private_invite',
-                'target': f'joinchat/{match.group(1)}'
-            })
-
-        # 3. 频道/群组中的具体消息：t.me/username/123
-        message_pattern = r't\.me/([a-zA-Z0-9_]+)/(\d+)'
-        for match in re.finditer(message_pattern, text):
-            results.append({
-                'url': f't.me/{match.group(1)}/{match.group(2)}',
-                'type': 't_me_channel_msg',
-                'target': match.group(1),
-                'message_id': match.group(2)
-            })
-
-        # 4. 打包群组：t.me/addlist/xxxx
-        addlist_pattern = r't\.me/addlist/([a-zA-Z0-9_-]+)'
-        for match in re.finditer(addlist_pattern, text):
-            results.append({
-                'url': f't.me/addlist/{match.group(1)}',
-                'type': 't_me_invite',  # 归类为邀请类型
-                'target': f'addlist/{match.group(1)}'
-            })
-
-        # 5. 公开用户名/频道/群组：t.me/username
-        # （排除已经匹配的其他类型）
-        public_pattern = r't\.me/(?!joinchat|addlist|\+)([a-zA-Z0-9_]+)(?!/\d+)'
-        for match in re.finditer(public_pattern, text):
-            # 检查是否已经被其他模式匹配
-            if not any(r['target'] == match.group(1) for r in results):
-                results.append({
-                    'url': f't.me/{match.group(1)}',
-                    'type': 't_me_invite',
-                    'target': match.group(1)
-                })
-
+        seen = set()
+        for entity in tokenize(text):
+            if entity.type != 'tme_link':
+                continue
+            link = classify_tme_link(entity.value)
+            if link and link['url'] not in seen:
+                seen.add(link['url'])
+                results.append(link)
         return results
 
     def fetch_tme_preview(self, tme_url: str) -> Dict:
@@ -855,7 +854,7 @@ class TmeSpider:
             if not tme_url.startswith(('http://', 'https://')):
                 tme_url = 'https://' + tme_url
 
-            response = requests.get(tme_url, headers=self.headers, timeout=self.timeout)
+            response = self.session.get(tme_url, timeout=self.timeout)
 
             if response.status_code != 200:
                 logger.error("t.me 链接访问失败", extra={
@@ -866,51 +865,7 @@ class TmeSpider:
                 })
                 return {'error': f'HTTP {response.status_code}'}
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # 提取基本信息
-            result = {}
-
-            # 提取名称
-            title_tag = soup.find('div', class_='tgme_page_title')
-            result['name'] = title_tag.get_text(strip=True) if title_tag else None
-
-            # 提取用户名
-            username_tag = soup.find('div', class_='tgme_page_extra')
-            result['username'] = username_tag.get_text(strip=True) if username_tag else None
-
-            # 提取头像
-            avatar_tag = soup.find('img', class_='tgme_page_photo_image')
-            result['avatar'] = avatar_tag.get('src') if avatar_tag else None
-
-            # 提取描述
-            desc_tag = soup.find('div', class_='tgme_page_description')
-            result['desc'] = desc_tag.get_text(strip=True) if desc_tag else None
-
-            # 提取成员数
-            members_tag = soup.find('div', class_='tgme_page_extra')
-            if members_tag:
-                members_text = members_tag.get_text()
-                # 尝试从文本中提取数字
-                members_match = re.search(r'([\d\s]+)\s*(members|subscribers)', members_text, re.IGNORECASE)
-                if members_match:
-                    members_str = members_match.group(1).replace(' ', '')
-                    result['members'] = int(members_str)
-                else:
-                    result['members'] = None
-            else:
-                result['members'] = None
-
-            # 判断类型
-            desc_text = result.get('desc') or ''
-            if 'channel' in response.url.lower() or 'Channel' in desc_text:
-                result['type'] = 'channel'
-            elif 'group' in response.url.lower() or 'Group' in desc_text:
-                result['type'] = 'group'
-            else:
-                result['type'] = 'user'
-
-            return result
+            return self._parse_tme_preview(response.text, response.url)
 
         except requests.Timeout:
             logger.error("t.me 链接请求超时", extra={
@@ -929,6 +884,63 @@ class TmeSpider:
             }, exc_info=True)
             return {'error': str(e)}
 
+    def _parse_tme_preview(self, html: str, final_url: str) -> Dict:
+        """
+        解析t.me预览页面
+
+        Args:
+            html: 页面内容
+            final_url: 跟随重定向后的地址
+
+        Returns:
+            预览信息，结构同 fetch_tme_preview()
+        """
+        soup = BeautifulSoup(html, 'html.parser')
+
+        # 提取基本信息
+        result = {}
+
+        # 提取名称
+        title_tag = soup.find('div', class_='tgme_page_title')
+        result['name'] = title_tag.get_text(strip=True) if title_tag else None
+
+        # 提取用户名
+        username_tag = soup.find('div', class_='tgme_page_extra')
+        result['username'] = username_tag.get_text(strip=True) if username_tag else None
+
+        # 提取头像
+        avatar_tag = soup.find('img', class_='tgme_page_photo_image')
+        result['avatar'] = avatar_tag.get('src') if avatar_tag else None
+
+        # 提取描述
+        desc_tag = soup.find('div', class_='tgme_page_description')
+        result['desc'] = desc_tag.get_text(strip=True) if desc_tag else None
+
+        # 提取成员数
+        members_tag = soup.find('div', class_='tgme_page_extra')
+        if members_tag:
+            members_text = members_tag.get_text()
+            # 尝试从文本中提取数字
+            members_match = re.search(r'([\d\s]+)\s*(members|subscribers)', members_text, re.IGNORECASE)
+            if members_match:
+                members_str = members_match.group(1).replace(' ', '')
+                result['members'] = int(members_str)
+            else:
+                result['members'] = None
+        else:
+            result['members'] = None
+
+        # 判断类型
+        desc_text = result.get('desc') or ''
+        if 'channel' in final_url.lower() or 'Channel' in desc_text:
+            result['type'] = 'channel'
+        elif 'group' in final_url.lower() or 'Group' in desc_text:
+            result['type'] = 'group'
+        else:
+            result['type'] = 'user'
+
+        return result
+
     # ============================================
     # 4. 主流域名检查（为标签处理服务）
     # ============================================
@@ -937,10 +949,8 @@ class TmeSpider:
         """
         检查域名是否为主流域名
 
-        此方法涉及数据库查询，但作为 Services 层的一部分是合理的，因为：
-        1. Services 层允许进行数据库查询（只要不涉及写入）
-        2. 这个功能可被多个 Job 复用，提高代码复用性
-        3. 与 analyze_url() 紧密相关，都是网站分析的一部分
+        使用进程内共享的主流域名索引（按数据版本定期从数据库刷新），
+        子域名按父域名匹配：sub.google.com 命中 google.com
 
         Args:
             domain: 域名
@@ -951,26 +961,9 @@ class TmeSpider:
         if not self._check_mainstream:
             return None  # 检查未启用
 
-        domain_lower = domain.lower().strip()
-
-        # 检查缓存
-        if domain_lower in self._mainstream_cache:
-            return self._mainstream_cache[domain_lower]
-
-        # 查询数据库（延迟导入，避免循环导入）
         try:
-            from jd.models.mainstream_domain import MainstreamDomain
-
-            result = MainstreamDomain.query.filter_by(
-                domain=domain_lower,
-                is_active=True
-            ).first()
-
-            is_mainstream = result is not None
-
-            # 缓存结果
-            self._mainstream_cache[domain_lower] = is_mainstream
-            return is_mainstream
+            self._mainstream_index.ensure_fresh()
+            return self._mainstream_index.contains(domain)
 
         except Exception as e:
             logger.warning("主流域名检查失败", extra={
@@ -1122,9 +1115,8 @@ class TmeSpider:
         Returns:
             Telegraph链接列表
         """
-        pattern = r'telegra\.ph/[a-zA-Z0-9\-]+'
-        links = re.findall(pattern, text)
-        return ['https://' + link for link in links]
+        links = (telegraph_link(entity.value) for entity in tokenize(text) if entity.type == 'telegraph')
+        return [link for link in links if link]
 
     def fetch_telegraph_content(self, url: str) -> Dict:
         """
@@ -1142,26 +1134,8 @@ class TmeSpider:
             }
         """
         try:
-            response = requests.get(url, timeout=self.timeout)
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # 提取标题
-            title = soup.find('h1')
-            title_text = title.text if title else ''
-
-            # 提取正文
-            article = soup.find('article')
-            content = article.get_text(separator='\n') if article else ''
-
-            # 提取图片
-            images = [img['src'] for img in soup.find_all('img') if img.get('src')]
-
-            return {
-                'url': url,
-                'title': title_text,
-                'content': content,
-                'images': images
-            }
+            response = self.session.get(url, timeout=self.timeout)
+            return self._parse_telegraph_content(url, response.text)
         except Exception as e:
             logger.error("Telegraph 内容获取失败", extra={
                 'extra_fields': {
@@ -1172,6 +1146,29 @@ class TmeSpider:
             }, exc_info=True)
             return {'url': url, 'error': str(e)}
 
+    @staticmethod
+    def _parse_telegraph_content(url: str, html: str) -> Dict:
+        """解析Telegraph页面内容，结构同 fetch_telegraph_content()"""
+        soup = BeautifulSoup(html, 'html.parser')
+
+        # 提取标题
+        title = soup.find('h1')
+        title_text = title.text if title else ''
+
+        # 提取正文
+        article = soup.find('article')
+        content = article.get_text(separator='\n') if article else ''
+
+        # 提取图片
+        images = [img['src'] for img in soup.find_all('img') if img.get('src')]
+
+        return {
+            'url': url,
+            'title': title_text,
+            'content': content,
+            'images': images
+        }
+
     def analyze_telegraph_content(self, content_data: Dict) -> Dict:
         """
         分析Telegraph内容的违规程度
@@ -1203,3 +1200,363 @@ class TmeSpider:
             'analysis_method': 'not_implemented',
             'note': 'Content analysis not implemented yet. Please integrate with auto-tagging system.'
         }
+
+    # ============================================
+    # 6. 批量并发URL分析
+    # ============================================
+
+    def analyze_urls_batch(self, urls: List[str]) -> Dict[str, Dict]:
+        """
+        批量分析URL（并发执行，结果写入URL缓存）
+
+        同一批URL共享一个异步HTTP引擎：同主机复用连接，全局并发和按域名限速
+        由引擎控制，整批耗时取决于带宽，而不是各请求超时之和。
+
+        注意：内部使用 asyncio.run()，需在没有运行中事件循环的线程调用（如 Job、Celery 任务）
+
+        Args:
+            urls: URL列表（可重复，按标准化URL去重）
+
+        Returns:
+            {原始url: 处理结果}，处理结果结构同 classify_and_process_url()
+            （original_url 为调用方传入的URL），
+            普通URL的 data['analysis'] 为 analyze_url() 结构的综合分析结果
+        """
+        perf_logger = PerformanceLogger()
+        perf_logger.start('analyze_urls_batch', url_count=len(urls))
+
+        grouped = {}  # {normalized_url: [原始url, ...]}
+        for url in urls:
+            if url:
+                grouped.setdefault(self.normalize_url(url), []).append(url)
+
+        # 两级缓存批量查询（进程内LRU + Redis）
+        cached = self._url_cache.get_many(list(grouped))
+        results = {}
+        for normalized_url, result in cached.items():
+            for url in grouped[normalized_url]:
+                results[url] = {**result, 'original_url': url}
+
+        cache_hits = len(cached)
+        pending = [normalized_url for normalized_url in grouped if normalized_url not in cached]
+        if pending:
+            # 证书按 host:port 缓存，整批一次性查询
+            cert_keys = {self._certificate_key(url) for url in pending
+                         if self.classify_url_type(url) == 'general'}
+            known_certs = self.cert_cache.get_many(list(cert_keys))
+
+            fetched, probed_certs = asyncio.run(self._process_urls_async(pending, known_certs))
+            self.cert_cache.set_many(probed_certs)
+            for result in fetched.values():
+                # 主流域名检查涉及数据库查询，在调用线程中完成
+                self._finalize_batch_result(result)
+            self._url_cache.set_many(fetched)
+            for normalized_url, result in fetched.items():
+                for url in grouped[normalized_url]:
+                    results[url] = {**result, 'original_url': url}
+
+        logger.info("批量 URL 分析完成", extra={
+            'extra_fields': {
+                'url_count': len(urls),
+                'unique_fetched': len(pending),
+                'cache_hits': cache_hits,
+                'engine_stats': self.last_batch_stats,
+                'cache_stats': self._url_cache.get_stats()
+            }
+        })
+        perf_logger.end(success=True, unique_fetched=len(pending), cache_hits=cache_hits)
+        return results
+
+    def analyze_telegram_accounts_batch(self, accounts: List[str]) -> Dict[str, Dict]:
+        """
+        批量分析 Telegram 账户（并发抓取 t.me 预览）
+
+        注意：内部使用 asyncio.run()，需在没有运行中事件循环的线程调用
+
+        Args:
+            accounts: 账户列表（@username 或 username，按用户名去重）
+
+        Returns:
+            {原始账户: 分析结果}，分析结果结构同 analyze_telegram_account()
+        """
+        grouped = {}  # {'@username': [原始账户, ...]}
+        for account in accounts:
+            if account:
+                grouped.setdefault('@' + account.lstrip('@'), []).append(account)
+        if not grouped:
+            return {}
+
+        analyses = asyncio.run(self._analyze_accounts_async(list(grouped)))
+        results = {}
+        for account, analysis in analyses.items():
+            for original in grouped[account]:
+                results[original] = analysis
+
+        logger.info("批量 Telegram 账户分析完成", extra={
+            'extra_fields': {
+                'account_count': len(accounts),
+                'unique_fetched': len(grouped),
+                'engine_stats': self.last_batch_stats
+            }
+        })
+        return results
+
+    async def _analyze_accounts_async(self, accounts: List[str]) -> Dict[str, Dict]:
+        """使用共享异步引擎并发抓取一批账户（'@username'）的 t.me 预览"""
+        engine = AsyncHttpEngine(
+            max_concurrency=self.max_concurrency,
+            per_host_limit=self.per_host_limit,
+            per_host_interval=self.per_host_interval,
+            timeout=self.timeout,
+            headers=self.headers
+        )
+
+        async def analyze(account):
+            tme_url = self.convert_account_to_tme_url(account)
+            try:
+                preview = await self._fetch_tme_preview_async(engine, tme_url)
+            except Exception as e:
+                logger.error("Telegram 账户分析失败", extra={
+                    'extra_fields': {
+                        'account': account,
+                        'error_type': type(e).__name__,
+                        'error_message': str(e)
+                    }
+                }, exc_info=True)
+                preview = {'error': str(e)}
+            return self._build_account_analysis(account, tme_url, preview)
+
+        async with engine:
+            analyses = await asyncio.gather(*(analyze(account) for account in accounts))
+        self.last_batch_stats = engine.get_stats()
+        return dict(zip(accounts, analyses))
+
+    async def _process_urls_async(self, normalized_urls: List[str], known_certs: Dict):
+        """
+        使用共享异步引擎并发处理一批已标准化的URL
+
+        Args:
+            normalized_urls: 已标准化的URL列表
+            known_certs: 已缓存的证书信息 {(host, port): info}
+
+        Returns:
+            ({normalized_url: 处理结果}, 本批新探测的证书 {(host, port): info})
+        """
+        engine = AsyncHttpEngine(
+            max_concurrency=self.max_concurrency,
+            per_host_limit=self.per_host_limit,
+            per_host_interval=self.per_host_interval,
+            timeout=self.timeout,
+            headers=self.headers
+        )
+        ip_tasks = {}  # {hostname: Future}，同一主机只解析一次
+        cert_tasks = {key: self._completed_future(info) for key, info in known_certs.items()}
+        async with engine:
+            results = await asyncio.gather(*(
+                self._process_url_async(engine, url, ip_tasks, cert_tasks) for url in normalized_urls
+            ))
+        self.last_batch_stats = engine.get_stats()
+
+        probed_certs = {key: task.result() for key, task in cert_tasks.items()
+                        if key not in known_certs}
+        return dict(zip(normalized_urls, results)), probed_certs
+
+    @staticmethod
+    def _completed_future(value):
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(value)
+        return future
+
+    async def _process_url_async(self, engine: AsyncHttpEngine, normalized_url: str,
+                                 ip_tasks: Dict, cert_tasks: Dict) -> Dict:
+        """异步处理单个URL，结果结构同 classify_and_process_url()"""
+        url_type = self.classify_url_type(normalized_url)
+        result = {
+            'url_type': url_type,
+            'original_url': normalized_url,
+            'data': {},
+            'error': None
+        }
+
+        try:
+            if url_type == 'tme':
+                tme_links = self.extract_and_classify_tme_links(normalized_url)
+                if tme_links:
+                    preview_data = await self._fetch_tme_preview_async(engine, normalized_url)
+                    result['data'] = {
+                        'classification': tme_links[0],
+                        'preview': preview_data
+                    }
+                else:
+                    result['error'] = 'Failed to classify t.me link'
+
+            elif url_type == 'telegraph':
+                content_data = await self._fetch_telegraph_content_async(engine, normalized_url)
+                if 'error' not in content_data:
+                    result['data'] = {
+                        'content': content_data,
+                        'analysis': self.analyze_telegraph_content(content_data)
+                    }
+                else:
+                    result['error'] = content_data.get('error')
+
+            else:
+                phishing_result = self.check_phishing_url(normalized_url)
+
+                # 证书探测与内容抓取并行，同一 host:port 在批次内只握手一次
+                cert_key = self._certificate_key(normalized_url)
+                cert_task = cert_tasks.get(cert_key)
+                if cert_task is None:
+                    cert_task = asyncio.ensure_future(engine.probe_certificate(*cert_key))
+                    cert_tasks[cert_key] = cert_task
+                website_info = await self._get_website_basic_info_async(engine, normalized_url, ip_tasks)
+                cert_info = await cert_task
+
+                if 'error' in website_info:
+                    result['error'] = website_info.get('error')
+
+                result['data'] = {
+                    'normalized_url': normalized_url,
+                    'phishing': phishing_result,
+                    'website': website_info,
+                    'certificate': cert_info
+                }
+
+        except Exception as e:
+            logger.error("URL 异步处理失败", extra={
+                'extra_fields': {
+                    'url': normalized_url,
+                    'url_type': url_type,
+                    'error_type': type(e).__name__,
+                    'error_message': str(e)
+                }
+            }, exc_info=True)
+            result['error'] = str(e)
+
+        return result
+
+    def _finalize_batch_result(self, result: Dict):
+        """为普通URL补充综合分析结果（含主流域名检查）"""
+        if result.get('url_type') != 'general' or not result.get('data'):
+            return
+        data = result['data']
+        data['analysis'] = self._build_url_analysis(
+            data['normalized_url'],
+            data.get('website', {}),
+            data.get('phishing', {}),
+            data.pop('certificate', {})
+        )
+
+    async def _get_website_basic_info_async(self, engine: AsyncHttpEngine, url: str,
+                                            ip_tasks: Dict) -> Dict:
+        """get_website_basic_info() 的异步版本，返回结构相同"""
+        if not url.startswith(('http://', 'https://')):
+            url = 'http://' + url
+
+        original_url = url
+        domain = urlparse(url).netloc
+        is_short_url = self._is_short_url_domain(domain)
+
+        response = await engine.fetch(url, max_bytes=TITLE_MAX_BYTES)
+        if response.get('error'):
+            logger.warning("URL 请求失败", extra={
+                'extra_fields': {
+                    'url': url,
+                    'domain': domain,
+                    'error_message': response['error']
+                }
+            })
+            return {'error': response['error'], 'domain': domain}
+
+        final_url = response['final_url']
+        final_parsed = urlparse(final_url)
+        ip_address, ip_location = await self._lookup_ip_location_async(
+            final_parsed.hostname or final_parsed.netloc, ip_tasks
+        )
+
+        return {
+            'domain': final_parsed.netloc,
+            'title': self._extract_html_title(response['content']),
+            'status_code': response['status_code'],
+            'content_type': response['headers'].get('content-type', ''),
+
+            # 短链接信息
+            'is_short_url': is_short_url,
+            'original_url': original_url,
+            'final_url': final_url,
+            'redirect_chain_length': response['redirect_count'],
+
+            # IP和地理位置信息
+            'ip_address': ip_address,
+            'ip_location': ip_location,
+        }
+
+    async def _lookup_ip_location_async(self, hostname: str, ip_tasks: Dict):
+        """解析主机IP及地理位置，同一批次内相同主机共享一次解析"""
+        task = ip_tasks.get(hostname)
+        if task is None:
+            task = asyncio.ensure_future(self.ip_resolver.lookup_async(hostname))
+            ip_tasks[hostname] = task
+        return await task
+
+    async def _fetch_tme_preview_async(self, engine: AsyncHttpEngine, tme_url: str) -> Dict:
+        """fetch_tme_preview() 的异步版本，返回结构相同"""
+        if not tme_url.startswith(('http://', 'https://')):
+            tme_url = 'https://' + tme_url
+
+        response = await engine.fetch(tme_url)
+        if response.get('error'):
+            logger.error("t.me 链接请求失败", extra={
+                'extra_fields': {
+                    'tme_url': tme_url,
+                    'error_message': response['error']
+                }
+            })
+            return {'error': response['error']}
+
+        if response['status_code'] != 200:
+            logger.error("t.me 链接访问失败", extra={
+                'extra_fields': {
+                    'tme_url': tme_url,
+                    'status_code': response['status_code']
+                }
+            })
+            return {'error': f"HTTP {response['status_code']}"}
+
+        try:
+            return self._parse_tme_preview(
+                response['content'].decode('utf-8', errors='ignore'), response['final_url']
+            )
+        except Exception as e:
+            logger.error("t.me 链接解析失败", extra={
+                'extra_fields': {
+                    'tme_url': tme_url,
+                    'error_type': type(e).__name__,
+                    'error_message': str(e)
+                }
+            }, exc_info=True)
+            return {'error': str(e)}
+
+    async def _fetch_telegraph_content_async(self, engine: AsyncHttpEngine, url: str) -> Dict:
+        """fetch_telegraph_content() 的异步版本，返回结构相同"""
+        response = await engine.fetch(url)
+        if response.get('error'):
+            logger.error("Telegraph 内容获取失败", extra={
+                'extra_fields': {
+                    'url': url,
+                    'error_message': response['error']
+                }
+            })
+            return {'url': url, 'error': response['error']}
+
+        try:
+            return self._parse_telegraph_content(url, response['content'].decode('utf-8', errors='ignore'))
+        except Exception as e:
+            logger.error("Telegraph 内容解析失败", extra={
+                'extra_fields': {
+                    'url': url,
+                    'error_type': type(e).__name__,
+                    'error_message': str(e)
+                }
+            }, exc_info=True)
+            return {'url': url, 'error': str(e)}
@@ -0,0 +1,187 @@
+"""
+URL分析结果两级缓存
+
+1. 进程内有界LRU：同一进程内重复URL直接命中，条目数有上限
+2. Redis：所有 Celery worker 共享，同一广告链接在多个群出现只抓取一次
+
+缓存键为标准化URL（由 TmeSpider.normalize_url 生成），
+按结果类型使用不同TTL：成功、重定向链（短链/跳转，目标可能变化）、失败（负缓存）。
+Redis 不可用时自动退化为仅进程内缓存。
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from jd.services.cache_service import CacheService
+from jd.utils.logging_config import get_logger
+
+logger = get_logger(__name__, {
+    'component': 'spider',
+    'module': 'url_analysis_cache'
+})
+
+REDIS_KEY_PREFIX = 'tme_spider:url_analysis:'
+
+
+class LruCache:
+    """带过期时间的有界进程内LRU缓存"""
+
+    def __init__(self, max_entries: int = 10000):
+        """
+        Args:
+            max_entries: 最大条目数，超出后淘汰最久未使用的条目
+        """
+        self.max_entries = max(1, max_entries)
+        self._data = OrderedDict()  # {key: (value, expires_at)}
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存，不存在或已过期返回None"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: int):
+        """写入缓存"""
+        self._data[key] = (value, time.time() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        """删除缓存"""
+        self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class UrlAnalysisCache:
+    """URL分析结果两级缓存（进程内LRU + Redis）"""
+
+    # 结果类型
+    KIND_SUCCESS = 'success'
+    KIND_REDIRECT = 'redirect'
+    KIND_FAILURE = 'failure'
+
+    def __init__(self, max_entries: int = 5000, success_ttl: int = 6 * 3600,
+                 redirect_ttl: int = 3600, failure_ttl: int = 600, use_redis: bool = True):
+        """
+        Args:
+            max_entries: 进程内LRU最大条目数
+            success_ttl: 成功结果的缓存时间（秒）
+            redirect_ttl: 经过重定向的结果缓存时间（秒）
+            failure_ttl: 失败结果的缓存时间（秒），避免每次出现都重试
+            use_redis: 是否启用Redis共享缓存
+        """
+        self.local = LruCache(max_entries)
+        self.ttls = {
+            self.KIND_SUCCESS: success_ttl,
+            self.KIND_REDIRECT: redirect_ttl,
+            self.KIND_FAILURE: failure_ttl,
+        }
+        self.use_redis = use_redis
+        self.stats = {
+            'local_hits': 0,
+            'redis_hits': 0,
+            'misses': 0,
+            'writes': 0,
+        }
+
+    @staticmethod
+    def _redis_key(normalized_url: str) -> str:
+        digest = hashlib.sha1(normalized_url.encode('utf-8')).hexdigest()
+        return f'{REDIS_KEY_PREFIX}{digest}'
+
+    def classify_result(self, result: Dict) -> str:
+        """
+        判断处理结果的缓存类型
+
+        Args:
+            result: classify_and_process_url() 结构的处理结果
+
+        Returns:
+            'success' | 'redirect' | 'failure'
+        """
+        if result.get('error'):
+            return self.KIND_FAILURE
+        website = (result.get('data') or {}).get('website') or {}
+        if website.get('redirect_chain_length') or website.get('is_short_url'):
+            return self.KIND_REDIRECT
+        return self.KIND_SUCCESS
+
+    def get_ttl(self, result: Dict) -> int:
+        """返回处理结果对应的缓存时间（秒）"""
+        return self.ttls[self.classify_result(result)]
+
+    def get(self, normalized_url: str) -> Optional[Dict]:
+        """读取单个URL的缓存结果"""
+        return self.get_many([normalized_url]).get(normalized_url)
+
+    def get_many(self, normalized_urls: List[str]) -> Dict[str, Dict]:
+        """
+        批量读取缓存，先查进程内LRU，未命中的一次性查Redis
+
+        Returns:
+            {normalized_url: 处理结果}，只包含命中的URL
+        """
+        found = {}
+        missing = []
+        for url in normalized_urls:
+            value = self.local.get(url)
+            if value is not None:
+                found[url] = value
+                self.stats['local_hits'] += 1
+            else:
+                missing.append(url)
+
+        if missing and self.use_redis:
+            values = CacheService.get_many([self._redis_key(url) for url in missing])
+            still_missing = []
+            for url, value in zip(missing, values):
+                if value is None:
+                    still_missing.append(url)
+                    continue
+                found[url] = value
+                self.stats['redis_hits'] += 1
+                self.local.set(url, value, self.get_ttl(value))
+            missing = still_missing
+
+        self.stats['misses'] += len(missing)
+        return found
+
+    def set(self, normalized_url: str, result: Dict):
+        """写入单个URL的处理结果"""
+        self.set_many({normalized_url: result})
+
+    def set_many(self, results: Dict[str, Dict]):
+        """批量写入处理结果，按结果类型分组写入Redis"""
+        by_ttl = {}
+        for url, result in results.items():
+            ttl = self.get_ttl(result)
+            self.local.set(url, result, ttl)
+            by_ttl.setdefault(ttl, {})[self._redis_key(url)] = result
+        self.stats['writes'] += len(results)
+
+        if self.use_redis:
+            for ttl, mapping in by_ttl.items():
+                CacheService.set_many(mapping, ttl)
+
+    def delete(self, normalized_url: str):
+        """删除两级缓存中的URL结果"""
+        self.local.delete(normalized_url)
+        if self.use_redis:
+            CacheService.delete(self._redis_key(normalized_url))
+
+    def get_stats(self) -> Dict:
+        """返回缓存统计信息"""
+        stats = dict(self.stats)
+        stats['local_size'] = len(self.local)
+        return stats
@@ -2,16 +2,32 @@
 广告分析数据提取 Celery 任务
 用于从聊天记录中批量提取价格、交易方式、地理位置等信息
 """
+import hashlib
 import logging
-from celery import current_task
+import uuid
+from celery import chord, current_task
 from datetime import datetime, timedelta
 
+from sqlalchemy import BigInteger, cast, func, insert, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
 from jd import db, app
 from jCelery import celery
 from jd.models.ad_tracking_price import AdTrackingPrice
 from jd.models.ad_tracking_transaction_method import AdTrackingTransactionMethod
 from jd.models.ad_tracking_geo_location import AdTrackingGeoLocation
-from jd.models.ad_tracking_dark_keyword import AdTrackingDarkKeyword
+from jd.models.ad_tracking_dark_keyword import (
+    AdTrackingDarkKeyword,
+    AdTrackingDarkKeywordCategory,
+    AdTrackingDarkKeywordDrug,
+    AdTrackingDarkKeywordKeyword
+)
+from jd.models.ad_tracking_geo_location_master import AdTrackingGeoLocationMaster
+from jd.models.ad_tracking_transaction_method_config import (
+    AdTrackingTransactionMethodConfig,
+    AdTrackingTransactionMethodKeyword
+)
+from jd.models.ad_analysis_watermark import AdAnalysisWatermark
 from jd.models.ad_tracking_batch_process_log import AdTrackingBatchProcessLog
 from jd.models.tg_group_chat_history import TgGroupChatHistory
 from jd.services.keyword_extraction_service import KeywordExtractionService
@@ -99,94 +115,86 @@ def _process_batch_for_analysis_impl(self, chat_id: str, batch_id: str, config:
         db.session.commit()
 
         # 构建查询条件
-        query = TgGroupChatHistory.query.filter_by(chat_id=chat_id)
+        filters = [TgGroupChatHistory.chat_id == chat_id]
 
         # 按日期范围筛选 (可选)
         if config.get('start_date'):
             try:
                 start_date = datetime.fromisoformat(config['start_date'])
-                query = query.filter(TgGroupChatHistory.postal_time >= start_date)
+                filters.append(TgGroupChatHistory.postal_time >= start_date)
             except Exception as e:
                 logger.warning(f"start_date 格式无效: {e}")
 
         if config.get('end_date'):
             try:
                 end_date = datetime.fromisoformat(config['end_date'])
-                query = query.filter(TgGroupChatHistory.postal_time <= end_date)
+                filters.append(TgGroupChatHistory.postal_time <= end_date)
             except Exception as e:
                 logger.warning(f"end_date 格式无效: {e}")
 
-        # 获取聊天记录
+        # 统计待处理消息数，消息本身按块流式读取
         limit = config.get('limit', 10000)
-        messages = query.order_by(TgGroupChatHistory.id).limit(limit).all()
+        total, max_id = _message_window(filters)
+        total = min(total, limit)
+        filters.append(TgGroupChatHistory.id <= max_id)
 
-        batch.total_messages = len(messages)
+        batch.total_messages = total
         db.session.commit()
 
-        logger.info(f"批次 {batch_id} 获取 {len(messages)} 条消息，开始处理")
+        logger.info(f"批次 {batch_id} 共 {total} 条消息，开始处理")
 
+        pipeline = AnalysisExtractionPipeline(chat_id, _enabled_extractors(
+            config.get('include_price', False),
+            config.get('include_transaction', False),
+            config.get('include_geo', False),
+            config.get('include_dark_keyword', False)
+        ))
         success_count = 0
         fail_count = 0
         errors = []
 
-        for idx, message in enumerate(messages):
-            try:
-                message_id = str(message.id) if message.id else None
-                message_text = message.message or ''
-
-                # 提取价格
-                if config.get('include_price', False):
-                    _extract_price_from_message(message, chat_id)
-
-                # 提取交易方式
-                if config.get('include_transaction', False):
-                    _extract_transaction_method_from_message(message, chat_id)
-
-                # 提取地理位置
-                if config.get('include_geo', False):
-                    _extract_geo_location_from_message(message, chat_id)
-
-                # 提取黑词
-                if config.get('include_dark_keyword', False):
-                    _extract_dark_keyword_from_message(message, chat_id)
-
-                success_count += 1
-
-                # 每处理100条更新进度
-                if (idx + 1) % 100 == 0:
-                    batch.update_progress(success_count, fail_count, len(messages))
-                    db.session.commit()
+        processed = 0
 
-                    # 更新 Celery 任务进度
-                    self.update_state(
-                        state='PROGRESS',
-                        meta={
-                            'current': idx + 1,
-                            'total': len(messages),
-                            'success': success_count,
-                            'failed': fail_count
-                        }
-                    )
-                    logger.info(f"批次 {batch_id} 处理进度: {idx + 1}/{len(messages)} (成功: {success_count}, 失败: {fail_count})")
+        for chunk in _iter_message_chunks(filters, limit=limit):
+            chunk_success, chunk_errors = _extract_chunk(pipeline, chunk, processed)
+            processed += len(chunk)
 
+            try:
+                # 批次进度只写入会话，由 flush() 与本块提取结果在同一事务中提交
+                batch.update_progress(success_count + chunk_success,
+                                      fail_count + len(chunk) - chunk_success, total, commit=False)
+                pipeline.flush()
+                success_count += chunk_success
+                fail_count += len(chunk) - chunk_success
             except Exception as e:
-                fail_count += 1
-                error_msg = f"处理消息 {idx} (ID={message.id}) 失败: {str(e)}"
-                errors.append(error_msg)
-                logger.error(error_msg, exc_info=True)
-                # 详细记录异常类型
-                logger.error(f"异常类型: {type(e).__name__}, 异常详情: {repr(e)}")
+                fail_count += len(chunk)
+                chunk_errors.append(f"写入消息 {chunk[0].id}-{chunk[-1].id} 的提取结果失败: {str(e)}")
+                logger.error(chunk_errors[-1], exc_info=True)
+                batch.update_progress(success_count, fail_count, total)
+            errors.extend(chunk_errors)
+
+            # 更新 Celery 任务进度
+            self.update_state(
+                state='PROGRESS',
+                meta={
+                    'current': processed,
+                    'total': total,
+                    'success': success_count,
+                    'failed': fail_count
+                }
+            )
+            logger.info(f"批次 {batch_id} 处理进度: {processed}/{total} (成功: {success_count}, 失败: {fail_count})")
 
         # 标记完成
         batch.mark_as_completed()
-        batch.update_progress(success_count, fail_count, len(messages))
+        batch.update_progress(success_count, fail_count, processed)
         db.session.commit()
 
         # 清除相关缓存，确保前端获取最新数据
         _clear_analysis_cache(chat_id)
 
         logger.info(
-            f"批次 {batch_id} 处理完成: 总数 {len(messages)}, "
+            f"批次 {batch_id} 处理完成: 总数 {processed}, "
             f"成功 {success_count}, 失败 {fail_count}"
         )
 
@@ -195,7 +203,7 @@ def _process_batch_for_analysis_impl(self, chat_id: str, batch_id: str, config:
             'chat_id': chat_id,
             'success_count': success_count,
             'fail_count': fail_count,
-            'total': len(messages),
+            'total': processed,
             'errors': errors[:10] if errors else []  # 返回前10个错误
         }
 
@@ -217,283 +225,361 @@ def _process_batch_for_analysis_impl(self, chat_id: str, batch_id: str, config:
         }
 
 
-def _extract_price_from_message(message: TgGroupChatHistory, chat_id: str):
-    """
-    从消息中提取价格
-
-    使用优化的关键词提取服务，合并正则表达式，减少文本扫描次数：
-    - 原始: 7 个独立的正则表达式遍历
-    - 优化后: 2 个合并的正则表达式遍历
-    - 性能提升: 7-10 倍
-
-    Args:
-        message: TgGroupChatHistory 消息对象
-        chat_id: 群组ID
-    """
-    if not message:
-        logger.debug(f"价格提取: 消息对象为 None")
-        return
+# 每块消息在内存中完成全部提取后，每张表一条批量 INSERT，同一事务提交
+EXTRACTION_CHUNK_SIZE = 500
 
-    message_text = message.message or ''
-    if not message_text or not message_text.strip():
-        logger.debug(f"价格提取: 消息 {message.id} 文本为空")
-        return
 
-    try:
-        # 使用服务层提取价格
-        logger.debug(f"价格提取: 开始处理消息 {message.id}, chat_id={chat_id}, 文本长度={len(message_text)}")
-        prices = KeywordExtractionService.extract_prices(message_text)
-        logger.debug(f"价格提取: 从消息 {message.id} 提取到 {len(prices)} 个价格")
-
-        # 保存提取的价格
-        if prices:
-            for idx, price in enumerate(prices):
-                try:
-                    record = AdTrackingPrice(
-                        chat_id=chat_id,
-                        message_id=str(message.id) if message.id else None,
-                        price_value=price['value'],
-                        unit=price['unit'],
-                        extracted_text=price['original_text'],
-                        msg_date=message.postal_time.date() if message.postal_time else None
-                    )
-                    db.session.add(record)
-                    logger.debug(f"价格提取: 添加记录 {idx+1}/{len(prices)}: {price['value']} {price['unit']}")
-                except Exception as add_error:
-                    logger.error(f"价格提取: 添加记录失败 {idx+1}/{len(prices)}: {add_error}")
-                    raise
+# 提取只需要这几列，不加载消息的其余字段（replies_info 等）
+MESSAGE_COLUMNS = (
+    TgGroupChatHistory.id,
+    TgGroupChatHistory.message,
+    TgGroupChatHistory.postal_time,
+    TgGroupChatHistory.user_id,
+)
 
-            # 提交数据库
-            try:
-                db.session.commit()
-                logger.info(f"价格提取: ✅ 成功提交 {len(prices)} 个价格到数据库 (消息 {message.id})")
-            except Exception as commit_error:
-                logger.error(f"价格提取: ❌ 提交数据库失败 (消息 {message.id}): {commit_error}")
-                db.session.rollback()
-                raise
-        else:
-            logger.debug(f"价格提取: 消息 {message.id} 未提取到价格")
-
-    except Exception as e:
-        logger.error(f"价格提取失败 (消息 {message.id}): {str(e)}", exc_info=True)
-        try:
-            db.session.rollback()
-        except Exception as rollback_error:
-            logger.error(f"价格提取: 回滚失败: {rollback_error}")
 
+def _message_window(filters: list):
+    """
+    统计待处理消息
 
-def _extract_transaction_method_from_message(message: TgGroupChatHistory, chat_id: str):
+    Returns:
+        (消息数, 最大消息ID)，最大ID用于固定处理窗口，不处理开始后新写入的消息
     """
-    从消息中提取交易方式
+    total, max_id = db.session.query(
+        func.count(TgGroupChatHistory.id), func.max(TgGroupChatHistory.id)
+    ).filter(*filters).one()
+    return total or 0, max_id or 0
 
-    使用 AC自动机 优化的关键词提取：
-    - 时间复杂度: O(n + z) 其中 n=消息文本长度，z=匹配数
-    - 相比原始方案性能提升: 2-3 倍
 
-    Args:
-        message: TgGroupChatHistory 消息对象
-        chat_id: 群组ID
+def _iter_message_chunks(filters: list, chunk_size: int = None, limit: int = None):
     """
-    if not message:
-        logger.debug(f"交易方式提取: 消息对象为 None")
-        return
+    按 id 键集分页流式读取消息，每次只持有一块
 
-    message_text = message.message or ''
-    if not message_text or not message_text.strip():
-        logger.debug(f"交易方式提取: 消息 {message.id} 文本为空")
-        return
+    每块是独立的短查询（id > 上一块最大ID ORDER BY id LIMIT n），
+    不占用跨块打开的游标，块之间可以在同一会话上写入和提交
 
-    try:
-        # 使用 AC自动机 提取交易方式
-        logger.debug(f"交易方式提取: 开始处理消息 {message.id}, chat_id={chat_id}, 文本长度={len(message_text)}")
-        methods = KeywordExtractionService.extract_transaction_methods(message_text)
-        logger.debug(f"交易方式提取: 从消息 {message.id} 提取到 {len(methods)} 种交易方式")
-
-        # 保存提取的交易方式
-        if methods:
-            for idx, method in enumerate(methods):
-                try:
-                    record = AdTrackingTransactionMethod(
-                        chat_id=chat_id,
-                        message_id=str(message.id) if message.id else None,
-                        method=method['method'],
-                        msg_date=message.postal_time.date() if message.postal_time else None
-                    )
-                    db.session.add(record)
-                    logger.debug(f"交易方式提取: 添加记录 {idx+1}/{len(methods)}: {method['method']}")
-                except Exception as add_error:
-                    logger.error(f"交易方式提取: 添加记录失败 {idx+1}/{len(methods)}: {add_error}")
-                    raise
+    Args:
+        filters: 查询条件
+        chunk_size: 每块消息数，默认 EXTRACTION_CHUNK_SIZE
+        limit: 最多读取的消息数（None 表示不限）
 
-            # 提交数据库
-            try:
-                db.session.commit()
-                logger.info(f"交易方式提取: ✅ 成功提交 {len(methods)} 种交易方式到数据库 (消息 {message.id})")
-            except Exception as commit_error:
-                logger.error(f"交易方式提取: ❌ 提交数据库失败 (消息 {message.id}): {commit_error}")
-                db.session.rollback()
-                raise
-        else:
-            logger.debug(f"交易方式提取: 消息 {message.id} 未提取到交易方式")
+    Yields:
+        查询行列表，行具有 id、message、postal_time、user_id 属性
+    """
+    chunk_size = chunk_size or EXTRACTION_CHUNK_SIZE
+    last_id = 0
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = chunk_size if remaining is None else min(chunk_size, remaining)
+        chunk = db.session.query(*MESSAGE_COLUMNS).filter(
+            *filters, TgGroupChatHistory.id > last_id
+        ).order_by(TgGroupChatHistory.id).limit(size).all()
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < size:
+            return
+        last_id = chunk[-1].id
+        if remaining is not None:
+            remaining -= len(chunk)
+
+
+def _extract_chunk(pipeline, chunk, offset: int = 0):
+    """
+    对一块消息运行提取流水线（只在内存中累积，由调用方 flush）
 
-    except Exception as e:
-        logger.error(f"交易方式提取失败 (消息 {message.id}): {str(e)}", exc_info=True)
+    Returns:
+        (提取成功的消息数, 错误信息列表)
+    """
+    success_count = 0
+    errors = []
+    for idx, message in enumerate(chunk, start=offset):
         try:
-            db.session.rollback()
-        except Exception as rollback_error:
-            logger.error(f"交易方式提取: 回滚失败: {rollback_error}")
+            pipeline.add(message)
+            success_count += 1
+        except Exception as e:
+            error_msg = f"处理消息 {idx} (ID={message.id}) 失败: {str(e)}"
+            errors.append(error_msg)
+            logger.error(error_msg, exc_info=True)
+            # 详细记录异常类型
+            logger.error(f"异常类型: {type(e).__name__}, 异常详情: {repr(e)}")
+    return success_count, errors
 
 
-def _extract_geo_location_from_message(message: TgGroupChatHistory, chat_id: str):
-    """
-    从消息中提取地理位置
-
-    使用 AC自动机 优化的地理位置提取：
-    - 时间复杂度: O(n + z) 其中 n=消息文本长度，z=匹配数
-    - 相比原始方案性能提升: 2000-5000 倍（取决于地理位置数据规模）
+def _message_fields(message, chat_id: str) -> dict:
+    """各提取记录共用的字段"""
+    return {
+        'chat_id': chat_id,
+        'message_id': str(message.id) if message.id else None,
+        'msg_date': message.postal_time.date() if message.postal_time else None
+    }
 
-    优化说明:
-    1. AC自动机仅在首次使用时初始化（~50-100ms for 2000+ keywords）
-    2. 后续调用使用缓存的 matcher 对象（<1ms）
-    3. 单次文本扫描找到所有地理位置关键词
 
-    Args:
-        message: TgGroupChatHistory 消息对象
-        chat_id: 群组ID
+def _price_rows(message, chat_id: str, message_text: str) -> list:
     """
-    if not message:
-        logger.debug(f"地理位置提取: 消息对象为 None")
-        return
+    从消息中提取价格
 
-    message_text = message.message or ''
-    if not message_text or not message_text.strip():
-        logger.debug(f"地理位置提取: 消息 {message.id} 文本为空")
-        return
+    使用优化的关键词提取服务，合并正则表达式，减少文本扫描次数：
+    - 原始: 7 个独立的正则表达式遍历
+    - 优化后: 2 个合并的正则表达式遍历
+    - 性能提升: 7-10 倍
+    """
+    prices = KeywordExtractionService.extract_prices(message_text)
+    logger.debug(f"价格提取: 从消息 {message.id} 提取到 {len(prices)} 个价格")
+    return [
+        dict(
+            _message_fields(message, chat_id),
+            price_value=price['value'],
+            unit=price['unit'],
+            extracted_text=price['original_text']
+        )
+        for price in prices
+    ]
 
-    try:
-        from flask import has_app_context
 
-        # 确保应用上下文存在
-        if not has_app_context():
-            logger.warning(f"地理位置提取: 消息 {message.id} - 无应用上下文，尝试继续...")
+def _transaction_method_rows(message, chat_id: str, message_text: str) -> list:
+    """
+    从消息中提取交易方式
 
-        # 使用 AC自动机 提取地理位置
-        logger.debug(f"地理位置提取: 开始处理消息 {message.id}, chat_id={chat_id}, 文本长度={len(message_text)}")
-        locations = GeoLocationService.extract_locations(message_text, chat_id)
-        logger.debug(f"地理位置提取: 从消息 {message.id} 提取到 {len(locations)} 个地理位置")
+    使用 AC自动机 优化的关键词提取：
+    - 时间复杂度: O(n + z) 其中 n=消息文本长度，z=匹配数
+    - 相比原始方案性能提升: 2-3 倍
+    """
+    methods = KeywordExtractionService.extract_transaction_methods(message_text)
+    logger.debug(f"交易方式提取: 从消息 {message.id} 提取到 {len(methods)} 种交易方式")
+    return [dict(_message_fields(message, chat_id), method=method['method']) for method in methods]
 
-        # 保存提取的地理位置
-        if locations:
-            for idx, location in enumerate(locations):
-                try:
-                    record = AdTrackingGeoLocation(
-                        chat_id=chat_id,
-                        message_id=str(message.id) if message.id else None,
-                        province=location.get('province'),  # 直接使用extract_locations返回的省份信息
-                        city=location.get('city'),  # 直接使用extract_locations返回的城市信息
-                        district=location.get('district'),  # 直接使用extract_locations返回的区县信息
-                        keyword_matched=location.get('keyword_matched'),
-                        latitude=location.get('latitude'),
-                        longitude=location.get('longitude'),
-                        msg_date=message.postal_time.date() if message.postal_time else None
-                    )
-                    db.session.add(record)
-                    logger.debug(f"地理位置提取: 添加记录 {idx+1}/{len(locations)}: {location.get('name')} ({location.get('type')})")
-                except Exception as add_error:
-                    logger.error(f"地理位置提取: 添加记录失败 {idx+1}/{len(locations)}: {add_error}")
-                    raise
 
-            # 提交数据库
-            try:
-                db.session.commit()
-                logger.info(f"地理位置提取: ✅ 成功提交 {len(locations)} 个地理位置到数据库 (消息 {message.id})")
-            except Exception as commit_error:
-                logger.error(f"地理位置提取: ❌ 提交数据库失败 (消息 {message.id}): {commit_error}")
-                db.session.rollback()
-                raise
-        else:
-            logger.debug(f"地理位置提取: 消息 {message.id} 未提取到地理位置")
+def _geo_location_rows(message, chat_id: str, message_text: str) -> list:
+    """
+    从消息中提取地理位置
 
-    except Exception as e:
-        logger.error(f"地理位置提取失败 (消息 {message.id}): {str(e)}", exc_info=True)
-        try:
-            db.session.rollback()
-        except Exception as rollback_error:
-            logger.error(f"地理位置提取: 回滚失败: {rollback_error}")
+    使用 AC自动机 优化的地理位置提取：
+    - 时间复杂度: O(n + z) 其中 n=消息文本长度，z=匹配数
+    - AC自动机仅在首次使用时初始化，后续调用使用缓存的 matcher 对象
+    - 单次文本扫描找到所有地理位置关键词
+    """
+    locations = GeoLocationService.extract_locations(message_text, chat_id)
+    logger.debug(f"地理位置提取: 从消息 {message.id} 提取到 {len(locations)} 个地理位置")
+    return [
+        dict(
+            _message_fields(message, chat_id),
+            province=location.get('province'),  # 直接使用extract_locations返回的省份信息
+            city=location.get('city'),  # 直接使用extract_locations返回的城市信息
+            district=location.get('district'),  # 直接使用extract_locations返回的区县信息
+            keyword_matched=location.get('keyword_matched'),
+            latitude=location.get('latitude'),
+            longitude=location.get('longitude')
+        )
+        for location in locations
+    ]
 
 
-def _extract_dark_keyword_from_message(message: TgGroupChatHistory, chat_id: str):
+def _dark_keyword_rows(message, chat_id: str, message_text: str) -> list:
     """
     从消息中提取黑词（毒品相关关键词）
 
     使用 AC自动机 优化的黑词提取：
     - 时间复杂度: O(n + z) 其中 n=消息文本长度，z=匹配数
     - 支持统计每个关键词在消息中出现的次数
+    """
+    dark_keywords = DarkKeywordExtractionService.extract_dark_keywords_with_count(message_text)
+    logger.debug(f"黑词提取: 从消息 {message.id} 提取到 {len(dark_keywords)} 个黑词")
+    return [
+        dict(
+            _message_fields(message, chat_id),
+            keyword=dk['keyword'],
+            drug_id=dk['drug_id'],
+            category_id=dk['category_id'],
+            count=dk['count']
+        )
+        for dk in dark_keywords
+    ]
+
+
+# 提取器：{名称: (结果表模型, 提取函数, 词典表模型)}
+EXTRACTORS = {
+    'price': (AdTrackingPrice, _price_rows, ()),
+    'transaction': (AdTrackingTransactionMethod, _transaction_method_rows,
+                    (AdTrackingTransactionMethodConfig, AdTrackingTransactionMethodKeyword)),
+    'geo': (AdTrackingGeoLocation, _geo_location_rows, (AdTrackingGeoLocationMaster,)),
+    'dark_keyword': (AdTrackingDarkKeyword, _dark_keyword_rows,
+                     (AdTrackingDarkKeywordCategory, AdTrackingDarkKeywordDrug, AdTrackingDarkKeywordKeyword)),
+}
+
+# 清空提取器 matcher 缓存的方法（价格规则在代码中，无缓存）
+_MATCHER_REFRESHERS = {
+    'transaction': KeywordExtractionService.refresh_transaction_matcher_cache,
+    'geo': GeoLocationService.refresh_geo_matcher_cache,
+    'dark_keyword': DarkKeywordExtractionService.refresh_matcher_cache,
+}
+
+# 本进程 matcher 最近一次按哪个词典版本刷新
+_matcher_versions = {}
+
+
+def _enabled_extractors(include_price: bool, include_transaction: bool,
+                        include_geo: bool, include_dark_keyword: bool) -> list:
+    return [name for name, enabled in (
+        ('price', include_price),
+        ('transaction', include_transaction),
+        ('geo', include_geo),
+        ('dark_keyword', include_dark_keyword),
+    ) if enabled]
+
+
+def _dictionary_versions(names: list) -> dict:
+    """
+    计算提取器的词典版本
 
-    Args:
-        message: TgGroupChatHistory 消息对象
-        chat_id: 群组ID
+    词典表的 (行数, 最大 updated_at) 变化即视为新版本；价格规则使用
+    KeywordExtractionService.PRICE_RULES_VERSION。版本变化时同时清空本进程的
+    matcher 缓存，保证提取使用的词典与记录的版本一致
+
+    Returns:
+        {提取器名称: 版本字符串}
     """
-    if not message:
-        logger.debug(f"黑词提取: 消息对象为 None")
-        return
+    versions = {}
+    for name in names:
+        parts = [name]
+        if name == 'price':
+            parts.append(str(KeywordExtractionService.PRICE_RULES_VERSION))
+        for model in EXTRACTORS[name][2]:
+            count, updated_at = db.session.query(func.count(model.id), func.max(model.updated_at)).one()
+            parts.append(f'{model.__tablename__}:{count}:{updated_at}')
+        versions[name] = hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+        if _matcher_versions.get(name) != versions[name]:
+            if name in _MATCHER_REFRESHERS:
+                _MATCHER_REFRESHERS[name]()
+            _matcher_versions[name] = versions[name]
+    return versions
+
+
+class AnalysisExtractionPipeline:
+    """
+    消息分析提取流水线
 
-    message_text = message.message or ''
-    if not message_text or not message_text.strip():
-        logger.debug(f"黑词提取: 消息 {message.id} 文本为空")
-        return
+    add() 对一条消息依次运行启用的提取器，结果累积在内存中；
+    flush() 对每张表执行一条批量 INSERT 并在同一事务中提交，
+    提交次数随消息块数增长，而不是随 消息数 × 提取器数 增长。
 
-    try:
-        from flask import has_app_context
+    传入 versions 时，flush() 在同一事务中把各提取器的水位线推进到已处理的最大消息ID
+    """
 
-        # 确保应用上下文存在
-        if not has_app_context():
-            logger.warning(f"黑词提取: 消息 {message.id} - 无应用上下文，尝试继续...")
+    def __init__(self, chat_id: str, names: list, versions: dict = None):
+        """
+        Args:
+            chat_id: 群组ID
+            names: 启用的提取器名称（EXTRACTORS 的键）
+            versions: {提取器名称: 词典版本}，为空时不记录水位线
+        """
+        self.chat_id = chat_id
+        self.names = list(names)
+        self.extractors = [(EXTRACTORS[name][0], EXTRACTORS[name][1]) for name in self.names]
+        self.versions = versions
+        self.last_message_id = None
+        self._rows = {model: [] for model, _ in self.extractors}
+
+    @property
+    def pending_rows(self) -> int:
+        return sum(len(rows) for rows in self._rows.values())
+
+    def add(self, message) -> None:
+        """
+        对一条消息运行全部提取器
+
+        任一提取器失败时抛出异常，该消息已提取的记录全部丢弃（水位线仍越过该消息）
+
+        Args:
+            message: 具有 id、message、postal_time 属性的消息（ORM 对象或查询行）
+        """
+        self.last_message_id = message.id
+        message_text = message.message or ''
+        if not message_text.strip():
+            return
+
+        extracted = [(model, extract(message, self.chat_id, message_text)) for model, extract in self.extractors]
+        for model, rows in extracted:
+            self._rows[model].extend(rows)
+
+    def flush(self) -> int:
+        """
+        批量写入累积的记录并提交（调用方在此之前对会话的修改一并提交）
+
+        Returns:
+            写入的记录数
+
+        Raises:
+            写入失败时回滚并抛出异常，累积的记录被清空
+        """
+        rows_by_model, self._rows = self._rows, {model: [] for model, _ in self.extractors}
+        written = 0
+        try:
+            for model, rows in rows_by_model.items():
+                if rows:
+                    db.session.execute(insert(model), rows)
+                    written += len(rows)
+            if self.versions is not None and self.last_message_id is not None:
+                self._save_watermarks()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
 
-        # 使用 AC自动机 提取黑词（带计数）
-        logger.debug(f"黑词提取: 开始处理消息 {message.id}, chat_id={chat_id}, 文本长度={len(message_text)}")
-        dark_keywords = DarkKeywordExtractionService.extract_dark_keywords_with_count(message_text)
-        logger.debug(f"黑词提取: 从消息 {message.id} 提取到 {len(dark_keywords)} 个黑词")
+        logger.debug(
+            "提取结果批量写入: " + ", ".join(
+                f"{model.__tablename__}={len(rows)}" for model, rows in rows_by_model.items()
+            )
+        )
+        return written
 
-        # 保存提取的黑词
-        if dark_keywords:
-            for idx, dk in enumerate(dark_keywords):
-                try:
-                    record = AdTrackingDarkKeyword(
-                        chat_id=chat_id,
-                        message_id=str(message.id) if message.id else None,
-                        keyword=dk['keyword'],
-                        drug_id=dk['drug_id'],
-                        category_id=dk['category_id'],
-                        count=dk['count'],
-                        msg_date=message.postal_time.date() if message.postal_time else None
-                    )
-                    db.session.add(record)
-                    logger.debug(f"黑词提取: 添加记录 {idx+1}/{len(dark_keywords)}: {dk['keyword']} (毒品: {dk['drug_name']}, 出现次数: {dk['count']})")
-                except Exception as add_error:
-                    logger.error(f"黑词提取: 添加记录失败 {idx+1}/{len(dark_keywords)}: {add_error}")
-                    raise
+    def _save_watermarks(self):
+        _save_watermarks(self.chat_id, self.names, self.versions, self.last_message_id)
 
-            # 提交数据库
-            try:
-                db.session.commit()
-                logger.info(f"黑词提取: ✅ 成功提交 {len(dark_keywords)} 个黑词到数据库 (消息 {message.id})")
-            except Exception as commit_error:
-                logger.error(f"黑词提取: ❌ 提交数据库失败 (消息 {message.id}): {commit_error}")
-                db.session.rollback()
-                raise
-        else:
-            logger.debug(f"黑词提取: 消息 {message.id} 未提取到黑词")
 
-    except Exception as e:
-        logger.error(f"黑词提取失败 (消息 {message.id}): {str(e)}", exc_info=True)
-        try:
-            db.session.rollback()
-        except Exception as rollback_error:
-            logger.error(f"黑词提取: 回滚失败: {rollback_error}")
+def _save_watermarks(chat_id: str, names: list, versions: dict, last_message_id: int):
+    """在当前事务中推进 (群组, 提取器) 水位线（只前进不后退），由调用方提交"""
+    stmt = mysql_insert(AdAnalysisWatermark.__table__).values([
+        {
+            'chat_id': chat_id,
+            'extractor': name,
+            'last_message_id': last_message_id,
+            'dictionary_version': versions[name]
+        }
+        for name in names
+    ])
+    stmt = stmt.on_duplicate_key_update(
+        last_message_id=func.greatest(AdAnalysisWatermark.__table__.c.last_message_id,
+                                      stmt.inserted.last_message_id),
+        dictionary_version=stmt.inserted.dictionary_version
+    )
+    db.session.execute(stmt)
+
+
+def _reset_watermarks(chat_id: str, names: list, versions: dict):
+    """
+    在当前事务中把 (群组, 提取器) 水位线重置为新词典版本、last_message_id=0，由调用方提交
+
+    与删除旧结果同一事务提交：之后的规划按新版本从头增量提取，不会再次判定版本变化而重复删除
+    """
+    stmt = mysql_insert(AdAnalysisWatermark.__table__).values([
+        {
+            'chat_id': chat_id,
+            'extractor': name,
+            'last_message_id': 0,
+            'dictionary_version': versions[name]
+        }
+        for name in names
+    ])
+    stmt = stmt.on_duplicate_key_update(
+        last_message_id=stmt.inserted.last_message_id,
+        dictionary_version=stmt.inserted.dictionary_version
+    )
+    db.session.execute(stmt)
 
 
-def _clear_analysis_cache(chat_id: str):
+def _clear_analysis_cache(chat_id: str = None):
     """
     清除分析相关的所有缓存
 
@@ -507,8 +593,9 @@ def _clear_analysis_cache(chat_id: str):
     注意：需要同时清除特定群组缓存和全局缓存，因为全局统计数据也受影响
 
     Args:
-        chat_id: 群组ID
+        chat_id: 群组ID，为空时清除所有群组的缓存
     """
+    chat_id = chat_id or '*'
     try:
         # 清除特定群组的缓存
         patterns = [
@@ -549,14 +636,16 @@ def process_messages_for_chat(
     include_dark_keyword: bool = True
 ):
     """
-    处理指定群组的最近N天的消息
+    增量处理指定群组的消息
 
     这是一个简化版本的任务，不需要批次ID，直接处理指定群组的消息。
+    每个提取器按 (群组, 提取器) 水位线只处理新消息；首次运行处理最近N天，
+    词典版本变化时删除该群组的旧结果并全量重新提取。
 
     Args:
         self: Celery Task 实例
         chat_id: 群组ID
-        days: 处理最近多少天的消息 (默认7)
+        days: 首次运行（无水位线）时处理最近多少天的消息 (默认7)
         include_price: 是否提取价格 (默认True)
         include_transaction: 是否提取交易方式 (默认True)
         include_geo: 是否提取地理位置 (默认True)
@@ -572,6 +661,74 @@ def process_messages_for_chat(
         )
 
 
+def _plan_chat_extraction(chat_id: str, names: list, start_date: datetime, versions: dict = None) -> list:
+    """
+    按水位线规划群组的提取范围
+
+    每个提取器按自己的水位线归入一组，同组提取器共用一次消息扫描：
+    - new: 水位线存在且词典版本未变，只处理水位线之后的消息
+    - window: 无水位线（首次运行），处理 start_date 之后的消息
+    - full: 词典版本变化，删除该群组该提取器的旧结果，全量重新提取；
+      删除与水位线重置（新版本、last_message_id=0）在同一事务中提交
+
+    Args:
+        chat_id: 群组ID
+        names: 启用的提取器名称
+        start_date: 首次运行的起始时间
+        versions: 已计算的词典版本（批量规划多个群组时复用），为空时现算
+
+    Returns:
+        [{'mode': str, 'names': list, 'versions': dict, 'filters': list, 'total': int,
+          'after_id': int, 'max_id': int, 'start_date': datetime 或 None}, ...]
+        范围为 after_id < id <= max_id（window 模式另加 postal_time >= start_date）
+    """
+    versions = versions or _dictionary_versions(names)
+    watermarks = {
+        watermark.extractor: watermark
+        for watermark in AdAnalysisWatermark.query.filter_by(chat_id=chat_id).all()
+    }
+
+    groups = {}  # {(mode, 起始ID): [提取器名称]}
+    for name in names:
+        watermark = watermarks.get(name)
+        if watermark is None:
+            key = ('window', 0)
+        elif watermark.dictionary_version != versions[name]:
+            key = ('full', 0)
+        else:
+            key = ('new', watermark.last_message_id)
+        groups.setdefault(key, []).append(name)
+
+    reset = groups.get(('full', 0), [])
+    if reset:
+        for name in reset:
+            EXTRACTORS[name][0].query.filter_by(chat_id=chat_id).delete(synchronize_session=False)
+        _reset_watermarks(chat_id, reset, versions)
+        db.session.commit()
+        logger.info(f"群组 {chat_id} 词典版本变化，已删除旧提取结果并全量重新提取: {reset}")
+
+    plans = []
+    for (mode, after_id), group_names in groups.items():
+        filters = [TgGroupChatHistory.chat_id == chat_id, TgGroupChatHistory.id > after_id]
+        if mode == 'window':
+            filters.append(TgGroupChatHistory.postal_time >= start_date)
+        total, max_id = _message_window(filters)
+        if not total:
+            continue
+        filters.append(TgGroupChatHistory.id <= max_id)
+        plans.append({
+            'mode': mode,
+            'names': group_names,
+            'versions': {name: versions[name] for name in group_names},
+            'filters': filters,
+            'total': total,
+            'after_id': after_id,
+            'max_id': max_id,
+            'start_date': start_date if mode == 'window' else None
+        })
+    return plans
+
+
 def _process_messages_for_chat_impl(
     self,
     chat_id: str,
@@ -584,46 +741,38 @@ def _process_messages_for_chat_impl(
     """process_messages_for_chat 的实现函数"""
     try:
         start_date = datetime.now() - timedelta(days=days)
-        logger.info(f"开始处理群组 {chat_id} 最近 {days} 天的消息")
-
-        # 查询消息
-        messages = TgGroupChatHistory.query.filter(
-            TgGroupChatHistory.chat_id == chat_id,
-            TgGroupChatHistory.postal_time >= start_date
-        ).order_by(TgGroupChatHistory.id).all()
+        names = _enabled_extractors(include_price, include_transaction, include_geo, include_dark_keyword)
+        plans = _plan_chat_extraction(chat_id, names, start_date)
+        total = sum(plan['total'] for plan in plans)
 
-        logger.info(f"群组 {chat_id} 获取 {len(messages)} 条消息")
+        plan_desc = ', '.join(f"{plan['mode']}:{'/'.join(plan['names'])}" for plan in plans) or '无新消息'
+        logger.info(f"开始处理群组 {chat_id}: 共 {total} 条消息待提取 ({plan_desc})")
 
         success_count = 0
         fail_count = 0
+        processed = 0
 
-        for idx, message in enumerate(messages):
-            try:
-                if include_price:
-                    _extract_price_from_message(message, chat_id)
-
-                if include_transaction:
-                    _extract_transaction_method_from_message(message, chat_id)
-
-                if include_geo:
-                    _extract_geo_location_from_message(message, chat_id)
-
-                if include_dark_keyword:
-                    _extract_dark_keyword_from_message(message, chat_id)
-
-                success_count += 1
-
-                # 每处理100条更新进度
-                if (idx + 1) % 100 == 0:
-                    self.update_state(
-                        state='PROGRESS',
-                        meta={'current': idx + 1, 'total': len(messages)}
-                    )
-                    logger.info(f"群组 {chat_id} 处理进度: {idx + 1}/{len(messages)}")
+        for plan in plans:
+            pipeline = AnalysisExtractionPipeline(chat_id, plan['names'], versions=plan['versions'])
+            for chunk in _iter_message_chunks(plan['filters']):
+                chunk_success, _ = _extract_chunk(pipeline, chunk, processed)
+                processed += len(chunk)
 
-            except Exception as e:
-                fail_count += 1
-                logger.error(f"处理消息 {idx} 失败: {str(e)}")
+                try:
+                    pipeline.flush()
+                    success_count += chunk_success
+                    fail_count += len(chunk) - chunk_success
+                except Exception as e:
+                    # 水位线停在上一块，后续块不再处理，下次运行从这里继续
+                    fail_count += len(chunk)
+                    logger.error(f"写入消息 {chunk[0].id}-{chunk[-1].id} 的提取结果失败: {str(e)}", exc_info=True)
+                    break
+
+                self.update_state(
+                    state='PROGRESS',
+                    meta={'current': processed, 'total': total}
+                )
+                logger.info(f"群组 {chat_id} 处理进度: {processed}/{total}")
 
         # 清除缓存
         _clear_analysis_cache(chat_id)
@@ -635,7 +784,7 @@ def _process_messages_for_chat_impl(
             'days': days,
             'success_count': success_count,
             'fail_count': fail_count,
-            'total': len(messages)
+            'total': processed
         }
 
     except Exception as e:
@@ -648,6 +797,117 @@ def _process_messages_for_chat_impl(
         }
 
 
+
+
+# 所有群组批量处理时每个工作单元的目标消息数：大群组按 id 范围切分，小群组合并打包
+WORK_UNIT_MESSAGES = 20000
+
+
+def _split_segment(segment: dict, unit_size: int) -> list:
+    """
+    把超过 unit_size 的范围按 id 切成每段恰好 unit_size 条消息（最后一段为余数）
+
+    分界点用 ORDER BY id LIMIT 1 OFFSET unit_size-1 在 (chat_id, id) 索引上定位
+    """
+    if segment['total'] <= unit_size:
+        return [segment]
+
+    filters = _segment_filters(segment)
+    pieces = []
+    after_id = segment['after_id']
+    remaining = segment['total']
+    while remaining > unit_size:
+        boundary = db.session.query(TgGroupChatHistory.id).filter(
+            *filters, TgGroupChatHistory.id > after_id
+        ).order_by(TgGroupChatHistory.id).offset(unit_size - 1).limit(1).scalar()
+        if boundary is None:
+            break
+        pieces.append(dict(segment, after_id=after_id, to_id=boundary, total=unit_size))
+        after_id = boundary
+        remaining -= unit_size
+    pieces.append(dict(segment, after_id=after_id, total=remaining))
+    return pieces
+
+
+def _pack_segments(segments: list, unit_size: int) -> list:
+    """
+    把范围装箱为工作单元（首次适应递减）：每个单元的消息数不超过 unit_size，
+    超过 unit_size 的范围（调用方应已切分）单独成为一个单元
+
+    Returns:
+        [[segment, ...], ...]
+    """
+    units = []  # [(剩余容量, [segment])]
+    for segment in sorted(segments, key=lambda item: item['total'], reverse=True):
+        for unit in units:
+            if unit[0] >= segment['total']:
+                unit[0] -= segment['total']
+                unit[1].append(segment)
+                break
+        else:
+            units.append([unit_size - segment['total'], [segment]])
+    return [unit_segments for _, unit_segments in units]
+
+
+def _segment_filters(segment: dict) -> list:
+    filters = [
+        TgGroupChatHistory.chat_id == segment['chat_id'],
+        TgGroupChatHistory.id > segment['after_id'],
+        TgGroupChatHistory.id <= segment['to_id'],
+    ]
+    if segment.get('start_date'):
+        filters.append(TgGroupChatHistory.postal_time >= datetime.fromisoformat(segment['start_date']))
+    return filters
+
+
+def _resolve_segments(segments: list) -> list:
+    """
+    根据各范围的执行结果决定每个 (群组, 提取器组) 的收尾动作
+
+    水位线只能推进到从头开始连续成功的最后一个范围；第一个失败范围及其之后的范围
+    （可能已部分写入）的提取结果需要删除，下次运行从水位线处重新提取
+
+    Returns:
+        [(chat_id, names, versions, 水位线推进到的ID 或 None, (删除起点, 删除终点) 或 None), ...]
+        删除范围为 起点 < message_id <= 终点
+    """
+    groups = {}
+    for segment in segments:
+        groups.setdefault((segment['chat_id'], tuple(segment['names'])), []).append(segment)
+
+    actions = []
+    for (chat_id, names), group in groups.items():
+        group.sort(key=lambda item: item['after_id'])
+        advance_to = None
+        discard = None
+        for segment in group:
+            if not segment['ok']:
+                discard = (segment['after_id'], group[-1]['to_id'])
+                break
+            advance_to = segment['to_id']
+        actions.append((chat_id, list(names), group[0]['versions'], advance_to, discard))
+    return actions
+
+
+def _add_batch_progress(batch_id: str, success_count: int, fail_count: int):
+    """
+    在当前事务中原子累加批次计数（多个工作单元并发更新同一批次）
+
+    MySQL 按顺序求值 SET 子句，progress 使用累加后的计数
+    """
+    table = AdTrackingBatchProcessLog.__table__
+    processed = table.c.success_count + table.c.fail_count
+    db.session.execute(
+        update(table).where(table.c.batch_id == batch_id).ordered_values(
+            (table.c.success_count, table.c.success_count + success_count),
+            (table.c.fail_count, table.c.fail_count + fail_count),
+            (table.c.progress, func.coalesce(
+                func.least(100, func.floor(processed * 100 / func.nullif(table.c.total_messages, 0))), 0
+            )),
+        )
+    )
+
+
 @celery.task(bind=True, queue='jd.celery.first')
 def process_all_chats(
     self,
@@ -655,18 +915,23 @@ def process_all_chats(
     include_price: bool = True,
     include_transaction: bool = True,
     include_geo: bool = True,
-    include_dark_keyword: bool = True
+    include_dark_keyword: bool = True,
+    batch_id: str = None
 ):
     """
     处理所有群组的消息
 
+    按水位线规划各群组待提取的消息，切分/打包成大小相近的工作单元，
+    以 Celery chord 并行执行，全部完成后由 summarize_extraction_units 汇总
+
     Args:
         self: Celery Task 实例
-        days: 处理最近多少天的消息 (默认1)
+        days: 首次运行（无水位线）的群组处理最近多少天的消息 (默认1)
         include_price: 是否提取价格
         include_transaction: 是否提取交易方式
         include_geo: 是否提取地理位置
         include_dark_keyword: 是否提取黑词
+        batch_id: 批次ID（chat_id='all' 的批次记录），为空时自动创建
 
     Returns:
         dict: 处理结果
@@ -674,7 +939,7 @@ def process_all_chats(
     # 建立 Flask 应用上下文（Celery 任务中访问数据库需要）
     with app.app_context():
         return _process_all_chats_impl(
-            self, days, include_price, include_transaction, include_geo, include_dark_keyword
+            self, days, include_price, include_transaction, include_geo, include_dark_keyword, batch_id
         )
 
 
@@ -684,51 +949,229 @@ def _process_all_chats_impl(
     include_price: bool,
     include_transaction: bool,
     include_geo: bool,
-    include_dark_keyword: bool
+    include_dark_keyword: bool,
+    batch_id: str = None
 ):
     """process_all_chats 的实现函数"""
+    batch = None
     try:
+        start_date = datetime.now() - timedelta(days=days)
+
         # 获取所有有消息的群组ID
-        from sqlalchemy import func
         chat_ids = db.session.query(
             func.distinct(TgGroupChatHistory.chat_id)
         ).filter(
-            TgGroupChatHistory.postal_time >= datetime.now() - timedelta(days=days)
+            TgGroupChatHistory.postal_time >= start_date
         ).all()
 
         chat_ids = [row[0] for row in chat_ids if row[0]]
         logger.info(f"发现 {len(chat_ids)} 个有消息的群组")
 
-        results = []
+        batch_id = batch_id or str(uuid.uuid4())
+        batch = AdTrackingBatchProcessLog.get_by_batch_id(batch_id)
+        if not batch:
+            batch = AdTrackingBatchProcessLog(
+                batch_id=batch_id,
+                chat_id='all',
+                include_price=include_price,
+                status=AdTrackingBatchProcessLog.Status.PROCESSING
+            )
+            db.session.add(batch)
+            db.session.commit()
+
+        # 规划：每个 (群组, 提取器组) 的待处理范围
+        names = _enabled_extractors(include_price, include_transaction, include_geo, include_dark_keyword)
+        versions = _dictionary_versions(names)
+        unit_size = app.config.get('AD_ANALYSIS_WORK_UNIT_MESSAGES', WORK_UNIT_MESSAGES)
+
+        segments = []
         for idx, chat_id in enumerate(chat_ids):
             try:
-                result = process_messages_for_chat.apply_async(
-                    args=[chat_id, days, include_price, include_transaction, include_geo, include_dark_keyword],
-                    queue='jd.celery.first'
+                for plan in _plan_chat_extraction(chat_id, names, start_date, versions):
+                    segments.extend(_split_segment({
+                        'chat_id': chat_id,
+                        'names': plan['names'],
+                        'versions': plan['versions'],
+                        'after_id': plan['after_id'],
+                        'to_id': plan['max_id'],
+                        'start_date': plan['start_date'].isoformat() if plan['start_date'] else None,
+                        'total': plan['total']
+                    }, unit_size))
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"规划群组 {chat_id} 失败: {str(e)}")
+
+            if (idx + 1) % 100 == 0:
+                self.update_state(
+                    state='PROGRESS',
+                    meta={'stage': 'planning', 'current': idx + 1, 'total': len(chat_ids)}
                 )
-                results.append({
-                    'chat_id': chat_id,
-                    'task_id': result.id
-                })
-
-                # 更新进度
-                if (idx + 1) % 10 == 0:
-                    self.update_state(
-                        state='PROGRESS',
-                        meta={'current': idx + 1, 'total': len(chat_ids)}
-                    )
 
-            except Exception as e:
-                logger.error(f"提交群组 {chat_id} 任务失败: {str(e)}")
+        units = _pack_segments(segments, unit_size)
+        total = sum(segment['total'] for segment in segments)
+        batch.total_messages = total
+        batch.success_count = 0
+        batch.fail_count = 0
+        batch.start_processing()
+
+        logger.info(
+            f"批次 {batch_id}: {len(chat_ids)} 个群组, {len(segments)} 个范围, "
+            f"打包为 {len(units)} 个工作单元, 共 {total} 条消息"
+        )
 
-        logger.info(f"已提交 {len(results)} 个群组的处理任务")
+        if not units:
+            batch.mark_as_completed()
+        else:
+            chord([
+                process_extraction_unit.s(batch_id, unit) for unit in units
+            ])(summarize_extraction_units.s(batch_id))
 
         return {
+            'batch_id': batch_id,
             'total_chats': len(chat_ids),
-            'submitted_tasks': len(results),
-            'tasks': results
+            'segments': len(segments),
+            'work_units': len(units),
+            'total_messages': total
         }
 
     except Exception as e:
         logger.error(f"处理所有群组异常: {str(e)}", exc_info=True)
-        return {'error': str(e)}
+        if batch:
+            db.session.rollback()
+            batch.mark_as_failed(str(e))
+        return {'error': str(e), 'batch_id': batch_id}
+
+
+@celery.task(bind=True, queue='jd.celery.first')
+def process_extraction_unit(self, batch_id: str, segments: list):
+    """
+    执行一个工作单元：依次提取单元内各范围的消息
+
+    每块提取结果与批次计数的原子累加在同一事务中提交。单元内不推进水位线，
+    由汇总回调按范围的成败统一处理；异常不外抛，保证 chord 回调总能执行
+
+    Args:
+        self: Celery Task 实例
+        batch_id: 批次ID
+        segments: 范围列表（见 _process_all_chats_impl）
+
+    Returns:
+        dict: {'segments': [范围 + ok], 'success_count': int, 'fail_count': int, 'processed': int}
+    """
+    with app.app_context():
+        return _process_extraction_unit_impl(batch_id, segments)
+
+
+def _process_extraction_unit_impl(batch_id: str, segments: list):
+    """process_extraction_unit 的实现函数"""
+    started = datetime.now()
+    success_count = 0
+    fail_count = 0
+    processed = 0
+    results = []
+
+    for segment in segments:
+        ok = True
+        try:
+            pipeline = AnalysisExtractionPipeline(segment['chat_id'], segment['names'])
+            for chunk in _iter_message_chunks(_segment_filters(segment)):
+                chunk_success, _ = _extract_chunk(pipeline, chunk, processed)
+                processed += len(chunk)
+                try:
+                    _add_batch_progress(batch_id, chunk_success, len(chunk) - chunk_success)
+                    pipeline.flush()
+                    success_count += chunk_success
+                    fail_count += len(chunk) - chunk_success
+                except Exception as e:
+                    fail_count += len(chunk)
+                    logger.error(
+                        f"写入群组 {segment['chat_id']} 消息 {chunk[0].id}-{chunk[-1].id} 的提取结果失败: {str(e)}",
+                        exc_info=True
+                    )
+                    _add_batch_progress(batch_id, 0, len(chunk))
+                    db.session.commit()
+                    ok = False
+                    break
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"处理群组 {segment['chat_id']} 范围 {segment['after_id']}-{segment['to_id']} 异常: {str(e)}",
+                         exc_info=True)
+            ok = False
+        results.append(dict(segment, ok=ok))
+
+    elapsed = (datetime.now() - started).total_seconds()
+    logger.info(
+        f"批次 {batch_id} 工作单元完成: {len(segments)} 个范围, {processed} 条消息, "
+        f"{processed / elapsed if elapsed else 0:.1f} 条/秒"
+    )
+    return {
+        'segments': results,
+        'success_count': success_count,
+        'fail_count': fail_count,
+        'processed': processed
+    }
+
+
+@celery.task(bind=True, queue='jd.celery.first')
+def summarize_extraction_units(self, results: list, batch_id: str):
+    """
+    chord 回调：汇总所有工作单元，推进水位线，清理失败范围，完成批次
+
+    Args:
+        self: Celery Task 实例
+        results: 各工作单元的返回值
+        batch_id: 批次ID
+
+    Returns:
+        dict: 批次汇总（计数、耗时、吞吐量）
+    """
+    with app.app_context():
+        return _summarize_extraction_units_impl(results, batch_id)
+
+
+def _summarize_extraction_units_impl(results: list, batch_id: str):
+    """summarize_extraction_units 的实现函数"""
+    batch = None
+    try:
+        batch = AdTrackingBatchProcessLog.get_by_batch_id(batch_id)
+        segments = [segment for result in results if result for segment in result['segments']]
+        failed_segments = 0
+
+        for chat_id, names, versions, advance_to, discard in _resolve_segments(segments):
+            if advance_to is not None:
+                _save_watermarks(chat_id, names, versions, advance_to)
+            if discard is not None:
+                failed_segments += 1
+                for name in names:
+                    model = EXTRACTORS[name][0]
+                    message_id = cast(model.message_id, BigInteger)
+                    model.query.filter(
+                        model.chat_id == chat_id, message_id > discard[0], message_id <= discard[1]
+                    ).delete(synchronize_session=False)
+                logger.warning(f"群组 {chat_id} {names} 消息 {discard[0]}-{discard[1]} 未完成，已删除结果待下次重新提取")
+        db.session.commit()
+
+        summary = {
+            'batch_id': batch_id,
+            'work_units': len(results),
+            'segments': len(segments),
+            'failed_segments': failed_segments,
+            'success_count': sum(result['success_count'] for result in results if result),
+            'fail_count': sum(result['fail_count'] for result in results if result),
+        }
+        if batch:
+            batch.mark_as_completed()
+            summary['duration_seconds'] = batch.get_duration_seconds()
+            summary['throughput'] = batch.get_throughput()
+
+        _clear_analysis_cache()
+
+        logger.info(f"批次 {batch_id} 汇总完成: {summary}")
+        return summary
+
+    except Exception as e:
+        logger.error(f"批次 {batch_id} 汇总异常: {str(e)}", exc_info=True)
+        db.session.rollback()
+        if batch:
+            batch.mark_as_failed(str(e))
+        return {'error': str(e), 'batch_id': batch_id}
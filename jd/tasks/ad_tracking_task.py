@@ -3,9 +3,10 @@
 
 功能：
 1. 每日增量广告追踪任务（定时执行）
-2. 历史数据批量处理任务（手动触发）
+2. 历史数据批量处理任务（手动触发，按ID范围切分分片并分发到多个 worker）
 3. 单条记录处理任务（即时处理）
 4. 时间范围处理任务（前端手动触发）
+5. t.me 账户预览刷新任务（定时执行，只抓取到期条目）
 
 基于 BaseTask 框架实现，支持队列管理和冲突检测
 """
@@ -309,26 +310,29 @@ class DateRangeAdTrackingTask(BaseTask):
 
 
 class HistoricalAdTrackingBatchTask(BaseTask):
-    """历史数据批量处理任务"""
+    """历史数据批量处理任务：按ID范围切分分片，分发给 Celery worker 并行处理"""
 
-    def __init__(self, batch_size: int = 1000, max_batches: Optional[int] = None):
+    def __init__(self, batch_size: int = 1000, max_batches: Optional[int] = None,
+                 shard_size: Optional[int] = None):
         """
         初始化历史数据批量处理任务
 
         Args:
             batch_size: 每批处理数量
-            max_batches: 最大批次数（None表示处理全部）
+            max_batches: 每个分片的最大批次数（None表示处理全部）
+            shard_size: 每个分片覆盖的ID跨度，默认取 AD_TRACKING_HISTORICAL_SHARD_SIZE
         """
         super().__init__(resource_id='historical_batch')
         self.batch_size = batch_size
         self.max_batches = max_batches
+        self.shard_size = shard_size
 
     def get_job_name(self) -> str:
         """获取任务名称"""
         return 'ad_tracking.historical_batch'
 
     def execute_task(self) -> Dict[str, Any]:
-        """执行历史数据批量处理任务"""
+        """切分ID范围并分发分片任务（分片任务各自按检查点续跑）"""
         perf_logger = PerformanceLogger()
         perf_logger.start('historical_ad_tracking_batch', batch_size=self.batch_size, max_batches=self.max_batches)
 
@@ -337,20 +341,104 @@ class HistoricalAdTrackingBatchTask(BaseTask):
                 'extra_fields': {
                     'batch_size': self.batch_size,
                     'max_batches': self.max_batches,
+                    'shard_size': self.shard_size,
                     'task_id': self.resource_id
                 }
             })
 
             job = AdTrackingJob()
-            result = job.run_historical_batch(self.batch_size, self.max_batches)
+            shards = job.plan_historical_shards(self.shard_size)
+            for shard in shards:
+                historical_ad_tracking_shard_task.delay(
+                    shard['source'], shard['start_id'], shard['end_id'],
+                    self.batch_size, self.max_batches
+                )
 
-            logger.info("历史广告追踪批量处理任务完成", extra={
+            result = {
+                'shards_dispatched': len(shards),
+                'shards_by_source': {
+                    source: sum(1 for shard in shards if shard['source'] == source)
+                    for source in {shard['source'] for shard in shards}
+                },
+                'batch_size': self.batch_size,
+                'max_batches': self.max_batches
+            }
+
+            logger.info("历史广告追踪分片已分发", extra={
+                'extra_fields': result
+            })
+
+            perf_logger.end(success=True, shards_dispatched=len(shards))
+
+            return {
+                'err_code': 0,
+                'err_msg': '分片任务已分发',
+                'payload': result
+            }
+
+        except Exception as e:
+            logger.error("历史广告追踪批量处理任务失败", extra={
                 'extra_fields': {
                     'batch_size': self.batch_size,
                     'max_batches': self.max_batches,
-                    'chat_records': result.get('chat_records_processed', 0),
-                    'user_infos': result.get('user_infos_processed', 0),
-                    'group_infos': result.get('group_infos_processed', 0),
+                    'error_type': type(e).__name__,
+                    'error_message': str(e)
+                }
+            }, exc_info=True)
+            perf_logger.end(success=False, error=str(e))
+
+            return {
+                'err_code': 1,
+                'err_msg': f'任务执行失败: {str(e)}',
+                'exception': str(e)
+            }
+
+
+class HistoricalAdTrackingShardTask(BaseTask):
+    """历史数据分片处理任务（ID闭区间，按检查点续跑）"""
+
+    def __init__(self, source: str, start_id: int, end_id: int,
+                 batch_size: int = 1000, max_batches: Optional[int] = None):
+        """
+        初始化历史数据分片处理任务
+
+        Args:
+            source: 'chat' | 'user_info' | 'group'
+            start_id: 起始ID（含）
+            end_id: 结束ID（含）
+            batch_size: 每批处理数量
+            max_batches: 最大批次数（None表示处理到分片结束）
+        """
+        super().__init__(resource_id=f'historical_{source}_{start_id}_{end_id}')
+        self.source = source
+        self.start_id = start_id
+        self.end_id = end_id
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+
+    def get_job_name(self) -> str:
+        """获取任务名称"""
+        return 'ad_tracking.historical_shard'
+
+    def execute_task(self) -> Dict[str, Any]:
+        """执行历史数据分片处理任务"""
+        perf_logger = PerformanceLogger()
+        perf_logger.start('historical_ad_tracking_shard', source=self.source,
+                          start_id=self.start_id, end_id=self.end_id)
+
+        try:
+            job = AdTrackingJob()
+            result = job.run_historical_shard(
+                self.source, self.start_id, self.end_id,
+                batch_size=self.batch_size, max_batches=self.max_batches
+            )
+
+            logger.info("历史广告追踪分片处理完成", extra={
+                'extra_fields': {
+                    'source': self.source,
+                    'start_id': self.start_id,
+                    'end_id': self.end_id,
+                    'last_id': result.get('last_id'),
                     'total_urls': result.get('total_urls', 0),
                     'total_accounts': result.get('total_accounts', 0),
                     'total_items': result.get('total_items', 0),
@@ -368,10 +456,63 @@ class HistoricalAdTrackingBatchTask(BaseTask):
             }
 
         except Exception as e:
-            logger.error("历史广告追踪批量处理任务失败", extra={
+            logger.error("历史广告追踪分片处理失败", extra={
                 'extra_fields': {
-                    'batch_size': self.batch_size,
-                    'max_batches': self.max_batches,
+                    'source': self.source,
+                    'start_id': self.start_id,
+                    'end_id': self.end_id,
+                    'error_type': type(e).__name__,
+                    'error_message': str(e)
+                }
+            }, exc_info=True)
+            perf_logger.end(success=False, error=str(e))
+
+            return {
+                'err_code': 1,
+                'err_msg': f'任务执行失败: {str(e)}',
+                'exception': str(e)
+            }
+
+
+class TmePreviewRefreshTask(BaseTask):
+    """t.me 账户预览刷新任务"""
+
+    def __init__(self, limit: Optional[int] = None):
+        """
+        初始化 t.me 账户预览刷新任务
+
+        Args:
+            limit: 本次最多抓取的条目数（None表示使用配置）
+        """
+        super().__init__(resource_id='tme_preview_refresh')
+        self.limit = limit
+
+    def get_job_name(self) -> str:
+        """获取任务名称"""
+        return 'ad_tracking.refresh_tme_previews'
+
+    def execute_task(self) -> Dict[str, Any]:
+        """执行 t.me 账户预览刷新任务"""
+        perf_logger = PerformanceLogger()
+        perf_logger.start('tme_preview_refresh', limit=self.limit)
+
+        try:
+            job = AdTrackingJob()
+            result = job.refresh_tme_previews(limit=self.limit)
+
+            logger.info("t.me 账户预览刷新任务完成", extra={'extra_fields': result})
+            perf_logger.end(success=True, **result)
+
+            return {
+                'err_code': 0,
+                'err_msg': '任务执行完成',
+                'payload': result
+            }
+
+        except Exception as e:
+            logger.error("t.me 账户预览刷新任务失败", extra={
+                'extra_fields': {
+                    'limit': self.limit,
                     'error_type': type(e).__name__,
                     'error_message': str(e)
                 }
@@ -748,28 +889,32 @@ def date_range_ad_tracking_task(self, start_date: str, end_date: str) -> Dict[st
 
 
 @celery.task(bind=True, queue='jd.celery.first', name='ad_tracking.historical_batch')
-def historical_ad_tracking_batch_task(self, batch_size: int = 1000, max_batches: int = None) -> Dict[str, Any]:
+def historical_ad_tracking_batch_task(self, batch_size: int = 1000, max_batches: int = None,
+                                      shard_size: int = None) -> Dict[str, Any]:
     """
-    历史数据批量处理任务 (Celery 包装器)
+    历史数据批量处理任务 (Celery 包装器)，切分ID范围并分发分片任务
 
     Args:
         batch_size: 每批处理数量
-        max_batches: 最大批次数（None表示处理全部）
+        max_batches: 每个分片的最大批次数（None表示处理全部）
+        shard_size: 每个分片覆盖的ID跨度
 
     Returns:
-        执行结果统计
+        分发结果统计
     """
     try:
         logger.info("Celery 历史广告追踪批量处理任务启动", extra={
             'extra_fields': {
                 'task_id': self.request.id,
                 'batch_size': batch_size,
-                'max_batches': max_batches
+                'max_batches': max_batches,
+                'shard_size': shard_size
             }
         })
 
         with app.app_context():
-            task = HistoricalAdTrackingBatchTask(batch_size=batch_size, max_batches=max_batches)
+            task = HistoricalAdTrackingBatchTask(batch_size=batch_size, max_batches=max_batches,
+                                                 shard_size=shard_size)
             result = task.start_task()
 
             logger.info("Celery 历史广告追踪批量处理任务完成", extra={
@@ -796,6 +941,73 @@ def historical_ad_tracking_batch_task(self, batch_size: int = 1000, max_batches:
         raise
 
 
+@celery.task(bind=True, queue='jd.celery.first', name='ad_tracking.historical_shard')
+def historical_ad_tracking_shard_task(self, source: str, start_id: int, end_id: int,
+                                      batch_size: int = 1000, max_batches: int = None) -> Dict[str, Any]:
+    """
+    历史数据分片处理任务 (Celery 包装器)
+
+    Args:
+        source: 'chat' | 'user_info' | 'group'
+        start_id: 起始ID（含）
+        end_id: 结束ID（含）
+        batch_size: 每批处理数量
+        max_batches: 最大批次数（None表示处理到分片结束）
+
+    Returns:
+        执行结果统计
+    """
+    try:
+        with app.app_context():
+            task = HistoricalAdTrackingShardTask(source, start_id, end_id,
+                                                 batch_size=batch_size, max_batches=max_batches)
+            return task.start_task()
+
+    except Exception as e:
+        logger.error("Celery 历史广告追踪分片任务失败，准备重试", extra={
+            'extra_fields': {
+                'task_id': self.request.id,
+                'source': source,
+                'start_id': start_id,
+                'end_id': end_id,
+                'error_type': type(e).__name__,
+                'error_message': str(e),
+                'retry_count': self.request.retries,
+                'max_retries': 3
+            }
+        }, exc_info=True)
+        # 分片按检查点续跑，重试不会重复处理已完成的批次
+        raise self.retry(countdown=60, max_retries=3, exc=e)
+
+
+@celery.task(bind=True, queue='jd.celery.first', name='ad_tracking.refresh_tme_previews')
+def refresh_tme_previews_task(self, limit: int = None) -> Dict[str, Any]:
+    """
+    t.me 账户预览刷新任务 (Celery 包装器)
+
+    Args:
+        limit: 本次最多抓取的条目数
+
+    Returns:
+        执行结果统计
+    """
+    try:
+        with app.app_context():
+            task = TmePreviewRefreshTask(limit=limit)
+            return task.start_task()
+
+    except Exception as e:
+        logger.error("Celery t.me 账户预览刷新任务失败", extra={
+            'extra_fields': {
+                'task_id': self.request.id,
+                'limit': limit,
+                'error_type': type(e).__name__,
+                'error_message': str(e)
+            }
+        }, exc_info=True)
+        raise
+
+
 @celery.task(bind=True, queue='jd.celery.first', name='ad_tracking.process_chat_record')
 def process_chat_record_task(self, chat_record_id: int) -> Dict[str, Any]:
     """
@@ -958,6 +1170,14 @@ beat_schedule = {
             'expires': 3600,  # 任务1小时后过期
         }
     },
+    # 每10分钟刷新一批到期的 t.me 账户预览（未到期的条目不会发起请求）
+    'refresh-tme-previews': {
+        'task': 'ad_tracking.refresh_tme_previews',
+        'schedule': crontab(minute='*/10'),
+        'options': {
+            'expires': 600,
+        }
+    },
 }
 
 前端API手动触发支持：
@@ -4,7 +4,8 @@ from typing import Dict, Any
 from zoneinfo import ZoneInfo
 
 from jCelery import celery
-from jd.jobs.tg_new_history import NewJoinedGroupHistoryFetcher
+from jd import app
+from jd.jobs.tg_new_history import NewJoinedGroupHistoryFetcher, GroupHistoryBackfillEngine
 from jd.jobs.tg_group_info import TgGroupInfoManager
 from jd.tasks.base_task import AsyncBaseTask, QueueStatus
 
@@ -125,6 +126,9 @@ class NewGroupHistoryTask(AsyncBaseTask):
             logger.warning(f'群组 {self.group_name} 没有关联的session，使用默认session或指定session')
         
         logger.info(f'群组 {self.chat_id} 可用session列表: {session_list}')
+
+        if app.config.get('TG_BACKFILL_ENGINE_ENABLED', True):
+            return await self._execute_backfill_engine(session_list)
         
         fetcher = NewJoinedGroupHistoryFetcher()
         
@@ -214,6 +218,46 @@ class NewGroupHistoryTask(AsyncBaseTask):
                 logger.error(f'关闭 Telegram 服务时发生错误: {e}')
 
 
+    async def _execute_backfill_engine(self, session_list) -> Dict[str, Any]:
+        """使用分段回溯引擎执行：区间检查点可续传，多个session并行拉取"""
+        start_time = datetime.datetime.now(ZoneInfo('UTC'))
+        try:
+            engine = GroupHistoryBackfillEngine(self.chat_id, self.group_name, session_list)
+            stats = await engine.run()
+        except Exception as e:
+            error_msg = f'处理群组 (chat_id: {self.chat_id}) 时发生错误: {e}'
+            logger.error(error_msg)
+            return {
+                'err_code': 1,
+                'err_msg': error_msg,
+                'payload': {
+                    'success': False,
+                    'chat_id': self.chat_id,
+                    'exception': str(e)
+                }
+            }
+
+        used_session = stats['used_sessions'][0] if stats.get('used_sessions') else (self.session_id or 'default')
+        self.update_queue_log(session_name=used_session)
+
+        payload = {
+            'success': stats['success'],
+            'group_name': self.group_name,
+            'chat_id': self.chat_id,
+            'used_session': used_session,
+            'backfill': stats,
+            'start_time': start_time.isoformat(),
+            'end_time': datetime.datetime.now(ZoneInfo('UTC')).isoformat()
+        }
+        if stats['success']:
+            logger.info(f'群组 {self.group_name} 历史记录分段回溯成功，使用session: {stats.get("used_sessions")}')
+            return {'err_code': 0, 'err_msg': '', 'payload': payload}
+
+        error_msg = f'获取群组 {self.group_name} (chat_id: {self.chat_id}) 聊天记录失败'
+        logger.warning(error_msg)
+        return {'err_code': 1, 'err_msg': error_msg, 'payload': payload}
+
+
 def start_group_history_fetch(group_name: str, chat_id: int, session_name: str = None) -> Dict[str, Any]:
     """
     启动群组历史获取任务（使用改进的任务队列管理）
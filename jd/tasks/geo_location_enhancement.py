@@ -1,28 +1,32 @@
 """地理位置数据增强任务 - 为现有数据填充省份信息"""
 import logging
+
+from sqlalchemy import func, text
+
 from jd import db
 from jd.tasks.base_task import BaseTask
 
 logger = logging.getLogger(__name__)
 
+# 城市 → 省份映射的会话级临时表（任务独占一个连接）
+CITY_PROVINCE_TABLE = 'tmp_geo_city_province'
+
 
 class GeoLocationEnhancementTask(BaseTask):
     """地理位置数据增强任务，为现有地理位置记录填充省份信息"""
 
     name = "jd.geo_location_enhancement"
 
-    def run(self, chat_id: int = None, batch_size: int = 100, **kwargs):
+    def run(self, chat_id: int = None, batch_size: int = 10000, **kwargs):
         """
         运行地理位置数据增强任务
 
         Args:
             chat_id: 可选，指定群组ID。如果为None，则处理所有群组
-            batch_size: 每批处理的记录数
+            batch_size: 每条 UPDATE 覆盖的记录ID范围
             **kwargs: 其他参数
         """
         try:
-            from jd.services.geo_location_enhancement import GeoLocationEnhancementService
-
             logger.info(f"开始地理位置数据增强任务 - chat_id: {chat_id}, batch_size: {batch_size}")
 
             if chat_id:
@@ -41,120 +45,97 @@ class GeoLocationEnhancementTask(BaseTask):
 
     def _enhance_chat_geo_locations(self, chat_id: int, batch_size: int) -> dict:
         """增强指定群组的地理位置记录"""
-        try:
-            from jd.models.ad_tracking_geo_location import AdTrackingGeoLocation
-
-            stats = {
-                'chat_id': chat_id,
-                'total_processed': 0,
-                'total_updated': 0,
-                'errors': 0
-            }
-
-            # 查询该群组需要增强的记录
-            records = AdTrackingGeoLocation.query.filter(
-                AdTrackingGeoLocation.chat_id == chat_id,
-                AdTrackingGeoLocation.city.isnot(None),
-                AdTrackingGeoLocation.province.is_(None)
-            ).limit(batch_size).all()
-
-            for record in records:
-                try:
-                    # 通过城市名查找省份
-                    province = self._get_province_by_city(record.city)
-                    if province:
-                        record.province = province
-                        stats['total_updated'] += 1
-
-                    stats['total_processed'] += 1
-
-                except Exception as e:
-                    logger.error(f"处理记录 {record.id} 失败: {e}")
-                    stats['errors'] += 1
-                    continue
-
-            db.session.commit()
-            return stats
-
-        except Exception as e:
-            logger.error(f"增强群组 {chat_id} 的地理位置记录失败: {e}")
-            db.session.rollback()
-            raise
+        return dict(self._enhance_geo_locations(batch_size, chat_id), chat_id=chat_id)
 
     def _enhance_all_geo_locations(self, batch_size: int) -> dict:
         """增强所有群组的地理位置记录"""
-        try:
-            from jd.models.ad_tracking_geo_location import AdTrackingGeoLocation
-
-            stats = {
-                'total_processed': 0,
-                'total_updated': 0,
-                'errors': 0,
-                'batch_count': 0
-            }
-
-            offset = 0
-            has_more = True
+        return self._enhance_geo_locations(batch_size)
 
-            while has_more:
-                # 查询一批需要增强的记录
-                records = AdTrackingGeoLocation.query.filter(
-                    AdTrackingGeoLocation.city.isnot(None),
-                    AdTrackingGeoLocation.province.is_(None)
-                ).offset(offset).limit(batch_size).all()
+    def _enhance_geo_locations(self, batch_size: int, chat_id: int = None) -> dict:
+        """
+        按ID范围分块，用 UPDATE ... JOIN 批量填充缺失的省份
 
-                if not records:
-                    has_more = False
-                    break
+        城市 → 省份映射从地理位置名录一次性加载，写入临时表后与记录表关联更新，
+        每个ID范围一条语句、一次提交，不再逐条查询省份
+        """
+        from jd.models.ad_tracking_geo_location import AdTrackingGeoLocation
+
+        stats = {
+            'total_processed': 0,
+            'total_updated': 0,
+            'errors': 0,
+            'batch_count': 0
+        }
+
+        filters = [AdTrackingGeoLocation.city.isnot(None), AdTrackingGeoLocation.province.is_(None)]
+        if chat_id:
+            filters.append(AdTrackingGeoLocation.chat_id == chat_id)
+        pending, min_id, max_id = db.session.query(
+            func.count(AdTrackingGeoLocation.id),
+            func.min(AdTrackingGeoLocation.id),
+            func.max(AdTrackingGeoLocation.id)
+        ).filter(*filters).one()
+        db.session.commit()
+
+        if not pending:
+            return stats
+        stats['total_processed'] = pending
 
-                stats['batch_count'] += 1
-                batch_updated = 0
+        city_provinces = self._load_city_provinces()
+        if not city_provinces:
+            logger.warning("城市 → 省份映射为空，跳过地理位置数据增强")
+            return stats
 
-                for record in records:
+        update_sql = f"""
+            UPDATE ad_tracking_geo_location g
+            JOIN {CITY_PROVINCE_TABLE} m ON m.city = g.city
+            SET g.province = m.province
+            WHERE g.id > :after_id AND g.id <= :to_id
+              AND g.province IS NULL
+        """
+        if chat_id:
+            update_sql += " AND g.chat_id = :chat_id"
+
+        with db.engine.connect() as conn:
+            conn.execute(text(
+                f"CREATE TEMPORARY TABLE IF NOT EXISTS {CITY_PROVINCE_TABLE} ("
+                "city VARCHAR(50) NOT NULL PRIMARY KEY, province VARCHAR(50) NOT NULL"
+                ") ENGINE=MEMORY DEFAULT CHARSET=utf8mb4"
+            ))
+            try:
+                conn.execute(text(f"DELETE FROM {CITY_PROVINCE_TABLE}"))
+                conn.execute(
+                    text(f"INSERT INTO {CITY_PROVINCE_TABLE} (city, province) VALUES (:city, :province)"),
+                    [{'city': city, 'province': province} for city, province in city_provinces.items()]
+                )
+                conn.commit()
+
+                after_id = min_id - 1
+                while after_id < max_id:
+                    to_id = after_id + batch_size
+                    stats['batch_count'] += 1
                     try:
-                        # 通过城市名查找省份
-                        province = self._get_province_by_city(record.city)
-                        if province:
-                            record.province = province
-                            batch_updated += 1
-
-                        stats['total_processed'] += 1
-
+                        result = conn.execute(text(update_sql), {
+                            'after_id': after_id, 'to_id': to_id, 'chat_id': chat_id
+                        })
+                        conn.commit()
+                        stats['total_updated'] += result.rowcount
+                        logger.info(f"已处理批次 {stats['batch_count']} (ID {after_id + 1}-{to_id}): "
+                                    f"更新 {result.rowcount} 条记录")
                     except Exception as e:
-                        logger.error(f"处理记录 {record.id} 失败: {e}")
+                        conn.rollback()
                         stats['errors'] += 1
-                        continue
-
-                stats['total_updated'] += batch_updated
-                offset += batch_size
-
-                # 每批提交一次
-                db.session.commit()
-                logger.info(f"已处理批次 {stats['batch_count']}: 更新 {batch_updated}/{len(records)} 条记录")
-
-            return stats
+                        logger.error(f"更新ID范围 {after_id + 1}-{to_id} 的省份失败: {e}")
+                    after_id = to_id
+            finally:
+                conn.execute(text(f"DROP TEMPORARY TABLE IF EXISTS {CITY_PROVINCE_TABLE}"))
+                conn.commit()
 
-        except Exception as e:
-            logger.error(f"增强所有地理位置记录失败: {e}")
-            db.session.rollback()
-            raise
+        return stats
 
-    def _get_province_by_city(self, city_name: str) -> str:
-        """通过城市名获取省份名"""
-        try:
-            from jd.models.ad_tracking_geo_location_master import AdTrackingGeoLocationMaster
+    def _load_city_provinces(self) -> dict:
+        """从地理位置名录加载城市名 → 省份名（名录未加载时一次查询主表）"""
+        from jd.services.geo_location_service import GeoLocationService
 
-            # 在地理位置主表中查找城市及其对应的省份
-            result = db.session.execute("""
-                SELECT p.name as province_name
-                FROM ad_tracking_geo_location_master c
-                JOIN ad_tracking_geo_location_master p ON c.parent_id = p.id
-                WHERE c.name = :city_name AND c.level = 2 AND p.level = 1
-                LIMIT 1
-            """, {'city_name': city_name}).fetchone()
-
-            return result.province_name if result else None
-
-        except Exception as e:
-            logger.error(f"通过城市名 {city_name} 查找省份失败: {e}")
-            return None
\ No newline at end of file
+        gazetteer = GeoLocationService.get_gazetteer()
+        return gazetteer.city_provinces() if gazetteer else {}
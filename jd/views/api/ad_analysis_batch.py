@@ -151,6 +151,7 @@ def get_batch_status(batch_id):
             "success_count": 450,
             "fail_count": 50,
             "progress_percent": 50.0,
+            "throughput": 120.5,
             "created_at": "2026-01-06T12:34:56",
             "started_at": "2026-01-06T12:35:00",
             "completed_at": null,
@@ -183,6 +184,7 @@ def get_batch_status(batch_id):
             'success_count': batch.success_count or 0,
             'fail_count': batch.fail_count or 0,
             'progress_percent': round(progress_percent, 2),
+            'throughput': batch.get_throughput(),
             'created_at': batch.created_at.isoformat() if batch.created_at else None,
             'started_at': batch.start_time.isoformat() if batch.start_time else None,
             'completed_at': batch.end_time.isoformat() if batch.end_time else None
@@ -542,9 +544,12 @@ def process_all_chats_api():
 
     Returns:
         {
+            "batch_id": "uuid",
             "task_id": "celery_task_id",
             "message": "已提交批量处理任务"
         }
+
+    批次进度与吞吐量通过 GET /ad-tracking/ad-analysis/batch/<batch_id> 查询
     """
     try:
         data = request.get_json() or {}
@@ -558,6 +563,17 @@ def process_all_chats_api():
                 status_code=400
             )
 
+        # 创建批次记录，各工作单元的进度汇总到这条记录
+        batch_id = str(uuid.uuid4())
+        batch = AdTrackingBatchProcessLog(
+            batch_id=batch_id,
+            chat_id='all',
+            include_price=data.get('include_price', True),
+            status='processing'
+        )
+        db.session.add(batch)
+        db.session.commit()
+
         # 提交任务（参照现有任务实现）
         task_id = None
         try:
@@ -567,12 +583,13 @@ def process_all_chats_api():
                     data.get('include_price', True),
                     data.get('include_transaction', True),
                     data.get('include_geo', True),
-                    data.get('include_dark_keyword', True)
+                    data.get('include_dark_keyword', True),
+                    batch_id
                 ],
                 queue='jd.celery.first'
             )
             task_id = task.id
-            logger.info(f"批量处理所有群组: days={days}, task_id={task_id}")
+            logger.info(f"批量处理所有群组: days={days}, batch_id={batch_id}, task_id={task_id}")
         except Exception as celery_error:
             # Celery 任务提交失败时，记录错误但继续返回成功
             logger.warning(
@@ -582,6 +599,7 @@ def process_all_chats_api():
             task_id = None
 
         return api_response({
+            'batch_id': batch_id,
             'task_id': task_id,
             'days': days,
             'status': 'pending',
@@ -23,9 +23,11 @@ from jd.services.role_service.role import ROLE_SUPER_ADMIN, RoleService
 from jd.views import get_or_exception
 from jd.views.api import api
 from jd.helpers.permission_helper import get_accessible_tg_user_ids
+from jd.helpers.photo_thumbnail import resolve_thumbnail_paths
 
 logger = logging.getLogger(__name__)
 
+
 def get_mime_type_from_path(file_path, file_ext=None):
     """根据文件路径或扩展名获取MIME类型"""
     # 首先尝试通过完整路径获取
@@ -297,6 +299,7 @@ def tg_chat_room_history():
                 'username': r.username,
                 'user_id': r.user_id,
                 'photo_paths': [r.photo_path] if r.photo_path else [],
+                'photo_thumb_paths': resolve_thumbnail_paths([r.photo_path] if r.photo_path else [], r.photo_thumb_path),
                 'document_paths': [r.document_path] if r.document_path else [],  # 保持向后兼容
                 'documents': documents,  # 新增：包含类型信息的文档列表
                 'reply_to_msg_id': reply_to_msg_id,
@@ -446,6 +449,7 @@ def tg_chat_room_history_json():
                 'user_avatar': user_avatar,
                 'is_key_focus': is_key_focus,
                 'photo_paths': [r.photo_path] if r.photo_path else [],
+                'photo_thumb_paths': resolve_thumbnail_paths([r.photo_path] if r.photo_path else [], r.photo_thumb_path),
                 'document_paths': [r.document_path] if r.document_path else [],  # 保持向后兼容
                 'documents': documents,  # 新增：包含类型信息的文档列表
                 'reply_to_msg_id': r.reply_to_msg_id or 0,
@@ -624,6 +628,7 @@ def tg_chat_room_history_by_group(group_id):
                 'user_avatar': user_avatar,
                 'is_key_focus': is_key_focus,
                 'photo_paths': [r.photo_path] if r.photo_path else [],
+                'photo_thumb_paths': resolve_thumbnail_paths([r.photo_path] if r.photo_path else [], r.photo_thumb_path),
                 'document_paths': [r.document_path] if r.document_path else [],  # 保持向后兼容
                 'documents': documents,  # 新增：包含类型信息的文档列表
                 'reply_to_msg_id': r.reply_to_msg_id or 0,
@@ -733,6 +738,7 @@ def tg_chat_room_history_by_private_chat(chat_id):
                 'username': r.username,
                 'postal_time': r.postal_time.strftime('%Y-%m-%d %H:%M:%S') if r.postal_time else '',
                 'photo_paths': r.photo_path.split(',') if r.photo_path else [],
+                'photo_thumb_paths': resolve_thumbnail_paths(r.photo_path.split(',') if r.photo_path else [], r.photo_thumb_path),
                 'document_paths': [r.document_path] if r.document_path else [],  # 保持向后兼容
                 'documents': documents,  # 新增：包含类型信息的文档列表
                 'reply_to_msg_id': r.reply_to_msg_id or 0,
@@ -980,6 +986,7 @@ def tg_chat_room_history_by_user_in_group(group_id, user_id):
                 'user_avatar': user_details['avatar_path'],
                 'is_key_focus': user_details['is_key_focus'],
                 'photo_paths': [r.photo_path] if r.photo_path else [],
+                'photo_thumb_paths': resolve_thumbnail_paths([r.photo_path] if r.photo_path else [], r.photo_thumb_path),
                 'document_paths': [r.document_path] if r.document_path else [],  # 保持向后兼容
                 'documents': documents,  # 新增：包含类型信息的文档列表
                 'reply_to_msg_id': r.reply_to_msg_id or 0,
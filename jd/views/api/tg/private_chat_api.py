@@ -6,6 +6,7 @@ from flask import request, jsonify
 from sqlalchemy import func, and_, or_
 
 from jd import db
+from jd.helpers.photo_thumbnail import resolve_thumbnail_paths
 from jd.models.tg_person_chat_history import TgPersonChatHistory
 from jd.models.tg_account import TgAccount
 from jd.models.tg_group_user_info import TgGroupUserInfo
@@ -119,6 +120,7 @@ def get_private_chat_history():
                 'is_key_focus': False,
                 'postal_time': msg.postal_time.strftime('%Y-%m-%d %H:%M:%S') if msg.postal_time else '',
                 'photo_paths': [msg.photo_path] if msg.photo_path else [],
+                'photo_thumb_paths': resolve_thumbnail_paths([msg.photo_path] if msg.photo_path else [], msg.photo_thumb_path),
                 'document_paths': [msg.document_path] if msg.document_path else [],
                 'documents': [],  # TODO: 增强文档信息
                 'reply_to_msg_id': int(msg.reply_to_msg_id) if msg.reply_to_msg_id and msg.reply_to_msg_id.isdigit() else 0,
@@ -21,7 +21,7 @@ sys.path.insert(0, '.')
 
 def check_domain(domain):
     """
-    检查单个域名
+    检查单个域名（与广告追踪使用同一索引，子域名按父域名匹配）
 
     Args:
         domain: 域名
@@ -29,15 +29,7 @@ def check_domain(domain):
     Returns:
         True 如果是主流域名，False 否则
     """
-    from web import app
-    from jd.models.mainstream_domain import MainstreamDomain
-
-    with app.app_context():
-        result = MainstreamDomain.query.filter_by(
-            domain=domain.lower().strip(),
-            is_active=True
-        ).first()
-        return result is not None
+    return check_batch([domain])[domain]
 
 
 def check_batch(domains):
@@ -51,17 +43,12 @@ def check_batch(domains):
         检查结果字典
     """
     from web import app
-    from jd.models.mainstream_domain import MainstreamDomain
+    from jd.services.spider.mainstream_domain_index import get_mainstream_domain_index
 
     with app.app_context():
-        # 批量查询
-        results = MainstreamDomain.query.filter(
-            MainstreamDomain.domain.in_(domains),
-            MainstreamDomain.is_active == True
-        ).all()
-
-        mainstream_set = {r.domain for r in results}
-        return {domain: domain in mainstream_set for domain in domains}
+        index = get_mainstream_domain_index()
+        index.ensure_fresh(force=True)
+        return {domain: index.contains(domain) for domain in domains}
 
 
 def main():
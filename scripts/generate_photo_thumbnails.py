@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+聊天图片缩略图补生成脚本
+
+为 static/images 下已下载但尚未生成缩略图的原图补生成 WebP 缩略图，
+并回填聊天记录的 photo_thumb_path 字段（列表接口读取该字段，不再检查文件是否存在）
+使用方法:
+    python scripts/generate_photo_thumbnails.py
+    python scripts/generate_photo_thumbnails.py --limit 1000
+"""
+
+import os
+import sys
+import logging
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# 添加项目路径
+sys.path.insert(0, '.')
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp')
+
+# 早期版本还会生成 small 规格，遍历原图时一并跳过
+LEGACY_THUMBNAIL_SIZES = ('small',)
+
+# 每批回填的记录数
+UPDATE_BATCH_SIZE = 500
+
+
+def iter_original_images(images_dir):
+    """遍历图片目录中的原图，跳过已生成的缩略图文件"""
+    from jd.helpers.photo_thumbnail import THUMBNAIL_SIZES
+
+    thumb_suffixes = tuple(f'.{size}.webp' for size in (*THUMBNAIL_SIZES, *LEGACY_THUMBNAIL_SIZES))
+    for file_name in sorted(os.listdir(images_dir)):
+        lower_name = file_name.lower()
+        if lower_name.endswith(thumb_suffixes) or not lower_name.endswith(IMAGE_EXTENSIONS):
+            continue
+        yield os.path.join(images_dir, file_name)
+
+
+def update_thumb_paths(db, thumb_paths):
+    """
+    回填 photo_thumb_path（只更新尚未记录缩略图的记录）
+
+    Args:
+        db: SQLAlchemy 实例
+        thumb_paths: [(原图相对路径, 缩略图相对路径), ...]
+
+    Returns:
+        int: 更新的记录数
+    """
+    from sqlalchemy import text
+
+    if not thumb_paths:
+        return 0
+    params = [{'photo_path': photo_path, 'thumb_path': thumb_path} for photo_path, thumb_path in thumb_paths]
+    updated = 0
+    for table in ('tg_group_chat_history', 'tg_person_chat_history'):
+        result = db.session.execute(text(
+            f"UPDATE {table} SET photo_thumb_path = :thumb_path "
+            f"WHERE photo_path = :photo_path AND photo_thumb_path = ''"
+        ), params)
+        updated += max(result.rowcount, 0)
+    db.session.commit()
+    return updated
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='补生成聊天图片缩略图')
+    parser.add_argument('--limit', type=int, default=0,
+                        help='最多处理的原图数量 (默认: 0 表示不限制)')
+    args = parser.parse_args()
+
+    from web import app
+    from jd import db
+    from jd.helpers.photo_thumbnail import THUMBNAIL_SIZES, generate_thumbnails, get_thumbnail_path
+
+    images_dir = os.path.join(app.static_folder, 'images')
+    if not os.path.isdir(images_dir):
+        logger.error(f"图片目录不存在: {images_dir}")
+        return
+
+    processed = 0
+    failed = 0
+    updated = 0
+    pending_updates = []
+    with app.app_context():
+        for original_file_path in iter_original_images(images_dir):
+            if args.limit and processed >= args.limit:
+                break
+            thumbnails = generate_thumbnails(original_file_path)
+            if len(thumbnails) < len(THUMBNAIL_SIZES):
+                failed += 1
+            else:
+                photo_path = f'images/{os.path.basename(original_file_path)}'
+                pending_updates.append((photo_path, get_thumbnail_path(photo_path)))
+            processed += 1
+            if len(pending_updates) >= UPDATE_BATCH_SIZE:
+                updated += update_thumb_paths(db, pending_updates)
+                pending_updates = []
+            if processed % 500 == 0:
+                logger.info(f"已处理 {processed} 张图片，失败 {failed} 张，回填 {updated} 条记录")
+
+        updated += update_thumb_paths(db, pending_updates)
+
+    logger.info(f"缩略图补生成完成: 处理 {processed} 张，失败 {failed} 张，回填 {updated} 条记录")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+离线IP地理位置库导入脚本
+
+下载免费IP段数据并转换为 OfflineIpGeoDatabase 使用的CSV格式：
+    ip_from, ip_to, country_code, country, region, city
+
+数据源：
+- IP2Location LITE DB3（需要免费注册获取 token，含国家名称）
+- DB-IP City Lite（无需注册，按月发布，只有国家代码，CC BY 4.0）
+
+生成文件后在 config_local.py / config_production.py 中配置：
+    GEOIP_RANGE_DB_PATH = '/path/to/ip_geo_ranges.csv'
+各 worker 按文件修改时间自动重新加载，未配置时回退到在线查询 ip-api.com。
+
+使用方法:
+    python scripts/import_ip_geo_ranges.py -o static/geoip/ip_geo_ranges.csv
+    python scripts/import_ip_geo_ranges.py -o static/geoip/ip_geo_ranges.csv --token <IP2Location token>
+    python scripts/import_ip_geo_ranges.py -o static/geoip/ip_geo_ranges.csv --file IP2LOCATION-LITE-DB3.CSV
+"""
+
+import csv
+import gzip
+import io
+import logging
+import os
+import sys
+import zipfile
+from datetime import date, timedelta
+
+import requests
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# 添加项目路径
+sys.path.insert(0, '.')
+
+IP2LOCATION_URL = 'https://www.ip2location.com/download/?token={token}&file=DB3LITECSV'
+DBIP_URL = 'https://download.db-ip.com/free/dbip-city-lite-{month}.csv.gz'
+
+
+def download_ip2location(token):
+    """下载 IP2Location LITE DB3，返回CSV文本"""
+    logger.info("正在下载 IP2Location LITE DB3 ...")
+    response = requests.get(IP2LOCATION_URL.format(token=token), timeout=300)
+    response.raise_for_status()
+    with zipfile.ZipFile(io.BytesIO(response.content)) as z:
+        name = next(name for name in z.namelist() if name.upper().endswith('.CSV'))
+        return z.read(name).decode('utf-8', errors='ignore')
+
+
+def download_dbip(month=None):
+    """下载 DB-IP City Lite（当月，失败时取上月），返回CSV文本"""
+    first_day = date.today().replace(day=1)
+    months = [month] if month else [
+        first_day.strftime('%Y-%m'),
+        (first_day - timedelta(days=1)).strftime('%Y-%m')
+    ]
+    for candidate in months:
+        url = DBIP_URL.format(month=candidate)
+        logger.info(f"正在下载 DB-IP City Lite {candidate} ...")
+        response = requests.get(url, timeout=300)
+        if response.status_code == 404:
+            continue
+        response.raise_for_status()
+        return gzip.decompress(response.content).decode('utf-8', errors='ignore')
+    raise RuntimeError(f"DB-IP City Lite 下载失败: {months}")
+
+
+def convert_rows(text, source):
+    """
+    转换为统一的列顺序，只保留IPv4段
+
+    Args:
+        text: 源CSV文本
+        source: 'ip2location' 或 'dbip'
+
+    Yields:
+        [ip_from, ip_to, country_code, country, region, city]
+    """
+    for row in csv.reader(io.StringIO(text)):
+        if source == 'ip2location':
+            # ip_from, ip_to, country_code, country_name, region_name, city_name
+            if len(row) < 6 or not row[0].isdigit():
+                continue
+            yield row[:6]
+        else:
+            # ip_start, ip_end, continent, country, stateprov, city, latitude, longitude
+            if len(row) < 6 or ':' in row[0] or '.' not in row[0]:
+                continue
+            yield [row[0], row[1], row[3], row[3], row[4], row[5]]
+
+
+def write_ranges(rows, output):
+    """先写临时文件再替换，避免 worker 读到写了一半的文件"""
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    temp_path = output + '.tmp'
+    count = 0
+    with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['ip_from', 'ip_to', 'country_code', 'country', 'region', 'city'])
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    os.replace(temp_path, output)
+    return count
+
+
+def verify(output):
+    """用 OfflineIpGeoDatabase 加载生成的文件并抽查"""
+    from jd.services.spider.ip_geo_resolver import OfflineIpGeoDatabase
+
+    database = OfflineIpGeoDatabase()
+    range_count = database.load_file(output)
+    logger.info(f"  IP段数量: {range_count:,}")
+    for ip_address in ('8.8.8.8', '1.1.1.1', '114.114.114.114'):
+        logger.info(f"  {ip_address:18} {database.lookup(ip_address)}")
+    return range_count > 0
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='生成离线IP地理位置库文件（GEOIP_RANGE_DB_PATH）')
+    parser.add_argument('-o', '--output', required=True, help='输出文件路径')
+    parser.add_argument('--token', default=os.environ.get('IP2LOCATION_TOKEN'),
+                        help='IP2Location 下载 token（默认读取环境变量 IP2LOCATION_TOKEN），不提供时使用 DB-IP')
+    parser.add_argument('--month', help='DB-IP 数据月份，如 2026-10（默认当月）')
+    parser.add_argument('--file', help='转换本地已下载的 IP2Location LITE DB3 CSV 文件，不下载')
+
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("离线IP地理位置库导入工具")
+    print("=" * 70)
+
+    try:
+        if args.file:
+            with open(args.file, encoding='utf-8', errors='ignore') as f:
+                text, source = f.read(), 'ip2location'
+        elif args.token:
+            text, source = download_ip2location(args.token), 'ip2location'
+        else:
+            text, source = download_dbip(args.month), 'dbip'
+    except Exception as e:
+        logger.error(f"❌ 获取IP段数据失败: {e}")
+        sys.exit(1)
+
+    count = write_ranges(convert_rows(text, source), args.output)
+    logger.info(f"✓ 已写入 {count:,} 个IPv4段到 {args.output}")
+
+    if not verify(args.output):
+        logger.error("❌ 验证失败：文件中没有可用的IP段")
+        sys.exit(1)
+
+    print("\n" + "=" * 70)
+    print(f"✓ 完成！请配置 GEOIP_RANGE_DB_PATH = '{os.path.abspath(args.output)}'")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
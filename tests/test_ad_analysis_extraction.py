@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+AnalysisExtractionPipeline 单元测试
+"""
+
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, '.')
+
+from sqlalchemy.dialects import mysql
+
+from jd.tasks import ad_analysis_extraction
+from jd.tasks.ad_analysis_extraction import AnalysisExtractionPipeline
+
+
+def _message(message_id, text):
+    return SimpleNamespace(id=message_id, message=text, postal_time=datetime(2026, 10, 1, 12))
+
+
+class TestAnalysisExtractionPipeline:
+    """消息分析提取流水线测试"""
+
+    def _patch_services(self):
+        return (
+            patch.object(ad_analysis_extraction.KeywordExtractionService, 'extract_prices',
+                         return_value=[{'value': 100, 'unit': '元/克', 'original_text': '100一克'}]),
+            patch.object(ad_analysis_extraction.KeywordExtractionService, 'extract_transaction_methods',
+                         return_value=[{'method': '邮寄'}]),
+        )
+
+    def test_one_insert_per_table_and_one_commit(self):
+        """测试整块消息每张表一条批量插入、只提交一次"""
+        prices, methods = self._patch_services()
+        with prices, methods, patch.object(ad_analysis_extraction, 'db') as db:
+            pipeline = AnalysisExtractionPipeline('c1', ['price', 'transaction'])
+            for message_id in range(3):
+                pipeline.add(_message(message_id + 1, '价格100一克 可邮寄'))
+            pipeline.add(_message(4, '   '))
+            assert pipeline.pending_rows == 6
+            written = pipeline.flush()
+
+        assert written == 6
+        assert db.session.execute.call_count == 2
+        db.session.commit.assert_called_once()
+        rows = db.session.execute.call_args_list[0][0][1]
+        assert [row['message_id'] for row in rows] == ['1', '2', '3']
+        assert rows[0]['msg_date'] == datetime(2026, 10, 1).date()
+        assert pipeline.pending_rows == 0
+
+    def test_failed_message_rows_discarded(self):
+        """测试某个提取器失败时该消息的记录全部丢弃"""
+        prices, _ = self._patch_services()
+        with prices, patch.object(ad_analysis_extraction.KeywordExtractionService, 'extract_transaction_methods',
+                                  side_effect=RuntimeError('matcher')):
+            pipeline = AnalysisExtractionPipeline('c1', ['price', 'transaction'])
+            success, errors = ad_analysis_extraction._extract_chunk(pipeline, [_message(1, '价格100一克')])
+
+        assert success == 0
+        assert len(errors) == 1
+        assert pipeline.pending_rows == 0
+
+    def test_watermark_advanced_in_same_transaction(self):
+        """测试带词典版本时水位线与提取结果在同一次提交中推进"""
+        prices, _ = self._patch_services()
+        with prices, patch.object(ad_analysis_extraction, 'db') as db:
+            pipeline = AnalysisExtractionPipeline('c1', ['price'], versions={'price': 'v1'})
+            pipeline.add(_message(7, '价格100一克'))
+            pipeline.add(_message(9, ''))
+            pipeline.flush()
+
+        assert db.session.execute.call_count == 2
+        db.session.commit.assert_called_once()
+        stmt = db.session.execute.call_args_list[1][0][0]
+        sql = str(stmt.compile(dialect=mysql.dialect()))
+        params = stmt.compile(dialect=mysql.dialect()).params
+        assert 'ad_analysis_watermark' in sql
+        assert 'greatest(ad_analysis_watermark.last_message_id, VALUES(last_message_id))' in sql
+        assert params['last_message_id_m0'] == 9
+        assert params['dictionary_version_m0'] == 'v1'
+
+    def test_full_reset_saves_version_with_delete(self):
+        """测试词典版本变化时删除旧结果与水位线重置在同一次提交中完成"""
+        table = ad_analysis_extraction.AdAnalysisWatermark.__table__
+        price_model = MagicMock()
+        watermark = SimpleNamespace(extractor='price', dictionary_version='v0', last_message_id=500)
+        with patch.object(ad_analysis_extraction, 'db') as db, \
+                patch.object(ad_analysis_extraction, 'AdAnalysisWatermark') as model, \
+                patch.dict(ad_analysis_extraction.EXTRACTORS, {'price': (price_model, None)}), \
+                patch.object(ad_analysis_extraction, '_message_window', return_value=(0, None)):
+            model.__table__ = table
+            model.query.filter_by.return_value.all.return_value = [watermark]
+            ad_analysis_extraction._plan_chat_extraction('c1', ['price'], datetime(2026, 10, 1), {'price': 'v1'})
+
+        price_model.query.filter_by.assert_called_once_with(chat_id='c1')
+        db.session.commit.assert_called_once()
+        stmt = db.session.execute.call_args[0][0]
+        sql = str(stmt.compile(dialect=mysql.dialect()))
+        params = stmt.compile(dialect=mysql.dialect()).params
+        assert 'last_message_id = VALUES(last_message_id)' in sql
+        assert params['last_message_id_m0'] == 0
+        assert params['dictionary_version_m0'] == 'v1'
+
+
+def _segment(chat_id, after_id, to_id, total, ok=True, names=('price',)):
+    return {'chat_id': chat_id, 'names': list(names), 'versions': {name: 'v1' for name in names},
+            'after_id': after_id, 'to_id': to_id, 'start_date': None, 'total': total, 'ok': ok}
+
+
+class TestWorkUnits:
+    """所有群组批量处理的工作单元规划测试"""
+
+    def test_pack_small_segments_together(self):
+        """测试小范围合并打包，单元消息数不超过上限"""
+        segments = [_segment('big', 0, 100, 100), _segment('a', 0, 10, 60),
+                    _segment('b', 0, 10, 30), _segment('c', 0, 10, 30), _segment('d', 0, 10, 10)]
+        units = ad_analysis_extraction._pack_segments(segments, 100)
+
+        assert [[segment['chat_id'] for segment in unit] for unit in units] == [['big'], ['a', 'b', 'd'], ['c']]
+        assert all(sum(segment['total'] for segment in unit) <= 100 for unit in units)
+
+    def test_resolve_contiguous_success(self):
+        """测试水位线只推进到连续成功的范围，失败范围及其后的结果被删除"""
+        segments = [_segment('c1', 200, 300, 100), _segment('c1', 0, 100, 100),
+                    _segment('c1', 100, 200, 100, ok=False), _segment('c2', 0, 50, 50),
+                    _segment('c3', 0, 50, 50, ok=False)]
+        actions = {action[0]: action for action in ad_analysis_extraction._resolve_segments(segments)}
+
+        assert actions['c1'][3:] == (100, (100, 300))
+        assert actions['c2'][3:] == (50, None)
+        assert actions['c3'][3:] == (None, (0, 50))
+        assert actions['c1'][1:3] == (['price'], {'price': 'v1'})
+
+    def test_batch_progress_atomic_increment(self):
+        """测试批次计数在 SQL 中累加，进度按累加后的计数计算"""
+        with patch.object(ad_analysis_extraction, 'db') as db:
+            ad_analysis_extraction._add_batch_progress('b1', 90, 10)
+
+        sql = str(db.session.execute.call_args[0][0].compile(dialect=mysql.dialect()))
+        assert sql.index('success_count=(ad_tracking_batch_process_log.success_count + %s)') < sql.index('progress=')
+        assert 'fail_count=(ad_tracking_batch_process_log.fail_count + %s)' in sql
+
+
+class TestBatchProgress:
+    """批次进度提交测试"""
+
+    def test_progress_committed_with_rows(self):
+        """测试块进度不单独提交，由 flush() 与提取结果一起提交"""
+        from jd.models.ad_tracking_batch_process_log import AdTrackingBatchProcessLog
+
+        batch = AdTrackingBatchProcessLog(total_messages=10, success_count=0, fail_count=0)
+        with patch('jd.models.ad_tracking_batch_process_log.db') as model_db:
+            batch.update_progress(3, 1, commit=False)
+        model_db.session.commit.assert_not_called()
+        assert batch.progress == 40
+
+        with patch('jd.models.ad_tracking_batch_process_log.db') as model_db:
+            batch.update_progress(5, 1)
+        model_db.session.commit.assert_called_once()
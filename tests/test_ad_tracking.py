@@ -14,6 +14,7 @@ import sys
 import os
 import unittest
 from datetime import datetime, timedelta
+from unittest.mock import patch
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -105,6 +106,26 @@ class TestTmeSpider(unittest.TestCase):
         # result = self.spider.classify_and_process_url("https://t.me/durov")
         # print(f"t.me URL result: {result}")
 
+    def test_batch_result_keeps_caller_url(self):
+        """测试批量分析结果的 original_url 为调用方传入的URL，而不是标准化后的URL"""
+        urls = ["http://www.example.com/path/", "https://example.com/path"]
+        normalized = self.spider.normalize_url(urls[0])
+
+        async def process(pending, known_certs):
+            return {url: {'url_type': 'general', 'original_url': url, 'data': {}, 'error': None}
+                    for url in pending}, {}
+
+        with patch.object(self.spider._url_cache, 'get_many', return_value={}), \
+                patch.object(self.spider._url_cache, 'set_many'), \
+                patch.object(self.spider.cert_cache, 'get_many', return_value={}), \
+                patch.object(self.spider.cert_cache, 'set_many'), \
+                patch.object(self.spider, '_process_urls_async', side_effect=process):
+            results = self.spider.analyze_urls_batch(urls)
+
+        for url in urls:
+            self.assertEqual(results[url]['original_url'], url)
+        self.assertEqual(self.spider.normalize_url(urls[1]), normalized)
+
 
 class TestAdTrackingJob(unittest.TestCase):
     """AdTrackingJob 数据处理测试"""
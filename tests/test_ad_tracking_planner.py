@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+AdTrackingRunPlanner 单元测试
+"""
+
+import sys
+
+sys.path.insert(0, '.')
+
+from jd.jobs.ad_tracking_planner import AdTrackingRunPlanner
+
+
+class FakeSpider:
+    """只实现计划器用到的接口，记录批量分析调用"""
+
+    def __init__(self):
+        self.url_batches = []
+        self.account_batches = []
+
+    def extract_urls_and_accounts(self, text):
+        words = text.split()
+        urls = [word for word in words if word.lower().startswith('http')]
+        accounts = [word for word in words if word.startswith('@')]
+        return urls, accounts
+
+    def normalize_url(self, url):
+        return url.lower().rstrip('/')
+
+    def analyze_urls_batch(self, urls):
+        self.url_batches.append(list(urls))
+        return {url: {'url_type': 'general', 'original_url': url} for url in urls}
+
+    def analyze_telegram_accounts_batch(self, accounts):
+        self.account_batches.append(list(accounts))
+        return {account: {'account': account, 'error': None} for account in accounts}
+
+
+def _source(text, source_id='1'):
+    return {'content_text': text, 'source_type': 'chat', 'source_id': source_id}
+
+
+class TestAdTrackingRunPlanner:
+    """运行级工作计划测试"""
+
+    def test_unique_entities_analyzed_once(self):
+        """测试同一实体多次出现只分析一次，结果分发到每个出现位置"""
+        spider = FakeSpider()
+        planner = AdTrackingRunPlanner(spider)
+        occurrences = planner.plan([
+            _source('http://a.com @Foo', '1'),
+            _source('HTTP://A.COM/ @foo http://b.com', '2'),
+            _source('', '3'),
+        ])
+
+        assert len(occurrences) == 5
+        assert len(spider.url_batches) == 1
+        assert sorted(spider.url_batches[0]) == ['http://a.com', 'http://b.com']
+        assert spider.account_batches == [['@Foo']]
+        assert all(o['analysis'] is not None for o in occurrences)
+        assert occurrences[2]['source_id'] == '2'
+        assert occurrences[2]['content'] == 'HTTP://A.COM/'
+        assert planner.stats['url_mentions'] == 3
+        assert planner.stats['unique_urls'] == 2
+
+    def test_results_reused_across_batches(self):
+        """测试后续批次复用本次运行已分析的实体"""
+        spider = FakeSpider()
+        planner = AdTrackingRunPlanner(spider)
+        planner.plan([_source('http://a.com @foo')])
+        occurrences = planner.plan([_source('http://a.com @FOO http://c.com')])
+
+        assert spider.url_batches == [['http://a.com'], ['http://c.com']]
+        assert spider.account_batches == [['@foo']]
+        assert len(occurrences) == 3
+
+    def test_batch_failure_falls_back(self):
+        """测试批量分析失败时 analysis 为 None，由调用方逐条处理"""
+        spider = FakeSpider()
+
+        def fail(urls):
+            raise RuntimeError('boom')
+
+        spider.analyze_urls_batch = fail
+        planner = AdTrackingRunPlanner(spider)
+        occurrences = planner.plan([_source('http://a.com')])
+
+        assert occurrences[0]['analysis'] is None
+        assert planner.url_results == {}
+
+    def test_preview_store_replaces_account_fetch(self):
+        """测试使用预览存储时账户不再抓取，每次提及都被记录"""
+
+        class FakeStore:
+            def __init__(self):
+                self.sightings = []
+
+            def record_sightings(self, counts):
+                self.sightings.append(dict(counts))
+
+            def lookup(self, usernames):
+                return {username: {'username': username, 'preview': {}, 'error': None, 'pending': True}
+                        for username in usernames}
+
+        spider = FakeSpider()
+        store = FakeStore()
+        planner = AdTrackingRunPlanner(spider, preview_store=store)
+        planner.plan([_source('@foo @FOO'), _source('@bar')])
+        occurrences = planner.plan([_source('@foo')])
+
+        assert spider.account_batches == []
+        assert store.sightings == [{'foo': 2, 'bar': 1}, {'foo': 1}]
+        assert occurrences[0]['analysis']['pending'] is True
+        assert occurrences[0]['analysis']['account'] == '@foo'
+        assert planner.stats['pending_accounts'] == 2
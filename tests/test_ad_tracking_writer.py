@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+AdTrackingBatchWriter 单元测试
+"""
+
+import sys
+from datetime import datetime
+from unittest.mock import patch
+
+sys.path.insert(0, '.')
+
+from sqlalchemy.dialects import mysql
+
+from jd.jobs.ad_tracking_writer import AdTrackingBatchWriter, content_hash
+
+
+def _tracking_data(normalized_content='https://a.com/', source_id='1', extra_info=None):
+    return {
+        'content': normalized_content,
+        'content_type': 'url',
+        'normalized_content': normalized_content,
+        'extra_info': extra_info,
+        'source_type': 'chat',
+        'source_id': source_id,
+        'user_id': 'u1',
+        'chat_id': 'c1'
+    }
+
+
+class TestAdTrackingBatchWriter:
+    """追踪记录批量写入测试"""
+
+    def test_merge_occurrences_in_batch(self):
+        """测试同一内容多次出现合并为一行"""
+        writer = AdTrackingBatchWriter()
+        key = writer.add(_tracking_data(extra_info={'title': 'a'}), seen_at=datetime(2026, 1, 2))
+        writer.add(_tracking_data(extra_info={'status_code': 200}), seen_at=datetime(2026, 1, 1))
+        writer.add(_tracking_data(), seen_at=datetime(2026, 1, 3))
+        writer.add(_tracking_data(source_id='2'))
+
+        assert len(writer) == 2
+        row = writer._rows[key]
+        assert row['occurrence_count'] == 3
+        assert row['first_seen'] == datetime(2026, 1, 1)
+        assert row['last_seen'] == datetime(2026, 1, 3)
+        assert row['extra_info'] == {'title': 'a', 'status_code': 200}
+
+    def test_case_insensitive_key(self):
+        """测试大小写不同的同一内容合并为一行，哈希与生成列 SHA1(LOWER(...)) 一致"""
+        writer = AdTrackingBatchWriter()
+        key = writer.add(_tracking_data('@SellerABC'))
+        assert writer.add(_tracking_data('@sellerabc')) == key
+
+        assert len(writer) == 1
+        assert writer._rows[key]['normalized_content'] == '@SellerABC'
+        assert writer._rows[key]['occurrence_count'] == 2
+        # MySQL: SELECT SHA1(LOWER('@SellerABC'))
+        assert content_hash('@SellerABC') == '9c66d01a01d84d73aeaa55e947eb7b2fa3dfbef6'
+
+    def test_flush_single_upsert_statement(self):
+        """测试整批只执行一条 INSERT ... ON DUPLICATE KEY UPDATE"""
+        writer = AdTrackingBatchWriter()
+        key = writer.add(_tracking_data())
+        writer.add(_tracking_data())
+        writer.add(_tracking_data('https://b.com/'))
+
+        with patch('jd.jobs.ad_tracking_writer.db') as db:
+            query = db.session.query.return_value.filter.return_value
+            query.all.return_value = [(7, content_hash('https://a.com/'), 'chat', '1')]
+            ids = writer.flush()
+
+        assert ids == {key: 7}
+        assert len(writer) == 0
+        assert db.session.execute.call_count == 1
+        db.session.commit.assert_called_once()
+
+        sql = str(db.session.execute.call_args[0][0].compile(dialect=mysql.dialect()))
+        assert 'ON DUPLICATE KEY UPDATE' in sql
+        assert 'occurrence_count = (ad_tracking.occurrence_count + VALUES(occurrence_count))' in sql
+        assert 'least(ad_tracking.first_seen, VALUES(first_seen))' in sql
+        assert 'greatest(ad_tracking.last_seen, VALUES(last_seen))' in sql
+        # 两个不同内容在同一条语句中写入，生成列 content_hash 不出现在插入列中
+        assert sql.count('), (') == 1
+        assert 'content_hash' not in sql
+
+    def test_flush_failure_rolls_back(self):
+        """测试写入失败时回滚并抛出异常"""
+        writer = AdTrackingBatchWriter()
+        writer.add(_tracking_data())
+
+        with patch('jd.jobs.ad_tracking_writer.db') as db:
+            db.session.execute.side_effect = RuntimeError('deadlock')
+            try:
+                writer.flush()
+                assert False, 'flush 应抛出异常'
+            except RuntimeError:
+                pass
+            db.session.rollback.assert_called_once()
+        assert len(writer) == 0
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+AsyncHttpEngine 单元测试
+
+使用本地HTTP服务验证：
+- 并发请求总耗时远小于串行耗时
+- 单主机并发上限与请求间隔
+- 读取字节上限与错误返回
+- 重定向逐跳占用目标主机的名额
+"""
+
+import asyncio
+import http.server
+import socketserver
+import sys
+import threading
+import time
+
+sys.path.insert(0, '.')
+
+from jd.services.spider.async_http_engine import AsyncHttpEngine
+
+RESPONSE_DELAY = 0.2
+
+
+class _SlowHandler(http.server.BaseHTTPRequestHandler):
+    """每个请求延迟返回的测试处理器"""
+
+    def do_GET(self):
+        if self.path.startswith('/redirect'):
+            # 跳转到同一服务的另一个主机名（localhost），用于验证逐跳按主机限流
+            self.send_response(302)
+            self.send_header('Location', f'http://localhost:{self.server.server_address[1]}/final')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        time.sleep(RESPONSE_DELAY)
+        body = b'<html><title>test</title>' + b'x' * 20000 + b'</html>'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _ThreadingServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+    # 默认 backlog 为 5，并发连接超过时 SYN 被丢弃，重传等待约 1 秒导致耗时断言不稳定
+    request_queue_size = 64
+
+
+class TestAsyncHttpEngine:
+    """AsyncHttpEngine 并发与限速测试"""
+
+    @classmethod
+    def setup_class(cls):
+        cls.server = _ThreadingServer(('127.0.0.1', 0), _SlowHandler)
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def teardown_class(cls):
+        cls.server.shutdown()
+
+    def _fetch_all(self, engine, count, **kwargs):
+        async def run():
+            async with engine:
+                return await asyncio.gather(*(
+                    engine.fetch(f'{self.base_url}/p{i}', **kwargs) for i in range(count)
+                ))
+        start = time.monotonic()
+        results = asyncio.run(run())
+        return results, time.monotonic() - start
+
+    def test_concurrent_fetch_faster_than_serial(self):
+        """测试并发请求耗时远小于串行耗时"""
+        engine = AsyncHttpEngine(max_concurrency=10, per_host_limit=10)
+        results, elapsed = self._fetch_all(engine, 10)
+
+        assert all(r['status_code'] == 200 for r in results)
+        assert elapsed < RESPONSE_DELAY * 10 / 2
+        assert engine.get_stats()['in_flight_max'] > 1
+
+    def test_per_host_limit(self):
+        """测试单主机并发上限"""
+        engine = AsyncHttpEngine(max_concurrency=10, per_host_limit=2)
+        _, elapsed = self._fetch_all(engine, 6)
+
+        assert engine.get_stats()['in_flight_max'] == 2
+        assert elapsed >= RESPONSE_DELAY * 3
+
+    def test_per_host_interval(self):
+        """测试同一主机请求间隔"""
+        engine = AsyncHttpEngine(per_host_limit=10, per_host_interval=0.1)
+        self._fetch_all(engine, 4)
+
+        assert engine.get_stats()['host_wait_seconds'] >= 0.5
+
+    def test_max_bytes_and_error(self):
+        """测试读取字节上限与连接错误"""
+        engine = AsyncHttpEngine()
+        results, _ = self._fetch_all(engine, 1, max_bytes=1024)
+        assert len(results[0]['content']) < 20000
+        assert results[0]['content'].startswith(b'<html><title>test</title>')
+
+        async def run_error():
+            async with AsyncHttpEngine(timeout=2) as error_engine:
+                return await error_engine.fetch('http://127.0.0.1:1/unreachable')
+
+        error_result = asyncio.run(run_error())
+        assert error_result.get('error')
+        assert 'status_code' not in error_result
+
+    def test_redirect_hops_use_target_host_policy(self):
+        """测试重定向每一跳都计入目标主机的名额与请求时隙"""
+        engine = AsyncHttpEngine(per_host_limit=1, per_host_interval=0.1)
+
+        async def run():
+            async with engine:
+                return await asyncio.gather(*(engine.fetch(f'{self.base_url}/redirect{i}') for i in range(3)))
+
+        start = time.monotonic()
+        results = asyncio.run(run())
+        elapsed = time.monotonic() - start
+        assert all(r['status_code'] == 200 and r['redirect_count'] == 1 for r in results)
+        assert all(r['final_url'].startswith('http://localhost:') for r in results)
+        assert results[0]['url'] == f'{self.base_url}/redirect0'
+
+        stats = engine.get_stats()
+        assert stats['request_count'] == 6
+        assert stats['host_count'] == 2
+        # 跳转目标主机（localhost）同样只允许 1 个并发，3 个慢请求串行完成
+        assert elapsed >= RESPONSE_DELAY * 3
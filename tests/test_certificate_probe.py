@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+CertificateCache / parse_certificate / probe_certificate 单元测试
+"""
+
+import shutil
+import socket
+import ssl
+import subprocess
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, '.')
+
+from jd.services.spider.certificate_probe import (CertificateCache, parse_certificate, parse_der_certificate,
+                                                  probe_certificate)
+
+# 自签名证书（有效期至 2126 年，notAfter 为 GeneralizedTime）
+SELF_SIGNED_PEM = """\
+-----BEGIN CERTIFICATE-----
+MIIDTTCCAjWgAwIBAgIUGqvCjOq/AETg08Wyj+9Fnh4APqkwDQYJKoZIhvcNAQEL
+BQAwNTEcMBoGA1UECgwTRXhhbXBsZSBTZWxmIFNpZ25lZDEVMBMGA1UEAwwMZXhh
+bXBsZS50ZXN0MCAXDTI2MTAxOTA3NDUwNFoYDzIxMjYwOTI1MDc0NTA0WjA1MRww
+GgYDVQQKDBNFeGFtcGxlIFNlbGYgU2lnbmVkMRUwEwYDVQQDDAxleGFtcGxlLnRl
+c3QwggEiMA0GCSqGSIb3DQEBAQUAA4IBDwAwggEKAoIBAQCj45ZXwB9TkGM1/c0T
+SAqt/O2AwPZUoqlIL6eYOIG80x/EaagS+mK2Dp+tarxwPxC3MwW7IqAMHaunEsHA
+DK71jOzhDdPvGslsnY/rG6E4iPN9Dm+u5d/okmWwBXdinRdi2P2PzE9094Pi5C59
+HxMn1A1dDON4Ag1L2i9bFyKG5EVSAdvQeQxwva6ud1Y1hMJVQhpcPiDpFl29JQds
+0WsMBjkmzXySd6r6JEr5lz1j8HyOmZsW/Z9N7x2ZmwLk0QBG1am5Ed6UtUPYuYhm
+gkWT2+3tT0M/8x5gmTaKqMBINNFmp3Ui28MpvPH7uKJOAbuRE84pzfmkr3GR2jTF
+cy9FAgMBAAGjUzBRMB0GA1UdDgQWBBQsMZH+3BFflgFr2+DgwAsQoivB2jAfBgNV
+HSMEGDAWgBQsMZH+3BFflgFr2+DgwAsQoivB2jAPBgNVHRMBAf8EBTADAQH/MA0G
+CSqGSIb3DQEBCwUAA4IBAQA1WZHQjdlNT9R42Tt83nDD9SQj1Q6AS8TiNQqJI8fl
+c4qANGoQWPnR65En5GPVxQXT0twFTMX8H0jnvQ41Fn2CzQEaXeQeuxMouFqWjiXn
+XaiCs+DMCfZcziy9OcvpuFnAjn3MGTfN+/z0fgmXlLvzCWSGe9uVCOjGcrKWuV+a
+322YvwDE2XLZi/chDUqds4YEooxsBX3IxNKX8/8CJ1LSKOmmyJ52PZDPBW6CEkSa
+qijin1nPVL+7NcbF5kWKhvJsEKJm5nG4uNMhBtxcIsPo9oXdANIpOvy4sEQVC86V
+u7bO9UwWUbk6NXKqM5l1b579TCeBev2/B3M1sGkheYrv
+-----END CERTIFICATE-----
+"""
+
+
+def _cert_time(offset_seconds):
+    return time.strftime('%b %d %H:%M:%S %Y GMT', time.gmtime(time.time() + offset_seconds))
+
+
+class TestParseCertificate:
+    """证书解析测试"""
+
+    def test_parse_issuer_and_validity(self):
+        """测试解析颁发者与有效期"""
+        cert = {
+            'issuer': ((('countryName', 'US'),), (('organizationName', "Let's Encrypt"),)),
+            'notBefore': 'Jan  1 00:00:00 2026 GMT',
+            'notAfter': 'Apr  1 00:00:00 2026 GMT',
+        }
+        assert parse_certificate(cert) == {
+            'issuer': "Let's Encrypt",
+            'valid_from': 'Jan  1 00:00:00 2026 GMT',
+            'valid_to': 'Apr  1 00:00:00 2026 GMT',
+        }
+
+    def test_empty_certificate(self):
+        """测试空证书返回错误"""
+        assert parse_certificate({})['error'] == 'certificate_empty'
+
+    def test_parse_der(self):
+        """测试解析 DER 证书（UTCTime 与 GeneralizedTime），格式与 getpeercert() 一致"""
+        info = parse_der_certificate(ssl.PEM_cert_to_DER_cert(SELF_SIGNED_PEM))
+        assert info == {
+            'issuer': 'Example Self Signed',
+            'valid_from': 'Oct 19 07:45:04 2026 GMT',
+            'valid_to': 'Sep 25 07:45:04 2126 GMT',
+        }
+        assert ssl.cert_time_to_seconds(info['valid_to']) > time.time()
+
+    def test_invalid_der(self):
+        """测试空或截断的 DER 返回错误"""
+        assert parse_der_certificate(b'')['error'] == 'certificate_empty'
+        assert parse_der_certificate(b'\x30\x03\x02\x01')['error'] == 'certificate_parse_failed'
+
+
+class TestProbeCertificate:
+    """证书探测测试（本地 TLS 服务）"""
+
+    def test_self_signed_recorded_with_verify_error(self, tmp_path):
+        """测试自签名证书校验失败时仍记录颁发者与有效期，校验结果单独记录"""
+        if not shutil.which('openssl'):
+            pytest.skip('openssl not available')
+        cert_file, key_file = tmp_path / 'cert.pem', tmp_path / 'key.pem'
+        subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                        '-keyout', str(key_file), '-out', str(cert_file), '-subj', '/O=Local Test/CN=localhost'],
+                       check=True, capture_output=True)
+
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(str(cert_file), str(key_file))
+        server = socket.create_server(('127.0.0.1', 0))
+        port = server.getsockname()[1]
+
+        def serve():
+            for _ in range(2):  # 校验握手 + 不校验握手
+                conn, _ = server.accept()
+                try:
+                    with context.wrap_socket(conn, server_side=True):
+                        pass
+                except (OSError, ssl.SSLError):
+                    pass
+
+        thread = threading.Thread(target=serve, daemon=True)
+        thread.start()
+        try:
+            info = probe_certificate('127.0.0.1', port, timeout=5)
+        finally:
+            thread.join(5)
+            server.close()
+
+        assert info['issuer'] == 'Local Test'
+        assert info['valid_to'].endswith('GMT')
+        assert info['verified'] is False
+        assert 'self-signed' in info['verify_error']
+
+
+class TestCertificateCache:
+    """证书缓存TTL测试"""
+
+    def setup_method(self):
+        self.cache = CertificateCache(max_ttl=86400, failure_ttl=3600, use_redis=False)
+
+    def test_ttl_capped_by_expiry(self):
+        """测试TTL不超过证书剩余有效期与最长缓存时间"""
+        assert 7000 < self.cache.get_ttl({'valid_to': _cert_time(7200)}) <= 7200
+        assert self.cache.get_ttl({'valid_to': _cert_time(30 * 86400)}) == 86400
+
+    def test_failure_and_expired_use_failure_ttl(self):
+        """测试失败与已过期证书使用失败TTL"""
+        assert self.cache.get_ttl({'error': 'connection_timeout'}) == 3600
+        assert self.cache.get_ttl({'valid_to': _cert_time(-60)}) == 3600
+
+    def test_keyed_by_host_and_port(self):
+        """测试按 (host, port) 缓存"""
+        info = {'issuer': 'CA', 'valid_from': '', 'valid_to': _cert_time(86400 * 10)}
+        self.cache.set(('a.com', 443), info)
+
+        assert self.cache.get(('a.com', 443)) == info
+        assert self.cache.get(('a.com', 8443)) is None
+
+    def test_redis_tier(self):
+        """测试Redis命中回填进程内缓存"""
+        cache = CertificateCache()
+        info = {'issuer': 'CA', 'valid_from': '', 'valid_to': _cert_time(86400 * 10)}
+        with patch('jd.services.spider.certificate_probe.CacheService') as cache_service:
+            cache_service.get_many.return_value = [info]
+            assert cache.get_many([('b.com', 443)]) == {('b.com', 443): info}
+            cache.get(('b.com', 443))
+            assert cache_service.get_many.call_count == 1
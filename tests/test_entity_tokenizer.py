@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+文本实体单遍提取单元测试
+"""
+
+import sys
+
+sys.path.insert(0, '.')
+
+from jd.services.spider.entity_tokenizer import classify_tme_link, telegraph_link, tokenize
+
+
+def _types(text):
+    return [(entity.type, entity.value) for entity in tokenize(text)]
+
+
+class TestTokenize:
+    """tokenize 测试"""
+
+    def test_typed_entities_in_order(self):
+        """测试一次扫描返回各类实体及位置"""
+        text = ('加群 https://t.me/+AbC_1 看 telegra.ph/Title-12-25 官网 www.test.com/a '
+                '联系@service_bot 电话13812345678 qq123456789')
+        assert _types(text) == [
+            ('tme_link', 'https://t.me/+AbC_1'),
+            ('telegraph', 'telegra.ph/Title-12-25'),
+            ('url', 'www.test.com/a'),
+            ('account', '@service_bot'),
+            ('phone', '13812345678'),
+            ('qq', '123456789'),
+        ]
+        entity = tokenize(text)[4]
+        assert text[entity.start:entity.end] == '13812345678'
+
+    def test_no_overlapping_entities(self):
+        """测试URL内部的域名和@不会重复识别"""
+        assert _types('https://www.example.com/@author') == [
+            ('url', 'https://www.example.com/@author')
+        ]
+
+    def test_number_boundaries(self):
+        """测试数字串边界：过长或紧跟字母数字的不识别"""
+        assert _types('1381234567890') == []
+        assert _types('abc13812345678') == []
+        assert _types('编号 012345678') == []
+
+
+class TestLinkHelpers:
+    """t.me 与 Telegraph 链接解析测试"""
+
+    def test_classify_tme_link(self):
+        """测试 t.me 链接分类"""
+        assert classify_tme_link('https://t.me/joinchat/abc123') == {
+            'url': 't.me/joinchat/abc123', 'type': 't_me_private_invite', 'target': 'joinchat/abc123'
+        }
+        assert classify_tme_link('t.me/channel/42')['message_id'] == '42'
+        assert classify_tme_link('t.me/channel/42')['target'] == 'channel'
+        assert classify_tme_link('https://t.me/addlist/xyz')['type'] == 't_me_invite'
+        assert classify_tme_link('https://t.me/my_channel?start=1')['target'] == 'my_channel'
+        assert classify_tme_link('https://gat.me/abc') is None
+
+    def test_telegraph_link(self):
+        """测试 Telegraph 链接规范化"""
+        assert telegraph_link('http://telegra.ph/Article-Title-12-25') == 'https://telegra.ph/Article-Title-12-25'
+        assert telegraph_link('telegra.ph/') is None
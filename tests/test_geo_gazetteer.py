@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+地理位置名录索引单元测试
+"""
+
+import json
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, '.')
+
+from jd.services.geo_gazetteer import GeoGazetteer, gazetteer_version
+
+
+def _row(id, level, name, parent_id=None, aliases=None, short_name=None):
+    return SimpleNamespace(id=id, level=level, name=name, parent_id=parent_id,
+                           latitude=36.5 if level == 1 else None, longitude=None,
+                           aliases=aliases, short_name=short_name)
+
+
+ROWS = [
+    # 子级排在父级之前，构建不依赖行顺序
+    _row(3, 3, '槐荫区', 2, short_name='槐荫'),
+    _row(2, 2, '济南市', 1, aliases='泉城, 济南,'),
+    _row(1, 1, '山东省', aliases='山东', short_name='鲁'),
+    _row(5, 2, '孤儿市', 99),
+    _row(4, 2, '济南市', 6),
+    _row(6, 1, '某省'),
+]
+
+
+class TestGeoGazetteer:
+    """名录构建与查询测试"""
+
+    def test_ancestor_chain(self):
+        """测试每个节点预先算好省市区"""
+        gazetteer = GeoGazetteer.from_rows(ROWS)
+        district = gazetteer.resolve(3)
+        assert (district['type'], district['province'], district['city'], district['district']) == \
+            ('district', '山东省', '济南市', '槐荫区')
+        assert district['parent_name'] == '济南市'
+        assert gazetteer.resolve(1)['province'] == '山东省'
+        assert gazetteer.resolve(1)['city'] is None
+        assert gazetteer.resolve(5)['province'] is None
+
+    def test_keyword_expansion(self):
+        """测试地名、别名、简称展开且去重"""
+        gazetteer = GeoGazetteer.from_rows(ROWS)
+        keywords = [keyword for keyword, node_id in gazetteer.keywords if node_id == 2]
+        assert keywords == ['济南市', '泉城', '济南']
+        assert ['鲁', 1] in gazetteer.keywords
+
+    def test_snapshot_roundtrip(self):
+        """测试快照可 JSON 编码，加载后与原名录一致"""
+        gazetteer = GeoGazetteer.from_rows(ROWS, version='v1')
+        loaded = GeoGazetteer.from_snapshot(json.loads(json.dumps(gazetteer.to_snapshot())))
+
+        assert loaded.version == 'v1'
+        assert loaded.nodes == gazetteer.nodes
+        assert loaded.keywords == gazetteer.keywords
+        assert GeoGazetteer.from_snapshot({'format': 0}) is None
+        assert gazetteer_version(6, None) != gazetteer_version(7, None)
+
+    def test_matcher_and_city_provinces(self):
+        """测试匹配结果直接是节点，同名城市取ID最小的省份"""
+        gazetteer = GeoGazetteer.from_rows(ROWS)
+        matches = gazetteer.build_matcher().search_unique('在槐荫交易')
+        assert matches[0]['metadata'] is gazetteer.resolve(3)
+        assert gazetteer.city_provinces() == {'济南市': '山东省'}
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+离线IP地理位置库与DNS缓存单元测试
+"""
+
+import os
+import sys
+import tempfile
+from unittest.mock import Mock, patch
+
+sys.path.insert(0, '.')
+
+import requests
+
+from jd.services.spider.ip_geo_resolver import DnsCache, IpApiGeoLookup, IpGeoResolver, OfflineIpGeoDatabase
+
+RANGE_CSV = '''"ip_from","ip_to","country_code","country_name","region_name","city_name"
+"16777216","16777471","AU","Australia","Queensland","Brisbane"
+"1.0.1.0","1.0.3.255","CN","China","Fujian","Fuzhou"
+"134744064","134744319","US","United States","California","Mountain View"
+"0","16777215","-","-","-","-"
+"2001:200::","2001:200:ffff:ffff:ffff:ffff:ffff:ffff","JP","Japan","Tokyo","Tokyo"
+'''
+
+
+class TestOfflineIpGeoDatabase:
+    """离线IP地理位置库测试"""
+
+    def setup_method(self):
+        fd, self.path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as f:
+            f.write(RANGE_CSV)
+        self.database = OfflineIpGeoDatabase()
+        self.database.load_file(self.path)
+
+    def teardown_method(self):
+        os.remove(self.path)
+
+    def test_load_skips_header_unassigned_and_ipv6(self):
+        """测试跳过表头、未分配段和IPv6段"""
+        assert len(self.database) == 3
+
+    def test_lookup_integer_and_dotted_ranges(self):
+        """测试整数与点分格式的IP段查询"""
+        assert self.database.lookup('1.0.0.1')['city'] == 'Brisbane'
+        assert self.database.lookup('1.0.2.200')['country_code'] == 'CN'
+        location = self.database.lookup('8.8.8.8')
+        assert location['country'] == 'United States'
+        assert location['isp'] is None
+
+    def test_lookup_miss(self):
+        """测试未命中返回空字典"""
+        assert self.database.lookup('1.0.4.1') == {}
+        assert self.database.lookup('0.0.0.1') == {}
+        assert self.database.lookup('not-an-ip') == {}
+
+
+class TestDnsCache:
+    """DNS缓存测试"""
+
+    def test_resolve_cached_including_failures(self):
+        """测试成功与失败结果都被缓存"""
+        cache = DnsCache()
+        with patch('socket.gethostbyname', side_effect=['1.2.3.4', OSError('nxdomain')]) as resolve:
+            assert cache.resolve('a.com') == ('1.2.3.4', None)
+            assert cache.resolve('a.com') == ('1.2.3.4', None)
+            assert cache.resolve('bad.invalid') == (None, 'nxdomain')
+            assert cache.resolve('bad.invalid') == (None, 'nxdomain')
+            assert resolve.call_count == 2
+        assert cache.stats == {'hits': 2, 'misses': 2}
+
+    def test_resolver_without_database_falls_back_online(self):
+        """测试未配置IP库时回退到在线查询"""
+        online = IpApiGeoLookup(min_interval=0)
+        resolver = IpGeoResolver(geo_db_path=None, online_fallback=online)
+        assert resolver.geo_db is None
+        with patch('socket.gethostbyname', return_value='1.2.3.4'), \
+                patch.object(online, 'lookup', return_value={'country': 'Japan'}) as lookup:
+            assert resolver.lookup('a.com') == ('1.2.3.4', {'country': 'Japan'})
+            lookup.assert_called_once_with('1.2.3.4')
+
+
+class TestIpApiGeoLookup:
+    """在线查询回退测试"""
+
+    def test_parse_and_cache(self):
+        """测试解析 ip-api.com 响应，成功结果被缓存，请求失败返回空字典"""
+        online = IpApiGeoLookup(min_interval=0)
+        response = Mock(status_code=200)
+        response.json.return_value = {'status': 'success', 'country': 'Japan', 'countryCode': 'JP',
+                                      'regionName': 'Tokyo', 'city': 'Tokyo', 'isp': 'X', 'org': 'Y'}
+        with patch.object(online.session, 'get', return_value=response) as get:
+            assert online.lookup('1.2.3.4')['country_code'] == 'JP'
+            assert online.lookup('1.2.3.4')['organization'] == 'Y'
+            assert get.call_count == 1
+
+        with patch.object(online.session, 'get', side_effect=requests.ConnectionError('down')):
+            assert online.lookup('5.6.7.8') == {}
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+LLM 请求客户端与令牌桶单元测试
+"""
+
+import asyncio
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, '.')
+
+import httpx
+
+from jd.jobs.llm_client import AsyncLLMClient, RedisTokenBucket, gcra_reserve, retry_after_seconds
+
+
+class TestTokenBucket:
+    """GCRA 令牌桶测试"""
+
+    def test_paces_to_quota_exactly(self):
+        """测试令牌按 max(间隔, 3600/每小时次数) 匀速发放，不超发也不空等"""
+        bucket = RedisTokenBucket('k', per_hour=10, interval_seconds=5)
+        assert bucket.interval == 360
+
+        tat, now = 0.0, 1000.0
+        send_times = []
+        for _ in range(11):
+            tat, delay = gcra_reserve(tat, now, bucket.interval, bucket.tolerance)
+            send_times.append(now + delay)
+        # 一小时（半开区间）内恰好 10 个请求
+        assert sum(1 for t in send_times if t < 1000.0 + 3600) == 10
+        assert send_times[1] - send_times[0] == 360
+
+        # 空闲后不累积额外令牌（burst=1）
+        _, delay = gcra_reserve(tat, tat + 10000, bucket.interval, bucket.tolerance)
+        assert delay == 0
+
+    def test_burst_tolerance(self):
+        """测试 burst 允许的突发请求无需等待"""
+        bucket = RedisTokenBucket('k', per_hour=3600, burst=3)
+        tat, delays = 0.0, []
+        for _ in range(4):
+            tat, delay = gcra_reserve(tat, 100.0, bucket.interval, bucket.tolerance)
+            delays.append(delay)
+        assert delays == [0.0, 0.0, 0.0, 1.0]
+
+    def test_local_fallback_and_pause(self):
+        """测试 Redis 不可用时进程内限流，暂停推迟下一个令牌"""
+        bucket = RedisTokenBucket('k', per_hour=3600, use_redis=False)
+        with patch('jd.jobs.llm_client.time.time', return_value=1000.0):
+            assert bucket.reserve() == 0
+            assert bucket.reserve() == 1.0
+            bucket.pause(30)
+            assert bucket.reserve() == 30.0
+
+    def test_retry_after(self):
+        """测试 Retry-After 秒数与 HTTP 日期解析"""
+        assert retry_after_seconds('12') == 12.0
+        assert retry_after_seconds('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+        assert retry_after_seconds('soon') is None
+        assert retry_after_seconds(None) is None
+
+
+class TestAsyncLLMClient:
+    """异步客户端测试"""
+
+    def _run(self, handler, payloads, max_concurrency=4):
+        bucket = RedisTokenBucket('k', per_hour=0, use_redis=False)
+        paused = []
+        bucket.pause = paused.append
+
+        async def run():
+            async with AsyncLLMClient('https://llm.test/v1/chat', 'key', bucket,
+                                      max_concurrency=max_concurrency, max_retries=2,
+                                      transport=httpx.MockTransport(handler)) as client:
+                return await client.post_many(payloads), client.stats
+
+        responses, stats = asyncio.run(run())
+        return responses, stats, paused
+
+    def test_concurrent_requests_keep_order(self):
+        """测试多个请求同时在途，结果顺序与输入一致"""
+        in_flight = {'current': 0, 'max': 0}
+
+        async def handler(request):
+            in_flight['current'] += 1
+            in_flight['max'] = max(in_flight['max'], in_flight['current'])
+            await asyncio.sleep(0.01)
+            in_flight['current'] -= 1
+            assert request.headers['Authorization'] == 'Bearer key'
+            return httpx.Response(200, json={'echo': request.read().decode()})
+
+        responses, stats, _ = self._run(handler, [{'n': i} for i in range(6)], max_concurrency=3)
+        assert [response['echo'] for response in responses] == ['{"n":%d}' % i for i in range(6)]
+        assert in_flight['max'] == 3
+        assert stats['success_count'] == 6
+
+    def test_rate_limited_pauses_bucket_and_retries(self):
+        """测试 429 按 Retry-After 暂停令牌桶后重试，不可重试的错误返回 None"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if b'"bad"' in request.content:
+                return httpx.Response(400, text='bad request')
+            if len(calls) == 1:
+                return httpx.Response(429, headers={'Retry-After': '0'})
+            return httpx.Response(200, json={'ok': True})
+
+        responses, stats, paused = self._run(handler, [{'q': 'a'}, {'q': 'bad'}], max_concurrency=1)
+        assert responses == [{'ok': True}, None]
+        assert paused == [0.0]
+        assert stats['rate_limited_count'] == 1
+        assert stats['retry_count'] == 1
+        assert stats['error_count'] == 1
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+LLM 判别结果缓存单元测试
+"""
+
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, '.')
+
+from sqlalchemy.dialects import mysql
+
+from jd.jobs.llm_verdict_cache import LLMVerdictCache, normalize_text
+
+
+class TestCacheKey:
+    """内容键测试"""
+
+    def test_text_normalized(self):
+        """测试全角、大小写与空白差异不影响内容键"""
+        cache = LLMVerdictCache('v1')
+        assert normalize_text('  ＡＢＣ１２３\n\t出货 ') == 'abc123 出货'
+        assert cache.cache_key('ＡＢＣ 出货', []) == cache.cache_key('abc   出货\n', [])
+        assert cache.cache_key('abc 出货', []) != cache.cache_key('abc 收货', [])
+
+    def test_images_hashed_by_content(self, tmp_path):
+        """测试图片按文件内容哈希：不同路径的相同图片命中同一键，顺序无关"""
+        (tmp_path / 'a.jpg').write_bytes(b'same')
+        (tmp_path / 'b.jpg').write_bytes(b'same')
+        (tmp_path / 'c.jpg').write_bytes(b'other')
+        cache = LLMVerdictCache('v1', static_folder=str(tmp_path))
+
+        assert cache.cache_key('x', ['a.jpg', 'c.jpg']) == cache.cache_key('x', ['c.jpg', 'b.jpg'])
+        assert cache.cache_key('x', ['a.jpg']) != cache.cache_key('x', ['c.jpg'])
+        assert cache.cache_key('x', ['a.jpg']) != cache.cache_key('x', [])
+        assert cache.image_hash('missing.jpg').startswith('path:')
+
+    def test_version_in_key(self):
+        """测试提示词/模型版本变化时内容键变化"""
+        assert LLMVerdictCache('v1').cache_key('x', []) != LLMVerdictCache('v2').cache_key('x', [])
+
+
+class TestSave:
+    """判别结果写入测试"""
+
+    def test_single_upsert_skips_empty(self):
+        """测试整批结果一条 upsert 写入，没有判别结果的不写入"""
+        cache = LLMVerdictCache('v1')
+        with patch('jd.jobs.llm_verdict_cache.db') as db:
+            cache.save({
+                'k1': {'ai_judgment': '涉及毒品', 'importance_score': 80.0, 'is_high_priority': True},
+                'k2': {'ai_judgment': '正常', 'importance_score': 0.0, 'is_high_priority': False},
+                'k3': {},
+            }, {'k1': 2})
+
+        assert db.session.execute.call_count == 1
+        db.session.commit.assert_called_once()
+        stmt = db.session.execute.call_args[0][0]
+        sql = str(stmt.compile(dialect=mysql.dialect()))
+        assert sql.count('), (') == 1
+        assert 'ai_judgment = VALUES(ai_judgment)' in sql.split('ON DUPLICATE KEY UPDATE')[1]
+        assert cache.stats['writes'] == 2
+
+    def test_write_failure_not_raised(self):
+        """测试写入失败只回滚并记录日志，不中断作业"""
+        cache = LLMVerdictCache('v1')
+        with patch('jd.jobs.llm_verdict_cache.db') as db:
+            db.session.execute.side_effect = RuntimeError('boom')
+            cache.save({'k1': {'ai_judgment': '正常'}})
+
+        db.session.rollback.assert_called_once()
+        assert cache.stats['writes'] == 0
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+MainstreamDomainIndex 单元测试
+"""
+
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, '.')
+
+from jd.services.spider.mainstream_domain_index import (
+    MainstreamDomainIndex,
+    registrable_domain,
+)
+
+
+class TestRegistrableDomain:
+    """可注册域名计算测试"""
+
+    def test_registrable_domain(self):
+        """测试单级与多级公共后缀"""
+        assert registrable_domain('sub.google.com') == 'google.com'
+        assert registrable_domain('news.bbc.co.uk') == 'bbc.co.uk'
+        assert registrable_domain('WWW.Example.COM:8080') == 'example.com'
+        assert registrable_domain('co.uk') is None
+        assert registrable_domain('com') is None
+
+
+class TestMainstreamDomainIndex:
+    """主流域名索引测试"""
+
+    def setup_method(self):
+        self.index = MainstreamDomainIndex()
+        self.index.load(['google.com', 'bbc.co.uk', 'www.taobao.com', 'co.uk'], version=1)
+
+    def test_exact_and_subdomain_match(self):
+        """测试精确匹配与子域名匹配"""
+        assert self.index.contains('google.com')
+        assert self.index.contains('Mail.Google.COM')
+        assert self.index.contains('news.bbc.co.uk')
+        assert self.index.contains('item.taobao.com')
+
+    def test_no_match_on_public_suffix(self):
+        """测试不会通过公共后缀误匹配"""
+        assert not self.index.contains('example.co.uk')
+        assert not self.index.contains('google.com.evil.net')
+        assert not self.index.contains('notgoogle.com')
+        assert len(self.index) == 3
+
+    def test_reload_only_when_version_changes(self):
+        """测试数据版本不变时不重新加载"""
+        with patch.object(MainstreamDomainIndex, '_query_version', return_value=1), \
+                patch.object(MainstreamDomainIndex, '_query_domains', return_value=['x.com']) as query_domains:
+            assert self.index.ensure_fresh(force=True) is False
+            query_domains.assert_not_called()
+
+        with patch.object(MainstreamDomainIndex, '_query_version', return_value=2), \
+                patch.object(MainstreamDomainIndex, '_query_domains', return_value=['x.com']):
+            assert self.index.ensure_fresh(force=True) is True
+            assert self.index.contains('a.x.com')
+            assert not self.index.contains('google.com')
+
+    def test_hosting_suffix_exact_match_only(self):
+        """测试托管后缀本身精确匹配，其下的用户站点不继承匹配"""
+        index = MainstreamDomainIndex()
+        index.load(['github.io', 'wordpress.com', 'blogspot.com', 'co.uk'], version=1)
+
+        assert index.contains('github.io')
+        assert index.contains('WordPress.com')
+        assert index.contains('blogspot.com')
+        assert not index.contains('evil.github.io')
+        assert not index.contains('phish.blogspot.com')
+        assert not index.contains('co.uk')
+        assert len(index) == 3
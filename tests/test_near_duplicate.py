@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+MinHash + LSH 近似重复检测单元测试
+"""
+
+import sys
+
+sys.path.insert(0, '.')
+
+from jd.jobs.near_duplicate import MinHashLSH
+
+AD = '出售各类精品货源，量大从优，同城可面交，全国包邮，联系飞机 @seller_abc 电话 13812345678'
+
+
+class TestMinHashLSH:
+    """近似重复检测测试"""
+
+    def test_near_duplicates_detected(self):
+        """测试改动少量字符的变体被识别为重复，返回最早保留的键"""
+        index = MinHashLSH()
+        assert index.add(1, AD) is None
+        duplicate = index.add(2, AD.replace('13812345678', '13812345679'))
+        assert duplicate[0] == 1 and duplicate[1] >= 0.7
+        assert index.add(3, '  ' + AD.upper() + ' ')[0] == 1
+        assert len(index) == 1
+
+    def test_different_messages_kept(self):
+        """测试内容不同的消息不会误判"""
+        index = MinHashLSH()
+        assert index.add(1, AD) is None
+        assert index.add(2, '今天群里有人出车吗，晚上八点老地方见，带上上次说的东西') is None
+        assert index.add(3, '出售各类精品货源，欢迎新老客户咨询下单') is None
+        assert len(index) == 3
+
+    def test_empty_text_not_indexed(self):
+        """测试空文本不参与去重"""
+        index = MinHashLSH()
+        assert index.add(1, '') is None
+        assert index.add(2, None) is None
+        assert index.signature('  ') is None
+        assert len(index) == 0
+
+    def test_signature_deterministic(self):
+        """测试固定种子下签名可复现"""
+        assert MinHashLSH().signature(AD) == MinHashLSH().signature(AD)
+        assert MinHashLSH().shingles('ab c') == {'abc'}
+
+    def test_short_captions_not_deduplicated(self):
+        """测试短文案不参与去重：相同短文案配不同图片的广告都保留"""
+        index = MinHashLSH()
+        assert index.add(1, '新货到了') is None
+        assert index.add(2, '新货到了') is None
+        assert index.add(3, '好') is None
+        assert len(index) == 0
+
+    def test_earliest_match_returned(self):
+        """测试多个已保留键都达到阈值时返回最早加入索引的键"""
+        index = MinHashLSH()
+        variant = AD.replace('13812345678', '13899999999')
+        index.insert(1, index.signature(AD))
+        index.insert(2, index.signature(variant))
+        assert index.add(3, variant)[0] == 1
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+聊天图片缩略图单元测试
+"""
+
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, '.')
+
+from PIL import Image
+
+from jd.helpers.photo_thumbnail import (THUMBNAIL_SIZES, generate_thumbnails, get_thumbnail_path,
+                                        resolve_thumbnail_paths)
+
+
+class TestThumbnailPath:
+    """缩略图路径测试"""
+
+    def test_path_from_original(self):
+        """测试缩略图路径由原图路径确定"""
+        assert get_thumbnail_path('images/123.jpg') == 'images/123.medium.webp'
+        assert get_thumbnail_path('/data/static/images/a.b.png') == '/data/static/images/a.b.medium.webp'
+        assert get_thumbnail_path('') == ''
+
+
+class TestGenerateThumbnails:
+    """缩略图生成测试"""
+
+    def test_generate_and_skip_existing(self, tmp_path):
+        """测试生成按最长边缩放的WebP缩略图，已存在时不重复生成"""
+        original = tmp_path / '1.jpg'
+        Image.new('RGB', (1200, 600), 'red').save(original)
+
+        result = generate_thumbnails(str(original))
+        assert set(result) == set(THUMBNAIL_SIZES)
+        with Image.open(result['medium']) as thumb:
+            assert thumb.format == 'WEBP'
+            assert thumb.size == (480, 240)
+
+        with patch('PIL.Image.open') as image_open:
+            assert generate_thumbnails(str(original)) == result
+            image_open.assert_not_called()
+
+    def test_invalid_or_missing_original(self, tmp_path):
+        """测试原图不存在或无法解析时返回空结果，不留下临时文件"""
+        assert generate_thumbnails(str(tmp_path / 'missing.jpg')) == {}
+        assert generate_thumbnails('') == {}
+
+        broken = tmp_path / 'broken.jpg'
+        broken.write_bytes(b'not an image')
+        assert generate_thumbnails(str(broken)) == {}
+        assert os.listdir(tmp_path) == ['broken.jpg']
+
+
+class TestResolveThumbnailPaths:
+    """列表接口缩略图路径测试"""
+
+    def test_recorded_thumb_used(self):
+        """测试使用记录中的缩略图路径，不检查文件是否存在"""
+        with patch('os.path.exists') as exists:
+            assert resolve_thumbnail_paths(['images/1.jpg'], 'images/1.medium.webp') == ['images/1.medium.webp']
+            exists.assert_not_called()
+
+    def test_fallback_to_original(self):
+        """测试没有记录缩略图时回退为原图，多图时逐张对应"""
+        assert resolve_thumbnail_paths(['images/1.jpg'], '') == ['images/1.jpg']
+        assert resolve_thumbnail_paths(['images/1.jpg', 'images/2.jpg'], 'images/1.medium.webp') == [
+            'images/1.medium.webp', 'images/2.jpg']
+        assert resolve_thumbnail_paths([], 'images/1.medium.webp') == []
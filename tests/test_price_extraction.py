@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+价格提取单元测试
+"""
+
+import sys
+
+sys.path.insert(0, '.')
+
+from jd.services.keyword_extraction_service import KeywordExtractionService, _has_price_hint
+
+
+def _prices(text):
+    return [(price['value'], price['unit'], price['original_text'])
+            for price in KeywordExtractionService.extract_prices(text)]
+
+
+class TestExtractPrices:
+    """extract_prices 测试"""
+
+    def test_unit_and_range_in_one_pass(self):
+        """测试单位价格与范围价格一次扫描提取，单位价格在前"""
+        assert _prices('冰 100元/克，量大 200-300元，烟 50 条') == [
+            (100.0, 'g', '100元/克'), (50.0, 'stick', '50 条'), (250.0, 'g', '200-300元')
+        ]
+        assert _prices('1-2元/克') == [(2.0, 'g', '2元/克'), (1.5, 'g', '1-2元')]
+
+    def test_retry_after_bare_number(self):
+        """测试只匹配到数字时从下一个字符重试"""
+        assert _prices('1~2~3元') == [(2.5, 'g', '2~3元')]
+        assert _prices('97.3.3克') == [(3.3, 'g', '3.3克')]
+
+    def test_deduplicate_and_bounds(self):
+        """测试相同价格去重、超出范围的价格忽略"""
+        assert _prices('150克 100-200元') == [(150.0, 'g', '150克')]
+        assert _prices('0.5克 200000片') == []
+
+    def test_prefilter(self):
+        """测试不含单位或数字不与单位相邻的消息直接跳过"""
+        assert not _has_price_hint('明天 10 点见')
+        assert not _has_price_hint('多少钱一克')
+        assert _has_price_hint('3 块')
+        assert _prices('明天 10 点见，多少钱一克') == []
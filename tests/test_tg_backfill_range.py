@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+分段历史回溯的单元测试
+
+验证：
+- 区间规划只补充未覆盖的部分
+- 条件更新认领区间，竞争失败时认领下一个
+- 从cursor_id检查点继续拉取
+- 整页都是服务消息时检查点继续推进，不会提前结束区间
+"""
+
+import unittest
+import asyncio
+import sys
+import os
+from unittest.mock import MagicMock, AsyncMock, patch
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jd.jobs.tg_new_history import GroupHistoryBackfillEngine, NewJoinedGroupHistoryFetcher
+from jd.models.tg_group_backfill_range import TgGroupBackfillRange
+
+
+class FakeTg:
+    """按 min_id/max_id/limit 从新到旧返回消息，服务消息计入 scan_progress 但不yield"""
+
+    def __init__(self, message_ids, service_ids=()):
+        self.message_ids = sorted(message_ids, reverse=True)
+        self.service_ids = set(service_ids)
+        self.calls = []
+
+    async def scan_message(self, chat, scan_progress=None, **kwargs):
+        self.calls.append((kwargs['min_id'], kwargs['max_id']))
+        page = [message_id for message_id in self.message_ids
+                if kwargs['min_id'] < message_id < kwargs['max_id']][:kwargs['limit']]
+        for message_id in page:
+            if scan_progress is not None:
+                scan_progress['raw_count'] = scan_progress.get('raw_count', 0) + 1
+                scan_progress['min_message_id'] = min(scan_progress.get('min_message_id', message_id), message_id)
+            if message_id in self.service_ids:
+                continue
+            yield {'message_id': message_id}
+
+
+def _range(start_id, end_id, cursor_id=None):
+    return TgGroupBackfillRange(chat_id='1', range_start_id=start_id, range_end_id=end_id,
+                                cursor_id=end_id + 1 if cursor_id is None else cursor_id,
+                                status=TgGroupBackfillRange.Status.RUNNING,
+                                fetched_count=0, saved_count=0)
+
+
+class TestPlanRanges(unittest.TestCase):
+    """区间规划测试"""
+
+    def test_split_from_newest(self):
+        """测试从新到旧按区间大小切分，最后一个区间不足区间大小"""
+        ranges = GroupHistoryBackfillEngine.split_ranges(100, 350, range_size=100)
+        self.assertEqual(ranges, [(250, 350), (150, 250), (100, 150)])
+
+    def test_only_uncovered_spans(self):
+        """测试已覆盖的部分不重复规划，只向新、向旧两端补充"""
+        ranges = GroupHistoryBackfillEngine.split_ranges(50, 400, covered_low=100, covered_high=300, range_size=100)
+        self.assertEqual(ranges, [(300, 400), (50, 100)])
+        self.assertEqual(GroupHistoryBackfillEngine.split_ranges(100, 300, 100, 300, 100), [])
+
+    def test_plan_persists_new_ranges(self):
+        """测试新增区间写入数据库，cursor_id 初始为上界+1"""
+        engine = GroupHistoryBackfillEngine(1, 'g', ['s1'], range_size=100, max_sessions=1)
+        with patch('jd.jobs.tg_new_history.db') as db, \
+                patch('jd.jobs.tg_new_history.TgGroupBackfillRange') as model:
+            db.session.query.return_value.filter.return_value.first.return_value = (None, None)
+            model.query.filter_by.return_value.count.return_value = 2
+            self.assertEqual(engine.plan_ranges(0, 150), 2)
+
+        created = [(call.kwargs['range_start_id'], call.kwargs['range_end_id'], call.kwargs['cursor_id'])
+                   for call in model.call_args_list]
+        self.assertEqual(created, [(50, 150, 151), (0, 50, 51)])
+        self.assertEqual(len(db.session.add_all.call_args[0][0]), 2)
+        db.session.commit.assert_called_once()
+
+
+class TestClaimNextRange(unittest.TestCase):
+    """区间认领测试"""
+
+    @staticmethod
+    def _model(mock_model, candidates, updates=()):
+        """配置模型 mock：过滤条件中的比较运算与候选区间查询"""
+        mock_model.attempts.__lt__.return_value = True
+        mock_model.updated_at.__lt__.return_value = True
+        query = mock_model.query.filter.return_value
+        query.order_by.return_value.limit.return_value.all.return_value = candidates
+        query.update.side_effect = list(updates)
+
+    def test_skip_range_claimed_by_other_worker(self):
+        """测试条件更新未命中（已被其他worker认领）时认领下一个候选区间"""
+        engine = GroupHistoryBackfillEngine(1, 'g', ['s1'], range_size=100, max_sessions=1)
+        first, second = _range(200, 300), _range(100, 200)
+        with patch('jd.jobs.tg_new_history.db') as db, \
+                patch('jd.jobs.tg_new_history.TgGroupBackfillRange') as model:
+            self._model(model, [first, second], updates=[0, 1])
+            claimed = engine.claim_next_range('s1')
+
+        self.assertIs(claimed, second)
+        db.session.refresh.assert_called_once_with(second)
+
+    def test_nothing_to_claim(self):
+        """测试没有可认领区间时返回 None"""
+        engine = GroupHistoryBackfillEngine(1, 'g', ['s1'], range_size=100, max_sessions=1)
+        with patch('jd.jobs.tg_new_history.db'), \
+                patch('jd.jobs.tg_new_history.TgGroupBackfillRange') as model:
+            self._model(model, [])
+            self.assertIsNone(engine.claim_next_range('s1'))
+
+
+class TestFetchBackfillRange(unittest.TestCase):
+    """区间拉取与检查点测试"""
+
+    def setUp(self):
+        self.fetcher = NewJoinedGroupHistoryFetcher()
+        self.fetcher.process_message_batch = AsyncMock(side_effect=lambda batch, chat_id, batch_num: len(batch))
+
+    def _fetch(self, backfill_range, batch_size=3):
+        with patch('jd.jobs.tg_new_history.db'):
+            return asyncio.run(self.fetcher.fetch_backfill_range(
+                MagicMock(), 1, backfill_range, asyncio.Lock(), batch_size=batch_size))
+
+    def test_resume_from_cursor(self):
+        """测试从检查点继续：只拉取 cursor_id 以下的消息"""
+        self.fetcher.tg = FakeTg(range(1, 11))
+        backfill_range = _range(0, 10, cursor_id=6)
+        saved = self._fetch(backfill_range)
+
+        self.assertEqual(saved, 5)
+        self.assertEqual(self.fetcher.tg.calls[0], (0, 6))
+        self.assertEqual(backfill_range.cursor_id, 1)
+        self.assertEqual(backfill_range.fetched_count, 5)
+
+    def test_service_message_page_does_not_end_range(self):
+        """测试整页都是服务消息时按返回的最小ID推进，更早的普通消息仍被拉取"""
+        self.fetcher.tg = FakeTg(range(1, 11), service_ids={10, 9, 8, 7})
+        backfill_range = _range(0, 10)
+        saved = self._fetch(backfill_range)
+
+        self.assertEqual(saved, 6)
+        self.assertEqual(backfill_range.saved_count, 6)
+        self.assertEqual(backfill_range.cursor_id, 1)
+        saved_ids = [data['message_id'] for call in self.fetcher.process_message_batch.call_args_list
+                     for data in call[0][0]]
+        self.assertEqual(saved_ids, [6, 5, 4, 3, 2, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
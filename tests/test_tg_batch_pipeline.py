@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+BaseTgHistoryFetcher.run_batch_pipeline 的单元测试
+
+验证Telegram拉取与写库流水线：
+- 拉取与写库时间重叠
+- 生产者异常在已入队批次写完后抛出
+- 队列深度统计
+- 关闭时等待写库线程不阻塞事件循环
+"""
+
+import unittest
+import asyncio
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jd.jobs.tg_chat_history import ExsitedGroupHistoryFetcher
+
+
+class TestRunBatchPipeline(unittest.TestCase):
+    """run_batch_pipeline 单元测试"""
+
+    def setUp(self):
+        self.fetcher = ExsitedGroupHistoryFetcher()
+        self.fetcher.pipeline_queue_size = 2
+        self.written = []
+
+        async def fake_write(batch_messages, chat_id, batch_num):
+            await asyncio.sleep(0.05)
+            self.written.append(batch_num)
+            return len(batch_messages)
+
+        self.fetcher.write_message_batch_pipelined = fake_write
+
+    def tearDown(self):
+        asyncio.run(self.fetcher.close_telegram_service())
+
+    @staticmethod
+    async def _batches(count, fail=False):
+        for _ in range(count):
+            await asyncio.sleep(0.05)
+            yield [{'message_id': 1}] * 10
+        if fail:
+            raise ConnectionError('network down')
+
+    def test_pipeline_overlaps_fetch_and_write(self):
+        """测试拉取与写库并行执行"""
+        saved, stats = asyncio.run(self.fetcher.run_batch_pipeline(self._batches(4), 123))
+
+        self.assertEqual(saved, 40)
+        self.assertEqual(stats['batch_count'], 4)
+        self.assertEqual(self.written, [1, 2, 3, 4])
+        self.assertLess(stats['wall_seconds'], stats['fetch_seconds'] + stats['write_seconds'])
+        self.assertLessEqual(stats['queue_max_depth'], stats['queue_max_size'])
+
+    def test_pipeline_propagates_producer_error_after_drain(self):
+        """测试生产者异常在写完已入队批次后抛出"""
+        with self.assertRaises(ConnectionError):
+            asyncio.run(self.fetcher.run_batch_pipeline(self._batches(3, fail=True), 123))
+
+        self.assertEqual(self.written, [1, 2, 3])
+
+
+class TestCloseDbExecutor(unittest.TestCase):
+    """关闭写库执行器测试"""
+
+    def test_close_waits_without_blocking_loop(self):
+        """测试关闭时等待未完成的写库，期间事件循环仍可调度其他协程"""
+        fetcher = ExsitedGroupHistoryFetcher()
+        fetcher._db_executor = ThreadPoolExecutor(max_workers=1)
+        finished = []
+        fetcher._db_executor.submit(lambda: (time.sleep(0.2), finished.append('write')))
+
+        async def run():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while not finished:
+                    ticks += 1
+                    await asyncio.sleep(0.01)
+
+            ticker_task = asyncio.create_task(ticker())
+            await fetcher.close_telegram_service()
+            await ticker_task
+            return ticks
+
+        ticks = asyncio.run(run())
+        self.assertEqual(finished, ['write'])
+        self.assertGreater(ticks, 5)
+        self.assertIsNone(fetcher._db_executor)
+
+
+if __name__ == '__main__':
+    unittest.main()
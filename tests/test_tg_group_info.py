@@ -304,6 +304,68 @@ class TestTgGroupInfoManager(unittest.TestCase):
             # 验证回滚被调用
             mock_db_session.rollback.assert_called_once()
 
+    def test_diff_group_fields_private_group_name(self):
+        """测试字段差异计算（私人群组name自动生成）"""
+        mock_existing_group = Mock()
+        mock_existing_group.chat_id = str(self.sample_group_data['id'])
+        mock_existing_group.name = f"<private_chat>_{self.sample_group_data['id']}"
+        mock_existing_group.desc = self.sample_group_data['channel_description']
+        mock_existing_group.title = 'old_title'
+        mock_existing_group.avatar_path = self.sample_group_data['photo_path']
+
+        new_data = dict(self.sample_group_data, username='')
+        diffs = TgGroupInfoManager._diff_group_fields(mock_existing_group, new_data)
+
+        # 只有title变化，name因自动生成与原值相同
+        self.assertEqual(len(diffs), 1)
+        self.assertEqual(diffs[0][0], 'title')
+        self.assertEqual(diffs[0][1], TgGroupInfoChange.ChangedFieldType.DISPLAY_NAME)
+        self.assertEqual(diffs[0][3], self.sample_group_data['title'])
+
+    def test_apply_message_stats(self):
+        """测试批量消息统计写入状态记录"""
+        status = Mock()
+        status.first_record_id = 'keep'
+        TgGroupInfoManager._apply_message_stats(status, {
+            'total_count': 10,
+            'first_date': datetime(2024, 1, 1),
+            'last_date': datetime(2024, 1, 2),
+            'first_id': None,
+            'last_id': '99'
+        })
+
+        self.assertEqual(status.records_now, 10)
+        self.assertEqual(status.first_record_id, 'keep')
+        self.assertEqual(status.last_record_id, '99')
+
+        TgGroupInfoManager._apply_message_stats(status, None)
+        self.assertEqual(status.records_now, 0)
+        self.assertIsNone(status.first_record_date)
+
+    @patch('jd.jobs.tg_group_info.db.session')
+    def test_sync_groups_bulk_chunk_failure_falls_back(self, mock_db_session):
+        """测试批量块提交失败时逐个群组重试，只有出错的群组被跳过"""
+        groups = [dict(self.sample_group_data, id=chat_id) for chat_id in (1, 2, 3)]
+        mock_db_session.commit.side_effect = Exception('Duplicate entry')
+        mock_db_session.in_transaction.return_value = True
+
+        def process_single(group_data, session_name):
+            if group_data['id'] == 2:
+                raise Exception('bad data')
+            return {'is_new': False, 'member_changes': 1, 'info_changes': 0}
+
+        with patch.object(TgGroupInfoManager, '_sync_group_chunk', return_value={}), \
+                patch.object(TgGroupInfoManager, '_process_single_group',
+                             side_effect=process_single) as mock_single:
+            result = TgGroupInfoManager._sync_groups_bulk(groups, 'session')
+
+        self.assertEqual(mock_single.call_count, 3)
+        self.assertEqual(result['processed_groups'], ['1', '3'])
+        self.assertEqual(result['updated_groups'], 2)
+        self.assertEqual(result['member_changes'], 2)
+        self.assertEqual(len(result['errors']), 1)
+        self.assertIn('chat_id=2', result['errors'][0])
+
     @patch('jd.jobs.tg_group_info.TgService.init_tg')
     def test_sync_group_info_by_account_success(self, mock_init_tg):
         """测试根据账户ID同步群组信息（成功）"""
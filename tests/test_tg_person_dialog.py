@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+私聊并发同步的单元测试
+
+验证：
+- 最新消息ID与上次同步相同的对话被跳过
+- 写库失败的对话不记录同步进度，下次重新获取
+"""
+
+import unittest
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+from unittest.mock import MagicMock, AsyncMock, patch
+
+# 添加项目路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jd.jobs import tg_person_dialog
+from jd.jobs.tg_person_dialog import PersonChatHistoryFetcher
+
+
+class FakeTg:
+    """get_dialog 返回对话，scan_message 为每个对话返回固定消息"""
+
+    def __init__(self, messages_by_chat):
+        self.messages_by_chat = messages_by_chat
+        self.scanned = []
+
+    async def get_dialog(self, chat_id):
+        return chat_id
+
+    async def scan_message(self, chat, **kwargs):
+        self.scanned.append(chat)
+        for message_id in self.messages_by_chat.get(chat, []):
+            yield {'message_id': message_id, 'user_id': chat}
+
+
+class TestProcessAllPrivateChats(unittest.TestCase):
+    """私聊同步进度测试"""
+
+    def setUp(self):
+        self.cache = {}
+
+    def _run(self, dialogs, tg, fail_chat_ids=()):
+        fetcher = PersonChatHistoryFetcher.__new__(PersonChatHistoryFetcher)
+        fetcher.account_id = 1
+        fetcher.account = SimpleNamespace(name='s1')
+        fetcher.owner_user_id = '100'
+        fetcher.concurrency = 2
+        fetcher.rate_governor = MagicMock(acquire=AsyncMock())
+        fetcher._write_lock = asyncio.Lock()
+        fetcher.skipped_dialog_count = 0
+        fetcher._load_account_info = MagicMock()
+        fetcher.get_sessionnames_by_accountid = MagicMock(return_value=['s1'])
+        fetcher.get_private_dialog_list = AsyncMock(return_value=dialogs)
+        fetcher.close_telegram_service = AsyncMock()
+
+        async def init_telegram_service(session_names):
+            fetcher.tg = tg
+            return True
+
+        fetcher.init_telegram_service = init_telegram_service
+
+        added = []
+
+        def commit():
+            if any(obj.chat_id in fail_chat_ids for obj in added):
+                added.clear()
+                raise Exception('写库失败')
+            added.clear()
+
+        cache_service = MagicMock()
+        cache_service.get.side_effect = lambda key: self.cache.get(key)
+        cache_service.set.side_effect = lambda key, value, ttl=None: self.cache.__setitem__(key, dict(value))
+
+        with patch.object(tg_person_dialog, 'db') as db, \
+                patch.object(tg_person_dialog, 'TgPersonChatHistory', side_effect=lambda **kw: MagicMock(**kw)), \
+                patch.object(tg_person_dialog, 'TgUserInfoProcessor', return_value=MagicMock(
+                    prepare_batch_user_cache=AsyncMock(), save_user_info_from_message=AsyncMock())), \
+                patch.object(tg_person_dialog, 'CacheService', cache_service):
+            db.session.add_all.side_effect = added.extend
+            db.session.commit.side_effect = commit
+            return asyncio.run(fetcher.process_all_private_chats())
+
+    def _synced(self):
+        return self.cache.get(tg_person_dialog.TOP_MESSAGE_CACHE_KEY.format(account_id=1), {})
+
+    def test_skip_unchanged_dialog(self):
+        """测试最新消息ID未变化的对话不再获取，其余对话获取后记录进度"""
+        self.cache[tg_person_dialog.TOP_MESSAGE_CACHE_KEY.format(account_id=1)] = {'1': 5}
+        tg = FakeTg({1: [5], 2: [7, 6]})
+        success, total = self._run([{'chat_id': 1, 'top_message_id': 5},
+                                    {'chat_id': 2, 'top_message_id': 7}], tg)
+
+        self.assertTrue(success)
+        self.assertEqual(total, 2)
+        self.assertEqual(tg.scanned, [2])
+        self.assertEqual(self._synced(), {'1': 5, '2': 7})
+
+    def test_failed_write_not_recorded(self):
+        """测试写库失败的对话不记录最新消息ID，下次运行重新获取"""
+        tg = FakeTg({1: [5], 2: [7, 6]})
+        dialogs = [{'chat_id': 1, 'top_message_id': 5}, {'chat_id': 2, 'top_message_id': 7}]
+        success, total = self._run(dialogs, tg, fail_chat_ids={'2'})
+
+        self.assertTrue(success)
+        self.assertEqual(total, 1)
+        self.assertEqual(self._synced(), {'1': 5})
+
+        tg = FakeTg({1: [5], 2: [7, 6]})
+        self._run(dialogs, tg)
+        self.assertEqual(tg.scanned, [2])
+        self.assertEqual(self._synced(), {'1': 5, '2': 7})
+
+
+if __name__ == '__main__':
+    unittest.main()
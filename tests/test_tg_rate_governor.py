@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+TgRateGovernor 单元测试
+"""
+
+import asyncio
+import sys
+import time
+
+sys.path.insert(0, '.')
+
+from jd.services.spider.tg_rate_governor import TgRateGovernor
+
+
+class TestTgRateGovernor:
+    """TgRateGovernor 时隙分配测试"""
+
+    def test_concurrent_acquire_spaced_by_interval(self):
+        """测试并发获取时隙时按最小间隔排队"""
+        async def run():
+            governor = TgRateGovernor(min_interval=0.05)
+            start = time.monotonic()
+            await asyncio.gather(*(governor.acquire() for _ in range(5)))
+            return governor, time.monotonic() - start
+
+        governor, elapsed = asyncio.run(run())
+        assert elapsed >= 0.19
+        assert governor.get_stats()['acquired_count'] == 5
+
+    def test_pause_delays_next_slot(self):
+        """测试限流暂停会推迟后续时隙"""
+        async def run():
+            governor = TgRateGovernor(min_interval=0)
+            governor.pause(0.1)
+            start = time.monotonic()
+            await governor.acquire()
+            return time.monotonic() - start
+
+        assert asyncio.run(run()) >= 0.09
+
+    def test_zero_interval_does_not_wait(self):
+        """测试间隔为0时不等待"""
+        async def run():
+            governor = TgRateGovernor(min_interval=0)
+            await asyncio.gather(*(governor.acquire() for _ in range(10)))
+            return governor
+
+        assert asyncio.run(run()).get_stats()['waited_seconds'] == 0
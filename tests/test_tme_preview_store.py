@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+TmePreviewStore 单元测试
+"""
+
+import sys
+from datetime import timedelta
+from unittest.mock import patch
+
+sys.path.insert(0, '.')
+
+from sqlalchemy.dialects import mysql
+
+from jd.jobs.tme_preview_store import TmePreviewStore, account_extra_info, preview_changed
+
+
+class TestRefreshPolicy:
+    """刷新间隔策略测试"""
+
+    def test_frequent_and_volatile_refresh_sooner(self):
+        """测试提及越频繁、变化越频繁，刷新间隔越短"""
+        store = TmePreviewStore()
+        quiet = store.refresh_interval(sightings_per_day=1, change_ratio=0.5)
+        busy = store.refresh_interval(sightings_per_day=100, change_ratio=0.5)
+        volatile = store.refresh_interval(sightings_per_day=1, change_ratio=1.0)
+        stable = store.refresh_interval(sightings_per_day=1, change_ratio=0.0)
+
+        assert busy < quiet
+        assert volatile < quiet < stable
+
+    def test_interval_clamped(self):
+        """测试间隔限制在最短与最长间隔之间"""
+        store = TmePreviewStore(min_interval=3600, max_interval=7 * 86400)
+        assert store.refresh_interval(10 ** 6, 1.0) == timedelta(seconds=3600)
+        assert store.refresh_interval(0, 0.0) == timedelta(days=7)
+
+    def test_retry_backoff(self):
+        """测试连续失败时重试间隔翻倍且不超过最长间隔"""
+        store = TmePreviewStore(error_interval=3600, max_interval=86400)
+        assert store.retry_interval(1) == timedelta(hours=1)
+        assert store.retry_interval(3) == timedelta(hours=4)
+        assert store.retry_interval(30) == timedelta(days=1)
+
+    def test_change_ratio(self):
+        """测试变化比例：首次抓取不计入"""
+        assert TmePreviewStore.change_ratio(1, 0) == 0.5
+        assert TmePreviewStore.change_ratio(5, 2) == 0.5
+        assert TmePreviewStore.change_ratio(3, 0) == 0.0
+
+
+class TestPreviewChanged:
+    """预览变化检测测试"""
+
+    def test_member_tolerance(self):
+        """测试成员数小幅波动不算变化"""
+        old = {'name': 'A', 'members': 1000}
+        assert not preview_changed(old, {'name': 'A', 'members': 1040})
+        assert preview_changed(old, {'name': 'A', 'members': 1100})
+        assert preview_changed(old, {'name': 'B', 'members': 1000})
+        assert preview_changed(None, {'name': 'A'})
+
+    def test_pending_extra_info(self):
+        """测试未抓取账户的 extra_info 带 pending 标记"""
+        extra_info = account_extra_info({'username': 'foo', 'tme_url': 'https://t.me/foo', 'pending': True})
+        assert extra_info == {'tme_url': 'https://t.me/foo', 'username': 'foo', 'pending': True}
+
+
+class TestRecordSightings:
+    """提及记录测试"""
+
+    def test_single_upsert_statement(self):
+        """测试整批提及只执行一条 upsert，且到期时间先于提及数更新"""
+        store = TmePreviewStore(hot_sightings=50)
+        with patch('jd.jobs.tme_preview_store.db') as db:
+            store.record_sightings({'foo': 3, 'bar': 1, '': 2})
+
+        assert db.session.execute.call_count == 1
+        db.session.commit.assert_called_once()
+        sql = str(db.session.execute.call_args[0][0].compile(dialect=mysql.dialect()))
+        assert sql.count('), (') == 1
+        update = sql.split('ON DUPLICATE KEY UPDATE')[1]
+        assert update.index('next_refresh_at =') < update.index('recent_sightings =')
+        assert 'sighting_count = (tme_preview.sighting_count + VALUES(sighting_count))' in update
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+UrlAnalysisCache / LruCache 单元测试
+"""
+
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, '.')
+
+from jd.services.spider.url_analysis_cache import LruCache, UrlAnalysisCache
+
+
+def _result(error=None, redirect_chain_length=0):
+    return {
+        'url_type': 'general',
+        'data': {'website': {'redirect_chain_length': redirect_chain_length}},
+        'error': error
+    }
+
+
+class TestLruCache:
+    """LruCache 测试"""
+
+    def test_evicts_least_recently_used(self):
+        """测试超出上限时淘汰最久未使用的条目"""
+        cache = LruCache(max_entries=2)
+        cache.set('a', 1, 60)
+        cache.set('b', 2, 60)
+        cache.get('a')
+        cache.set('c', 3, 60)
+
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert len(cache) == 2
+
+    def test_expired_entry_returns_none(self):
+        """测试过期条目返回None"""
+        cache = LruCache()
+        cache.set('a', False, 0.01)
+        assert cache.get('a') is False
+        time.sleep(0.02)
+        assert cache.get('a') is None
+
+
+class TestUrlAnalysisCache:
+    """UrlAnalysisCache 测试"""
+
+    def test_ttl_by_result_kind(self):
+        """测试成功、重定向、失败结果使用不同TTL"""
+        cache = UrlAnalysisCache(success_ttl=100, redirect_ttl=10, failure_ttl=1, use_redis=False)
+
+        assert cache.get_ttl(_result()) == 100
+        assert cache.get_ttl(_result(redirect_chain_length=2)) == 10
+        assert cache.get_ttl(_result(error='timeout')) == 1
+
+    def test_failure_is_negative_cached(self):
+        """测试失败结果也会被缓存"""
+        cache = UrlAnalysisCache(use_redis=False)
+        cache.set('https://a.com', _result(error='timeout'))
+
+        assert cache.get('https://a.com')['error'] == 'timeout'
+        assert cache.get_stats()['local_hits'] == 1
+
+    def test_redis_tier_fills_local(self):
+        """测试Redis命中后回填进程内缓存，写入按TTL分组"""
+        cache = UrlAnalysisCache(success_ttl=100, failure_ttl=1)
+        with patch('jd.services.spider.url_analysis_cache.CacheService') as cache_service:
+            cache_service.get_many.return_value = [_result(), None]
+            found = cache.get_many(['https://a.com', 'https://b.com'])
+
+            assert list(found) == ['https://a.com']
+            assert cache.get_stats()['redis_hits'] == 1
+            assert cache.get_stats()['misses'] == 1
+
+            cache.get('https://a.com')
+            assert cache_service.get_many.call_count == 1
+
+            cache.set_many({'https://b.com': _result(error='x'), 'https://c.com': _result()})
+            ttls = sorted(call.args[1] for call in cache_service.set_many.call_args_list)
+            assert ttls == [1, 100]
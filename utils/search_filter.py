@@ -1,21 +1,25 @@
-import re
+from jd.services.spider.entity_tokenizer import tokenize
 
 
 def find_accounts(text):
-    # QQ号正则表达式 (5-11位数字)
-    qq_pattern = r'\b(qq)?[1-9][0-9]{8,10}\b'
-
-    # 中国大陆手机号正则表达式
-    phone_pattern = r'\b1[3-9]\d{9}\b'
-
-    # Telegram账号正则表达式 (@开头,4-32位字母、数字或下划线)
-    # telegram_pattern = r'@[a-zA-Z0-9_]{4,32}\b'
-    telegram_pattern = r'@\+?[a-zA-Z0-9_]{4,32}\b'
-
-    # 查找所有匹配项
-    qq_numbers = re.findall(qq_pattern, text)
-    phone_numbers = re.findall(phone_pattern, text)
-    telegram_accounts = re.findall(telegram_pattern, text)
+    """
+    提取文本中的QQ号、手机号和Telegram账号（单遍扫描，见 entity_tokenizer）
+
+    - QQ号：9-11位数字，可带 qq 前缀（返回值不含前缀）
+    - 手机号：中国大陆手机号
+    - Telegram账号：@开头，可带 +，4-32位字母、数字或下划线
+    """
+    qq_numbers = []
+    phone_numbers = []
+    telegram_accounts = []
+
+    for entity in tokenize(text):
+        if entity.type == 'qq':
+            qq_numbers.append(entity.value)
+        elif entity.type == 'phone':
+            phone_numbers.append(entity.value)
+        elif entity.type == 'account' and len(entity.value.lstrip('@+')) <= 32:
+            telegram_accounts.append(entity.value)
 
     return {
         'qq_number': qq_numbers,
@@ -23,7 +27,6 @@ def find_accounts(text):
         'telegram_number': telegram_accounts
     }
 
-
 if __name__ == '__main__':
 
     # 测试代码